@@ -0,0 +1,106 @@
+"""baseline schema
+
+Schema di partenza: users, activities e laps come li creava Base.metadata.create_all()
+prima delle migrazioni. Sui database già esistenti non va eseguita: basta
+`alembic stamp 0001`.
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-17 01:31:52.483219
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('strava_id', sa.Integer(), nullable=False),
+    sa.Column('access_token', sa.Text(), nullable=False),
+    sa.Column('refresh_token', sa.Text(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('first_name', sa.String(length=100), nullable=True),
+    sa.Column('last_name', sa.String(length=100), nullable=True),
+    sa.Column('strava_profile_url', sa.String(length=500), nullable=True),
+    sa.Column('profile_picture_url', sa.String(length=500), nullable=True),
+    sa.Column('last_sync_timestamp', sa.DateTime(), nullable=True),
+    sa.Column('settings', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_users_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_users_strava_id'), ['strava_id'], unique=True)
+
+    op.create_table('activities',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('strava_activity_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=200), nullable=False),
+    sa.Column('distance', sa.Float(), nullable=False),
+    sa.Column('moving_time', sa.Integer(), nullable=False),
+    sa.Column('elapsed_time', sa.Integer(), nullable=False),
+    sa.Column('total_elevation_gain', sa.Float(), nullable=True),
+    sa.Column('type', sa.String(length=50), nullable=False),
+    sa.Column('start_date', sa.DateTime(), nullable=False),
+    sa.Column('average_speed', sa.Float(), nullable=True),
+    sa.Column('max_speed', sa.Float(), nullable=True),
+    sa.Column('average_heartrate', sa.Float(), nullable=True),
+    sa.Column('max_heartrate', sa.Float(), nullable=True),
+    sa.Column('average_cadence', sa.Float(), nullable=True),
+    sa.Column('average_watts', sa.Float(), nullable=True),
+    sa.Column('map_polyline', sa.Text(), nullable=True),
+    sa.Column('summary_polyline', sa.Text(), nullable=True),
+    sa.Column('detailed_data', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('activities', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_activities_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_activities_strava_activity_id'), ['strava_activity_id'], unique=True)
+
+    op.create_table('laps',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('activity_id', sa.Integer(), nullable=False),
+    sa.Column('lap_index', sa.Integer(), nullable=False),
+    sa.Column('distance', sa.Float(), nullable=False),
+    sa.Column('moving_time', sa.Integer(), nullable=False),
+    sa.Column('average_speed', sa.Float(), nullable=True),
+    sa.Column('start_date', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['activity_id'], ['activities.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('laps', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_laps_id'), ['id'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('laps', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_laps_id'))
+
+    op.drop_table('laps')
+    with op.batch_alter_table('activities', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_activities_strava_activity_id'))
+        batch_op.drop_index(batch_op.f('ix_activities_id'))
+
+    op.drop_table('activities')
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_strava_id'))
+        batch_op.drop_index(batch_op.f('ix_users_id'))
+
+    op.drop_table('users')
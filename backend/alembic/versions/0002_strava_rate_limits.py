@@ -0,0 +1,37 @@
+"""strava rate limits
+
+Contatori condivisi delle chiamate a Strava per finestra (15 minuti, giorno) e per
+utente, usati dallo scheduler delle richieste.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 01:32:20.377415
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('strava_rate_limits',
+    sa.Column('key', sa.String(length=50), nullable=False),
+    sa.Column('window_start', sa.DateTime(), nullable=False),
+    sa.Column('usage', sa.Integer(), nullable=False),
+    sa.Column('limit', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('strava_rate_limits')
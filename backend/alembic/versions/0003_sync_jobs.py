@@ -0,0 +1,53 @@
+"""sync jobs
+
+Coda delle sincronizzazioni in background. L'indice unico parziale su user_id ammette
+un solo job in coda o in esecuzione per utente.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 01:34:02.810963
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('sync_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('params', sa.JSON(), nullable=True),
+    sa.Column('pages_fetched', sa.Integer(), nullable=False),
+    sa.Column('activities_upserted', sa.Integer(), nullable=False),
+    sa.Column('streams_pending', sa.Integer(), nullable=False),
+    sa.Column('streams_fetched', sa.Integer(), nullable=False),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('sync_jobs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_sync_jobs_id'), ['id'], unique=False)
+        batch_op.create_index('uq_sync_jobs_active_user', ['user_id'], unique=True, sqlite_where=sa.text("status IN ('queued', 'running')"), postgresql_where=sa.text("status IN ('queued', 'running')"))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('sync_jobs', schema=None) as batch_op:
+        batch_op.drop_index('uq_sync_jobs_active_user', sqlite_where=sa.text("status IN ('queued', 'running')"), postgresql_where=sa.text("status IN ('queued', 'running')"))
+        batch_op.drop_index(batch_op.f('ix_sync_jobs_id'))
+    op.drop_table('sync_jobs')
@@ -0,0 +1,35 @@
+"""user sync cursor
+
+Aggiunge users.sync_cursor, l'high-water mark della sync incrementale. Il valore
+iniziale è la start_date dell'attività più recente già importata.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 01:36:05.118342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('sync_cursor', sa.DateTime(), nullable=True))
+    op.execute(
+        "UPDATE users SET sync_cursor = "
+        "(SELECT max(activities.start_date) FROM activities WHERE activities.user_id = users.id)"
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('sync_cursor')
@@ -0,0 +1,33 @@
+"""sync job checkpoint
+
+Aggiunge sync_jobs.checkpoint e sync_jobs.run_after per riprendere le sync interrotte.
+I job già salvati restano senza checkpoint e ripartono dall'inizio.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 01:37:11.553102
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('sync_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('checkpoint', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('run_after', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('sync_jobs', schema=None) as batch_op:
+        batch_op.drop_column('run_after')
+        batch_op.drop_column('checkpoint')
@@ -0,0 +1,37 @@
+"""activity stream status
+
+Aggiunge ad activities le colonne del download degli stream in background
+(stream_status, stream_attempts, stream_requested_at). Le attività che hanno già gli
+stream diventano "fetched", le altre restano "pending" e le scarica il worker di backfill.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 01:39:20.901447
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('activities', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('stream_status', sa.String(length=20), server_default='pending', nullable=False))
+        batch_op.add_column(sa.Column('stream_attempts', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('stream_requested_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE activities SET stream_status = 'fetched' WHERE detailed_data IS NOT NULL")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('activities', schema=None) as batch_op:
+        batch_op.drop_column('stream_requested_at')
+        batch_op.drop_column('stream_attempts')
+        batch_op.drop_column('stream_status')
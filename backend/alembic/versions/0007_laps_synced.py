@@ -0,0 +1,40 @@
+"""laps synced
+
+Aggiunge activities.laps_synced_at e sync_jobs.laps_synced. Le attività che hanno già
+dei laps vengono segnate come sincronizzate; le altre restano NULL e i loro laps vengono
+scaricati alla prossima sync.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 01:41:48.264019
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('activities', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('laps_synced_at', sa.DateTime(), nullable=True))
+    op.execute(
+        "UPDATE activities SET laps_synced_at = CURRENT_TIMESTAMP "
+        "WHERE id IN (SELECT activity_id FROM laps)"
+    )
+    with op.batch_alter_table('sync_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('laps_synced', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('sync_jobs', schema=None) as batch_op:
+        batch_op.drop_column('laps_synced')
+    with op.batch_alter_table('activities', schema=None) as batch_op:
+        batch_op.drop_column('laps_synced_at')
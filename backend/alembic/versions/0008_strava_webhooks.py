@@ -0,0 +1,56 @@
+"""strava webhooks
+
+Aggiunge users.strava_deauthorized_at e crea strava_webhook_events, la coda degli
+eventi della push subscription di Strava.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 01:43:55.640877
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('strava_deauthorized_at', sa.DateTime(), nullable=True))
+
+    op.create_table('strava_webhook_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('object_type', sa.String(length=20), nullable=False),
+    sa.Column('object_id', sa.Integer(), nullable=False),
+    sa.Column('aspect_type', sa.String(length=20), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('updates', sa.JSON(), nullable=True),
+    sa.Column('event_time', sa.DateTime(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('process_after', sa.DateTime(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('processed_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('strava_webhook_events', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_strava_webhook_events_id'), ['id'], unique=False)
+        batch_op.create_index('ix_strava_webhook_events_pending', ['status', 'object_type', 'object_id'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('strava_webhook_events', schema=None) as batch_op:
+        batch_op.drop_index('ix_strava_webhook_events_pending')
+        batch_op.drop_index(batch_op.f('ix_strava_webhook_events_id'))
+    op.drop_table('strava_webhook_events')
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('strava_deauthorized_at')
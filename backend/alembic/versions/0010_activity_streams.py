@@ -0,0 +1,39 @@
+"""activity streams
+
+Crea activity_streams, gli stream in formato binario compresso. Gli stream JSON già
+salvati in activities.detailed_data si convertono con python -m app.utils.migrate_streams.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17 01:50:02.446120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('activity_streams',
+    sa.Column('activity_id', sa.Integer(), nullable=False),
+    sa.Column('format_version', sa.Integer(), nullable=False),
+    sa.Column('point_count', sa.Integer(), nullable=False),
+    sa.Column('stream_types', sa.String(length=200), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['activity_id'], ['activities.id'], ),
+    sa.PrimaryKeyConstraint('activity_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('activity_streams')
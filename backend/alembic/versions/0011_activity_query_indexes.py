@@ -0,0 +1,42 @@
+"""activity query indexes
+
+Indici composti per le query delle attività (tutte filtrano su user_id e ordinano
+o filtrano per start_date) e chiave normalizzata del tipo, che sostituisce
+type.ilike(...) con un confronto di uguaglianza indicizzabile.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-17 01:53:08.180167
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0011'
+down_revision: Union[str, None] = '0010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('activities', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('type_key', sa.String(length=50), nullable=True))
+
+    # Stessa normalizzazione di app.models.activity.activity_type_key
+    op.execute("UPDATE activities SET type_key = lower(trim(type))")
+
+    with op.batch_alter_table('activities', schema=None) as batch_op:
+        batch_op.alter_column('type_key', existing_type=sa.String(length=50), nullable=False)
+        batch_op.create_index('ix_activities_user_start_date', ['user_id', 'start_date'], unique=False)
+        batch_op.create_index('ix_activities_user_type_start_date', ['user_id', 'type_key', 'start_date'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('activities', schema=None) as batch_op:
+        batch_op.drop_index('ix_activities_user_type_start_date')
+        batch_op.drop_index('ix_activities_user_start_date')
+        batch_op.drop_column('type_key')
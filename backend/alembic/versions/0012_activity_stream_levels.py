@@ -0,0 +1,38 @@
+"""activity stream levels
+
+Livelli sottocampionati degli stream (piramide LTTB con inviluppi min/max) serviti da
+GET /activities/{id}/streams?points=N. Le attività già scaricate ottengono i livelli
+alla prima richiesta, senza bisogno di un backfill.
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-17 09:12:40.518302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0012'
+down_revision: Union[str, None] = '0011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('activity_stream_levels',
+    sa.Column('activity_id', sa.Integer(), nullable=False),
+    sa.Column('points', sa.Integer(), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['activity_id'], ['activities.id'], ),
+    sa.PrimaryKeyConstraint('activity_id', 'points')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('activity_stream_levels')
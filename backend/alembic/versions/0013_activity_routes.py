@@ -0,0 +1,39 @@
+"""activity routes
+
+Percorsi delle attività semplificati per gli zoom della mappa (Douglas-Peucker, polyline
+ricodificate). Le attività già salvate si elaborano con python -m app.utils.build_routes;
+fino ad allora gli endpoint dei percorsi restituiscono le polyline originali.
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-17 10:31:07.246815
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0013'
+down_revision: Union[str, None] = '0012'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('activity_routes',
+    sa.Column('activity_id', sa.Integer(), nullable=False),
+    sa.Column('zoom', sa.Integer(), nullable=False),
+    sa.Column('point_count', sa.Integer(), nullable=False),
+    sa.Column('polyline', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['activity_id'], ['activities.id'], ),
+    sa.PrimaryKeyConstraint('activity_id', 'zoom')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('activity_routes')
@@ -0,0 +1,52 @@
+"""activity rollups
+
+Totali delle attività per utente, tipo e giorno, settimana ISO e mese, aggiornati in modo
+incrementale dalla sync. Le tabelle esistenti si popolano con python -m
+app.utils.rebuild_rollups; in alternativa i totali di un utente vengono calcolati alla
+prima richiesta di statistiche o tendenze.
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-17 14:12:44.518302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0014'
+down_revision: Union[str, None] = '0013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('activity_rollups',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.String(length=10), nullable=False),
+    sa.Column('bucket', sa.Date(), nullable=False),
+    sa.Column('type_key', sa.String(length=50), nullable=False),
+    sa.Column('activity_count', sa.Integer(), nullable=False),
+    sa.Column('distance', sa.Float(), nullable=False),
+    sa.Column('moving_time', sa.Integer(), nullable=False),
+    sa.Column('elapsed_time', sa.Integer(), nullable=False),
+    sa.Column('elevation_gain', sa.Float(), nullable=False),
+    sa.Column('distance_activity_count', sa.Integer(), nullable=False),
+    sa.Column('distance_moving_time', sa.Integer(), nullable=False),
+    sa.Column('distance_elevation_gain', sa.Float(), nullable=False),
+    sa.Column('heartrate_time', sa.Integer(), nullable=False),
+    sa.Column('heartrate_sum', sa.Float(), nullable=False),
+    sa.Column('watts_time', sa.Integer(), nullable=False),
+    sa.Column('watts_sum', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'period', 'bucket', 'type_key')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('activity_rollups')
@@ -0,0 +1,40 @@
+"""best efforts
+
+Migliori tempi delle attività sulle distanze standard, calcolati dagli stream quando
+vengono salvati. Le attività già scaricate li ottengono all'apertura del dettaglio o
+con python -m app.utils.build_best_efforts.
+
+Revision ID: 0015
+Revises: 0014
+Create Date: 2026-10-17 15:02:19.604117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0015'
+down_revision: Union[str, None] = '0014'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('best_efforts',
+    sa.Column('activity_id', sa.Integer(), nullable=False),
+    sa.Column('distance', sa.Float(), nullable=False),
+    sa.Column('elapsed_time', sa.Float(), nullable=False),
+    sa.Column('start_index', sa.Integer(), nullable=False),
+    sa.Column('end_index', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['activity_id'], ['activities.id'], ),
+    sa.PrimaryKeyConstraint('activity_id', 'distance')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('best_efforts')
@@ -0,0 +1,46 @@
+"""personal records
+
+Indice dei record personali (migliori tempi per utente, tipo, anno e distanza),
+aggiornato quando le attività ottengono i loro migliori tempi. Per i dati esistenti si
+costruisce alla prima richiesta di /records o con python -m app.utils.rebuild_records.
+
+Revision ID: 0016
+Revises: 0015
+Create Date: 2026-10-17 15:48:36.190274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0016'
+down_revision: Union[str, None] = '0015'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('personal_records',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('type_key', sa.String(length=50), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('distance', sa.Float(), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=False),
+    sa.Column('activity_id', sa.Integer(), nullable=False),
+    sa.Column('elapsed_time', sa.Float(), nullable=False),
+    sa.Column('start_date', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['activity_id'], ['activities.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'type_key', 'year', 'distance', 'rank')
+    )
+    op.create_index('ix_personal_records_activity_id', 'personal_records', ['activity_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_personal_records_activity_id', table_name='personal_records')
+    op.drop_table('personal_records')
@@ -0,0 +1,40 @@
+"""activity zones
+
+Tempo di ogni attività nelle zone di frequenza cardiaca e di ritmo, calcolato al
+salvataggio degli stream con i limiti delle impostazioni dell'utente. Per i dati
+esistenti si calcola alla prima richiesta di /activities/zones/summary o con
+python -m app.utils.build_zones.
+
+Revision ID: 0017
+Revises: 0016
+Create Date: 2026-10-17 17:12:08.402915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0017'
+down_revision: Union[str, None] = '0016'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('activity_zones',
+    sa.Column('activity_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('zone', sa.Integer(), nullable=False),
+    sa.Column('seconds', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['activity_id'], ['activities.id'], ),
+    sa.PrimaryKeyConstraint('activity_id', 'kind', 'zone')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('activity_zones')
@@ -0,0 +1,45 @@
+"""training load
+
+TRIMP delle attività (activities.trimp) e carico giornaliero con le medie di fatica,
+forma fisica e forma (training_loads). Per le attività esistenti si calcolano alla prima
+richiesta di /activities/training-load/summary o con python -m app.utils.build_training_load.
+
+Revision ID: 0018
+Revises: 0017
+Create Date: 2026-10-17 18:03:41.557210
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0018'
+down_revision: Union[str, None] = '0017'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('training_loads',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('trimp', sa.Float(), nullable=False),
+    sa.Column('atl', sa.Float(), nullable=False),
+    sa.Column('ctl', sa.Float(), nullable=False),
+    sa.Column('tsb', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'day')
+    )
+    with op.batch_alter_table('activities', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('trimp', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('activities', schema=None) as batch_op:
+        batch_op.drop_column('trimp')
+    op.drop_table('training_loads')
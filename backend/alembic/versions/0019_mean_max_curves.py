@@ -0,0 +1,58 @@
+"""mean max curves
+
+Curve media-massime di velocità e potenza di ogni attività, calcolate al salvataggio
+degli stream, e il loro inviluppo per utente, tipo e anno (e di sempre), aggiornato con
+il massimo elemento per elemento. Per i dati esistenti si calcolano alla prima richiesta
+di /records/mean-max o con python -m app.utils.build_mean_max.
+
+Revision ID: 0019
+Revises: 0018
+Create Date: 2026-10-17 19:02:41.516207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0019'
+down_revision: Union[str, None] = '0018'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('activity_mean_max',
+    sa.Column('activity_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('duration', sa.Integer(), nullable=False),
+    sa.Column('value', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['activity_id'], ['activities.id'], ),
+    sa.PrimaryKeyConstraint('activity_id', 'kind', 'duration')
+    )
+    op.create_table('mean_max_envelopes',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('type_key', sa.String(length=50), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('duration', sa.Integer(), nullable=False),
+    sa.Column('value', sa.Float(), nullable=False),
+    sa.Column('activity_id', sa.Integer(), nullable=False),
+    sa.Column('start_date', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['activity_id'], ['activities.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'type_key', 'year', 'kind', 'duration')
+    )
+    op.create_index('ix_mean_max_envelopes_activity_id', 'mean_max_envelopes', ['activity_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_mean_max_envelopes_activity_id', table_name='mean_max_envelopes')
+    op.drop_table('mean_max_envelopes')
+    op.drop_table('activity_mean_max')
@@ -1,5 +1,7 @@
 from .auth import router as auth_router
 from .activities import router as activities_router
 from .mock import router as mock_router
+from .records import router as records_router
+from .webhooks import router as webhooks_router
 
-__all__ = ["auth_router", "activities_router", "mock_router"] 
\ No newline at end of file
+__all__ = ["auth_router", "activities_router", "mock_router", "records_router", "webhooks_router"] 
\ No newline at end of file
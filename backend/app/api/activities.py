@@ -1,126 +1,140 @@
+import base64
+import json
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, asc, func
-from datetime import datetime, timedelta
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer, undefer_group
+from sqlalchemy import desc, asc, func, select, tuple_
+from datetime import date, datetime, timedelta
 from typing import List, Optional
-from app.db.database import get_db
-from app.services.strava_service import StravaService, StravaRateLimitError
+from app.db.database import SessionLocal, get_db
+from app.core.config import settings
+from app.services.rate_limiter import StravaRateLimitError, rate_limiter
+from app.services.rollups import bucket_start, count_by_type, ensure_user_rollups, read_rollups, sum_totals
+from app.services.strava_service import StravaService
+from app.services.best_efforts import best_efforts_to_json, save_best_efforts
+from app.services.downsample import split_envelopes
+from app.services.geometry import route_zoom
+from app.services.stream_archive import read_stream_range
+from app.services.stream_store import load_stream_level, load_streams, streams_to_json, streams_to_lists
+from app.services.sync_jobs import enqueue_sync_job, job_eta_seconds
+from app.services.training_load import ensure_user_training_load, read_training_load
+from app.services.zones import ensure_user_zones, read_zone_distribution, zone_bounds, zone_seconds
 from app.models.user import User
-from app.models.activity import Activity, Lap
-from app.schemas.activity import Activity as ActivitySchema, ActivityWithLaps
+from app.models.activity import Activity, Lap, activity_type_key, STREAM_PENDING, STREAM_FAILED
+from app.models.activity_rollup import ROLLUP_DAY, ROLLUP_WEEK, ROLLUP_MONTH
+from app.models.activity_zone import ZONE_HEARTRATE, ZONE_PACE
+from app.models.activity_route import ActivityRoute
+from app.models.best_effort import BestEffort
+from app.models.mean_max import ActivityMeanMax
+from app.models.sync_job import SyncJob
+from app.schemas.activity import (
+    Activity as ActivitySchema, ActivityRoute as ActivityRouteSchema, ActivityRoutes, ActivitySummary, ActivityStreams, ActivityWithLaps
+)
+from app.schemas.training_load import TrainingLoadSeries
+from app.schemas.zone import ZoneDistribution
+from app.schemas.sync_job import SyncJob as SyncJobSchema
 from app.api.deps import get_current_user
 
 router = APIRouter(prefix="/activities", tags=["activities"])
 strava_service = StravaService()
 
+# Colonne lette per l'elenco: polyline e stream restano fuori dalla query
+SUMMARY_COLUMNS = [getattr(Activity, field) for field in ActivitySummary.model_fields]
 
-@router.post("/sync")
+# Ordinamenti ammessi per l'elenco: colonne NOT NULL, così la coppia (valore, id) del cursore è sempre confrontabile
+SORT_COLUMNS = {
+    "start_date": Activity.start_date,
+    "distance": Activity.distance,
+    "moving_time": Activity.moving_time,
+    "elapsed_time": Activity.elapsed_time,
+    "name": Activity.name,
+}
+
+
+def _job_response(job: SyncJob, message: str) -> dict:
+    """Serializza un job di sincronizzazione con la stima del tempo residuo"""
+    job_data = SyncJobSchema.model_validate(job)
+    job_data.eta_seconds = job_eta_seconds(job)
+    return {"message": message, "job_id": job.id, "job": job_data}
+
+
+@router.post("/sync", status_code=202)
 async def sync_activities(
     after_date: Optional[datetime] = Query(None, description="Sync activities after this date"),
-    db: Session = Depends(get_db),
+    full: bool = Query(False, description="Re-download the whole history instead of an incremental sync"),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Sincronizza le attività di un utente da Strava"""
-    try:
-        # Aggiorna il token se necessario
-        if not strava_service.refresh_access_token(current_user, db):
-            print(f"[SYNC][ERRORE] Refresh token fallito per user_id={current_user.id}")
-            raise HTTPException(status_code=401, detail="Token Strava scaduto o non valido. Ricollega il tuo account Strava dalle impostazioni.")
-        
-        # Sincronizza le attività
-        sync_result = strava_service.sync_user_activities(db, current_user, after_date)
-        
-        return {
-            "message": "Activities synced successfully",
-            "sync_result": sync_result
-        }
-        
-    except StravaRateLimitError as e:
-        retry_after = e.retry_after or 60
-        raise HTTPException(
-            status_code=429, 
-            detail={
-                "error": "Rate limit exceeded",
-                "message": str(e),
-                "retry_after": retry_after,
-                "retry_after_seconds": retry_after
-            }
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Sync failed: {str(e)}")
+    """
+    Accoda la sincronizzazione delle attività di un utente da Strava.
+    Senza after_date la sync è incrementale: solo le attività nuove più una
+    rilettura degli ultimi giorni per intercettare le modifiche.
+    """
+    params = {"after_date": after_date.isoformat()} if after_date else {"full": full}
+    job = await db.run_sync(enqueue_sync_job, current_user, "sync", params)
+    return _job_response(job, "Sync job queued")
 
 
-@router.post("/sync/smart")
+@router.post("/sync/smart", status_code=202)
 async def sync_activities_smart(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Sincronizza le attività partendo dalla data dell'attività più vecchia nel database"""
-    try:
-        if not strava_service.refresh_access_token(current_user, db):
-            raise HTTPException(status_code=401, detail="Token Strava scaduto o non valido.")
-        
-        oldest_activity = db.query(Activity).filter(
-            Activity.user_id == current_user.id
-        ).order_by(Activity.start_date.asc()).first()
-        
-        if oldest_activity:
-            after_date = oldest_activity.start_date
-            sync_result = strava_service.sync_user_activities(db, current_user, after_date)
-            return {
-                "message": f"Activities synced from {after_date.strftime('%Y-%m-%d')}",
-                "sync_result": sync_result,
-                "oldest_activity_date": after_date.isoformat()
-            }
-        else:
-            sync_result = strava_service.sync_user_activities(db, current_user)
-            return {
-                "message": "No existing activities found. Syncing all activities.",
-                "sync_result": sync_result
-            }
-        
-    except StravaRateLimitError as e:
-        retry_after = e.retry_after or 60
-        raise HTTPException(status_code=429, detail={"retry_after": retry_after, "message": str(e)})
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Smart sync failed: {str(e)}")
+    """Accoda una sincronizzazione incrementale a partire dall'attività più recente già importata"""
+    job = await db.run_sync(enqueue_sync_job, current_user, "smart")
+    return _job_response(job, "Smart sync job queued")
 
 
-@router.post("/sync/extend")
+@router.post("/sync/extend", status_code=202)
 async def sync_activities_extend(
-    months_back: int = Query(12, description="How many months back to sync"),
-    db: Session = Depends(get_db),
+    months_back: int = Query(12, ge=1, le=240, description="How many months back to sync"),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Sincronizza le attività estendendo il periodo di X mesi indietro"""
+    """Accoda una sincronizzazione dello storico di X mesi precedente all'attività più vecchia"""
+    job = await db.run_sync(enqueue_sync_job, current_user, "extend", {"months_back": months_back})
+    return _job_response(job, "Extend sync job queued")
+
+
+@router.get("/sync/{job_id}")
+async def get_sync_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Restituisce lo stato di avanzamento di un job di sincronizzazione"""
+    job = await db.scalar(select(SyncJob).where(
+        SyncJob.id == job_id,
+        SyncJob.user_id == current_user.id
+    ))
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Sync job not found")
+    
+    return _job_response(job, f"Sync job {job.status}")
+
+
+def _encode_cursor(sort_by: str, descending: bool, row) -> str:
+    """Cursore opaco con la posizione dell'ultima riga restituita: (colonna, verso, valore, id)"""
+    value = getattr(row, sort_by)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps([sort_by, descending, value, row.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort_by: str, descending: bool) -> tuple:
     try:
-        if not strava_service.refresh_access_token(current_user, db):
-            raise HTTPException(status_code=401, detail="Token Strava scaduto o non valido.")
-        
-        oldest_activity = db.query(Activity).filter(
-            Activity.user_id == current_user.id
-        ).order_by(Activity.start_date.asc()).first()
-        
-        if oldest_activity:
-            extended_date = oldest_activity.start_date - timedelta(days=months_back * 30)
-            sync_result = strava_service.sync_user_activities(db, current_user, extended_date)
-            return {
-                "message": f"Activities synced from {extended_date.strftime('%Y-%m-%d')}",
-                "sync_result": sync_result,
-                "extended_from_date": extended_date.isoformat()
-            }
-        else:
-            sync_result = strava_service.sync_user_activities(db, current_user)
-            return {
-                "message": "No existing activities found. Syncing all activities.",
-                "sync_result": sync_result
-            }
-            
-    except StravaRateLimitError as e:
-        retry_after = e.retry_after or 60
-        raise HTTPException(status_code=429, detail={"retry_after": retry_after, "message": str(e)})
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Extend sync failed: {str(e)}")
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort_by, cursor_descending, value, activity_id = json.loads(payload)
+        if sort_by == "start_date":
+            value = datetime.fromisoformat(value)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if (cursor_sort_by, cursor_descending) != (sort_by, descending):
+        raise HTTPException(status_code=400, detail="Cursor does not match sort_by/sort_order")
+    return value, activity_id
 
 
 @router.get("/")
@@ -130,135 +144,320 @@ async def get_user_activities(
     activity_type: Optional[str] = Query(None, description="Filter by activity type"),
     start_date: Optional[datetime] = Query(None, description="Filter activities after this date"),
     end_date: Optional[datetime] = Query(None, description="Filter activities before this date"),
-    sort_by: str = Query("start_date", description="Sort by field"),
+    sort_by: str = Query("start_date", description="Sort by field: " + ", ".join(SORT_COLUMNS)),
     sort_order: str = Query("desc", description="Sort order (asc/desc)"),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (replaces skip)"),
+    include_total: Optional[bool] = Query(None, description="Count all matching activities (default: only without cursor)"),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Ottiene le attività dell'utente corrente con filtri e paginazione"""
-    query = db.query(Activity).filter(Activity.user_id == current_user.id)
+    """
+    Ottiene le attività dell'utente corrente con filtri e paginazione (solo i campi di riepilogo).
+
+    Con cursor la pagina successiva parte dall'ultima riga della precedente, (valore, id)
+    nell'ordinamento scelto, invece di scartare skip righe: il costo non cresce con la
+    profondità. Il totale viene contato solo se richiesto (per default sulla prima pagina).
+    """
+    # Filtri e ordinamento per data usano gli indici (user_id, start_date) e (user_id, type_key, start_date)
+    query = select(*SUMMARY_COLUMNS).where(Activity.user_id == current_user.id)
     
     if activity_type:
-        query = query.filter(Activity.type == activity_type)
+        query = query.where(Activity.type_key == activity_type_key(activity_type))
     if start_date:
-        query = query.filter(Activity.start_date >= start_date)
+        query = query.where(Activity.start_date >= start_date)
     if end_date:
-        query = query.filter(Activity.start_date <= end_date)
+        query = query.where(Activity.start_date <= end_date)
+    
+    total = None
+    if include_total or (include_total is None and cursor is None):
+        total = await db.scalar(select(func.count()).select_from(query.subquery()))
+    
+    if sort_by not in SORT_COLUMNS:
+        sort_by = "start_date"
+    sort_column = SORT_COLUMNS[sort_by]
+    descending = sort_order.lower() == "desc"
+    # id come secondo criterio: l'ordine è totale anche a parità di valore
+    order = desc if descending else asc
+    query = query.order_by(order(sort_column), order(Activity.id))
     
-    if hasattr(Activity, sort_by):
-        sort_column = getattr(Activity, sort_by)
-        if sort_order.lower() == "desc":
-            query = query.order_by(desc(sort_column))
-        else:
-            query = query.order_by(asc(sort_column))
+    if cursor:
+        value, activity_id = _decode_cursor(cursor, sort_by, descending)
+        position = tuple_(sort_column, Activity.id)
+        query = query.where(position < (value, activity_id) if descending else position > (value, activity_id))
     else:
-        query = query.order_by(desc(Activity.start_date))
+        query = query.offset(skip)
     
-    total = query.count()
-    activities = query.offset(skip).limit(limit).all()
+    # Una riga in più dice se esiste una pagina successiva
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    activities = rows[:limit]
     
     return {
-        "activities": [ActivitySchema.from_orm(activity) for activity in activities],
+        "activities": [ActivitySummary.model_validate(activity) for activity in activities],
         "total": total,
-        "skip": skip,
-        "limit": limit
+        "skip": skip if cursor is None else 0,
+        "limit": limit,
+        "next_cursor": _encode_cursor(sort_by, descending, activities[-1]) if len(rows) > limit else None
     }
 
 
+def _hydrate_streams(user_id: int, activity_id: int) -> None:
+    """
+    Scarica gli stream senza attendere a lungo il budget Strava: in caso contrario ci pensa il backfill.
+    Gira in un thread con una sessione sincrona propria, come i worker in background.
+    """
+    db = SessionLocal()
+    try:
+        user = db.get(User, user_id)
+        activity = db.get(Activity, activity_id)
+        with rate_limiter.max_wait(settings.stream_on_demand_max_wait):
+            strava_service.hydrate_activity_streams(db, user, activity)
+    except StravaRateLimitError as e:
+        db.rollback()
+        print(f"[STREAMS] Stream dell'attività {activity_id} rimandati al backfill: {str(e)}")
+    finally:
+        db.close()
+
+
+async def _ensure_streams(db: AsyncSession, user: User, activity: Activity) -> None:
+    """Gli stream vengono scaricati alla prima apertura, se il backfill non è ancora arrivato"""
+    if activity.stream_status in (STREAM_PENDING, STREAM_FAILED):
+        await run_in_threadpool(_hydrate_streams, user.id, activity.id)
+        await db.refresh(activity, ["stream_status"])
+
+
+def _load_detail_streams(db, activity: Activity):
+    """
+    (stream, migliori tempi, True se i tempi sono stati appena calcolati): le attività
+    scaricate prima di best_efforts li ottengono qui (il chiamante esegue il commit)
+    """
+    streams = load_streams(db, activity)
+    best_efforts = db.query(BestEffort).filter(BestEffort.activity_id == activity.id).all()
+    if best_efforts or streams is None:
+        return streams, best_efforts, False
+    best_efforts = save_best_efforts(db, activity, streams)
+    return streams, best_efforts, bool(best_efforts)
+
+
 @router.get("/{activity_id}")
 async def get_activity_detail(
     activity_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Ottiene i dettagli di una singola attività"""
-    activity = db.query(Activity).filter(
-        Activity.id == activity_id,
-        Activity.user_id == current_user.id
-    ).first()
+    activity = await db.scalar(
+        select(Activity)
+        .options(undefer_group("geometry"), undefer(Activity.detailed_data))
+        .where(Activity.id == activity_id, Activity.user_id == current_user.id)
+    )
     
     if not activity:
         raise HTTPException(status_code=404, detail="Activity not found")
     
-    laps = db.query(Lap).filter(Lap.activity_id == activity_id).order_by(Lap.lap_index).all()
+    await _ensure_streams(db, current_user, activity)
     
-    activity_data = ActivitySchema.from_orm(activity)
-    response_data = activity_data.dict()
+    laps = (await db.scalars(select(Lap).where(Lap.activity_id == activity_id).order_by(Lap.lap_index))).all()
+    
+    activity_data = ActivitySchema.model_validate(activity)
+    response_data = activity_data.model_dump()
+    # Gli stream sono nell'archivio binario: il frontend li riceve nel formato JSON di sempre
+    streams, best_efforts, created = await db.run_sync(_load_detail_streams, activity)
+    if created:
+        await db.commit()
+    response_data["detailed_data"] = streams_to_json(streams) if streams is not None else None
+    response_data["best_efforts"] = best_efforts_to_json(best_efforts)
+    # Curve media-massime calcolate con gli stream: {speed|power: [{duration, value}]}
+    mean_max = {}
+    for kind, duration, value in await db.execute(
+        select(ActivityMeanMax.kind, ActivityMeanMax.duration, ActivityMeanMax.value)
+        .where(ActivityMeanMax.activity_id == activity.id)
+        .order_by(ActivityMeanMax.kind, ActivityMeanMax.duration)
+    ):
+        mean_max.setdefault(kind, []).append({"duration": duration, "value": value})
+    response_data["mean_max"] = mean_max
     response_data["laps"] = [{"id": lap.id, "lap_index": lap.lap_index, "distance": lap.distance, 
                              "moving_time": lap.moving_time, "average_speed": lap.average_speed, 
                              "start_date": lap.start_date} for lap in laps]
     return response_data
 
 
-@router.get("/stats/summary")
-async def get_user_stats(
+@router.get("/{activity_id}/streams", response_model=ActivityStreams)
+async def get_activity_streams(
+    activity_id: int,
+    types: Optional[str] = Query(None, description="Comma-separated stream types, e.g. time,heartrate"),
+    from_t: Optional[float] = Query(None, ge=0, description="Start of the time window in seconds (inclusive)"),
+    to_t: Optional[float] = Query(None, ge=0, description="End of the time window in seconds (inclusive)"),
+    points: Optional[int] = Query(None, ge=3, description="Approximate number of points wanted, e.g. the chart width"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Restituisce gli stream di un'attività, eventualmente solo i tipi richiesti e solo i
+    punti con from_t <= time <= to_t (letti dall'archivio su file, senza decodificare il blob).
+    Con points serve il livello sottocampionato più piccolo che ne ha almeno tanti, con gli
+    inviluppi min/max di ogni punto.
+    """
+    if from_t is not None and to_t is not None and from_t > to_t:
+        raise HTTPException(status_code=400, detail="from_t must not be greater than to_t")
+
+    activity = await db.scalar(select(Activity).where(
+        Activity.id == activity_id,
+        Activity.user_id == current_user.id
+    ))
+    
+    if not activity:
+        raise HTTPException(status_code=404, detail="Activity not found")
+    
+    await _ensure_streams(db, current_user, activity)
+    
+    try:
+        level_points, streams, envelopes = await db.run_sync(
+            _read_streams, activity, types.split(",") if types else None, from_t, to_t, points
+        )
+    except KeyError:
+        raise HTTPException(status_code=400, detail="Activity has no time stream to filter on")
+    if points is not None:
+        await db.commit()  # livelli calcolati ora per le attività scaricate prima della piramide
+    return {
+        "activity_id": activity.id,
+        "stream_status": activity.stream_status,
+        "points": level_points,
+        "streams": streams_to_lists(streams) if streams is not None else None,
+        "envelopes": {
+            stream_type: streams_to_lists(bounds) for stream_type, bounds in envelopes.items()
+        } if envelopes else None
+    }
+
+
+def _read_streams(db, activity: Activity, types: Optional[List[str]], from_t: Optional[float], to_t: Optional[float], points: Optional[int]):
+    """(punti del livello o None, stream, inviluppi): il livello adatto a points se c'è, altrimenti la risoluzione piena"""
+    if points is not None:
+        level = load_stream_level(db, activity, points, types, from_t, to_t)
+        if level is not None:
+            level_points, level_streams = level
+            return (level_points, *split_envelopes(level_streams))
+    return None, read_stream_range(db, activity, types, from_t, to_t), None
+
+
+@router.get("/{activity_id}/route", response_model=ActivityRouteSchema)
+async def get_activity_route(
+    activity_id: int,
+    zoom: Optional[int] = Query(None, ge=0, le=22, description="Map zoom level (omit for the original polyline)"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Percorso dell'attività semplificato per lo zoom della mappa (Douglas-Peucker, vedi services/geometry.py)"""
+    activity = (await db.execute(select(Activity.id, Activity.map_polyline, Activity.summary_polyline).where(
+        Activity.id == activity_id,
+        Activity.user_id == current_user.id
+    ))).first()
+    
+    if not activity:
+        raise HTTPException(status_code=404, detail="Activity not found")
+    
+    level = route_zoom(settings.route_zoom_levels, zoom) if zoom is not None else None
+    if level is not None:
+        route = (await db.execute(select(ActivityRoute.point_count, ActivityRoute.polyline).where(
+            ActivityRoute.activity_id == activity_id, ActivityRoute.zoom == level
+        ))).first()
+        if route:
+            return {"activity_id": activity_id, "zoom": level, "point_count": route.point_count, "polyline": route.polyline}
+    
+    # Zoom oltre il livello più fine, o percorsi non ancora calcolati: polyline originale
+    return {"activity_id": activity_id, "zoom": None, "polyline": activity.map_polyline or activity.summary_polyline}
+
+
+@router.get("/routes/all", response_model=ActivityRoutes)
+async def get_user_routes(
+    zoom: int = Query(..., ge=0, le=22, description="Map zoom level"),
+    activity_type: Optional[str] = Query(None),
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
-    activity_type: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Ottiene le statistiche aggregate ottimizzate"""
-    # Base query filters
-    filters = [Activity.user_id == current_user.id, Activity.distance > 0]
+    """Percorsi di tutte le attività per la mappa, alla semplificazione adatta allo zoom"""
+    level = route_zoom(settings.route_zoom_levels, zoom)
+    if level is not None:
+        # Le attività senza percorsi calcolati ripiegano sulla polyline di riepilogo, la più leggera
+        polyline = func.coalesce(ActivityRoute.polyline, Activity.summary_polyline, Activity.map_polyline)
+    else:
+        polyline = func.coalesce(Activity.map_polyline, Activity.summary_polyline)
+    query = select(
+        Activity.id.label("activity_id"), Activity.name, Activity.type, Activity.start_date, polyline.label("polyline")
+    ).outerjoin(
+        ActivityRoute, (ActivityRoute.activity_id == Activity.id) & (ActivityRoute.zoom == level)
+    ).where(Activity.user_id == current_user.id, polyline.isnot(None), polyline != "")
+    
     if activity_type:
-        filters.append(Activity.type == activity_type)
-    if start_date:
-        filters.append(Activity.start_date >= start_date)
-    if end_date:
-        filters.append(Activity.start_date <= end_date)
-
-    # Optimized aggregation query
-    stats = db.query(
-        func.count(Activity.id).label('count'),
-        func.sum(Activity.distance).label('total_distance'),
-        func.sum(Activity.moving_time).label('total_time'),
-        func.sum(Activity.total_elevation_gain).label('total_elevation')
-    ).filter(*filters).first()
-
-    # Calculate run specific stats for average pace
-    run_filters = [Activity.user_id == current_user.id, Activity.type.ilike('run')]
+        query = query.where(Activity.type_key == activity_type_key(activity_type))
     if start_date:
-        run_filters.append(Activity.start_date >= start_date)
+        query = query.where(Activity.start_date >= start_date)
     if end_date:
-        run_filters.append(Activity.start_date <= end_date)
-        
-    run_stats = db.query(
-        func.sum(Activity.distance).label('dist'),
-        func.sum(Activity.moving_time).label('time')
-    ).filter(*run_filters).first()
+        query = query.where(Activity.start_date <= end_date)
+    
+    rows = (await db.execute(query.order_by(Activity.start_date.desc()))).all()
+    return {"zoom": level, "routes": [row._asdict() for row in rows]}
+
+
+def _read_rollups(db, user_id: int, start_date: Optional[datetime], end_date: Optional[datetime], period: str, by_bucket: bool):
+    """Totali dell'intervallo e conteggi per tipo; True se i totali dell'utente sono stati appena creati"""
+    created = ensure_user_rollups(db, user_id)
+    rows = read_rollups(db, user_id, start_date, end_date, period=period, by_bucket=by_bucket)
+    return rows, count_by_type(db, user_id), created
+
+
+@router.get("/stats/summary")
+async def get_user_stats(
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    activity_type: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Ottiene le statistiche aggregate dai totali mensili e giornalieri (activity_rollups):
+    il costo dipende dal numero di mesi dell'intervallo, non dal numero di attività
+    """
+    rows, counts_by_type, created = await db.run_sync(
+        _read_rollups, current_user.id, start_date, end_date, ROLLUP_MONTH, False
+    )
+    if created:
+        await db.commit()
+
+    type_key = activity_type_key(activity_type) if activity_type else None
+    stats = sum_totals(values for _, row_type, values in rows if type_key is None or row_type == type_key)
+    run_stats = sum_totals(values for _, row_type, values in rows if row_type == "run")
 
     average_pace = 0
-    if run_stats and run_stats.dist and run_stats.dist > 0:
+    if run_stats["distance"] > 0:
         # Calculate average pace in min/km
         # time is in seconds, distance is in meters
         # pace (min/km) = (seconds / meters) * (1000 meters/km) / (60 seconds/min)
-        average_pace = (run_stats.time / run_stats.dist) * 1000 / 60
-
-    # Counts by type
-    total_activities_all = db.query(func.count(Activity.id)).filter(Activity.user_id == current_user.id).scalar()
-    num_bike = db.query(func.count(Activity.id)).filter(Activity.user_id == current_user.id, Activity.type.ilike('ride')).scalar()
-    num_tennis = db.query(func.count(Activity.id)).filter(Activity.user_id == current_user.id, Activity.type.ilike('workout')).scalar()
+        average_pace = (run_stats["moving_time"] / run_stats["distance"]) * 1000 / 60
+    # Media della frequenza cardiaca pesata sul tempo in movimento
+    average_heartrate = stats["heartrate_sum"] / stats["heartrate_time"] if stats["heartrate_time"] else None
 
     return {
-        "total_activities": stats.count or 0,
-        "total_distance": stats.total_distance or 0,
-        "total_time": stats.total_time or 0,
-        "total_elevation": stats.total_elevation or 0,
+        "total_activities": stats["distance_activity_count"],
+        "total_distance": stats["distance"],
+        "total_time": stats["distance_moving_time"],
+        "total_elevation": stats["distance_elevation_gain"],
         "average_pace": average_pace,
-        "total_activities_all": total_activities_all or 0,
-        "num_bike": num_bike or 0,
-        "num_tennis": num_tennis or 0
+        "average_heartrate": average_heartrate,
+        "total_activities_all": sum(counts_by_type.values()),
+        "num_bike": counts_by_type.get("ride", 0),
+        "num_tennis": counts_by_type.get("workout", 0)
     }
 
 
 @router.get("/trends/summary")
 async def get_user_trends(
     period: str = Query("month", description="Period: week, month, year"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Ottiene le tendenze delle attività"""
+    """Ottiene le tendenze delle attività: per giorno (week, month) o per mese (year), dai totali salvati"""
     now = datetime.utcnow()
     if period == "week":
         start_date = now - timedelta(days=7)
@@ -269,27 +468,114 @@ async def get_user_trends(
     else:
         raise HTTPException(status_code=400, detail="Invalid period")
     
-    # Questo potrebbe essere ottimizzato ulteriormente con group_by SQL, 
-    # ma per ora manteniamo la logica Python per semplicità di raggruppamento date,
-     # limitando però i campi selezionati.
-    activities = db.query(Activity.start_date, Activity.distance, Activity.moving_time, Activity.total_elevation_gain).filter(
-        Activity.user_id == current_user.id,
-        Activity.start_date >= start_date
-    ).order_by(Activity.start_date).all()
+    bucket_period = ROLLUP_MONTH if period == "year" else ROLLUP_DAY
+    key_format = "%Y-%m" if period == "year" else "%Y-%m-%d"
+    rows, _, created = await db.run_sync(_read_rollups, current_user.id, start_date, None, bucket_period, True)
+    if created:
+        await db.commit()
     
     trends = {}
-    for activity in activities:
-        if period == "week" or period == "month":
-            key = activity.start_date.strftime("%Y-%m-%d")
-        else:
-            key = activity.start_date.strftime("%Y-%m")
-        
+    for bucket, _, values in sorted(rows, key=lambda row: row[0]):
+        key = bucket_start(bucket_period, bucket).strftime(key_format)
         if key not in trends:
             trends[key] = {"distance": 0, "time": 0, "activities": 0, "elevation": 0}
         
-        trends[key]["distance"] += activity.distance
-        trends[key]["time"] += activity.moving_time
-        trends[key]["activities"] += 1
-        trends[key]["elevation"] += activity.total_elevation_gain or 0
+        trends[key]["distance"] += values["distance"]
+        trends[key]["time"] += values["moving_time"]
+        trends[key]["activities"] += values["activity_count"]
+        trends[key]["elevation"] += values["elevation_gain"]
+    
+    return {"period": period, "trends": trends}
+
+
+def _read_zones(db, user_id: int, start_date: Optional[datetime], end_date: Optional[datetime], type_key: Optional[str], period: Optional[str]):
+    """Secondi per zona dell'intervallo; True se le zone dell'utente sono state appena calcolate"""
+    created = ensure_user_zones(db, user_id)
+    return read_zone_distribution(db, user_id, start_date, end_date, type_key, period), created
+
+
+@router.get("/zones/summary", response_model=ZoneDistribution)
+async def get_zone_distribution(
+    period: str = Query("week", description="Period: week, month, total"),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    activity_type: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Tempo nelle zone di frequenza cardiaca e di ritmo, in totale e per settimana o mese:
+    somme delle righe di activity_zones, calcolate con i limiti delle impostazioni dell'utente
+    """
+    periods = {"week": ROLLUP_WEEK, "month": ROLLUP_MONTH, "total": None}
+    if period not in periods:
+        raise HTTPException(status_code=400, detail="Invalid period")
+    
+    type_key = activity_type_key(activity_type) if activity_type else None
+    distribution, created = await db.run_sync(
+        _read_zones, current_user.id, start_date, end_date, type_key, periods[period]
+    )
+    if created:
+        await db.commit()
     
-    return {"period": period, "trends": trends} 
\ No newline at end of file
+    bounds = zone_bounds(current_user.settings)
+    totals = {ZONE_HEARTRATE: {}, ZONE_PACE: {}}
+    buckets = []
+    # Con period=total c'è un solo bucket, None
+    for bucket, zones in sorted(distribution.items(), key=lambda item: item[0]):
+        for kind, seconds in zones.items():
+            for zone, value in seconds.items():
+                totals[kind][zone] = totals[kind].get(zone, 0.0) + value
+        if bucket is not None:
+            buckets.append({
+                "start": bucket,
+                "heartrate": zone_seconds(zones.get(ZONE_HEARTRATE, {}), bounds[ZONE_HEARTRATE]),
+                "pace": zone_seconds(zones.get(ZONE_PACE, {}), bounds[ZONE_PACE]),
+            })
+    
+    return {
+        "period": period,
+        "activity_type": activity_type,
+        "heartrate_bounds": bounds[ZONE_HEARTRATE],
+        "pace_bounds": bounds[ZONE_PACE],
+        "heartrate": zone_seconds(totals[ZONE_HEARTRATE], bounds[ZONE_HEARTRATE]),
+        "pace": zone_seconds(totals[ZONE_PACE], bounds[ZONE_PACE]),
+        "buckets": buckets,
+    }
+
+
+def _read_training_load(db, user_id: int, start_date: date, end_date: date):
+    """Carico dei giorni dell'intervallo; True se il carico dell'utente è stato appena calcolato"""
+    created = ensure_user_training_load(db, user_id)
+    return read_training_load(db, user_id, start_date, end_date), created
+
+
+@router.get("/training-load/summary", response_model=TrainingLoadSeries)
+async def get_training_load(
+    start_date: Optional[date] = Query(None, description="Default: 90 days before end_date"),
+    end_date: Optional[date] = Query(None, description="Default: today"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    TRIMP giornaliero, fatica (ATL), forma fisica (CTL) e forma (TSB) per ogni giorno
+    dell'intervallo, letti da training_loads: il costo dipende dai giorni richiesti, non dalle attività
+    """
+    end_date = end_date or datetime.utcnow().date()
+    start_date = start_date or end_date - timedelta(days=90)
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    if (end_date - start_date).days > 3660:
+        raise HTTPException(status_code=400, detail="Date range too long (max 10 years)")
+    
+    days, created = await db.run_sync(_read_training_load, current_user.id, start_date, end_date)
+    if created:
+        await db.commit()
+    
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "atl_days": settings.training_atl_days,
+        "ctl_days": settings.training_ctl_days,
+        "days": days,
+    }
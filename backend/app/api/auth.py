@@ -1,5 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.database import get_db
 from app.services.strava_service import StravaService
 from app.models.user import User
@@ -27,27 +29,28 @@ async def authorize_strava():
 @router.get("/strava/callback")
 async def strava_callback(
     code: str = Query(..., description="Authorization code from Strava"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Gestisce il callback di autorizzazione di Strava"""
     try:
         print(f"CODE RICEVUTO DAL FRONTEND: {code}")
         
-        # Scambia il codice con i token
-        token_response = strava_service.exchange_code_for_token(code)
+        # Scambia il codice con i token (chiamate a Strava in un thread, fuori dall'event loop)
+        token_response = await run_in_threadpool(strava_service.exchange_code_for_token, code)
         
         # Ottieni le informazioni dell'atleta
-        athlete_info = strava_service.get_athlete_info(token_response['access_token'])
+        athlete_info = await run_in_threadpool(strava_service.get_athlete_info, token_response['access_token'])
         
         # Controlla se l'utente esiste già
-        existing_user = db.query(User).filter(User.strava_id == athlete_info['id']).first()
+        existing_user = await db.scalar(select(User).where(User.strava_id == athlete_info['id']))
         
         if existing_user:
             # Aggiorna i token dell'utente esistente
             existing_user.access_token = token_response['access_token']
             existing_user.refresh_token = token_response['refresh_token']
             existing_user.expires_at = datetime.fromtimestamp(token_response['expires_at'])
-            db.commit()
+            existing_user.strava_deauthorized_at = None
+            await db.commit()
             user = existing_user
         else:
             # Crea un nuovo utente
@@ -61,10 +64,10 @@ async def strava_callback(
                 expires_at=token_response['expires_at']
             )
             
-            user = User(**user_data.dict())
+            user = User(**user_data.model_dump())
             db.add(user)
-            db.commit()
-            db.refresh(user)
+            await db.commit()
+            await db.refresh(user)
         
         # Genera JWT token
         from app.core import security
@@ -108,13 +111,13 @@ async def get_current_user_info(
 @router.get("/user/{user_id}")
 async def get_user_by_id(
     user_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Ottiene le informazioni di un utente specifico per ID.
     Richiesto dal frontend per il caricamento iniziale se l'ID è salvato nel localStorage.
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -133,7 +136,7 @@ async def get_user_by_id(
 async def upload_profile_image(
     user_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Upload a custom profile image"""
     from fastapi import File, UploadFile, Request
@@ -157,7 +160,7 @@ async def upload_user_profile_image(
     user_id: int,
     profile_image: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Upload a custom profile image - proper multipart upload"""
     from app.core.config import settings
@@ -202,7 +205,7 @@ async def upload_user_profile_image(
     # Update user record
     profile_url = f"/uploads/profile_images/{filename}"
     current_user.profile_picture_url = profile_url
-    db.commit()
+    await db.commit()
     
     return {
         "message": "Profile image uploaded successfully",
@@ -214,7 +217,7 @@ async def upload_user_profile_image(
 async def delete_profile_image(
     user_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete custom profile image"""
     from pathlib import Path
@@ -233,7 +236,7 @@ async def delete_profile_image(
     
     # Update user record
     current_user.profile_picture_url = None
-    db.commit()
+    await db.commit()
     
     return {"message": "Profile image deleted successfully"}
 
@@ -242,7 +245,7 @@ async def delete_profile_image(
 async def refresh_strava_avatar(
     user_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Refresh Strava profile picture from Strava API"""
     # Verify user is updating their own profile
@@ -251,11 +254,11 @@ async def refresh_strava_avatar(
     
     try:
         # Get fresh athlete info from Strava
-        athlete_info = strava_service.get_athlete_info(current_user.access_token)
+        athlete_info = await run_in_threadpool(strava_service.get_athlete_info, current_user.access_token)
         
         # Update strava profile URL
         current_user.strava_profile_url = athlete_info.get('profile')
-        db.commit()
+        await db.commit()
         
         return {
             "message": "Strava avatar refreshed successfully",
@@ -269,7 +272,7 @@ async def refresh_strava_avatar(
 async def get_user_settings(
     user_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get user settings"""
     from app.schemas.user import UserSettings
@@ -284,7 +287,7 @@ async def get_user_settings(
     else:
         # Return default settings
         default_settings = UserSettings()
-        return default_settings.dict()
+        return default_settings.model_dump()
 
 
 @router.put("/user/{user_id}/settings")
@@ -292,15 +295,24 @@ async def update_user_settings(
     user_id: int,
     settings: Dict[str, Any],
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update user settings"""
     from app.schemas.user import UserSettings
+    from app.services.training_load import rebuild_training_load, training_heartrates
+    from app.services.zones import rebuild_user_zones, zone_bounds
     
     # Verify user is updating their own settings
     if current_user.id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized to update these settings")
     
+    # Zone e frequenze non inviate restano quelle salvate
+    previous_zones = zone_bounds(current_user.settings)
+    previous_heartrates = training_heartrates(current_user.settings)
+    for section in ("zones", "training"):
+        if section not in settings and (current_user.settings or {}).get(section):
+            settings = {**settings, section: current_user.settings[section]}
+    
     # Validate settings
     try:
         validated_settings = UserSettings(**settings)
@@ -308,8 +320,18 @@ async def update_user_settings(
         raise HTTPException(status_code=400, detail=f"Invalid settings format: {str(e)}")
     
     # Update user settings
-    current_user.settings = validated_settings.dict()
-    db.commit()
+    current_user.settings = validated_settings.model_dump()
+    zones = zone_bounds(current_user.settings)
+    if zones != previous_zones:
+        # Il tempo nelle zone salvato è calcolato con i vecchi limiti: si ricalcola nella stessa transazione
+        count = await db.run_sync(rebuild_user_zones, current_user.id, zones)
+        print(f"[ZONES] Zone ricalcolate per {count} attività dell'utente {current_user.id}")
+    heartrates = training_heartrates(current_user.settings)
+    if heartrates != previous_heartrates:
+        # Il TRIMP dipende dalla riserva cardiaca: si ricalcolano attività e medie
+        count = await db.run_sync(rebuild_training_load, current_user.id, heartrates)
+        print(f"[TRAINING] Carico ricalcolato per {count} attività dell'utente {current_user.id}")
+    await db.commit()
     
     return {
         "message": "Settings updated successfully",
@@ -321,7 +343,7 @@ async def update_user_settings(
 async def export_user_data(
     user_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Export all user data as JSON"""
     from app.models.activity import Activity
@@ -332,7 +354,7 @@ async def export_user_data(
         raise HTTPException(status_code=403, detail="Not authorized to export this data")
     
     # Get all user activities
-    activities = db.query(Activity).filter(Activity.user_id == user_id).all()
+    activities = (await db.scalars(select(Activity).where(Activity.user_id == user_id))).all()
     
     # Build export data
     export_data = {
@@ -385,10 +407,21 @@ async def delete_user_account(
     user_id: int,
     confirmation: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete user account and all associated data (PERMANENT)"""
     from app.models.activity import Activity, Lap
+    from app.models.activity_route import ActivityRoute
+    from app.models.activity_rollup import ActivityRollup
+    from app.models.activity_zone import ActivityZone
+    from app.models.activity_stream import ActivityStream, ActivityStreamLevel
+    from app.models.best_effort import BestEffort
+    from app.models.mean_max import ActivityMeanMax, MeanMaxEnvelope
+    from app.models.personal_record import PersonalRecord
+    from app.models.sync_job import SyncJob
+    from app.models.training_load import TrainingLoad
+    from app.models.webhook_event import WebhookEvent
+    from app.services.stream_archive import remove_archives
     from pathlib import Path
     
     # Verify user is deleting their own account
@@ -406,19 +439,34 @@ async def delete_user_account(
             if file_path.exists():
                 file_path.unlink()
         
-        # Delete all laps associated with user activities
-        user_activities = db.query(Activity).filter(Activity.user_id == user_id).all()
-        for activity in user_activities:
-            db.query(Lap).filter(Lap.activity_id == activity.id).delete()
+        # Delete all laps and streams associated with user activities
+        user_activity_ids = select(Activity.id).where(Activity.user_id == user_id)
+        await db.execute(delete(Lap).where(Lap.activity_id.in_(user_activity_ids)))
+        await db.execute(delete(ActivityStream).where(ActivityStream.activity_id.in_(user_activity_ids)))
+        await db.execute(delete(ActivityStreamLevel).where(ActivityStreamLevel.activity_id.in_(user_activity_ids)))
+        await db.execute(delete(ActivityRoute).where(ActivityRoute.activity_id.in_(user_activity_ids)))
+        await db.execute(delete(PersonalRecord).where(PersonalRecord.user_id == user_id))
+        await db.execute(delete(BestEffort).where(BestEffort.activity_id.in_(user_activity_ids)))
+        await db.execute(delete(ActivityZone).where(ActivityZone.activity_id.in_(user_activity_ids)))
+        await db.execute(delete(MeanMaxEnvelope).where(MeanMaxEnvelope.user_id == user_id))
+        await db.execute(delete(ActivityMeanMax).where(ActivityMeanMax.activity_id.in_(user_activity_ids)))
+        await db.execute(delete(ActivityRollup).where(ActivityRollup.user_id == user_id))
+        await db.execute(delete(TrainingLoad).where(TrainingLoad.user_id == user_id))
+        
+        # Delete sync jobs and queued webhook events: the user row cannot be removed while jobs reference it
+        await db.execute(delete(SyncJob).where(SyncJob.user_id == user_id))
+        await db.execute(delete(WebhookEvent).where(WebhookEvent.owner_id == current_user.strava_id))
         
         # Delete all activities
-        db.query(Activity).filter(Activity.user_id == user_id).delete()
+        archived_ids = (await db.scalars(user_activity_ids)).all()
+        await db.execute(delete(Activity).where(Activity.user_id == user_id))
         
         # Delete user
-        db.delete(current_user)
-        db.commit()
+        await db.delete(current_user)
+        await db.commit()
+        remove_archives(archived_ids)
         
         return {"message": "Account deleted successfully"}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to delete account: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,104 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.db.database import get_db
+from app.models.user import User
+from app.models.activity import Activity, activity_type_key
+from app.models.mean_max import MeanMaxEnvelope
+from app.models.personal_record import PersonalRecord, ALL_TIME
+from app.schemas.mean_max import MeanMaxCurve
+from app.schemas.record import PersonalRecords
+from app.services.best_efforts import BEST_EFFORT_KEYS, BEST_EFFORT_NAMES
+from app.services.mean_max import MEAN_MAX_KINDS, ensure_user_mean_max
+from app.services.records import ensure_user_records
+from app.api.deps import get_current_user
+
+router = APIRouter(prefix="/records", tags=["records"])
+
+
+def _load_records(db, user_id: int, type_key: str, year: int):
+    """Record di un ambito (una lettura della chiave primaria); True se l'indice dell'utente è stato appena creato"""
+    created = ensure_user_records(db, user_id)
+    rows = db.execute(
+        select(PersonalRecord, Activity.name)
+        .join(Activity, Activity.id == PersonalRecord.activity_id)
+        .where(PersonalRecord.user_id == user_id, PersonalRecord.type_key == type_key, PersonalRecord.year == year)
+        .order_by(PersonalRecord.distance, PersonalRecord.rank)
+    ).all()
+    return rows, created
+
+
+@router.get("", response_model=PersonalRecords)
+async def get_personal_records(
+    activity_type: str = Query("Run", description="Activity type, e.g. Run or Ride"),
+    year: Optional[int] = Query(None, ge=1900, description="Only efforts of this year; all-time records if omitted"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Migliori tempi dell'utente sulle distanze standard, dall'indice personal_records"""
+    rows, created = await db.run_sync(
+        _load_records, current_user.id, activity_type_key(activity_type), ALL_TIME if year is None else year
+    )
+    if created:
+        await db.commit()
+    
+    records = {}
+    for record, activity_name in rows:
+        distance_records = records.setdefault(record.distance, {
+            "key": BEST_EFFORT_KEYS.get(record.distance, f"{record.distance:g}m"),
+            "name": BEST_EFFORT_NAMES.get(record.distance, f"{record.distance:g} m"),
+            "distance": record.distance,
+            "efforts": []
+        })
+        distance_records["efforts"].append({
+            "rank": record.rank, "activity_id": record.activity_id, "activity_name": activity_name,
+            "elapsed_time": record.elapsed_time, "start_date": record.start_date
+        })
+    return {"activity_type": activity_type, "year": year, "records": list(records.values())}
+
+
+def _load_mean_max(db, user_id: int, type_key: str, year: int, kind: str):
+    """Inviluppo di un ambito (una riga per durata); True se è stato appena calcolato"""
+    created = ensure_user_mean_max(db, user_id)
+    rows = db.execute(
+        select(MeanMaxEnvelope, Activity.name)
+        .join(Activity, Activity.id == MeanMaxEnvelope.activity_id)
+        .where(
+            MeanMaxEnvelope.user_id == user_id, MeanMaxEnvelope.type_key == type_key,
+            MeanMaxEnvelope.year == year, MeanMaxEnvelope.kind == kind
+        )
+        .order_by(MeanMaxEnvelope.duration)
+    ).all()
+    return rows, created
+
+
+@router.get("/mean-max", response_model=MeanMaxCurve)
+async def get_mean_max_curve(
+    activity_type: str = Query("Run", description="Activity type, e.g. Run or Ride"),
+    kind: str = Query("speed", description="Curve: speed (velocity_smooth) or power (watts)"),
+    year: Optional[int] = Query(None, ge=1900, description="Only activities of this year; all-time curve if omitted"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Curva media-massima dell'utente (miglior media per durata), dall'inviluppo
+    mean_max_envelopes: il costo dipende dal numero di durate, non dalle attività
+    """
+    if kind not in MEAN_MAX_KINDS:
+        raise HTTPException(status_code=400, detail="Invalid kind")
+    
+    rows, created = await db.run_sync(
+        _load_mean_max, current_user.id, activity_type_key(activity_type), ALL_TIME if year is None else year, kind
+    )
+    if created:
+        await db.commit()
+    
+    points = [
+        {
+            "duration": envelope.duration, "value": envelope.value, "activity_id": envelope.activity_id,
+            "activity_name": activity_name, "start_date": envelope.start_date
+        }
+        for envelope, activity_name in rows
+    ]
+    return {"activity_type": activity_type, "year": year, "kind": kind, "points": points}
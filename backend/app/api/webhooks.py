@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.db.database import get_db
+from app.schemas.webhook import StravaWebhookEvent
+from app.services.webhook_events import enqueue_webhook_event, WEBHOOK_OBJECT_TYPES, WEBHOOK_ASPECT_TYPES
+
+router = APIRouter(prefix="/webhooks", tags=["webhooks"])
+
+
+@router.get("/strava")
+async def verify_strava_subscription(
+    hub_mode: str = Query(..., alias="hub.mode"),
+    hub_challenge: str = Query(..., alias="hub.challenge"),
+    hub_verify_token: str = Query(..., alias="hub.verify_token")
+):
+    """Risponde alla verifica della push subscription inviata da Strava alla creazione"""
+    if hub_mode != "subscribe" or not settings.strava_webhook_verify_token or hub_verify_token != settings.strava_webhook_verify_token:
+        raise HTTPException(status_code=403, detail="Invalid verify token")
+    return {"hub.challenge": hub_challenge}
+
+
+@router.post("/strava")
+async def receive_strava_event(
+    event: StravaWebhookEvent,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Riceve un evento della push subscription. Strava richiede una risposta entro 2 secondi:
+    l'evento viene solo salvato e sarà elaborato dal worker in background.
+    """
+    if settings.strava_webhook_subscription_id is not None and event.subscription_id != settings.strava_webhook_subscription_id:
+        raise HTTPException(status_code=403, detail="Unknown subscription")
+    
+    if event.object_type not in WEBHOOK_OBJECT_TYPES or event.aspect_type not in WEBHOOK_ASPECT_TYPES:
+        return {"status": "ignored"}
+    
+    webhook_event = await db.run_sync(enqueue_webhook_event, event.model_dump())
+    return {"status": "queued", "event_id": webhook_event.id}
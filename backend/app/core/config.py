@@ -15,11 +15,71 @@ class Settings:
     
     # Database settings
     database_url: str = os.getenv("DATABASE_URL", "sqlite:///./data/strava_analyzer.db")
+    # SQLite: impostati con PRAGMA su ogni connessione
+    sqlite_journal_mode: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")  # WAL: le letture non attendono le scritture
+    sqlite_synchronous: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")  # con WAL resta consistente anche dopo un crash
+    sqlite_busy_timeout: int = int(os.getenv("SQLITE_BUSY_TIMEOUT", "30000"))  # ms di attesa del lock prima di "database is locked"
+    sqlite_mmap_size: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # byte letti via mmap
+    sqlite_cache_size: int = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # pagine, o KiB se negativo
+    # Pool di connessioni (PostgreSQL e SQLite su file)
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    db_pool_timeout: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # secondi di attesa di una connessione libera
+    db_pool_pre_ping: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"  # scarta le connessioni chiuse dal server
+    db_pool_recycle: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # secondi di vita massima di una connessione
     
     # Strava API settings
     strava_client_id: Optional[str] = os.getenv("STRAVA_CLIENT_ID")
     strava_client_secret: Optional[str] = os.getenv("STRAVA_CLIENT_SECRET")
     strava_redirect_uri: str = os.getenv("STRAVA_REDIRECT_URI", "http://localhost:3000/auth/callback")
+    strava_stream_workers: int = int(os.getenv("STRAVA_STREAM_WORKERS", "4"))  # download paralleli degli stream
+    sync_chunk_size: int = int(os.getenv("SYNC_CHUNK_SIZE", "200"))  # attività salvate per commit durante la sync
+    sync_recheck_days: int = int(os.getenv("SYNC_RECHECK_DAYS", "7"))  # giorni riletti dalla sync incrementale per le modifiche
+    strava_lap_workers: int = int(os.getenv("STRAVA_LAP_WORKERS", "4"))  # download paralleli dei laps
+    lap_batch_size: int = int(os.getenv("LAP_BATCH_SIZE", "50"))  # attività i cui laps vengono sostituiti per commit
+    
+    # Strava rate limit settings (limiti di lettura dell'applicazione, condivisi tra tutti gli utenti)
+    strava_rate_limit_short: int = int(os.getenv("STRAVA_RATE_LIMIT_SHORT", "100"))  # richieste ogni 15 minuti
+    strava_rate_limit_daily: int = int(os.getenv("STRAVA_RATE_LIMIT_DAILY", "1000"))  # richieste al giorno
+    strava_rate_limit_safety: float = float(os.getenv("STRAVA_RATE_LIMIT_SAFETY", "0.1"))  # quota tenuta di riserva
+    strava_rate_limit_user_share: float = float(os.getenv("STRAVA_RATE_LIMIT_USER_SHARE", "0.5"))  # quota massima per utente
+    strava_rate_limit_burst: int = int(os.getenv("STRAVA_RATE_LIMIT_BURST", "10"))
+    strava_rate_limit_max_wait: int = int(os.getenv("STRAVA_RATE_LIMIT_MAX_WAIT", "900"))  # secondi
+    strava_rate_limit_background_share: float = float(os.getenv("STRAVA_RATE_LIMIT_BACKGROUND_SHARE", "0.5"))  # quota usabile dai lavori a bassa priorità
+    
+    # Stream backfill (download degli stream in background con il budget avanzato)
+    stream_backfill_batch_size: int = int(os.getenv("STREAM_BACKFILL_BATCH_SIZE", "20"))
+    stream_backfill_idle_interval: float = float(os.getenv("STREAM_BACKFILL_IDLE_INTERVAL", "60"))  # secondi
+    stream_backfill_max_attempts: int = int(os.getenv("STREAM_BACKFILL_MAX_ATTEMPTS", "3"))
+    stream_backfill_lease: int = int(os.getenv("STREAM_BACKFILL_LEASE", "600"))  # secondi
+    stream_on_demand_max_wait: float = float(os.getenv("STREAM_ON_DEMAND_MAX_WAIT", "10"))  # secondi
+    stream_levels: list = [int(points) for points in os.getenv("STREAM_LEVELS", "2000,1000,500,250").split(",") if points]  # punti dei livelli sottocampionati per i grafici
+    route_zoom_levels: list = [int(zoom) for zoom in os.getenv("ROUTE_ZOOM_LEVELS", "10,13,16").split(",") if zoom]  # zoom della mappa con un percorso semplificato
+    route_tolerance_pixels: float = float(os.getenv("ROUTE_TOLERANCE_PIXELS", "0.5"))  # scarto massimo del percorso semplificato, in pixel
+    stream_archive_dir: str = os.getenv("STREAM_ARCHIVE_DIR", "./data/streams")  # file degli stream letti con mmap (ricostruibili dal database)
+    records_top_n: int = int(os.getenv("RECORDS_TOP_N", "3"))  # migliori tempi tenuti per distanza, tipo e anno
+    training_atl_days: float = float(os.getenv("TRAINING_ATL_DAYS", "7"))  # costante di tempo della fatica (ATL)
+    training_ctl_days: float = float(os.getenv("TRAINING_CTL_DAYS", "42"))  # costante di tempo della forma fisica (CTL)
+    
+    # Strava webhook (push subscription)
+    strava_webhook_verify_token: Optional[str] = os.getenv("STRAVA_WEBHOOK_VERIFY_TOKEN")
+    strava_webhook_subscription_id: Optional[int] = int(os.getenv("STRAVA_WEBHOOK_SUBSCRIPTION_ID")) if os.getenv("STRAVA_WEBHOOK_SUBSCRIPTION_ID") else None
+    webhook_debounce_seconds: float = float(os.getenv("WEBHOOK_DEBOUNCE_SECONDS", "30"))  # eventi ravvicinati sulla stessa attività vengono uniti
+    webhook_poll_interval: float = float(os.getenv("WEBHOOK_POLL_INTERVAL", "5"))  # secondi
+    webhook_max_attempts: int = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "5"))
+    
+    # Background sync jobs
+    sync_job_workers: int = int(os.getenv("SYNC_JOB_WORKERS", "2"))
+    sync_job_poll_interval: float = float(os.getenv("SYNC_JOB_POLL_INTERVAL", "5"))  # secondi
+    sync_job_stale_after: int = int(os.getenv("SYNC_JOB_STALE_AFTER", "1800"))  # secondi senza progressi prima di riprendere un job
+    sync_job_max_wait: int = int(os.getenv("SYNC_JOB_MAX_WAIT", "900"))  # attesa massima per il budget Strava nei job (al massimo metà di sync_job_stale_after)
+    
+    # Sync automatica (UserSettings.sync.autoSync / syncInterval)
+    auto_sync_enabled: bool = os.getenv("AUTO_SYNC_ENABLED", "true").lower() == "true"
+    auto_sync_tick: float = float(os.getenv("AUTO_SYNC_TICK", "60"))  # secondi tra due controlli degli utenti da sincronizzare
+    auto_sync_max_concurrent: int = int(os.getenv("AUTO_SYNC_MAX_CONCURRENT", "4"))  # sync automatiche in coda o in esecuzione
+    auto_sync_jitter: int = int(os.getenv("AUTO_SYNC_JITTER", "900"))  # secondi su cui distribuire le partenze
+    auto_sync_lease: int = int(os.getenv("AUTO_SYNC_LEASE", "180"))  # secondi di validità del lease dello scheduler
     
     # Security settings
     secret_key: str = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
@@ -1,21 +1,125 @@
-from sqlalchemy import create_engine
+from pathlib import Path
+from typing import AsyncGenerator, Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.ext.declarative import declarative_base
 from app.core.config import settings
 
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {}
-)
+
+def _is_sqlite_memory(url) -> bool:
+    return url.database in (None, "", ":memory:")
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Profilo SQLite applicato a ogni nuova connessione"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+        cursor.execute(f"PRAGMA cache_size={int(settings.sqlite_cache_size)}")
+    finally:
+        cursor.close()
+
+
+def _engine_options(url: URL) -> dict:
+    """
+    Profilo dell'engine adatto al database.
+
+    SQLite: WAL (le letture della dashboard non si bloccano durante le scritture della sync),
+    synchronous=NORMAL, busy_timeout, mmap e cache impostati con PRAGMA alla connessione.
+    PostgreSQL (e altri server): QueuePool dimensionato, pre-ping e riciclo delle connessioni.
+    """
+    pool_options = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+    }
+    if url.get_backend_name() == "sqlite":
+        return {
+            # Il timeout del driver è in secondi; il PRAGMA busy_timeout vale anche per le connessioni già aperte
+            "connect_args": {"check_same_thread": False, "timeout": settings.sqlite_busy_timeout / 1000},
+            **({} if _is_sqlite_memory(url) else pool_options)
+        }
+    return {
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "pool_recycle": settings.db_pool_recycle,
+        **pool_options
+    }
+
+
+def create_db_engine(database_url: str = settings.database_url) -> Engine:
+    """Engine sincrono, usato dai worker in background e dagli script"""
+    url = make_url(database_url)
+    engine = create_engine(url, **_engine_options(url))
+    if url.get_backend_name() == "sqlite":
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+
+def _async_url(url: URL) -> URL:
+    """Stesso database con il driver asincrono: aiosqlite per SQLite, asyncpg per PostgreSQL"""
+    backend = url.get_backend_name()
+    if backend == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    if backend == "postgresql":
+        return url.set(drivername="postgresql+asyncpg")
+    return url
+
+
+def create_async_db_engine(database_url: str = settings.database_url) -> AsyncEngine:
+    """Engine asincrono, usato dagli endpoint: le query non bloccano l'event loop di uvicorn"""
+    url = _async_url(make_url(database_url))
+    options = _engine_options(url)
+    if url.get_backend_name() == "sqlite" and not _is_sqlite_memory(url):
+        # aiosqlite usa NullPool per default: senza pool ogni richiesta riaprirebbe il file e i PRAGMA
+        options["poolclass"] = AsyncAdaptedQueuePool
+    engine = create_async_engine(url, **options)
+    if url.get_backend_name() == "sqlite":
+        event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+
+engine = create_db_engine()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_db_engine()
+
+# expire_on_commit=False: dopo il commit gli oggetti restano leggibili senza altre query
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+
+def require_current_schema(bind: Optional[Engine] = None) -> None:
+    """
+    Lo schema è gestito solo dalle migrazioni (alembic upgrade head): l'applicazione e gli
+    script non creano tabelle e si fermano se il database non è all'ultima revisione.
+    """
+    from alembic.config import Config
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "alembic"))
+    heads = set(ScriptDirectory.from_config(config).get_heads())
+    with (bind or engine).connect() as connection:
+        current = set(MigrationContext.configure(connection).get_current_heads())
+    if current != heads:
+        raise RuntimeError(
+            f"Database alla revisione {', '.join(sorted(current)) or 'nessuna'} invece di {', '.join(sorted(heads))}: "
+            "eseguire `alembic upgrade head` (database creati prima delle migrazioni: prima `alembic stamp 0001`)"
+        )
+
+
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close() 
\ No newline at end of file
@@ -1,21 +1,41 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from app.core.config import settings
-from app.api import auth_router, activities_router, mock_router
-from app.db.database import engine
-from app.models import Base
+from app.api import auth_router, activities_router, mock_router, records_router, webhooks_router
+from app.db.database import require_current_schema
+from app.services.sync_jobs import sync_worker
+from app.services.stream_backfill import stream_backfill_worker
+from app.services.webhook_events import webhook_worker
+from app.services.auto_sync import auto_sync_scheduler
 import os
 
-# Crea le tabelle del database
-Base.metadata.create_all(bind=engine)
+# Le tabelle le crea Alembic: senza migrazioni aggiornate l'applicazione non parte
+require_current_schema()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Avvia e ferma i worker in background: sincronizzazioni, sync automatiche, download degli stream ed eventi webhook"""
+    sync_worker.start()
+    stream_backfill_worker.start()
+    webhook_worker.start()
+    auto_sync_scheduler.start()
+    yield
+    auto_sync_scheduler.stop()
+    webhook_worker.stop()
+    stream_backfill_worker.stop()
+    sync_worker.stop()
+
 
 # Crea l'applicazione FastAPI
 app = FastAPI(
     title=settings.app_name,
     description="API per l'analisi delle attività di corsa da Strava",
     version="1.0.0",
-    debug=settings.debug
+    debug=settings.debug,
+    lifespan=lifespan
 )
 
 # Configura CORS
@@ -39,6 +59,8 @@ app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 # Includi i router
 app.include_router(auth_router)
 app.include_router(activities_router)
+app.include_router(records_router)
+app.include_router(webhooks_router)
 if settings.debug:
     app.include_router(mock_router)  # Solo per sviluppo
 
@@ -1,5 +1,17 @@
 from .base import Base, TimestampMixin
 from .user import User
 from .activity import Activity, Lap
+from .activity_stream import ActivityStream, ActivityStreamLevel
+from .activity_route import ActivityRoute
+from .activity_rollup import ActivityRollup
+from .activity_zone import ActivityZone
+from .best_effort import BestEffort
+from .personal_record import PersonalRecord
+from .mean_max import ActivityMeanMax, MeanMaxEnvelope
+from .training_load import TrainingLoad
+from .rate_limit import RateLimitWindow
+from .sync_job import SyncJob
+from .webhook_event import WebhookEvent
+from .scheduler_lease import SchedulerLease
 
-__all__ = ["Base", "TimestampMixin", "User", "Activity", "Lap"] 
\ No newline at end of file
+__all__ = ["Base", "TimestampMixin", "User", "Activity", "Lap", "ActivityStream", "ActivityStreamLevel", "ActivityRoute", "ActivityRollup", "ActivityZone", "BestEffort", "PersonalRecord", "ActivityMeanMax", "MeanMaxEnvelope", "TrainingLoad", "RateLimitWindow", "SyncJob", "WebhookEvent", "SchedulerLease"] 
\ No newline at end of file
@@ -1,10 +1,27 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, Text, ForeignKey
-from sqlalchemy.orm import relationship
+from typing import Optional
+from sqlalchemy import Column, Integer, String, DateTime, Float, Text, ForeignKey, Index
+from sqlalchemy.orm import relationship, deferred, validates
 from .base import Base, TimestampMixin
 
 
+STREAM_PENDING = "pending"
+STREAM_FETCHED = "fetched"
+STREAM_FAILED = "failed"
+STREAM_UNAVAILABLE = "unavailable"
+
+
+def activity_type_key(activity_type: Optional[str]) -> Optional[str]:
+    """Chiave normalizzata del tipo di attività ('Run', ' run ' -> 'run'), confrontabile con un indice"""
+    return activity_type.strip().lower() if activity_type else activity_type
+
+
 class Activity(Base, TimestampMixin):
     __tablename__ = "activities"
+    __table_args__ = (
+        # Tutte le query dell'utente filtrano su user_id e ordinano o filtrano per data
+        Index("ix_activities_user_start_date", "user_id", "start_date"),
+        Index("ix_activities_user_type_start_date", "user_id", "type_key", "start_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     strava_activity_id = Column(Integer, unique=True, index=True, nullable=False)
@@ -15,6 +32,7 @@ class Activity(Base, TimestampMixin):
     elapsed_time = Column(Integer, nullable=False)  # in seconds
     total_elevation_gain = Column(Float)  # in meters
     type = Column(String(50), nullable=False)  # 'Run', 'Ride', etc.
+    type_key = Column(String(50), nullable=False)  # type normalizzato (activity_type_key), usato nei filtri
     start_date = Column(DateTime, nullable=False)
     average_speed = Column(Float)  # m/s
     max_speed = Column(Float)  # m/s
@@ -22,14 +40,25 @@ class Activity(Base, TimestampMixin):
     max_heartrate = Column(Float)
     average_cadence = Column(Float)
     average_watts = Column(Float)
-    map_polyline = Column(Text)
-    summary_polyline = Column(Text)
-    detailed_data = Column(Text)  # JSON string for raw data streams
+    trimp = Column(Float)  # carico (TRIMP) dagli stream o dalla frequenza media; NULL = non ancora calcolato
+    # Colonne pesanti: caricate solo quando servono (dettaglio, endpoint dedicati)
+    map_polyline = deferred(Column(Text), group="geometry")
+    summary_polyline = deferred(Column(Text), group="geometry")
+    detailed_data = deferred(Column(Text))  # Stream in JSON (formato precedente, convertiti in activity_streams da app.utils.migrate_streams)
+    stream_status = Column(String(20), nullable=False, default="pending", server_default="pending")  # pending, fetched, failed, unavailable
+    stream_attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    stream_requested_at = Column(DateTime)  # lease del worker di backfill che sta scaricando gli stream
+    laps_synced_at = Column(DateTime)  # NULL finché i laps non sono stati scaricati (o dopo una modifica su Strava)
     
     # Relationship
     user = relationship("User", back_populates="activities")
     laps = relationship("Lap", back_populates="activity")
 
+    @validates("type")
+    def _set_type_key(self, key, value):
+        self.type_key = activity_type_key(value)
+        return value
+
 
 class Lap(Base, TimestampMixin):
     __tablename__ = "laps"
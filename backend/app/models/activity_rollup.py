@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, Date, Float, ForeignKey
+from .base import Base, TimestampMixin
+
+ROLLUP_DAY = "day"
+ROLLUP_WEEK = "week"  # settimana ISO, il bucket è il lunedì
+ROLLUP_MONTH = "month"  # il bucket è il primo del mese
+
+
+class ActivityRollup(Base, TimestampMixin):
+    """Totali delle attività per utente, tipo e periodo, aggiornati a ogni sync (vedi services/rollups.py)"""
+    __tablename__ = "activity_rollups"
+    
+    # Chiave in quest'ordine: le letture di un intervallo sono una ricerca su (user_id, period, bucket)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    period = Column(String(10), primary_key=True)  # day, week, month
+    bucket = Column(Date, primary_key=True)  # primo giorno del periodo
+    type_key = Column(String(50), primary_key=True)
+    
+    activity_count = Column(Integer, nullable=False, default=0)
+    distance = Column(Float, nullable=False, default=0)
+    moving_time = Column(Integer, nullable=False, default=0)
+    elapsed_time = Column(Integer, nullable=False, default=0)
+    elevation_gain = Column(Float, nullable=False, default=0)
+    # Solo le attività con distanza (le statistiche della dashboard escludono quelle senza)
+    distance_activity_count = Column(Integer, nullable=False, default=0)
+    distance_moving_time = Column(Integer, nullable=False, default=0)
+    distance_elevation_gain = Column(Float, nullable=False, default=0)
+    # Medie pesate sul tempo in movimento: media = somma / tempo delle attività con il dato
+    heartrate_time = Column(Integer, nullable=False, default=0)
+    heartrate_sum = Column(Float, nullable=False, default=0)
+    watts_time = Column(Integer, nullable=False, default=0)
+    watts_sum = Column(Float, nullable=False, default=0)
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, Text, ForeignKey
+from .base import Base, TimestampMixin
+
+
+class ActivityRoute(Base, TimestampMixin):
+    """Percorso di un'attività semplificato per uno zoom della mappa, vedi services/geometry.py"""
+    __tablename__ = "activity_routes"
+    
+    activity_id = Column(Integer, ForeignKey("activities.id"), primary_key=True)
+    zoom = Column(Integer, primary_key=True)  # zoom massimo a cui il percorso resta fedele entro ROUTE_TOLERANCE_PIXELS
+    point_count = Column(Integer, nullable=False)
+    polyline = Column(Text, nullable=False)  # polyline di Google ricodificata
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, LargeBinary, ForeignKey
+from sqlalchemy.orm import relationship
+from .base import Base, TimestampMixin
+
+
+class ActivityStream(Base, TimestampMixin):
+    __tablename__ = "activity_streams"
+    
+    activity_id = Column(Integer, ForeignKey("activities.id"), primary_key=True)
+    format_version = Column(Integer, nullable=False)
+    point_count = Column(Integer, nullable=False)
+    stream_types = Column(String(200), nullable=False)  # es. 'time,distance,latlng,heartrate'
+    data = Column(LargeBinary, nullable=False)  # array tipizzati e compressi, vedi services/stream_store.py
+    
+    # Relationship
+    activity = relationship("Activity")
+
+
+class ActivityStreamLevel(Base, TimestampMixin):
+    """Stream sottocampionati per i grafici (un livello della piramide), vedi services/downsample.py"""
+    __tablename__ = "activity_stream_levels"
+    
+    activity_id = Column(Integer, ForeignKey("activities.id"), primary_key=True)
+    points = Column(Integer, primary_key=True)  # punti del livello (es. 2000, 1000, 500, 250)
+    data = Column(LargeBinary, nullable=False)  # stesso formato di activity_streams, con gli inviluppi "tipo:min"/"tipo:max"
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from .base import Base, TimestampMixin
+
+ZONE_HEARTRATE = "heartrate"
+ZONE_PACE = "pace"
+
+
+class ActivityZone(Base, TimestampMixin):
+    """Tempo di un'attività in una zona di frequenza cardiaca o di ritmo, vedi services/zones.py"""
+    __tablename__ = "activity_zones"
+    
+    activity_id = Column(Integer, ForeignKey("activities.id"), primary_key=True)
+    kind = Column(String(20), primary_key=True)  # ZONE_HEARTRATE o ZONE_PACE
+    zone = Column(Integer, primary_key=True)  # 0 = la zona più facile (frequenza più bassa, ritmo più lento)
+    seconds = Column(Float, nullable=False)  # solo le zone con tempo > 0 hanno una riga
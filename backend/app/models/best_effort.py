@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, Float, ForeignKey
+from .base import Base, TimestampMixin
+
+
+class BestEffort(Base, TimestampMixin):
+    """Miglior tempo di un'attività su una distanza standard, vedi services/best_efforts.py"""
+    __tablename__ = "best_efforts"
+    
+    activity_id = Column(Integer, ForeignKey("activities.id"), primary_key=True)
+    distance = Column(Float, primary_key=True)  # metri, uno dei valori di BEST_EFFORT_DISTANCES
+    elapsed_time = Column(Float, nullable=False)  # secondi, interpolati sul punto in cui si raggiunge la distanza
+    start_index = Column(Integer, nullable=False)  # indici negli stream dell'attività
+    end_index = Column(Integer, nullable=False)
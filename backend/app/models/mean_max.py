@@ -0,0 +1,34 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
+from .base import Base, TimestampMixin
+
+MEAN_MAX_SPEED = "speed"
+MEAN_MAX_POWER = "power"
+
+
+class ActivityMeanMax(Base, TimestampMixin):
+    """Miglior media di un'attività su una durata (curva media-massima), vedi services/mean_max.py"""
+    __tablename__ = "activity_mean_max"
+
+    activity_id = Column(Integer, ForeignKey("activities.id"), primary_key=True)
+    kind = Column(String(20), primary_key=True)  # MEAN_MAX_SPEED (velocity_smooth) o MEAN_MAX_POWER (watts)
+    duration = Column(Integer, primary_key=True)  # secondi in movimento, uno dei valori di MEAN_MAX_DURATIONS
+    value = Column(Float, nullable=False)  # m/s o watt medi nella finestra migliore
+
+
+class MeanMaxEnvelope(Base, TimestampMixin):
+    """Inviluppo delle curve media-massime di un utente per tipo, anno (e di sempre) e durata"""
+    __tablename__ = "mean_max_envelopes"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    type_key = Column(String(50), primary_key=True)
+    year = Column(Integer, primary_key=True)  # ALL_TIME (personal_record.py) per l'inviluppo di sempre
+    kind = Column(String(20), primary_key=True)
+    duration = Column(Integer, primary_key=True)
+    value = Column(Float, nullable=False)
+    activity_id = Column(Integer, ForeignKey("activities.id"), nullable=False)  # attività che detiene il valore
+    start_date = Column(DateTime, nullable=False)
+
+    # Le eliminazioni e le risincronizzazioni cercano gli inviluppi di un'attività
+    __table_args__ = (
+        Index("ix_mean_max_envelopes_activity_id", "activity_id"),
+    )
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
+from .base import Base, TimestampMixin
+
+ALL_TIME = 0  # anno dei record di sempre
+
+
+class PersonalRecord(Base, TimestampMixin):
+    """Migliori tempi di un utente per tipo, anno e distanza, vedi services/records.py"""
+    __tablename__ = "personal_records"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    type_key = Column(String(50), primary_key=True)
+    year = Column(Integer, primary_key=True)  # ALL_TIME per i record di sempre
+    distance = Column(Float, primary_key=True)  # metri, come in best_efforts
+    rank = Column(Integer, primary_key=True)  # 1 = record, fino a RECORDS_TOP_N
+    activity_id = Column(Integer, ForeignKey("activities.id"), nullable=False)
+    elapsed_time = Column(Float, nullable=False)
+    start_date = Column(DateTime, nullable=False)
+    
+    # Le eliminazioni e le risincronizzazioni cercano i record di un'attività
+    __table_args__ = (
+        Index("ix_personal_records_activity_id", "activity_id"),
+    )
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from .base import Base, TimestampMixin
+
+
+class RateLimitWindow(Base, TimestampMixin):
+    """Contatore condiviso (tra utenti e processi) delle chiamate Strava per finestra temporale"""
+    __tablename__ = "strava_rate_limits"
+    
+    key = Column(String(50), primary_key=True)  # 'short', 'daily' o 'user:<id>'
+    window_start = Column(DateTime, nullable=False)
+    usage = Column(Integer, nullable=False, default=0)
+    limit = Column(Integer, nullable=False)
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, String, DateTime
+from .base import Base, TimestampMixin
+
+
+class SchedulerLease(Base, TimestampMixin):
+    __tablename__ = "scheduler_leases"
+    
+    name = Column(String(50), primary_key=True)  # es. 'auto_sync'
+    owner = Column(String(200))  # istanza dell'applicazione che detiene il lease
+    expires_at = Column(DateTime, nullable=False)
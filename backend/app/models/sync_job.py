@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, ForeignKey, Index, text
+from sqlalchemy.orm import relationship
+from .base import Base, TimestampMixin
+
+ACTIVE_JOB_STATUSES = ("queued", "running")
+
+
+class SyncJob(Base, TimestampMixin):
+    __tablename__ = "sync_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    kind = Column(String(20), nullable=False)  # 'sync', 'smart', 'extend', 'auto'
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, completed, failed
+    params = Column(JSON, nullable=True)
+    pages_fetched = Column(Integer, nullable=False, default=0)
+    activities_upserted = Column(Integer, nullable=False, default=0)
+    streams_pending = Column(Integer, nullable=False, default=0)
+    streams_fetched = Column(Integer, nullable=False, default=0)
+    laps_synced = Column(Integer, nullable=False, default=0)
+    checkpoint = Column(JSON, nullable=True)  # ultima pagina salvata, da cui riprendere dopo un'interruzione
+    run_after = Column(DateTime)  # un job rimesso in coda per rate limit non parte prima di questo istante
+    result = Column(JSON, nullable=True)
+    error = Column(Text)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    
+    # Al massimo un job attivo per utente: le richieste duplicate confluiscono in quello esistente
+    __table_args__ = (
+        Index(
+            "uq_sync_jobs_active_user", "user_id", unique=True,
+            sqlite_where=text("status IN ('queued', 'running')"),
+            postgresql_where=text("status IN ('queued', 'running')")
+        ),
+    )
+    
+    # Relationship
+    user = relationship("User")
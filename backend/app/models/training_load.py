@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, Float, Date, ForeignKey
+from .base import Base, TimestampMixin
+
+
+class TrainingLoad(Base, TimestampMixin):
+    """Carico di un giorno e medie esponenziali di fatica e forma, vedi services/training_load.py"""
+    __tablename__ = "training_loads"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)  # una riga per giorno, dalla prima all'ultima attività
+    trimp = Column(Float, nullable=False)  # somma del TRIMP delle attività del giorno
+    atl = Column(Float, nullable=False)  # fatica, media su TRAINING_ATL_DAYS
+    ctl = Column(Float, nullable=False)  # forma fisica, media su TRAINING_CTL_DAYS
+    tsb = Column(Float, nullable=False)  # forma del giorno: CTL - ATL del giorno prima
@@ -16,6 +16,8 @@ class User(Base, TimestampMixin):
     strava_profile_url = Column(String(500))  # Avatar di Strava
     profile_picture_url = Column(String(500))  # Foto caricata dall'utente
     last_sync_timestamp = Column(DateTime)
+    sync_cursor = Column(DateTime)  # start_date dell'attività più recente importata (high-water mark)
+    strava_deauthorized_at = Column(DateTime)  # l'atleta ha revocato l'accesso da Strava
     settings = Column(JSON, nullable=True)
     
     # Relationship
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Index
+from .base import Base, TimestampMixin
+
+
+class WebhookEvent(Base, TimestampMixin):
+    __tablename__ = "strava_webhook_events"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    object_type = Column(String(20), nullable=False)  # 'activity', 'athlete'
+    object_id = Column(Integer, nullable=False)  # id Strava dell'attività o dell'atleta
+    aspect_type = Column(String(20), nullable=False)  # 'create', 'update', 'delete'
+    owner_id = Column(Integer, nullable=False)  # id Strava dell'atleta
+    updates = Column(JSON, nullable=True)  # campi modificati, es. {"title": "..."} o {"authorized": "false"}
+    event_time = Column(DateTime, nullable=False)
+    status = Column(String(20), nullable=False, default="pending")  # pending, processing, done, failed
+    process_after = Column(DateTime, nullable=False)  # fine della finestra di debounce
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text)
+    processed_at = Column(DateTime)
+    
+    __table_args__ = (
+        Index("ix_strava_webhook_events_pending", "status", "object_type", "object_id"),
+    )
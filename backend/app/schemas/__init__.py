@@ -1,8 +1,18 @@
 from .user import User, UserCreate, UserUpdate, UserBase
-from .activity import Activity, ActivityCreate, ActivityUpdate, ActivityBase, Lap, LapCreate, ActivityWithLaps
+from .activity import (
+    Activity, ActivityCreate, ActivityUpdate, ActivityBase, ActivitySummary, ActivityStreams,
+    ActivityRoute, RouteSummary, ActivityRoutes, Lap, LapCreate, ActivityWithLaps
+)
+from .record import RecordEffort, DistanceRecords, PersonalRecords
+from .mean_max import MeanMaxPoint, MeanMaxCurve
+from .training_load import TrainingLoadDay, TrainingLoadSeries
+from .zone import ZoneBucket, ZoneDistribution
+from .sync_job import SyncJob
+from .webhook import StravaWebhookEvent
 
 __all__ = [
     "User", "UserCreate", "UserUpdate", "UserBase",
-    "Activity", "ActivityCreate", "ActivityUpdate", "ActivityBase",
-    "Lap", "LapCreate", "ActivityWithLaps"
+    "Activity", "ActivityCreate", "ActivityUpdate", "ActivityBase", "ActivitySummary", "ActivityStreams",
+    "ActivityRoute", "RouteSummary", "ActivityRoutes", "Lap", "LapCreate", "ActivityWithLaps",
+    "RecordEffort", "DistanceRecords", "PersonalRecords", "MeanMaxPoint", "MeanMaxCurve", "TrainingLoadDay", "TrainingLoadSeries", "ZoneBucket", "ZoneDistribution", "SyncJob", "StravaWebhookEvent"
 ] 
\ No newline at end of file
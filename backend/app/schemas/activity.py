@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict
 
 
 class ActivityBase(BaseModel):
@@ -47,12 +47,65 @@ class ActivityUpdate(BaseModel):
 class Activity(ActivityBase):
     id: int
     user_id: int
+    stream_status: str = "pending"
+    trimp: Optional[float] = None  # carico di allenamento (TRIMP)
     created_at: datetime
     updated_at: datetime
     
-    class Config:
-        orm_mode = True
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ActivitySummary(BaseModel):
+    """Riga dell'elenco attività: solo i campi di riepilogo, senza polyline né stream"""
+    id: int
+    strava_activity_id: int
+    user_id: int
+    name: str
+    distance: float
+    moving_time: int
+    elapsed_time: int
+    total_elevation_gain: Optional[float] = None
+    type: str
+    start_date: datetime
+    average_speed: Optional[float] = None
+    max_speed: Optional[float] = None
+    average_heartrate: Optional[float] = None
+    max_heartrate: Optional[float] = None
+    average_cadence: Optional[float] = None
+    average_watts: Optional[float] = None
+    stream_status: str = "pending"
+    created_at: datetime
+    updated_at: datetime
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ActivityStreams(BaseModel):
+    activity_id: int
+    stream_status: str
+    points: Optional[int] = None  # punti del livello sottocampionato servito, None = risoluzione piena
+    streams: Optional[Dict[str, list]] = None
+    envelopes: Optional[Dict[str, Dict[str, list]]] = None  # {tipo: {"min": [...], "max": [...]}} per ogni punto
+
+
+class ActivityRoute(BaseModel):
+    activity_id: int
+    zoom: Optional[int] = None  # livello semplificato servito, None = polyline originale
+    point_count: Optional[int] = None
+    polyline: Optional[str] = None
+
+
+class RouteSummary(BaseModel):
+    activity_id: int
+    name: str
+    type: str
+    start_date: datetime
+    polyline: str
+
+
+class ActivityRoutes(BaseModel):
+    zoom: Optional[int] = None  # livello semplificato servito, None = polyline originali
+    routes: List[RouteSummary]
 
 
 class LapBase(BaseModel):
@@ -73,9 +126,7 @@ class Lap(LapBase):
     created_at: datetime
     updated_at: datetime
     
-    class Config:
-        orm_mode = True
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class ActivityWithLaps(Activity):
@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import List, Optional
+
+
+class MeanMaxPoint(BaseModel):
+    duration: int  # secondi in movimento
+    value: float  # m/s (speed) o watt (power) medi nella finestra migliore
+    activity_id: int
+    activity_name: str
+    start_date: datetime
+
+
+class MeanMaxCurve(BaseModel):
+    activity_type: str
+    year: Optional[int] = None  # None = inviluppo di sempre
+    kind: str  # speed o power
+    points: List[MeanMaxPoint]  # per durata crescente, solo quelle raggiunte
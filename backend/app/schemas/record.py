@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import List, Optional
+
+
+class RecordEffort(BaseModel):
+    rank: int
+    activity_id: int
+    activity_name: str
+    elapsed_time: float  # secondi
+    start_date: datetime
+
+
+class DistanceRecords(BaseModel):
+    key: str  # es. "5k", vedi BEST_EFFORT_KEYS
+    name: str  # es. "Best 5K"
+    distance: float  # metri
+    efforts: List[RecordEffort]  # dal migliore, fino a RECORDS_TOP_N
+
+
+class PersonalRecords(BaseModel):
+    activity_type: str
+    year: Optional[int] = None  # None = record di sempre
+    records: List[DistanceRecords]
@@ -0,0 +1,27 @@
+from pydantic import BaseModel, ConfigDict
+from datetime import datetime
+from typing import Optional
+
+
+class SyncJob(BaseModel):
+    id: int
+    user_id: int
+    kind: str
+    status: str
+    params: Optional[dict] = None
+    pages_fetched: int = 0
+    activities_upserted: int = 0
+    streams_pending: int = 0
+    streams_fetched: int = 0
+    laps_synced: int = 0
+    eta_seconds: Optional[int] = None
+    checkpoint: Optional[dict] = None
+    run_after: Optional[datetime] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    created_at: datetime
+    updated_at: datetime
+    
+    model_config = ConfigDict(from_attributes=True)
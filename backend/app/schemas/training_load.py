@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from datetime import date
+from typing import List
+
+
+class TrainingLoadDay(BaseModel):
+    date: date
+    trimp: float  # carico delle attività del giorno
+    atl: float  # fatica
+    ctl: float  # forma fisica
+    tsb: float  # forma del giorno (CTL - ATL del giorno prima)
+
+
+class TrainingLoadSeries(BaseModel):
+    start_date: date
+    end_date: date
+    atl_days: float  # costanti di tempo delle medie (TRAINING_ATL_DAYS, TRAINING_CTL_DAYS)
+    ctl_days: float
+    days: List[TrainingLoadDay]
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, field_validator
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 
 class UserBase(BaseModel):
@@ -31,8 +31,7 @@ class User(UserBase):
     created_at: datetime
     updated_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # Settings schemas
@@ -60,11 +59,47 @@ class SyncSettings(BaseModel):
     syncInterval: str = "daily"  # hourly, daily, weekly
 
 
+class ZoneSettings(BaseModel):
+    # Limiti fra le zone, dalla più facile: n limiti = n + 1 zone
+    heartrate: List[float] = [142, 162, 174, 184]  # bpm, crescenti
+    pace: List[float] = [330, 300, 270, 240]  # secondi al km, decrescenti
+
+    @field_validator("heartrate")
+    @classmethod
+    def heartrate_increasing(cls, bounds: List[float]) -> List[float]:
+        if not bounds or bounds[0] <= 0 or any(low >= high for low, high in zip(bounds, bounds[1:])):
+            raise ValueError("heart rate zone bounds must be positive and increasing")
+        return bounds
+
+    @field_validator("pace")
+    @classmethod
+    def pace_decreasing(cls, bounds: List[float]) -> List[float]:
+        if not bounds or bounds[-1] <= 0 or any(slow <= fast for slow, fast in zip(bounds, bounds[1:])):
+            raise ValueError("pace zone bounds must be positive and decreasing")
+        return bounds
+
+
+class TrainingSettings(BaseModel):
+    # Frequenze del TRIMP (riserva cardiaca), vedi services/training_load.py
+    restingHeartrate: int = 60
+    maxHeartrate: int = 190
+
+    @field_validator("maxHeartrate")
+    @classmethod
+    def max_above_resting(cls, max_heartrate: int, info) -> int:
+        resting = info.data.get("restingHeartrate")
+        if resting is not None and max_heartrate <= resting:
+            raise ValueError("max heart rate must be above resting heart rate")
+        return max_heartrate
+
+
 class UserSettings(BaseModel):
     notifications: NotificationSettings = NotificationSettings()
     privacy: PrivacySettings = PrivacySettings()
     display: DisplaySettings = DisplaySettings()
     sync: SyncSettings = SyncSettings()
+    zones: ZoneSettings = ZoneSettings()
+    training: TrainingSettings = TrainingSettings()
 
 
 class UserProfileUpdate(BaseModel):
@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from typing import Optional
+
+
+class StravaWebhookEvent(BaseModel):
+    """Evento inviato da Strava alla push subscription"""
+    object_type: str  # 'activity', 'athlete'
+    object_id: int
+    aspect_type: str  # 'create', 'update', 'delete'
+    owner_id: int
+    subscription_id: int
+    event_time: int  # timestamp UNIX
+    updates: Optional[dict] = None
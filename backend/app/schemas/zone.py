@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from datetime import date
+from typing import List, Optional
+
+
+class ZoneBucket(BaseModel):
+    start: date  # primo giorno della settimana (lunedì) o del mese
+    heartrate: List[float]  # secondi per zona, dalla più facile
+    pace: List[float]
+
+
+class ZoneDistribution(BaseModel):
+    period: str  # week, month, total
+    activity_type: Optional[str] = None
+    heartrate_bounds: List[float]  # bpm, limiti fra le zone
+    pace_bounds: List[float]  # secondi al km, limiti fra le zone
+    heartrate: List[float]  # secondi per zona nell'intervallo
+    pace: List[float]
+    buckets: List[ZoneBucket]  # vuoto con period=total
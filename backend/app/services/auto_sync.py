@@ -0,0 +1,173 @@
+import os
+import random
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import func, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.models.scheduler_lease import SchedulerLease
+from app.models.sync_job import SyncJob, ACTIVE_JOB_STATUSES
+from app.models.user import User
+from app.schemas.user import SyncSettings
+from app.services.sync_jobs import enqueue_sync_job
+
+AUTO_SYNC_LEASE = "auto_sync"
+SYNC_INTERVALS = {
+    "hourly": timedelta(hours=1),
+    "daily": timedelta(days=1),
+    "weekly": timedelta(days=7),
+}
+
+
+def user_sync_interval(user_settings: Optional[dict]) -> Optional[timedelta]:
+    """Intervallo di sync automatica scelto dall'utente, None se disattivata"""
+    sync_settings = SyncSettings(**((user_settings or {}).get("sync") or {}))
+    if not sync_settings.autoSync:
+        return None
+    return SYNC_INTERVALS.get(sync_settings.syncInterval, SYNC_INTERVALS["daily"])
+
+
+class AutoSyncScheduler:
+    """
+    Accoda periodicamente una sync incrementale per gli utenti con autoSync attivo
+    il cui syncInterval è trascorso.
+
+    Solo l'istanza che detiene il lease "auto_sync" nella tabella scheduler_leases
+    seleziona gli utenti, così più istanze dell'applicazione non accodano job doppi.
+    Le partenze vengono distribuite con un ritardo casuale (run_after) sulla finestra
+    di rate limit, e non più di auto_sync_max_concurrent sync automatiche sono in coda
+    o in esecuzione contemporaneamente; i job sono poi eseguiti in parallelo dai worker di sync.
+    """
+
+    def __init__(self):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread or not settings.auto_sync_enabled:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="auto-sync-scheduler", daemon=True)
+        self._thread.start()
+        print(f"[AUTO SYNC] Scheduler avviato ({self.owner})")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self._thread = None
+        self._release_lease()
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"[AUTO SYNC][ERRORE] Controllo degli utenti non riuscito: {str(e)}")
+            self._stop_event.wait(settings.auto_sync_tick)
+
+    def _acquire_lease(self, db: Session) -> bool:
+        """Prende o rinnova il lease dello scheduler; restituisce False se lo detiene un'altra istanza"""
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=settings.auto_sync_lease)
+        if not db.query(SchedulerLease.name).filter(SchedulerLease.name == AUTO_SYNC_LEASE).first():
+            db.add(SchedulerLease(name=AUTO_SYNC_LEASE, owner=self.owner, expires_at=expires_at))
+            try:
+                db.commit()
+                return True
+            except IntegrityError:
+                # Creato nel frattempo da un'altra istanza
+                db.rollback()
+
+        acquired = db.execute(
+            update(SchedulerLease)
+            .where(
+                SchedulerLease.name == AUTO_SYNC_LEASE,
+                or_(SchedulerLease.owner == self.owner, SchedulerLease.expires_at < now)
+            )
+            .values(owner=self.owner, expires_at=expires_at, updated_at=now)
+        )
+        db.commit()
+        return acquired.rowcount == 1
+
+    def _release_lease(self) -> None:
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(SchedulerLease)
+                .where(SchedulerLease.name == AUTO_SYNC_LEASE, SchedulerLease.owner == self.owner)
+                .values(expires_at=datetime.utcnow())
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def due_users(self, db: Session, now: datetime, limit: int) -> List[User]:
+        """
+        Utenti da sincronizzare, dal più in ritardo: autoSync attivo, nessun job attivo e
+        syncInterval trascorso dall'ultima sync riuscita e dall'ultimo job accodato
+        (così un utente con la sync in errore non viene riaccodato a ogni controllo).
+        """
+        last_job_at = db.query(
+            SyncJob.user_id, func.max(SyncJob.created_at).label("created_at")
+        ).group_by(SyncJob.user_id).subquery()
+        active_users = db.query(SyncJob.user_id).filter(SyncJob.status.in_(ACTIVE_JOB_STATUSES))
+        min_interval = min(SYNC_INTERVALS.values())
+
+        rows = db.query(User, last_job_at.c.created_at).outerjoin(
+            last_job_at, last_job_at.c.user_id == User.id
+        ).filter(
+            User.strava_deauthorized_at.is_(None),
+            User.id.notin_(active_users),
+            or_(User.last_sync_timestamp.is_(None), User.last_sync_timestamp <= now - min_interval)
+        ).all()
+
+        due: List[tuple] = []
+        for user, last_job_created_at in rows:
+            interval = user_sync_interval(user.settings)
+            if interval is None:
+                continue
+            last_attempt = max(
+                [moment for moment in (user.last_sync_timestamp, last_job_created_at) if moment is not None],
+                default=None
+            )
+            if last_attempt is None or last_attempt + interval <= now:
+                due.append((last_attempt or datetime.min, user))
+        due.sort(key=lambda item: item[0])
+        return [user for _, user in due[:limit]]
+
+    def run_once(self) -> int:
+        """Accoda le sync degli utenti in scadenza; restituisce quante ne sono state accodate"""
+        db = SessionLocal()
+        try:
+            if not self._acquire_lease(db):
+                return 0
+
+            now = datetime.utcnow()
+            in_flight = db.query(func.count(SyncJob.id)).filter(
+                SyncJob.kind == "auto",
+                SyncJob.status.in_(ACTIVE_JOB_STATUSES)
+            ).scalar()
+            slots = settings.auto_sync_max_concurrent - in_flight
+            if slots <= 0:
+                return 0
+
+            users = self.due_users(db, now, slots)
+            for user in users:
+                # Partenze distribuite sulla finestra di rate limit invece che tutte insieme
+                run_after = now + timedelta(seconds=random.uniform(0, settings.auto_sync_jitter))
+                enqueue_sync_job(db, user, "auto", run_after=run_after)
+            if users:
+                print(f"[AUTO SYNC] Accodate {len(users)} sync automatiche")
+            return len(users)
+        finally:
+            db.close()
+
+
+auto_sync_scheduler = AutoSyncScheduler()
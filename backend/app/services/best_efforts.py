@@ -0,0 +1,117 @@
+"""
+Migliori tempi delle attività sulle distanze standard (400 m, 1K, miglio, 5K, ... maratona).
+
+Per ogni distanza e per ogni punto di partenza i, np.searchsorted sullo stream
+"distance" (cumulativo, quindi ordinato) trova il primo punto j in cui la distanza
+percorsa da i raggiunge l'obiettivo: tutte le finestre si valutano con operazioni su
+array invece che con un ciclo Python. Il tempo di arrivo è interpolato fra j - 1 e j,
+così il risultato non dipende dalla frequenza di campionamento del GPS.
+
+I tempi si calcolano una volta sola, quando gli stream vengono salvati, e restano in
+best_efforts; il dettaglio dell'attività li legge da lì.
+"""
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models.activity import Activity
+from app.models.best_effort import BestEffort
+from app.services.records import merge_activity_records
+
+# Nomi usati dal frontend (ActivityDetail.tsx, record della Dashboard) -> distanza in metri
+BEST_EFFORT_DISTANCES = {
+    "Best 400m": 400.0,
+    "Best 1/2 Mile": 804.672,
+    "Best 1K": 1000.0,
+    "Best Mile": 1609.344,
+    "Best 2 Mile": 3218.688,
+    "Best 5K": 5000.0,
+    "Best 10K": 10000.0,
+    "Best 15K": 15000.0,
+    "Best 10 Mile": 16093.44,
+    "Best 20K": 20000.0,
+    "Best Half Marathon": 21097.5,
+    "Best 30K": 30000.0,
+    "Best Marathon": 42195.0,
+}
+BEST_EFFORT_NAMES = {distance: name for name, distance in BEST_EFFORT_DISTANCES.items()}
+# Chiave stabile di ogni distanza nelle risposte di /records: il frontend confronta questa, non i metri
+BEST_EFFORT_KEYS = {
+    400.0: "400m",
+    804.672: "half_mile",
+    1000.0: "1k",
+    1609.344: "mile",
+    3218.688: "2_mile",
+    5000.0: "5k",
+    10000.0: "10k",
+    15000.0: "15k",
+    16093.44: "10_mile",
+    20000.0: "20k",
+    21097.5: "half_marathon",
+    30000.0: "30k",
+    42195.0: "marathon",
+}
+
+
+def compute_best_efforts(
+    distance: np.ndarray, time: np.ndarray, targets: Iterable[float]
+) -> Dict[float, Tuple[float, int, int]]:
+    """
+    Miglior tempo per ogni distanza obiettivo raggiunta: {distanza: (secondi, indice di
+    partenza, indice di arrivo)}. Le distanze più lunghe dell'attività non compaiono.
+    """
+    if distance.shape[0] < 2 or distance.shape[0] != time.shape[0]:
+        return {}
+    # Distanza cumulativa: i punti mancanti (NaN) e i piccoli arretramenti del GPS non la fanno scendere
+    covered = np.fmax.accumulate(np.nan_to_num(distance.astype(np.float64), nan=0.0))
+    seconds = time.astype(np.float64)
+    count = covered.shape[0]
+
+    efforts = {}
+    for target in sorted(targets):
+        if covered[-1] - covered[0] < target:
+            break
+        # Primo punto a distanza >= obiettivo da ogni partenza; oltre la fine = finestra incompleta
+        ends = np.searchsorted(covered, covered + target, side="left")
+        starts = np.flatnonzero(ends < count)
+        ends = ends[starts]
+        before = ends - 1
+        step = covered[ends] - covered[before]
+        fraction = np.where(step > 0, (covered[starts] + target - covered[before]) / np.where(step > 0, step, 1), 1.0)
+        elapsed = seconds[before] + fraction * (seconds[ends] - seconds[before]) - seconds[starts]
+        best = int(np.argmin(elapsed))
+        efforts[target] = (float(elapsed[best]), int(starts[best]), int(ends[best]))
+    return efforts
+
+
+def save_best_efforts(db: Session, activity: Activity, arrays: Dict[str, np.ndarray]) -> List[BestEffort]:
+    """
+    Ricalcola i migliori tempi dell'attività dagli stream, sostituisce quelli salvati e
+    aggiorna i record personali. Non esegue il commit.
+    """
+    db.query(BestEffort).filter(BestEffort.activity_id == activity.id).delete(synchronize_session=False)
+    efforts = []
+    if "distance" in arrays and "time" in arrays:
+        efforts = [
+            BestEffort(activity_id=activity.id, distance=target, elapsed_time=elapsed, start_index=start, end_index=end)
+            for target, (elapsed, start, end) in compute_best_efforts(
+                arrays["distance"], arrays["time"], BEST_EFFORT_DISTANCES.values()
+            ).items()
+        ]
+        db.add_all(efforts)
+    merge_activity_records(db, activity, efforts)
+    return efforts
+
+
+def best_efforts_to_json(efforts: Iterable[BestEffort]) -> List[dict]:
+    return [
+        {
+            "name": BEST_EFFORT_NAMES.get(effort.distance, f"{effort.distance:g} m"),
+            "distance": effort.distance,
+            "elapsed_time": effort.elapsed_time,
+            "start_index": effort.start_index,
+            "end_index": effort.end_index,
+        }
+        for effort in sorted(efforts, key=lambda effort: effort.distance)
+    ]
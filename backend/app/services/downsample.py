@@ -0,0 +1,140 @@
+"""
+Sottocampionamento degli stream per i grafici.
+
+Ogni livello della piramide ha un numero fisso di punti scelti con LTTB (Largest
+Triangle Three Buckets) sugli stream del grafico, con gli stessi indici per tutti gli
+stream così che il frontend li possa affiancare punto per punto. Per gli stream che
+oscillano (frequenza cardiaca, velocità, quota, ...) il livello conserva anche
+l'inviluppo min/max di ogni bucket, per disegnare i picchi che LTTB scarta.
+
+I livelli si costruiscono uno dall'altro, dal più dettagliato: il costo totale è circa
+quello del primo livello, e gli inviluppi restano esatti perché il minimo dei minimi
+è il minimo del bucket originale.
+"""
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+# Stream monotoni o non numerici: nessun inviluppo
+NO_ENVELOPE_STREAMS = {"time", "distance", "latlng", "moving"}
+ENVELOPE_SEPARATOR = ":"
+
+
+def lttb_indices(x: np.ndarray, ys: np.ndarray, points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Indici scelti da LTTB su più serie insieme (ys ha una colonna per serie, già normalizzata:
+    l'area del triangolo è la somma delle aree delle serie). Restituisce anche l'inizio di
+    ogni bucket, da usare con np.fmin.reduceat per gli inviluppi.
+    """
+    length = x.shape[0]
+    if points >= length or points < 3:
+        indices = np.arange(length)
+        return indices, indices
+
+    # Primo e ultimo punto restano; gli altri points - 2 bucket dividono i punti interni
+    edges = np.linspace(1, length - 1, points - 1).astype(np.int64)
+    counts = np.diff(edges)
+    bucket_x = np.add.reduceat(x, edges[:-1]) / counts
+    bucket_y = np.add.reduceat(ys, edges[:-1], axis=0) / counts[:, None]
+    # Terzo vertice del triangolo: media del bucket successivo (per l'ultimo, l'ultimo punto)
+    next_x = np.append(bucket_x[1:], x[-1])
+    next_y = np.vstack([bucket_y[1:], ys[-1:]])
+
+    indices = np.empty(points, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = length - 1
+    selected = 0
+    for bucket in range(points - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        ax, ay = x[selected], ys[selected]
+        area = np.abs(
+            (ax - next_x[bucket]) * (ys[start:stop] - ay) - (ax - x[start:stop, None]) * (next_y[bucket] - ay)
+        ).sum(axis=1)
+        selected = start + int(np.argmax(area))
+        indices[bucket + 1] = selected
+    starts = np.concatenate([[0], edges[:-1], [length - 1]])
+    return indices, starts
+
+
+def _normalized(streams: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Asse x (tempo, o indice) e matrice delle serie scalate su [0, 1], con i NaN a 0"""
+    length = _point_count(streams)
+    x = streams["time"].astype(np.float64) if "time" in streams else np.arange(length, dtype=np.float64)
+    columns = [
+        array.astype(np.float64) for name, array in streams.items()
+        if name not in NO_ENVELOPE_STREAMS and ENVELOPE_SEPARATOR not in name
+        and array.ndim == 1 and array.shape[0] == length
+    ]
+    ys = np.column_stack(columns) if columns else np.zeros((length, 1))
+    # fmin/fmax ignorano i NaN (punti mancanti) senza avvisi
+    low = np.fmin.reduce(ys, axis=0)
+    span = np.fmax.reduce(ys, axis=0) - low
+    ys = np.nan_to_num((ys - low) / np.where(span > 0, span, 1))
+    x_span = x[-1] - x[0]
+    return (x - x[0]) / (x_span if x_span > 0 else 1), ys
+
+
+def _point_count(streams: Dict[str, np.ndarray]) -> int:
+    """Lunghezza dell'asse: quella di "time" se c'è, altrimenti dello stream più lungo"""
+    if "time" in streams:
+        return streams["time"].shape[0]
+    return max((array.shape[0] for array in streams.values()), default=0)
+
+
+def downsample_streams(streams: Dict[str, np.ndarray], points: int) -> Dict[str, np.ndarray]:
+    """
+    Un livello: gli stream negli indici scelti da LTTB più gli inviluppi "tipo:min" e "tipo:max".
+    Accetta anche un livello già sottocampionato, di cui riduce gli inviluppi esistenti.
+    """
+    x, ys = _normalized(streams)
+    indices, starts = lttb_indices(x, ys, points)
+    level = {}
+    length = x.shape[0]
+    for name, array in streams.items():
+        # Stream di lunghezza diversa dall'asse (raro, dati Strava incompleti): non allineabili
+        if ENVELOPE_SEPARATOR in name or array.shape[0] != length:
+            continue
+        level[name] = array[indices]
+        if name in NO_ENVELOPE_STREAMS or array.ndim != 1:
+            continue
+        low = streams.get(f"{name}{ENVELOPE_SEPARATOR}min", array)
+        high = streams.get(f"{name}{ENVELOPE_SEPARATOR}max", array)
+        level[f"{name}{ENVELOPE_SEPARATOR}min"] = np.fmin.reduceat(low, starts)
+        level[f"{name}{ENVELOPE_SEPARATOR}max"] = np.fmax.reduceat(high, starts)
+    return level
+
+
+def build_pyramid(streams: Dict[str, np.ndarray], levels: Iterable[int]) -> Dict[int, Dict[str, np.ndarray]]:
+    """Livelli più piccoli degli stream originali, ciascuno ricavato dal precedente"""
+    point_count = _point_count(streams)
+    pyramid = {}
+    current = streams
+    for points in sorted(set(levels), reverse=True):
+        if points >= point_count or points < 3:
+            continue
+        current = downsample_streams(current, points)
+        pyramid[points] = current
+    return pyramid
+
+
+def split_envelopes(level: Dict[str, np.ndarray]) -> Tuple[Dict[str, np.ndarray], Dict[str, Dict[str, np.ndarray]]]:
+    """Separa gli stream dagli inviluppi ({tipo: {"min": ..., "max": ...}})"""
+    streams = {}
+    envelopes: Dict[str, Dict[str, np.ndarray]] = {}
+    for name, array in level.items():
+        if ENVELOPE_SEPARATOR in name:
+            stream_type, bound = name.split(ENVELOPE_SEPARATOR, 1)
+            envelopes.setdefault(stream_type, {})[bound] = array
+        else:
+            streams[name] = array
+    return streams, envelopes
+
+
+def choose_level(available: List[int], point_count: int, points: int, fraction: float = 1.0) -> int:
+    """
+    Il livello più piccolo che mostra almeno `points` punti nella parte di attività richiesta
+    (fraction = durata della finestra / durata totale); 0 = risoluzione piena.
+    """
+    needed = points / fraction if fraction > 0 else float("inf")
+    candidates = [level for level in available if level >= needed]
+    return min(candidates) if candidates and min(candidates) < point_count else 0
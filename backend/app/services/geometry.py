@@ -0,0 +1,145 @@
+"""
+Geometria dei percorsi: polyline di Google decodificate in array NumPy e semplificate
+con Douglas-Peucker per i diversi livelli di zoom della mappa.
+
+Douglas-Peucker viene eseguito una volta sola, alla tolleranza più fine, dividendo a
+ogni passo tutti i segmenti ancora troppo lontani dalla traccia con operazioni su
+array. Ogni punto tenuto riceve la sua "importanza" (la distanza per cui è stato
+scelto, limitata da quella del punto che ha diviso il segmento padre): la
+semplificazione a una tolleranza più grossa sono esattamente i punti con importanza
+maggiore, quindi tutti i livelli escono dallo stesso calcolo.
+"""
+import math
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.activity_route import ActivityRoute
+
+# Metri per pixel allo zoom 0 all'equatore (tile di 256 pixel, Web Mercator)
+METERS_PER_PIXEL_ZOOM_0 = 156543.03392
+EARTH_METERS_PER_DEGREE = 111_320.0
+
+
+def decode_polyline(encoded: str, precision: int = 5) -> np.ndarray:
+    """Decodifica una polyline di Google in un array (n, 2) di [lat, lng]"""
+    if not encoded:
+        return np.empty((0, 2))
+    chars = np.frombuffer(encoded.encode("ascii"), dtype=np.uint8).astype(np.int64) - 63
+    # Ogni valore è una sequenza di gruppi da 5 bit; l'ultimo gruppo non ha il bit 0x20
+    last = chars < 0x20
+    value_index = np.concatenate([[0], np.cumsum(last)[:-1]])
+    value_starts = np.concatenate([[0], np.flatnonzero(last)[:-1] + 1])
+    shifts = 5 * (np.arange(chars.shape[0]) - value_starts[value_index])
+    values = np.bincount(value_index, weights=(chars & 0x1F) << shifts).astype(np.int64)
+    # Zigzag: il bit meno significativo è il segno
+    deltas = np.where(values & 1, ~(values >> 1), values >> 1)
+    deltas = deltas[:deltas.shape[0] // 2 * 2].reshape(-1, 2)
+    return np.cumsum(deltas, axis=0) / 10 ** precision
+
+
+def encode_polyline(coordinates: np.ndarray, precision: int = 5) -> str:
+    """Codifica un array (n, 2) di [lat, lng] come polyline di Google"""
+    if len(coordinates) == 0:
+        return ""
+    scaled = np.round(np.asarray(coordinates, dtype=np.float64) * 10 ** precision).astype(np.int64)
+    deltas = np.diff(scaled, axis=0, prepend=0).ravel()
+    values = np.where(deltas < 0, ~(deltas << 1), deltas << 1)
+    # Fino a 7 gruppi da 5 bit per valore (coordinate a 32 bit); si emettono solo quelli necessari
+    groups = (values[:, None] >> (5 * np.arange(7))) & 0x1F
+    lengths = 1 + (values[:, None] >= 32 ** np.arange(1, 7)).sum(axis=1)
+    used = np.arange(7) < lengths[:, None]
+    continued = np.arange(7) < (lengths - 1)[:, None]
+    chars = groups + 0x20 * continued + 63
+    return chars[used].astype(np.uint8).tobytes().decode("ascii")
+
+
+def _to_meters(coordinates: np.ndarray) -> np.ndarray:
+    """Proiezione equirettangolare locale: basta per distanze entro un percorso"""
+    scale = math.cos(math.radians(float(np.mean(coordinates[:, 0]))))
+    return np.column_stack([coordinates[:, 1] * scale, coordinates[:, 0]]) * EARTH_METERS_PER_DEGREE
+
+
+def point_importance(coordinates: np.ndarray, min_tolerance: float) -> np.ndarray:
+    """
+    Importanza Douglas-Peucker di ogni punto in metri: il punto appartiene alla
+    semplificazione con tolleranza t se la sua importanza è > t. Primo e ultimo punto
+    hanno importanza infinita; i punti sotto min_tolerance restano a 0.
+    """
+    count = coordinates.shape[0]
+    importance = np.zeros(count)
+    if count == 0:
+        return importance
+    importance[[0, -1]] = np.inf
+    if count < 3:
+        return importance
+
+    points = _to_meters(coordinates)
+    # Limite dei segmenti: importanza del punto che li ha creati (indicizzata dal loro inizio)
+    segment_cap = np.full(count, np.inf)
+    active = np.zeros(count, dtype=bool)  # segmenti (per punto di inizio) ancora da esaminare
+    active[0] = True
+    positions = np.arange(count)
+    while active.any():
+        kept = np.flatnonzero(importance > 0)
+        segment = np.minimum(np.searchsorted(kept, positions, side="right") - 1, kept.shape[0] - 2)
+        start, end = kept[segment], kept[segment + 1]
+        a, b = points[start], points[end]
+        # Distanza di ogni punto dal segmento (non dalla retta) del proprio tratto
+        ab = b - a
+        length_sq = np.einsum("ij,ij->i", ab, ab)
+        t = np.clip(np.einsum("ij,ij->i", points - a, ab) / np.where(length_sq > 0, length_sq, 1), 0, 1)
+        distance = np.hypot(*(points - a - t[:, None] * ab).T)
+        distance[(importance > 0) | ~active[start]] = -1
+
+        segment_max = np.maximum.reduceat(distance, kept[:-1])
+        split = segment_max > min_tolerance
+        active[kept[:-1]] = split
+        if not split.any():
+            break
+        # Primo punto alla distanza massima di ogni segmento da dividere
+        candidates = np.flatnonzero((distance == segment_max[segment]) & split[segment])
+        _, first = np.unique(segment[candidates], return_index=True)
+        chosen = candidates[first]
+        chosen_start = start[chosen]
+        capped = np.minimum(distance[chosen], segment_cap[chosen_start])
+        importance[chosen] = capped
+        segment_cap[chosen_start] = capped
+        segment_cap[chosen] = capped
+        active[chosen] = True
+    return importance
+
+
+def zoom_tolerance(zoom: int, latitude: float) -> float:
+    """Tolleranza in metri per lo zoom: ROUTE_TOLERANCE_PIXELS pixel alla latitudine del percorso"""
+    return settings.route_tolerance_pixels * METERS_PER_PIXEL_ZOOM_0 * math.cos(math.radians(latitude)) / 2 ** zoom
+
+
+def simplify_for_zooms(coordinates: np.ndarray, zooms: Iterable[int]) -> Dict[int, np.ndarray]:
+    """Percorso semplificato per ogni zoom, tutti dalla stessa esecuzione di Douglas-Peucker"""
+    zooms = sorted(set(zooms))
+    if coordinates.shape[0] == 0 or not zooms:
+        return {}
+    latitude = float(np.mean(coordinates[:, 0]))
+    importance = point_importance(coordinates, zoom_tolerance(zooms[-1], latitude))
+    return {zoom: coordinates[importance > zoom_tolerance(zoom, latitude)] for zoom in zooms}
+
+
+def save_routes(db: Session, polylines: Dict[int, Optional[str]]) -> None:
+    """Ricalcola i percorsi semplificati (ROUTE_ZOOM_LEVELS) di più attività ({id: polyline}). Non esegue il commit."""
+    if not polylines:
+        return
+    db.query(ActivityRoute).filter(ActivityRoute.activity_id.in_(list(polylines))).delete(synchronize_session=False)
+    db.add_all(
+        ActivityRoute(activity_id=activity_id, zoom=zoom, point_count=len(simplified), polyline=encode_polyline(simplified))
+        for activity_id, encoded in polylines.items() if encoded
+        for zoom, simplified in simplify_for_zooms(decode_polyline(encoded), settings.route_zoom_levels).items()
+    )
+
+
+def route_zoom(available: Iterable[int], zoom: int) -> Optional[int]:
+    """Il livello più grossolano con abbastanza dettaglio per lo zoom richiesto; None = polyline originale"""
+    candidates = [level for level in available if level >= zoom]
+    return min(candidates) if candidates else None
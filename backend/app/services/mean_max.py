@@ -0,0 +1,244 @@
+"""
+Curve media-massime: la miglior velocità media (velocity_smooth) e la miglior potenza
+media (watts) di ogni attività su un insieme di durate a passo circa logaritmico, nella
+tabella activity_mean_max, e il loro inviluppo per utente, tipo e anno (e di sempre)
+nella tabella mean_max_envelopes.
+
+Il tempo di ogni punto è quello di point_seconds (zero nelle pause), quindi le durate
+sono secondi in movimento. Con le somme cumulative del tempo e del lavoro (valore per
+secondi) la media di una finestra è una differenza di due somme: np.interp valuta in un
+colpo le finestre che iniziano e quelle che finiscono su ogni punto, e fra queste c'è
+sempre la migliore perché fra un punto e l'altro il valore è costante.
+
+Le curve si calcolano quando gli stream vengono salvati; l'inviluppo si aggiorna con il
+massimo elemento per elemento fra la curva nuova e quello salvato degli ambiti
+dell'attività. Come per i record personali, quando un valore dell'inviluppo esce (attività
+eliminata, curva ricalcolata, tipo cambiato su Strava) il suo ambito si ricalcola da
+activity_mean_max. L'endpoint legge così una riga per durata, qualunque sia lo storico.
+"""
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+from sqlalchemy import delete, extract, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from app.models.activity import Activity
+from app.models.activity_stream import ActivityStream
+from app.models.mean_max import ActivityMeanMax, MeanMaxEnvelope, MEAN_MAX_SPEED, MEAN_MAX_POWER
+from app.models.personal_record import ALL_TIME
+from app.services.records import RecordScope, activity_scopes
+from app.services.zones import point_seconds
+
+# Secondi, a passo circa logaritmico (x1.3-2) arrotondati a valori leggibili: da 1 s a 6 ore
+MEAN_MAX_DURATIONS = (
+    1, 2, 3, 5, 8, 10, 15, 20, 30, 45, 60, 90, 120, 180, 240, 300, 420, 600, 900,
+    1200, 1800, 2700, 3600, 5400, 7200, 10800, 14400, 21600,
+)
+MEAN_MAX_KINDS = {MEAN_MAX_SPEED: "velocity_smooth", MEAN_MAX_POWER: "watts"}
+MEAN_MAX_STREAMS = ["time", "moving", *MEAN_MAX_KINDS.values()]
+
+
+def compute_mean_max(
+    streams: Dict[str, np.ndarray], durations: Iterable[int] = MEAN_MAX_DURATIONS
+) -> Dict[str, Dict[int, float]]:
+    """
+    Miglior media per durata ({tipo di curva: {secondi: valore}}) per i tipi di cui
+    l'attività ha lo stream. Le durate più lunghe del tempo in movimento non compaiono;
+    i punti senza valore (NaN) contano come zero.
+    """
+    seconds = point_seconds(streams)
+    if seconds is None:
+        return {}
+    elapsed = np.cumsum(seconds)  # tempo in movimento alla fine di ogni punto, non decrescente
+
+    curves = {}
+    for kind, stream_type in MEAN_MAX_KINDS.items():
+        values = streams.get(stream_type)
+        if values is None or values.shape[0] != seconds.shape[0]:
+            continue
+        values = np.clip(np.nan_to_num(values.astype(np.float64), nan=0.0), 0.0, None)
+        if not (values * seconds > 0).any():
+            continue
+        # Lavoro cumulativo: lineare a tratti nel tempo, quindi np.interp è esatto anche a metà di un punto
+        work = np.cumsum(values * seconds)
+        curve = {}
+        for duration in sorted(durations):
+            if elapsed[-1] < duration:
+                break
+            # Sui punti il lavoro è già in work: si interpola solo l'altro estremo della finestra
+            starts = elapsed + duration <= elapsed[-1]
+            ends = elapsed >= duration
+            best = max(
+                np.max(np.interp(elapsed[starts] + duration, elapsed, work) - work[starts]),
+                np.max(work[ends] - np.interp(elapsed[ends] - duration, elapsed, work)),
+            )
+            curve[duration] = float(best / duration)
+        if curve:
+            curves[kind] = curve
+    return curves
+
+
+def _curve_rows(activity_id: int, curves: Dict[str, Dict[int, float]]) -> List[dict]:
+    return [
+        {"activity_id": activity_id, "kind": kind, "duration": duration, "value": value}
+        for kind, curve in curves.items()
+        for duration, value in curve.items()
+    ]
+
+
+def _ranked_curves(
+    db: Session, user_id: int, type_key: Optional[str] = None, year: Optional[int] = None, by_year: bool = False
+) -> List[dict]:
+    """
+    Il valore più alto di activity_mean_max per tipo, curva, durata e (con by_year) anno;
+    con year solo quell'anno. Un'unica query con ROW_NUMBER() per partizione.
+    """
+    year_column = extract("year", Activity.start_date) if by_year or year is not None else literal(ALL_TIME)
+    rank = func.row_number().over(
+        partition_by=[Activity.type_key, year_column, ActivityMeanMax.kind, ActivityMeanMax.duration],
+        order_by=[ActivityMeanMax.value.desc(), Activity.start_date, Activity.id]
+    )
+    query = select(
+        Activity.type_key, year_column.label("year"), ActivityMeanMax.kind, ActivityMeanMax.duration,
+        ActivityMeanMax.value, ActivityMeanMax.activity_id, Activity.start_date, rank.label("rank")
+    ).join(Activity, Activity.id == ActivityMeanMax.activity_id).where(Activity.user_id == user_id)
+    if type_key is not None:
+        query = query.where(Activity.type_key == type_key)
+    if year is not None:
+        query = query.where(Activity.start_date >= datetime(year, 1, 1), Activity.start_date < datetime(year + 1, 1, 1))
+    ranked = query.subquery()
+    return [
+        {
+            "user_id": user_id, "type_key": row.type_key, "year": int(row.year), "kind": row.kind,
+            "duration": row.duration, "value": row.value, "activity_id": row.activity_id, "start_date": row.start_date,
+        }
+        for row in db.execute(select(ranked).where(ranked.c.rank == 1))
+    ]
+
+
+def _insert_envelopes(db: Session, rows: List[dict]) -> None:
+    if rows:
+        db.execute(insert(MeanMaxEnvelope), rows)
+
+
+def refresh_mean_max(db: Session, scopes: Iterable[RecordScope]) -> None:
+    """Ricalcola da activity_mean_max l'inviluppo degli ambiti indicati. Non esegue il commit."""
+    db.flush()
+    for user_id, type_key, year in set(scopes):
+        db.execute(delete(MeanMaxEnvelope).where(
+            MeanMaxEnvelope.user_id == user_id, MeanMaxEnvelope.type_key == type_key, MeanMaxEnvelope.year == year
+        ))
+        _insert_envelopes(db, _ranked_curves(db, user_id, type_key, None if year == ALL_TIME else year))
+
+
+def merge_activity_mean_max(db: Session, activity: Activity, curves: Dict[str, Dict[int, float]]) -> None:
+    """
+    Aggiorna l'inviluppo con le curve (appena ricalcolate) di un'attività: in ogni ambito
+    si riscrivono solo le durate in cui la curva supera il valore salvato. Non esegue il commit.
+    """
+    scopes = activity_scopes(activity.user_id, activity.type_key, activity.start_date)
+    current = db.execute(select(
+        MeanMaxEnvelope.year, MeanMaxEnvelope.kind, MeanMaxEnvelope.duration,
+        MeanMaxEnvelope.value, MeanMaxEnvelope.activity_id
+    ).where(
+        MeanMaxEnvelope.user_id == activity.user_id, MeanMaxEnvelope.type_key == activity.type_key,
+        MeanMaxEnvelope.year.in_([year for _, _, year in scopes])
+    )).all()
+    # Se l'attività era già nell'inviluppo la sua curva può essere peggiorata: serve il valore successivo
+    stale = {(activity.user_id, activity.type_key, row.year) for row in current if row.activity_id == activity.id}
+    if stale:
+        refresh_mean_max(db, stale)
+
+    index = {duration: position for position, duration in enumerate(MEAN_MAX_DURATIONS)}
+    for user_id, type_key, year in scopes:
+        if (user_id, type_key, year) in stale:
+            continue
+        for kind, curve in curves.items():
+            saved = np.full(len(MEAN_MAX_DURATIONS), -np.inf)
+            for row in current:
+                if row.year == year and row.kind == kind:
+                    saved[index[row.duration]] = row.value
+            new = np.full(len(MEAN_MAX_DURATIONS), -np.inf)
+            for duration, value in curve.items():
+                new[index[duration]] = value
+            better = [MEAN_MAX_DURATIONS[position] for position in np.flatnonzero(new > saved)]
+            if not better:
+                continue
+            db.execute(delete(MeanMaxEnvelope).where(
+                MeanMaxEnvelope.user_id == user_id, MeanMaxEnvelope.type_key == type_key, MeanMaxEnvelope.year == year,
+                MeanMaxEnvelope.kind == kind, MeanMaxEnvelope.duration.in_(better)
+            ))
+            _insert_envelopes(db, [
+                {
+                    "user_id": user_id, "type_key": type_key, "year": year, "kind": kind, "duration": duration,
+                    "value": curve[duration], "activity_id": activity.id, "start_date": activity.start_date,
+                }
+                for duration in better
+            ])
+
+
+def save_mean_max(db: Session, activity: Activity, arrays: Dict[str, np.ndarray]) -> Dict[str, Dict[int, float]]:
+    """
+    Ricalcola le curve media-massime dell'attività dagli stream, sostituisce quelle salvate
+    e aggiorna l'inviluppo. Non esegue il commit.
+    """
+    curves = compute_mean_max(arrays)
+    db.execute(delete(ActivityMeanMax).where(ActivityMeanMax.activity_id == activity.id))
+    rows = _curve_rows(activity.id, curves)
+    if rows:
+        db.execute(insert(ActivityMeanMax), rows)
+    merge_activity_mean_max(db, activity, curves)
+    return curves
+
+
+def mean_max_scopes_of_activities(db: Session, activity_ids: Iterable[int]) -> Set[RecordScope]:
+    """Ambiti dell'inviluppo in cui compaiono le attività (da ricalcolare se cambiano o spariscono)"""
+    return set(db.execute(
+        select(MeanMaxEnvelope.user_id, MeanMaxEnvelope.type_key, MeanMaxEnvelope.year)
+        .where(MeanMaxEnvelope.activity_id.in_(list(activity_ids))).distinct()
+    ).all())
+
+
+def rebuild_mean_max(db: Session, user_id: int, batch_size: int = 200) -> int:
+    """
+    Ricalcola dagli stream le curve di tutte le attività dell'utente, leggendo solo le
+    colonne necessarie, e ricostruisce il suo inviluppo. Restituisce le attività
+    elaborate. Non esegue il commit.
+    """
+    from app.services.stream_store import decode_streams  # stream_store importa questo modulo
+
+    user_activity_ids = select(Activity.id).where(Activity.user_id == user_id)
+    db.execute(delete(ActivityMeanMax).where(ActivityMeanMax.activity_id.in_(user_activity_ids)))
+    query = select(ActivityStream.activity_id, ActivityStream.data).where(ActivityStream.activity_id.in_(user_activity_ids))
+    count = 0
+    rows = []
+    for activity_id, data in db.execute(query.execution_options(yield_per=batch_size)):
+        rows.extend(_curve_rows(activity_id, compute_mean_max(decode_streams(data, MEAN_MAX_STREAMS))))
+        count += 1
+        if len(rows) >= batch_size * 10:
+            db.execute(insert(ActivityMeanMax), rows)
+            rows = []
+    if rows:
+        db.execute(insert(ActivityMeanMax), rows)
+    db.execute(delete(MeanMaxEnvelope).where(MeanMaxEnvelope.user_id == user_id))
+    _insert_envelopes(db, _ranked_curves(db, user_id, by_year=True) + _ranked_curves(db, user_id))
+    return count
+
+
+def ensure_user_mean_max(db: Session, user_id: int) -> bool:
+    """
+    Calcola curve e inviluppo di un utente con stream scaricati prima di activity_mean_max
+    (o con python -m app.utils.build_mean_max). True se li ha calcolati: il chiamante esegue il commit.
+    """
+    if db.execute(select(MeanMaxEnvelope.user_id).where(MeanMaxEnvelope.user_id == user_id).limit(1)).first():
+        return False
+    has_streams = db.execute(select(ActivityStream.activity_id).where(
+        ActivityStream.activity_id.in_(select(Activity.id).where(Activity.user_id == user_id)),
+        ActivityStream.stream_types.like("%velocity_smooth%") | ActivityStream.stream_types.like("%watts%")
+    ).limit(1)).first()
+    if not has_streams:
+        return False
+    print(f"[CURVES] Calcolo delle curve media-massime per l'utente {user_id}")
+    rebuild_mean_max(db, user_id)
+    return True
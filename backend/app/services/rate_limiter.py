@@ -0,0 +1,271 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import requests
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from stravalib.util.limiter import get_rates_from_response_headers
+from app.core.config import settings
+from app.db.database import engine
+from app.models.rate_limit import RateLimitWindow
+
+SHORT_WINDOW = "short"
+DAILY_WINDOW = "daily"
+SHORT_WINDOW_SECONDS = 15 * 60
+
+# Utente per cui si stanno effettuando le chiamate (per la quota per utente)
+_current_user_id: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("strava_user_id", default=None)
+# Attesa massima accettata dal chiamante prima di rinunciare
+_max_wait: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("strava_max_wait", default=None)
+# Lavori a bassa priorità (backfill) che possono usare solo parte di ogni finestra
+_background: contextvars.ContextVar[bool] = contextvars.ContextVar("strava_background", default=False)
+
+
+class StravaRateLimitError(Exception):
+    """Eccezione personalizzata per errori di rate limit"""
+    def __init__(self, message: str, retry_after: Optional[int] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _short_window_start(now: datetime) -> datetime:
+    """Inizio della finestra di 15 minuti corrente (Strava le allinea a :00, :15, :30, :45 UTC)"""
+    return now.replace(minute=(now.minute // 15) * 15, second=0, microsecond=0)
+
+
+def _daily_window_start(now: datetime) -> datetime:
+    """Inizio della finestra giornaliera corrente (mezzanotte UTC)"""
+    return now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class StravaRateLimiter:
+    """
+    Scheduler token-bucket per tutte le chiamate alle API Strava.
+
+    Il budget delle finestre da 15 minuti e giornaliera è tenuto nella tabella
+    strava_rate_limits, così è condiviso tra tutti gli utenti e tutti i processi;
+    i contatori vengono riallineati con gli header X-RateLimit-Usage di Strava.
+    Il bucket locale distribuisce le chiamate sul resto della finestra invece di
+    consumarla tutta subito, e ogni utente non può usare più di
+    strava_rate_limit_user_share della finestra corta.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._limits = {SHORT_WINDOW: settings.strava_rate_limit_short, DAILY_WINDOW: settings.strava_rate_limit_daily}
+        self._tokens = float(settings.strava_rate_limit_burst)
+        self._refill_rate = settings.strava_rate_limit_short / SHORT_WINDOW_SECONDS
+        self._last_refill = time.monotonic()
+        self._known_keys = set()
+
+    @contextmanager
+    def for_user(self, user_id: int):
+        """Attribuisce all'utente le chiamate effettuate nel blocco"""
+        token = _current_user_id.set(user_id)
+        try:
+            yield
+        finally:
+            _current_user_id.reset(token)
+
+    @contextmanager
+    def max_wait(self, seconds: float):
+        """Imposta quanto a lungo le chiamate del blocco possono restare in attesa di budget"""
+        token = _max_wait.set(seconds)
+        try:
+            yield
+        finally:
+            _max_wait.reset(token)
+
+    @contextmanager
+    def background(self):
+        """
+        Esegue le chiamate del blocco a bassa priorità: usano solo i primi
+        strava_rate_limit_background_share di ogni finestra, lasciando il resto alle richieste degli utenti
+        """
+        token = _background.set(True)
+        try:
+            yield
+        finally:
+            _background.reset(token)
+
+    def _budget(self, limit: int) -> int:
+        budget = limit * (1 - settings.strava_rate_limit_safety)
+        if _background.get():
+            budget *= settings.strava_rate_limit_background_share
+        return max(1, int(budget))
+
+    def _windows(self, now: datetime) -> List[Tuple[str, datetime, int, datetime]]:
+        """Finestre da rispettare per la chiamata corrente: (chiave, inizio, budget, reset)"""
+        short_start = _short_window_start(now)
+        short_reset = short_start + timedelta(seconds=SHORT_WINDOW_SECONDS)
+        daily_start = _daily_window_start(now)
+        short_budget = self._budget(self._limits[SHORT_WINDOW])
+        windows = [
+            (SHORT_WINDOW, short_start, short_budget, short_reset),
+            (DAILY_WINDOW, daily_start, self._budget(self._limits[DAILY_WINDOW]), daily_start + timedelta(days=1)),
+        ]
+        user_id = _current_user_id.get()
+        if user_id is not None:
+            user_budget = max(1, int(short_budget * settings.strava_rate_limit_user_share))
+            windows.append((f"user:{user_id}", short_start, user_budget, short_reset))
+        return windows
+
+    def _ensure_rows(self, windows: List[Tuple[str, datetime, int]]) -> None:
+        """Crea le righe dei contatori mancanti (una sola volta per processo)"""
+        for key, window_start, limit in windows:
+            if key in self._known_keys:
+                continue
+            with engine.connect() as conn:
+                if not conn.execute(select(RateLimitWindow.key).where(RateLimitWindow.key == key)).first():
+                    try:
+                        conn.execute(RateLimitWindow.__table__.insert().values(
+                            key=key, window_start=window_start, usage=0, limit=limit,
+                            created_at=datetime.utcnow(), updated_at=datetime.utcnow()
+                        ))
+                        conn.commit()
+                    except IntegrityError:
+                        # Creata nel frattempo da un altro processo
+                        conn.rollback()
+            self._known_keys.add(key)
+
+    def _roll_window(self, conn, key: str, window_start: datetime) -> None:
+        """Azzera il contatore se appartiene a una finestra ormai passata"""
+        conn.execute(
+            update(RateLimitWindow)
+            .where(RateLimitWindow.key == key, RateLimitWindow.window_start < window_start)
+            .values(window_start=window_start, usage=0)
+        )
+
+    def _reserve(self, now: datetime) -> float:
+        """Prenota una chiamata su tutte le finestre; restituisce 0 se riuscita, altrimenti i secondi da attendere"""
+        windows = self._windows(now)
+        self._ensure_rows([(key, window_start, budget) for key, window_start, budget, _ in windows])
+        with engine.connect() as conn:
+            with conn.begin() as transaction:
+                remaining = []
+                for key, window_start, budget, reset_at in windows:
+                    self._roll_window(conn, key, window_start)
+                    result = conn.execute(
+                        update(RateLimitWindow)
+                        .where(
+                            RateLimitWindow.key == key,
+                            RateLimitWindow.window_start == window_start,
+                            RateLimitWindow.usage < budget
+                        )
+                        .values(usage=RateLimitWindow.usage + 1)
+                    )
+                    if result.rowcount == 0:
+                        # Finestra esaurita: annulla le prenotazioni già fatte e attendi il reset
+                        transaction.rollback()
+                        return max(1.0, (reset_at - now).total_seconds())
+                    usage = conn.execute(
+                        select(RateLimitWindow.usage).where(RateLimitWindow.key == key)
+                    ).scalar_one()
+                    if key in (SHORT_WINDOW, DAILY_WINDOW):
+                        remaining.append((budget - usage, (reset_at - now).total_seconds()))
+
+        # Distribuisci il budget residuo sul tempo che manca alla fine della finestra corta
+        short_left, short_seconds = remaining[0]
+        daily_left, _ = remaining[1]
+        self._refill_rate = max(min(short_left, daily_left), 1) / max(short_seconds, 1.0)
+        return 0.0
+
+    def _bucket_wait(self) -> float:
+        """Secondi prima che il bucket locale abbia un token disponibile"""
+        now = time.monotonic()
+        burst = float(settings.strava_rate_limit_burst)
+        self._tokens = min(burst, self._tokens + (now - self._last_refill) * self._refill_rate)
+        self._last_refill = now
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self._refill_rate
+
+    def acquire(self) -> None:
+        """Attende finché la chiamata successiva rientra nei limiti, o solleva StravaRateLimitError"""
+        max_wait = _max_wait.get()
+        if max_wait is None:
+            max_wait = settings.strava_rate_limit_max_wait
+        deadline = time.monotonic() + max_wait
+
+        while True:
+            with self._lock:
+                wait = self._bucket_wait()
+                if wait == 0:
+                    wait = self._reserve(datetime.utcnow())
+                    if wait == 0:
+                        self._tokens -= 1
+                        return
+
+            if time.monotonic() + wait > deadline:
+                raise StravaRateLimitError(
+                    f"Rate limit exceeded for Strava API. Retry after {int(wait)} seconds.",
+                    int(wait)
+                )
+            if wait > 1:
+                print(f"[RATE LIMIT] Budget Strava esaurito, attesa di {int(wait)}s")
+            time.sleep(wait)
+
+    def record(self, headers: Dict[str, str], status_code: int, method: str = "GET") -> None:
+        """Riallinea i contatori condivisi con l'utilizzo riportato da Strava"""
+        rates = get_rates_from_response_headers(headers, method.upper())
+        if rates is None and status_code != 429:
+            return
+
+        now = datetime.utcnow()
+        observed = {}
+        if rates is not None:
+            self._limits = {SHORT_WINDOW: rates.short_limit, DAILY_WINDOW: rates.long_limit}
+            observed = {SHORT_WINDOW: rates.short_usage, DAILY_WINDOW: rates.long_usage}
+        if status_code == 429:
+            # Strava ha rifiutato la chiamata: considera esaurita la finestra corta
+            observed[SHORT_WINDOW] = self._limits[SHORT_WINDOW]
+
+        starts = {SHORT_WINDOW: _short_window_start(now), DAILY_WINDOW: _daily_window_start(now)}
+        self._ensure_rows([(key, starts[key], self._limits[key]) for key in observed])
+        with engine.begin() as conn:
+            for key, usage in observed.items():
+                self._roll_window(conn, key, starts[key])
+                conn.execute(
+                    update(RateLimitWindow)
+                    .where(
+                        RateLimitWindow.key == key,
+                        RateLimitWindow.window_start == starts[key],
+                        RateLimitWindow.usage < usage
+                    )
+                    .values(usage=usage)
+                )
+                conn.execute(
+                    update(RateLimitWindow)
+                    .where(RateLimitWindow.key == key)
+                    .values(limit=self._limits[key])
+                )
+
+
+class RateLimitedSession(requests.Session):
+    """Sessione HTTP che fa passare ogni chiamata alle API Strava dallo scheduler"""
+
+    max_retries = 3
+
+    def __init__(self, limiter: StravaRateLimiter):
+        super().__init__()
+        self.limiter = limiter
+
+    def request(self, method, url, *args, **kwargs):
+        # Gli endpoint OAuth non consumano il budget delle API
+        if "/oauth/" in str(url):
+            return super().request(method, url, *args, **kwargs)
+
+        for _ in range(self.max_retries):
+            self.limiter.acquire()
+            response = super().request(method, url, *args, **kwargs)
+            self.limiter.record(response.headers, response.status_code, method)
+            if response.status_code != 429:
+                return response
+            print(f"[RATE LIMIT] 429 da Strava su {url}, la chiamata viene rimessa in coda")
+        return response
+
+
+rate_limiter = StravaRateLimiter()
@@ -0,0 +1,161 @@
+"""
+Indice dei record personali: i RECORDS_TOP_N migliori tempi di ogni utente per tipo di
+attività, anno (e di sempre) e distanza standard, nella tabella personal_records.
+
+L'indice si aggiorna quando un'attività ottiene i suoi migliori tempi: i nuovi tempi
+vengono confrontati solo con i record già salvati dei due ambiti dell'attività (il suo
+anno e "sempre"). Quando invece un record esce dall'indice (attività eliminata, tempi
+ricalcolati, tipo cambiato su Strava) il suo ambito viene ricalcolato da best_efforts
+con una query per ambito, perché il prossimo tempo in classifica non è nell'indice.
+L'endpoint /records legge così un solo intervallo della chiave primaria.
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, extract, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.activity import Activity
+from app.models.best_effort import BestEffort
+from app.models.personal_record import PersonalRecord, ALL_TIME
+
+RecordScope = Tuple[int, str, int]  # (utente, tipo, anno)
+
+
+def activity_scopes(user_id: int, type_key: str, start_date: datetime) -> List[RecordScope]:
+    """Ambiti in cui compaiono i tempi di un'attività: il suo anno e "sempre" """
+    return [(user_id, type_key, start_date.year), (user_id, type_key, ALL_TIME)]
+
+
+def _ranked_efforts(
+    db: Session, user_id: int, type_key: Optional[str] = None, year: Optional[int] = None, by_year: bool = False
+):
+    """
+    I migliori RECORDS_TOP_N tempi da best_efforts, per tipo, distanza e (con by_year)
+    anno; con year solo quell'anno. Un'unica query con ROW_NUMBER() per partizione.
+    """
+    year_column = extract("year", Activity.start_date) if by_year or year is not None else literal(ALL_TIME)
+    rank = func.row_number().over(
+        partition_by=[Activity.type_key, year_column, BestEffort.distance],
+        order_by=[BestEffort.elapsed_time, Activity.start_date, Activity.id]
+    )
+    query = select(
+        Activity.type_key, year_column.label("year"), BestEffort.distance, rank.label("rank"),
+        BestEffort.activity_id, BestEffort.elapsed_time, Activity.start_date
+    ).join(Activity, Activity.id == BestEffort.activity_id).where(Activity.user_id == user_id)
+    if type_key is not None:
+        query = query.where(Activity.type_key == type_key)
+    if year is not None:
+        query = query.where(Activity.start_date >= datetime(year, 1, 1), Activity.start_date < datetime(year + 1, 1, 1))
+    ranked = query.subquery()
+    return db.execute(select(ranked).where(ranked.c.rank <= settings.records_top_n)).all()
+
+
+def _insert_records(db: Session, records: List[dict]) -> None:
+    """INSERT diretto, senza oggetti nella sessione: le stesse chiavi vengono cancellate e riscritte più volte"""
+    if records:
+        db.execute(insert(PersonalRecord), records)
+
+
+def _ranked_records(user_id: int, rows) -> List[dict]:
+    return [
+        {
+            "user_id": user_id, "type_key": row.type_key, "year": int(row.year), "distance": row.distance,
+            "rank": row.rank, "activity_id": row.activity_id, "elapsed_time": row.elapsed_time, "start_date": row.start_date,
+        }
+        for row in rows
+    ]
+
+
+def refresh_records(db: Session, scopes: Iterable[RecordScope]) -> None:
+    """Ricalcola da best_efforts i record degli ambiti indicati. Non esegue il commit."""
+    db.flush()  # i tempi appena aggiunti alla sessione devono entrare nella query
+    for user_id, type_key, year in set(scopes):
+        db.execute(delete(PersonalRecord).where(
+            PersonalRecord.user_id == user_id, PersonalRecord.type_key == type_key, PersonalRecord.year == year
+        ))
+        _insert_records(db, _ranked_records(user_id, _ranked_efforts(db, user_id, type_key, None if year == ALL_TIME else year)))
+
+
+def merge_activity_records(db: Session, activity: Activity, efforts: List[BestEffort]) -> None:
+    """
+    Aggiorna l'indice con i migliori tempi (appena ricalcolati) di un'attività. Non esegue il commit.
+    """
+    scopes = activity_scopes(activity.user_id, activity.type_key, activity.start_date)
+    current = db.execute(select(
+        PersonalRecord.year, PersonalRecord.distance, PersonalRecord.activity_id,
+        PersonalRecord.elapsed_time, PersonalRecord.start_date
+    ).where(
+        PersonalRecord.user_id == activity.user_id, PersonalRecord.type_key == activity.type_key,
+        PersonalRecord.year.in_([year for _, _, year in scopes])
+    )).all()
+    # Se l'attività era già nell'indice il suo tempo può essere peggiorato: serve il tempo successivo
+    stale = {(activity.user_id, activity.type_key, record.year) for record in current if record.activity_id == activity.id}
+    if stale:
+        refresh_records(db, stale)
+
+    by_distance: Dict[Tuple[int, float], list] = defaultdict(list)
+    for record in current:
+        by_distance[(record.year, record.distance)].append(record)
+    for user_id, type_key, year in scopes:
+        if (user_id, type_key, year) in stale:
+            continue
+        for effort in efforts:
+            records = by_distance[(year, effort.distance)]
+            if len(records) >= settings.records_top_n and effort.elapsed_time >= max(record.elapsed_time for record in records):
+                continue
+            # Nuovo record nei primi N: si riscrivono le posizioni di questa distanza
+            ranked = sorted(
+                [(record.elapsed_time, record.start_date, record.activity_id) for record in records]
+                + [(effort.elapsed_time, activity.start_date, activity.id)]
+            )[:settings.records_top_n]
+            db.execute(delete(PersonalRecord).where(
+                PersonalRecord.user_id == user_id, PersonalRecord.type_key == type_key,
+                PersonalRecord.year == year, PersonalRecord.distance == effort.distance
+            ))
+            _insert_records(db, [
+                {
+                    "user_id": user_id, "type_key": type_key, "year": year, "distance": effort.distance, "rank": rank,
+                    "activity_id": activity_id, "elapsed_time": elapsed_time, "start_date": start_date,
+                }
+                for rank, (elapsed_time, start_date, activity_id) in enumerate(ranked, start=1)
+            ])
+
+
+def record_scopes_of_activities(db: Session, activity_ids: Iterable[int]) -> Set[RecordScope]:
+    """Ambiti dell'indice in cui compaiono le attività (da ricalcolare se cambiano o spariscono)"""
+    return set(db.execute(
+        select(PersonalRecord.user_id, PersonalRecord.type_key, PersonalRecord.year)
+        .where(PersonalRecord.activity_id.in_(list(activity_ids))).distinct()
+    ).all())
+
+
+def rebuild_records(db: Session, user_ids: Iterable[int]) -> int:
+    """Ricostruisce da zero l'indice degli utenti indicati. Restituisce i record scritti. Non esegue il commit."""
+    count = 0
+    for user_id in user_ids:
+        db.execute(delete(PersonalRecord).where(PersonalRecord.user_id == user_id))
+        records = _ranked_records(user_id, _ranked_efforts(db, user_id, by_year=True) + _ranked_efforts(db, user_id))
+        _insert_records(db, records)
+        count += len(records)
+    return count
+
+
+def ensure_user_records(db: Session, user_id: int) -> bool:
+    """
+    Crea l'indice di un utente con migliori tempi calcolati prima dell'introduzione dei record
+    (o con python -m app.utils.build_best_efforts). True se lo ha creato: il chiamante esegue il commit.
+    """
+    if db.execute(select(PersonalRecord.user_id).where(PersonalRecord.user_id == user_id).limit(1)).first():
+        return False
+    has_efforts = db.execute(
+        select(BestEffort.activity_id).join(Activity, Activity.id == BestEffort.activity_id)
+        .where(Activity.user_id == user_id).limit(1)
+    ).first()
+    if not has_efforts:
+        return False
+    print(f"[RECORDS] Calcolo dei record per l'utente {user_id}")
+    rebuild_records(db, [user_id])
+    return True
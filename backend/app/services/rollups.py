@@ -0,0 +1,275 @@
+"""
+Totali delle attività per giorno, settimana ISO e mese (tabella activity_rollups).
+
+La sync aggiorna i totali in modo incrementale: ogni attività inserita, modificata o
+eliminata produce la differenza tra il suo contributo nuovo e quello vecchio, sommata
+con un unico INSERT ... ON CONFLICT DO UPDATE per blocco. Statistiche e tendenze
+leggono poi solo i bucket del periodo richiesto invece delle singole attività: i mesi
+interi dai bucket mensili, i giorni ai bordi da quelli giornalieri e le frazioni di
+giorno (date con orario) dalle attività, con l'indice (user_id, start_date).
+"""
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.activity import Activity
+from app.models.activity_rollup import ActivityRollup, ROLLUP_DAY, ROLLUP_WEEK, ROLLUP_MONTH
+
+PERIODS = (ROLLUP_DAY, ROLLUP_WEEK, ROLLUP_MONTH)
+SUM_COLUMNS = (
+    "activity_count", "distance", "moving_time", "elapsed_time", "elevation_gain",
+    "distance_activity_count", "distance_moving_time", "distance_elevation_gain",
+    "heartrate_time", "heartrate_sum", "watts_time", "watts_sum",
+)
+# Colonne delle attività da cui dipendono i totali
+ACTIVITY_COLUMNS = (
+    Activity.user_id, Activity.type_key, Activity.start_date, Activity.distance, Activity.moving_time,
+    Activity.elapsed_time, Activity.total_elevation_gain, Activity.average_heartrate, Activity.average_watts,
+)
+
+RollupKey = Tuple[int, str, str, date]
+
+
+def bucket_start(period: str, day: date) -> date:
+    """Primo giorno del bucket che contiene il giorno"""
+    if period == ROLLUP_WEEK:
+        return day - timedelta(days=day.weekday())
+    if period == ROLLUP_MONTH:
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(period: str, bucket: date) -> date:
+    if period == ROLLUP_WEEK:
+        return bucket + timedelta(days=7)
+    if period == ROLLUP_MONTH:
+        return (bucket + timedelta(days=32)).replace(day=1)
+    return bucket + timedelta(days=1)
+
+
+def contribution(activity) -> Dict[str, float]:
+    """Contributo di un'attività (riga o mapping con le ACTIVITY_COLUMNS) ai totali"""
+    get = activity.get if isinstance(activity, dict) else lambda name: getattr(activity, name)
+    distance = get("distance") or 0
+    moving_time = get("moving_time") or 0
+    elevation = get("total_elevation_gain") or 0
+    heartrate = get("average_heartrate")
+    watts = get("average_watts")
+    has_distance = distance > 0
+    return {
+        "activity_count": 1,
+        "distance": distance,
+        "moving_time": moving_time,
+        "elapsed_time": get("elapsed_time") or 0,
+        "elevation_gain": elevation,
+        "distance_activity_count": int(has_distance),
+        "distance_moving_time": moving_time if has_distance else 0,
+        "distance_elevation_gain": elevation if has_distance else 0,
+        "heartrate_time": moving_time if heartrate else 0,
+        "heartrate_sum": heartrate * moving_time if heartrate else 0,
+        "watts_time": moving_time if watts else 0,
+        "watts_sum": watts * moving_time if watts else 0,
+    }
+
+
+class RollupDelta:
+    """Differenze da applicare ai totali, accumulate per (utente, tipo, periodo, bucket)"""
+
+    def __init__(self):
+        self.deltas: Dict[RollupKey, Dict[str, float]] = defaultdict(lambda: dict.fromkeys(SUM_COLUMNS, 0))
+
+    def add(self, activity, sign: int = 1) -> None:
+        """Somma (sign=1) o sottrae (sign=-1) il contributo di un'attività in tutti i periodi"""
+        get = activity.get if isinstance(activity, dict) else lambda name: getattr(activity, name)
+        values = contribution(activity)
+        day = get("start_date").date()
+        for period in PERIODS:
+            totals = self.deltas[(get("user_id"), get("type_key"), period, bucket_start(period, day))]
+            for column, value in values.items():
+                totals[column] += sign * value
+
+    def replace(self, old, new) -> None:
+        if old is not None:
+            self.add(old, -1)
+        if new is not None:
+            self.add(new)
+
+    def apply(self, db: Session) -> None:
+        """Scrive le differenze con un upsert per blocco. Non esegue il commit."""
+        rows = [
+            {"user_id": key[0], "type_key": key[1], "period": key[2], "bucket": key[3], **totals}
+            for key, totals in self.deltas.items()
+            if any(totals.values())
+        ]
+        if rows:
+            upsert(db, rows, increment=True)
+        emptied = {row["user_id"] for row in rows if row["activity_count"] < 0}
+        if emptied:
+            # Bucket rimasti senza attività (eliminate o spostate): non devono comparire nelle tendenze
+            db.execute(delete(ActivityRollup).where(
+                ActivityRollup.user_id.in_(emptied), ActivityRollup.activity_count <= 0
+            ))
+        self.deltas.clear()
+
+
+def upsert(db: Session, rows: List[dict], increment: bool) -> None:
+    """INSERT ... ON CONFLICT DO UPDATE su SQLite e PostgreSQL; increment somma ai valori esistenti"""
+    insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    statement = insert(ActivityRollup)
+    table = ActivityRollup.__table__
+    now = datetime.utcnow()
+    statement = statement.on_conflict_do_update(
+        index_elements=["user_id", "period", "bucket", "type_key"],
+        set_={
+            **{
+                column: table.c[column] + statement.excluded[column] if increment else statement.excluded[column]
+                for column in SUM_COLUMNS
+            },
+            "updated_at": now,
+        }
+    )
+    db.execute(statement, [{**row, "created_at": now, "updated_at": now} for row in rows])
+
+
+def rebuild_rollups(db: Session, user_ids: Optional[Iterable[int]] = None, batch_size: int = 5000) -> int:
+    """Ricalcola da zero i totali degli utenti indicati (tutti se None). Non esegue il commit."""
+    delete_query = delete(ActivityRollup)
+    query = select(*ACTIVITY_COLUMNS)
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        delete_query = delete_query.where(ActivityRollup.user_id.in_(user_ids))
+        query = query.where(Activity.user_id.in_(user_ids))
+    db.execute(delete_query)
+
+    totals = RollupDelta()
+    count = 0
+    for activity in db.execute(query.execution_options(yield_per=batch_size)):
+        totals.add(activity)
+        count += 1
+    rows = [
+        {"user_id": key[0], "type_key": key[1], "period": key[2], "bucket": key[3], **values}
+        for key, values in totals.deltas.items()
+    ]
+    for start in range(0, len(rows), batch_size):
+        upsert(db, rows[start:start + batch_size], increment=False)
+    return count
+
+
+def ensure_user_rollups(db: Session, user_id: int) -> bool:
+    """
+    Crea i totali di un utente con attività salvate prima dell'introduzione dei rollup
+    (o di un database aggiornato senza python -m app.utils.rebuild_rollups).
+    Restituisce True se li ha creati: il chiamante deve eseguire il commit.
+    """
+    if db.execute(select(ActivityRollup.user_id).where(ActivityRollup.user_id == user_id).limit(1)).first():
+        return False
+    if not db.execute(select(Activity.id).where(Activity.user_id == user_id).limit(1)).first():
+        return False
+    print(f"[ROLLUPS] Calcolo dei totali per l'utente {user_id}")
+    rebuild_rollups(db, [user_id])
+    return True
+
+
+def _covering_pieces(start: Optional[datetime], end: Optional[datetime], period: str):
+    """
+    Scompone [start, end] in bucket interi del periodo, giorni interi ai bordi e frazioni
+    di giorno da leggere dalle attività. Restituisce ([(periodo, primo bucket, bucket
+    escluso)], [(da, a esclusivo, a inclusivo)]); None = senza limite.
+    """
+    if start is not None and end is not None and start.date() == end.date():
+        return [], [(start, None, end)]
+    raw = []
+    day_lo = day_hi = None
+    if start is not None:
+        day_lo = start.date() if start.time() == time.min else start.date() + timedelta(days=1)
+        if start.time() != time.min:
+            raw.append((start, datetime.combine(day_lo, time.min), None))
+    if end is not None:
+        day_hi = end.date()
+        raw.append((datetime.combine(day_hi, time.min), None, end))
+
+    if period == ROLLUP_DAY:
+        pieces = [(ROLLUP_DAY, day_lo, day_hi)]
+    else:
+        period_lo = None
+        if day_lo is not None:
+            period_lo = bucket_start(period, day_lo)
+            if period_lo < day_lo:
+                period_lo = next_bucket(period, period_lo)
+        period_hi = bucket_start(period, day_hi) if day_hi is not None else None
+        if period_lo is not None and period_hi is not None and period_lo >= period_hi:
+            pieces = [(ROLLUP_DAY, day_lo, day_hi)]
+        else:
+            pieces = [(period, period_lo, period_hi)]
+            if day_lo is not None:
+                pieces.append((ROLLUP_DAY, day_lo, period_lo))
+            if day_hi is not None:
+                pieces.append((ROLLUP_DAY, period_hi, day_hi))
+    pieces = [piece for piece in pieces if piece[1] is None or piece[2] is None or piece[1] < piece[2]]
+    return pieces, raw
+
+
+def read_rollups(
+    db: Session, user_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None,
+    type_key: Optional[str] = None, period: str = ROLLUP_MONTH, by_bucket: bool = True
+) -> List[Tuple[Optional[date], str, Dict[str, float]]]:
+    """
+    Totali dell'intervallo [start, end] come (bucket, tipo, totali), con i bucket più grandi
+    possibili fino a `period`. I giorni e le frazioni di giorno ai bordi hanno come bucket
+    il loro giorno: il chiamante li raggruppa con bucket_start se gli serve la chiave del periodo.
+    Con by_bucket=False i bucket vengono sommati per tipo nel database (bucket = None).
+    """
+    pieces, raw = _covering_pieces(start, end, period)
+    results = []
+    if by_bucket:
+        columns = [ActivityRollup.bucket, ActivityRollup.type_key] + [getattr(ActivityRollup, column) for column in SUM_COLUMNS]
+    else:
+        columns = [ActivityRollup.type_key] + [func.sum(getattr(ActivityRollup, column)).label(column) for column in SUM_COLUMNS]
+    for piece_period, lo, hi in pieces:
+        query = select(*columns).where(ActivityRollup.user_id == user_id, ActivityRollup.period == piece_period)
+        if not by_bucket:
+            query = query.group_by(ActivityRollup.type_key)
+        if lo is not None:
+            query = query.where(ActivityRollup.bucket >= lo)
+        if hi is not None:
+            query = query.where(ActivityRollup.bucket < hi)
+        if type_key is not None:
+            query = query.where(ActivityRollup.type_key == type_key)
+        for row in db.execute(query):
+            bucket = row.bucket if by_bucket else None
+            results.append((bucket, row.type_key, {column: getattr(row, column) for column in SUM_COLUMNS}))
+
+    for lo, hi_exclusive, hi_inclusive in raw:
+        query = select(*ACTIVITY_COLUMNS).where(Activity.user_id == user_id, Activity.start_date >= lo)
+        if hi_exclusive is not None:
+            query = query.where(Activity.start_date < hi_exclusive)
+        if hi_inclusive is not None:
+            query = query.where(Activity.start_date <= hi_inclusive)
+        if type_key is not None:
+            query = query.where(Activity.type_key == type_key)
+        for activity in db.execute(query):
+            bucket = activity.start_date.date() if by_bucket else None
+            results.append((bucket, activity.type_key, contribution(activity)))
+    return results
+
+
+def sum_totals(rows: Iterable[Dict[str, float]]) -> Dict[str, float]:
+    totals = dict.fromkeys(SUM_COLUMNS, 0)
+    for values in rows:
+        for column in SUM_COLUMNS:
+            totals[column] += values[column] or 0
+    return totals
+
+
+def count_by_type(db: Session, user_id: int) -> Dict[str, int]:
+    """Numero di attività per tipo, dai bucket mensili"""
+    return dict(db.execute(
+        select(ActivityRollup.type_key, func.sum(ActivityRollup.activity_count))
+        .where(ActivityRollup.user_id == user_id, ActivityRollup.period == ROLLUP_MONTH)
+        .group_by(ActivityRollup.type_key)
+    ).all())
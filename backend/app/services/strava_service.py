@@ -1,25 +1,50 @@
-import json
-from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
+import calendar
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional, Dict, Any, Callable, Iterator, Tuple
 from stravalib.client import Client
-from stravalib.exc import RateLimitExceeded, ActivityUploadFailed
+from stravalib.model import SummaryActivity
+from stravalib.exc import RateLimitExceeded, ActivityUploadFailed, ObjectNotFound
+from sqlalchemy import update, insert, func, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.models.user import User
-from app.models.activity import Activity, Lap
+from app.models.activity import Activity, Lap, activity_type_key, STREAM_PENDING, STREAM_FETCHED, STREAM_FAILED, STREAM_UNAVAILABLE
+from app.models.activity_route import ActivityRoute
+from app.models.activity_stream import ActivityStream, ActivityStreamLevel
+from app.models.activity_zone import ActivityZone
+from app.models.best_effort import BestEffort
+from app.models.mean_max import ActivityMeanMax, MeanMaxEnvelope
+from app.models.personal_record import PersonalRecord
 from app.schemas.user import UserCreate, UserUpdate
 from app.core.config import settings
+from app.services.geometry import save_routes
+from app.services.rate_limiter import StravaRateLimitError, RateLimitedSession, rate_limiter
+from app.services.mean_max import mean_max_scopes_of_activities, refresh_mean_max
+from app.services.records import RecordScope, activity_scopes, record_scopes_of_activities, refresh_records
+from app.services.rollups import ACTIVITY_COLUMNS as ROLLUP_COLUMNS, RollupDelta
+from app.services.stream_archive import remove_archives
+from app.services.stream_store import save_streams
+from app.services.training_load import summary_trimp, training_heartrates, update_training_load, update_training_loads
 
 
-class StravaRateLimitError(Exception):
-    """Eccezione personalizzata per errori di rate limit"""
-    def __init__(self, message: str, retry_after: Optional[int] = None):
-        super().__init__(message)
-        self.retry_after = retry_after
+STRAVA_PAGE_SIZE = 200
+# Limite inferiore per le sync complete: con 'after' l'elenco arriva in ordine cronologico
+STRAVA_EPOCH = datetime(1970, 1, 1)
+
+
+def create_strava_client() -> Client:
+    """Crea un client Strava le cui chiamate passano dallo scheduler condiviso dei rate limit"""
+    return Client(rate_limit_requests=False, requests_session=RateLimitedSession(rate_limiter))
 
 
 class StravaService:
     def __init__(self):
-        self.client = Client()
+        self.client = create_strava_client()
+        # Un client per thread: requests.Session non è thread-safe
+        self._thread_local = threading.local()
     
     def get_authorization_url(self) -> str:
         """Genera l'URL di autorizzazione per Strava OAuth2"""
@@ -49,52 +74,49 @@ class StravaService:
             'profile': athlete.profile
         }
     
-    def sync_user_activities(self, db: Session, user: User, after_date: Optional[datetime] = None) -> Dict[str, Any]:
-        """Sincronizza le attività dell'utente da Strava"""
-        print(f"[SYNC] Inizio sync per user_id={user.id}, after_date={after_date}")
-        self.client.access_token = user.access_token
+    def incremental_after_date(self, db: Session, user: User) -> Optional[datetime]:
+        """
+        Data da cui parte una sync incrementale: l'attività più recente già importata
+        (sync_cursor) meno settings.sync_recheck_days, per intercettare le modifiche recenti.
+        Restituisce None se l'utente non ha ancora attività (sync completa).
+        """
+        cursor = user.sync_cursor
+        if cursor is None:
+            # Utenti importati prima dell'introduzione del cursore
+            cursor = db.query(func.max(Activity.start_date)).filter(Activity.user_id == user.id).scalar()
+        if cursor is None:
+            return None
+        if user.last_sync_timestamp:
+            cursor = min(cursor, user.last_sync_timestamp)
+        return cursor - timedelta(days=settings.sync_recheck_days)
+    
+    def sync_user_activities(
+        self,
+        db: Session,
+        user: User,
+        after_date: Optional[datetime] = None,
+        progress: Optional[Callable[..., None]] = None,
+        before_date: Optional[datetime] = None,
+        checkpoint: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Sincronizza le attività dell'utente da Strava comprese tra after_date e before_date.
+        Se indicato, progress viene chiamato con i contatori aggiornati
+        (pages_fetched, activities_upserted, streams_pending, laps_synced) e,
+        dopo il commit di ogni pagina, con il checkpoint da cui riprendere.
+        Passando un checkpoint salvato la sync riparte dalla pagina successiva.
+        """
+        print(f"[SYNC] Inizio sync per user_id={user.id}, after_date={after_date}, before_date={before_date}")
         
         try:
-            # Ottieni le attività
-            activities = list(self.client.get_activities(after=after_date))
-            print(f"[SYNC] Recuperate {len(activities)} attività da Strava")
-            
-            synced_count = 0
-            updated_count = 0
-            
-            for strava_activity in activities:
-                # Controlla se l'attività esiste già
-                existing_activity = db.query(Activity).filter(
-                    Activity.strava_activity_id == strava_activity.id
-                ).first()
-                
-                if existing_activity:
-                    # Aggiorna l'attività esistente
-                    self._update_activity_from_strava(existing_activity, strava_activity)
-                    updated_count += 1
-                    print(f"[SYNC] Aggiornata attività esistente: {strava_activity.id}")
-                else:
-                    # Crea una nuova attività
-                    new_activity = self._create_activity_from_strava(strava_activity, user.id)
-                    db.add(new_activity)
-                    synced_count += 1
-                    print(f"[SYNC] Aggiunta nuova attività: {strava_activity.id}")
-                
-                # Sincronizza i laps se disponibili
-                if hasattr(strava_activity, 'laps') and strava_activity.laps:
-                    self._sync_activity_laps(db, strava_activity, existing_activity or new_activity)
-            
-            # Aggiorna il timestamp di sincronizzazione
-            user.last_sync_timestamp = datetime.utcnow()
-            db.commit()
-            print(f"[SYNC] Commit completato. Nuove: {synced_count}, Aggiornate: {updated_count}")
-            
-            return {
-                'synced_count': synced_count,
-                'updated_count': updated_count,
-                'total_activities': len(activities)
-            }
-            
+            with rate_limiter.for_user(user.id):
+                return self._sync_user_activities(
+                    db, user, after_date, before_date, progress or (lambda **counters: None), checkpoint
+                )
+        except StravaRateLimitError as e:
+            db.rollback()
+            print(f"[SYNC][ERRORE] Budget Strava esaurito: {str(e)}")
+            raise
         except RateLimitExceeded as e:
             db.rollback()
             print(f"[SYNC][ERRORE] Rate limit exceeded per Strava API: {str(e)}")
@@ -109,6 +131,273 @@ class StravaService:
             print(f"[SYNC][ERRORE] Errore durante la sync: {str(e)}")
             raise Exception(f"Error syncing activities: {str(e)}")
     
+    def _sync_user_activities(
+        self,
+        db: Session,
+        user: User,
+        after_date: Optional[datetime],
+        before_date: Optional[datetime],
+        progress: Callable[..., None],
+        checkpoint: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Corpo della sincronizzazione, eseguito con il budget Strava attribuito all'utente"""
+        if checkpoint:
+            checkpoint = dict(checkpoint)
+            print(f"[SYNC] Ripresa dal checkpoint: pagina {checkpoint['page']}")
+        else:
+            # Con 'after' Strava restituisce le attività dalla più vecchia: le pagine già salvate
+            # non si spostano quando ne arrivano di nuove, quindi il numero di pagina è un checkpoint stabile
+            checkpoint = {
+                'after': self._naive_utc(after_date or STRAVA_EPOCH).isoformat(),
+                'before': self._naive_utc(before_date).isoformat() if before_date else None,
+                'page': 0,
+                'first_start_date': None,
+                'last_start_date': None,
+                'synced_count': 0,
+                'updated_count': 0
+            }
+        after = datetime.fromisoformat(checkpoint['after'])
+        before = datetime.fromisoformat(checkpoint['before']) if checkpoint['before'] else None
+        
+        # Client del thread corrente: più sync possono girare in parallelo
+        client = self._get_thread_client(user.access_token)
+        chunk_size = max(1, settings.sync_chunk_size)
+        
+        for page, summaries in self._iter_activity_pages(client, after, before, checkpoint['page'] + 1):
+            # Ogni blocco viene salvato con il proprio commit: un errore non fa perdere i blocchi precedenti
+            for chunk_start in range(0, len(summaries), chunk_size):
+                synced, updated = self._upsert_activities_chunk(
+                    db, user, summaries[chunk_start:chunk_start + chunk_size]
+                )
+                db.commit()
+                checkpoint['synced_count'] += synced
+                checkpoint['updated_count'] += updated
+                # I progressi si scrivono su un'altra connessione: solo dopo il commit, che rilascia il lock di SQLite
+                progress(
+                    activities_upserted=checkpoint['synced_count'] + checkpoint['updated_count'],
+                    streams_pending=checkpoint['synced_count']
+                )
+            
+            page_newest = max(self._naive_utc(strava_activity.start_date) for strava_activity in summaries)
+            if not checkpoint.get('first_start_date'):
+                # Inizio dello storico effettivo: serve alla stima del tempo residuo (job_eta_seconds)
+                checkpoint['first_start_date'] = min(
+                    self._naive_utc(strava_activity.start_date) for strava_activity in summaries
+                ).isoformat()
+            if checkpoint['last_start_date'] is None or page_newest > datetime.fromisoformat(checkpoint['last_start_date']):
+                checkpoint['last_start_date'] = page_newest.isoformat()
+            checkpoint['page'] = page
+            progress(pages_fetched=page, checkpoint=dict(checkpoint))
+            print(f"[SYNC] Pagina {page} salvata: {len(summaries)} attività")
+        checkpoint['listed'] = True
+        progress(checkpoint=dict(checkpoint))
+        
+        # Aggiorna il timestamp di sincronizzazione e il cursore della sync incrementale
+        user.last_sync_timestamp = datetime.utcnow()
+        if checkpoint['last_start_date']:
+            newest_start_date = datetime.fromisoformat(checkpoint['last_start_date'])
+            if user.sync_cursor is None or newest_start_date > user.sync_cursor:
+                user.sync_cursor = newest_start_date
+        db.commit()
+        synced_count, updated_count = checkpoint['synced_count'], checkpoint['updated_count']
+        print(f"[SYNC] Commit completato. Nuove: {synced_count}, Aggiornate: {updated_count}")
+        
+        # I riepiloghi dell'elenco non contengono i laps: vanno scaricati per le attività nuove o modificate
+        laps_count = self._ingest_laps(db, user, progress)
+        
+        return {
+            'synced_count': synced_count,
+            'updated_count': updated_count,
+            'total_activities': synced_count + updated_count,
+            'laps_synced': laps_count
+        }
+    
+    def _get_activities_page(
+        self, client: Client, after: datetime, before: Optional[datetime], page: int
+    ) -> List[SummaryActivity]:
+        """Scarica una singola pagina dell'elenco attività dell'atleta"""
+        raw_activities = client.protocol.get(
+            "/athlete/activities",
+            after=calendar.timegm(after.timetuple()),
+            before=calendar.timegm(before.timetuple()) if before else None,
+            page=page,
+            per_page=STRAVA_PAGE_SIZE
+        )
+        return [SummaryActivity.model_validate({**raw, 'bound_client': client}) for raw in raw_activities]
+    
+    def _iter_activity_pages(
+        self, client: Client, after: datetime, before: Optional[datetime], start_page: int = 1
+    ) -> Iterator[Tuple[int, List[SummaryActivity]]]:
+        """Genera le pagine dell'elenco attività una alla volta, senza tenerle tutte in memoria"""
+        page = start_page
+        while True:
+            summaries = self._get_activities_page(client, after, before, page)
+            if not summaries:
+                return
+            yield page, summaries
+            if len(summaries) < STRAVA_PAGE_SIZE:
+                return
+            page += 1
+    
+    def _upsert_activities_chunk(self, db: Session, user: User, chunk: List[Any]) -> Tuple[int, int]:
+        """
+        Inserisce o aggiorna un blocco di attività: gli id esistenti vengono risolti
+        con un'unica query IN e le scritture avvengono in batch. Non esegue il commit.
+        """
+        existing = {
+            row.strava_activity_id: row
+            for row in db.query(
+                Activity.strava_activity_id, Activity.id, Activity.map_polyline, Activity.summary_polyline,
+                Activity.stream_status, Activity.trimp, *ROLLUP_COLUMNS
+            ).filter(
+                Activity.strava_activity_id.in_([strava_activity.id for strava_activity in chunk])
+            ).all()
+        }
+        
+        # Aggiorna le attività esistenti con un unico UPDATE per chiave primaria
+        updates = []
+        new_summaries = []
+        changed_routes = {}
+        rollups = RollupDelta()
+        retyped = {}
+        heartrates = training_heartrates(user.settings)
+        load_since = None  # primo giorno da cui ricalcolare il carico di allenamento
+        for strava_activity in chunk:
+            row = existing.get(strava_activity.id)
+            if row is None:
+                new_summaries.append(strava_activity)
+                continue
+            values = self._activity_update_values(strava_activity)
+            values['id'] = row.id
+            values['updated_at'] = datetime.utcnow()
+            # Un'attività tagliata o corretta su Strava ha laps e stream diversi: vanno riscaricati
+            if (values['distance'], values['moving_time'], values['elapsed_time']) != (row.distance, row.moving_time, row.elapsed_time):
+                values['laps_synced_at'] = None
+                values['stream_status'] = STREAM_PENDING
+                values['stream_attempts'] = 0
+            # Il TRIMP degli stream resta finché gli stream restano validi; altrimenti si stima dalla frequenza media
+            if values.get('stream_status', row.stream_status) != STREAM_FETCHED or row.trimp is None:
+                values['trimp'] = summary_trimp(values['average_heartrate'], values['moving_time'], heartrates)
+                if values['trimp'] != row.trimp:
+                    load_since = min(load_since or row.start_date.date(), row.start_date.date())
+            if (values['map_polyline'], values['summary_polyline']) != (row.map_polyline, row.summary_polyline):
+                changed_routes[row.id] = values['map_polyline'] or values['summary_polyline']
+            rollups.replace(row, {**values, 'user_id': row.user_id, 'start_date': row.start_date})
+            if values['type_key'] != row.type_key:
+                retyped[row.id] = activity_scopes(row.user_id, values['type_key'], row.start_date)
+            updates.append(values)
+        if updates:
+            db.execute(update(Activity), updates)
+        self._refresh_retyped(db, retyped)
+        
+        # Gli stream non vengono scaricati qui: le nuove attività restano "pending" e vengono
+        # idratate all'apertura del dettaglio o dal worker di backfill con il budget avanzato
+        new_activities = [
+            self._create_activity_from_strava(strava_activity, user.id)
+            for strava_activity in new_summaries
+        ]
+        for activity in new_activities:
+            activity.trimp = summary_trimp(activity.average_heartrate, activity.moving_time, heartrates)
+            load_since = min(load_since or activity.start_date.date(), activity.start_date.date())
+        db.add_all(new_activities)
+        db.flush()
+        
+        # Percorsi semplificati per gli zoom della mappa, solo se la traccia è cambiata
+        changed_routes.update(
+            (activity.id, activity.map_polyline or activity.summary_polyline) for activity in new_activities
+        )
+        save_routes(db, changed_routes)
+        
+        # Totali giornalieri, settimanali e mensili: differenza tra contributi nuovi e vecchi
+        for activity in new_activities:
+            rollups.add(activity)
+        rollups.apply(db)
+        
+        # Carico di allenamento: solo i giorni dalla prima attività cambiata in avanti
+        if load_since is not None:
+            update_training_load(db, user.id, load_since)
+        
+        return len(new_activities), len(updates)
+    
+    def _refresh_retyped(self, db: Session, retyped: Dict[int, List[RecordScope]]) -> None:
+        """
+        Tipo cambiato su Strava: i migliori tempi e le curve passano ai record del nuovo tipo.
+        retyped associa ogni attività ai suoi ambiti (activity_scopes) del nuovo tipo; va chiamato
+        dopo l'UPDATE, i record salvati indicano ancora gli ambiti del vecchio tipo.
+        """
+        if not retyped:
+            return
+        new_scopes = {scope for scopes in retyped.values() for scope in scopes}
+        refresh_records(db, record_scopes_of_activities(db, retyped) | new_scopes)
+        refresh_mean_max(db, mean_max_scopes_of_activities(db, retyped) | new_scopes)
+    
+    def update_activity_fields(self, db: Session, activity: Activity, values: Dict[str, Any]) -> None:
+        """
+        Aggiorna nome e tipo di un'attività senza chiamare Strava (eventi webhook "update"),
+        con gli stessi effetti di una sync: un cambio di tipo sposta l'attività nei totali,
+        nei record e nelle curve del nuovo tipo. Non esegue il commit.
+        """
+        values = dict(values)
+        if 'type' in values:
+            values['type_key'] = activity_type_key(values['type'])
+        row = db.execute(select(*ROLLUP_COLUMNS).where(Activity.id == activity.id)).one()
+        retyped = {}
+        if values.get('type_key', row.type_key) != row.type_key:
+            rollups = RollupDelta()
+            rollups.replace(row, {**row._asdict(), **values})
+            rollups.apply(db)
+            retyped[activity.id] = activity_scopes(row.user_id, values['type_key'], row.start_date)
+        for column, value in values.items():
+            setattr(activity, column, value)
+        db.flush()
+        self._refresh_retyped(db, retyped)
+    
+    def ingest_activity(self, db: Session, user: User, strava_activity_id: int) -> Optional[Activity]:
+        """
+        Scarica un'attività dettagliata (con i suoi laps) e la salva, in una sola chiamata.
+        Restituisce None se l'attività non esiste più su Strava. Esegue il commit.
+        """
+        client = self._get_thread_client(user.access_token)
+        try:
+            detailed_activity = client.get_activity(strava_activity_id)
+        except ObjectNotFound:
+            return None
+        self._upsert_activities_chunk(db, user, [detailed_activity])
+        activity = db.query(Activity).filter(Activity.strava_activity_id == strava_activity_id).first()
+        self._replace_laps(db, {activity.id: [self._lap_values(lap) for lap in detailed_activity.laps or []]})
+        db.commit()
+        return activity
+    
+    def delete_activities(self, db: Session, activity_ids: List[int]) -> None:
+        """Elimina attività, laps e stream collegati. Non esegue il commit."""
+        if not activity_ids:
+            return
+        rollups = RollupDelta()
+        load_since = {}
+        for activity in db.execute(select(*ROLLUP_COLUMNS).where(Activity.id.in_(activity_ids))):
+            rollups.add(activity, -1)
+            day = activity.start_date.date()
+            load_since[activity.user_id] = min(load_since.get(activity.user_id, day), day)
+        rollups.apply(db)
+        record_scopes = record_scopes_of_activities(db, activity_ids)
+        mean_max_scopes = mean_max_scopes_of_activities(db, activity_ids)
+        db.query(PersonalRecord).filter(PersonalRecord.activity_id.in_(activity_ids)).delete(synchronize_session=False)
+        db.query(MeanMaxEnvelope).filter(MeanMaxEnvelope.activity_id.in_(activity_ids)).delete(synchronize_session=False)
+        db.query(Lap).filter(Lap.activity_id.in_(activity_ids)).delete(synchronize_session=False)
+        db.query(ActivityStream).filter(ActivityStream.activity_id.in_(activity_ids)).delete(synchronize_session=False)
+        db.query(ActivityStreamLevel).filter(ActivityStreamLevel.activity_id.in_(activity_ids)).delete(synchronize_session=False)
+        db.query(ActivityRoute).filter(ActivityRoute.activity_id.in_(activity_ids)).delete(synchronize_session=False)
+        db.query(BestEffort).filter(BestEffort.activity_id.in_(activity_ids)).delete(synchronize_session=False)
+        db.query(ActivityZone).filter(ActivityZone.activity_id.in_(activity_ids)).delete(synchronize_session=False)
+        db.query(ActivityMeanMax).filter(ActivityMeanMax.activity_id.in_(activity_ids)).delete(synchronize_session=False)
+        db.query(Activity).filter(Activity.id.in_(activity_ids)).delete(synchronize_session=False)
+        # I record e gli inviluppi in cui comparivano le attività passano ai valori successivi
+        refresh_records(db, record_scopes)
+        refresh_mean_max(db, mean_max_scopes)
+        update_training_loads(db, load_since)
+        # I file dell'archivio mmap sono derivati: se la transazione viene annullata si ricreano alla lettura
+        remove_archives(activity_ids)
+    
     def _get_value(self, value) -> float:
         """Estrae il valore numerico da un oggetto quantità di Strava o restituisce il valore se è già un numero"""
         if value is None:
@@ -134,6 +423,12 @@ class StravaService:
         except (ValueError, TypeError):
             return 0
 
+    def _naive_utc(self, value: datetime) -> datetime:
+        """Converte le date di Strava (con fuso orario) nel formato naive UTC usato dal database"""
+        if value.tzinfo is not None:
+            return value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
     def _get_type_value(self, value) -> str:
         """Estrae il valore stringa dal tipo attività"""
         if value is None:
@@ -143,79 +438,245 @@ class StravaService:
             return str(value.root)
         return str(value)
 
+    def _activity_update_values(self, strava_activity) -> Dict[str, Any]:
+        """Campi di un'attività che vengono aggiornati a ogni sincronizzazione"""
+        activity_type = self._get_type_value(strava_activity.type)
+        return {
+            'name': strava_activity.name,
+            'type': activity_type,
+            'type_key': activity_type_key(activity_type),
+            'distance': self._get_value(strava_activity.distance),
+            'moving_time': self._get_seconds(strava_activity.moving_time),
+            'elapsed_time': self._get_seconds(strava_activity.elapsed_time),
+            'total_elevation_gain': self._get_value(strava_activity.total_elevation_gain),
+            'average_speed': self._get_value(strava_activity.average_speed),
+            'max_speed': self._get_value(strava_activity.max_speed),
+            'average_heartrate': strava_activity.average_heartrate,
+            'max_heartrate': strava_activity.max_heartrate,
+            'average_cadence': strava_activity.average_cadence,
+            'average_watts': strava_activity.average_watts,
+            'map_polyline': strava_activity.map.polyline if strava_activity.map else None,
+            'summary_polyline': strava_activity.map.summary_polyline if strava_activity.map else None
+        }
+    
     def _create_activity_from_strava(self, strava_activity, user_id: int) -> Activity:
-        """Crea un'attività dal modello Strava"""
+        """Crea un'attività dal modello Strava; gli stream vengono scaricati in seguito"""
         return Activity(
             strava_activity_id=strava_activity.id,
             user_id=user_id,
-            name=strava_activity.name,
-            distance=self._get_value(strava_activity.distance),
-            moving_time=self._get_seconds(strava_activity.moving_time),
-            elapsed_time=self._get_seconds(strava_activity.elapsed_time),
-            total_elevation_gain=self._get_value(strava_activity.total_elevation_gain),
-            type=self._get_type_value(strava_activity.type),
             start_date=strava_activity.start_date,
-            average_speed=self._get_value(strava_activity.average_speed),
-            max_speed=self._get_value(strava_activity.max_speed),
-            average_heartrate=strava_activity.average_heartrate,
-            max_heartrate=strava_activity.max_heartrate,
-            average_cadence=strava_activity.average_cadence,
-            average_watts=strava_activity.average_watts,
-            map_polyline=strava_activity.map.polyline if strava_activity.map else None,
-            summary_polyline=strava_activity.map.summary_polyline if strava_activity.map else None,
-            detailed_data=self._get_activity_streams(strava_activity.id)
+            stream_status=STREAM_PENDING,
+            **self._activity_update_values(strava_activity)
         )
     
-    def _update_activity_from_strava(self, activity: Activity, strava_activity) -> None:
-        """Aggiorna un'attività esistente con i dati di Strava"""
-        activity.name = strava_activity.name
-        activity.distance = self._get_value(strava_activity.distance)
-        activity.moving_time = self._get_seconds(strava_activity.moving_time)
-        activity.elapsed_time = self._get_seconds(strava_activity.elapsed_time)
-        activity.total_elevation_gain = self._get_value(strava_activity.total_elevation_gain)
-        activity.average_speed = self._get_value(strava_activity.average_speed)
-        activity.max_speed = self._get_value(strava_activity.max_speed)
-        activity.average_heartrate = strava_activity.average_heartrate
-        activity.max_heartrate = strava_activity.max_heartrate
-        activity.average_cadence = strava_activity.average_cadence
-        activity.average_watts = strava_activity.average_watts
-        activity.map_polyline = strava_activity.map.polyline if strava_activity.map else None
-        activity.summary_polyline = strava_activity.map.summary_polyline if strava_activity.map else None
-    
-    def _sync_activity_laps(self, db: Session, strava_activity, activity: Activity) -> None:
-        """Sincronizza i laps di un'attività"""
-        if not hasattr(strava_activity, 'laps') or not strava_activity.laps:
-            return
-        
-        # Rimuovi i laps esistenti
-        db.query(Lap).filter(Lap.activity_id == activity.id).delete()
-        
-        # Aggiungi i nuovi laps
-        for lap in strava_activity.laps:
-            new_lap = Lap(
-                activity_id=activity.id,
-                lap_index=lap.lap_index,
-                distance=self._get_value(lap.distance),
-                moving_time=self._get_seconds(lap.moving_time),
-                average_speed=self._get_value(lap.average_speed),
-                start_date=lap.start_date
+    def _ingest_laps(self, db: Session, user: User, progress: Callable[..., None]) -> int:
+        """
+        Scarica i laps delle attività dell'utente che non li hanno ancora (nuove o modificate),
+        a blocchi di settings.lap_batch_size con un commit per blocco. Restituisce i laps salvati.
+        """
+        laps_count = 0
+        failed_ids = set()
+        while True:
+            batch = db.query(Activity.id, Activity.strava_activity_id).filter(
+                Activity.user_id == user.id,
+                Activity.laps_synced_at.is_(None),
+                Activity.id.notin_(failed_ids)
+            ).order_by(Activity.start_date.desc()).limit(max(1, settings.lap_batch_size)).all()
+            if not batch:
+                return laps_count
+            
+            ids_by_strava_id = {strava_activity_id: activity_id for activity_id, strava_activity_id in batch}
+            laps_by_strava_id = self._map_concurrently(
+                user.access_token, list(ids_by_strava_id), self._get_activity_laps, settings.strava_lap_workers
             )
-            db.add(new_lap)
+            laps_by_activity_id = {}
+            for strava_activity_id, laps in laps_by_strava_id.items():
+                if laps is None:
+                    # Errore temporaneo: l'attività resta da scaricare alla prossima sync
+                    failed_ids.add(ids_by_strava_id[strava_activity_id])
+                else:
+                    laps_by_activity_id[ids_by_strava_id[strava_activity_id]] = laps
+            laps_count += self._replace_laps(db, laps_by_activity_id)
+            db.commit()
+            progress(laps_synced=laps_count)
+            print(f"[SYNC] Laps salvati per {len(batch)} attività")
     
-    def _get_activity_streams(self, activity_id: int) -> Optional[str]:
-        """Ottiene gli stream di dati dettagliati per un'attività"""
+    def _get_activity_laps(self, activity_id: int, client: Client) -> Optional[List[Dict[str, Any]]]:
+        """
+        Ottiene i laps di un'attività; un'attività non più disponibile non ha laps.
+        Restituisce None per gli errori temporanei; i rate limit vengono propagati.
+        """
         try:
-            streams = self.client.get_activity_streams(
+            return [self._lap_values(lap) for lap in client.get_activity_laps(activity_id)]
+        except StravaRateLimitError:
+            raise
+        except ObjectNotFound:
+            return []
+        except Exception as e:
+            print(f"[SYNC][ERRORE] Laps non scaricati per l'attività {activity_id}: {str(e)}")
+            return None
+    
+    def _lap_values(self, lap) -> Dict[str, Any]:
+        """Campi di un lap Strava salvati nella tabella laps"""
+        return {
+            'lap_index': lap.lap_index,
+            'distance': self._get_value(lap.distance),
+            'moving_time': self._get_seconds(lap.moving_time),
+            'average_speed': self._get_value(lap.average_speed),
+            'start_date': self._naive_utc(lap.start_date)
+        }
+    
+    def _replace_laps(self, db: Session, laps_by_activity_id: Dict[int, List[Dict[str, Any]]]) -> int:
+        """Sostituisce i laps di un blocco di attività con un solo DELETE e un solo INSERT multiplo. Non esegue il commit."""
+        if not laps_by_activity_id:
+            return 0
+        activity_ids = list(laps_by_activity_id)
+        now = datetime.utcnow()
+        db.query(Lap).filter(Lap.activity_id.in_(activity_ids)).delete(synchronize_session=False)
+        rows = [
+            {**lap, 'activity_id': activity_id, 'created_at': now, 'updated_at': now}
+            for activity_id, laps in laps_by_activity_id.items()
+            for lap in laps
+        ]
+        if rows:
+            db.execute(insert(Lap), rows)
+        db.execute(
+            update(Activity).where(Activity.id.in_(activity_ids)).values(laps_synced_at=now)
+        )
+        return len(rows)
+    
+    def _get_thread_client(self, access_token: str) -> Client:
+        """Restituisce il client Strava del thread corrente, creandolo se necessario"""
+        client = getattr(self._thread_local, 'client', None)
+        if client is None:
+            client = create_strava_client()
+            self._thread_local.client = client
+        client.access_token = access_token
+        return client
+    
+    def _map_concurrently(
+        self,
+        access_token: str,
+        activity_ids: List[int],
+        fetch: Callable[[int, Client], Any],
+        workers: int,
+        results: Optional[Dict[int, Any]] = None
+    ) -> Dict[int, Any]:
+        """
+        Esegue fetch(activity_id, client) per più attività su un pool di thread limitato a workers.
+        Ogni thread usa il proprio client; le chiamate passano comunque dallo scheduler condiviso.
+        I risultati vanno in results (se passato) man mano che arrivano: con un rate limit
+        l'eccezione viene propagata alla fine e il chiamante conserva le attività già scaricate.
+        """
+        results = {} if results is None else results
+        if not activity_ids:
+            return results
+        
+        workers = max(1, min(workers, len(activity_ids)))
+        # Propaga ai worker il contesto del rate limiter (utente corrente, attesa massima, priorità)
+        context = contextvars.copy_context()
+        rate_limit_error = None
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="strava-fetch") as pool:
+            futures = {
+                pool.submit(
+                    lambda activity_id: context.copy().run(
+                        fetch, activity_id, self._get_thread_client(access_token)
+                    ),
+                    activity_id
+                ): activity_id
+                for activity_id in activity_ids
+            }
+            for future in as_completed(futures):
+                try:
+                    results[futures[future]] = future.result()
+                except StravaRateLimitError as e:
+                    rate_limit_error = rate_limit_error or e
+        if rate_limit_error:
+            raise rate_limit_error
+        return results
+    
+    def _fetch_streams_concurrently(
+        self, access_token: str, activity_ids: List[int],
+        results: Optional[Dict[int, Tuple[str, Optional[Dict[str, List[Any]]]]]] = None
+    ) -> Dict[int, Tuple[str, Optional[Dict[str, List[Any]]]]]:
+        """
+        Scarica gli stream di più attività su un pool di thread limitato da settings.strava_stream_workers.
+        Restituisce per ogni attività la coppia (stato, {tipo: valori}); con un rate limit
+        quelle già scaricate restano in results (vedi _map_concurrently).
+        """
+        if activity_ids:
+            print(f"[STREAMS] Download stream per {len(activity_ids)} attività")
+        return self._map_concurrently(
+            access_token, activity_ids, self._get_activity_streams, settings.strava_stream_workers, results
+        )
+    
+    def _get_activity_streams(self, activity_id: int, client: Optional[Client] = None) -> Tuple[str, Optional[Dict[str, List[Any]]]]:
+        """
+        Ottiene gli stream di dati dettagliati per un'attività.
+        Restituisce (stato, {tipo: valori}): "unavailable" se Strava non ha stream per l'attività,
+        "failed" per gli altri errori; i rate limit vengono propagati.
+        """
+        client = client or self.client
+        try:
+            streams = client.get_activity_streams(
                 activity_id,
                 types=['time', 'distance', 'latlng', 'altitude', 'velocity_smooth', 'heartrate', 'cadence', 'watts'],
                 resolution='high'
             )
-            return json.dumps(streams)
-        except Exception:
-            return None
+        except StravaRateLimitError:
+            raise
+        except ObjectNotFound:
+            return STREAM_UNAVAILABLE, None
+        except Exception as e:
+            print(f"[STREAMS][ERRORE] Stream non scaricati per l'attività {activity_id}: {str(e)}")
+            return STREAM_FAILED, None
+        if not streams:
+            return STREAM_UNAVAILABLE, None
+        return STREAM_FETCHED, {stream_type: stream.data for stream_type, stream in streams.items()}
+    
+    def _apply_stream_result(
+        self, db: Session, activity: Activity, result: Tuple[str, Optional[Dict[str, List[Any]]]],
+        load_since: Optional[Dict[int, date]] = None
+    ) -> None:
+        """
+        Salva l'esito del download degli stream; gli stream vanno nell'archivio binario activity_streams.
+        Con load_since il carico di allenamento si aggiorna dopo il blocco (update_training_loads).
+        """
+        status, streams = result
+        activity.stream_status = status
+        activity.stream_requested_at = None
+        if status == STREAM_FETCHED:
+            save_streams(db, activity, streams, load_since)
+            activity.detailed_data = None
+        else:
+            activity.stream_attempts = (activity.stream_attempts or 0) + 1
+    
+    def hydrate_activity_streams(self, db: Session, user: User, activity: Activity) -> bool:
+        """
+        Scarica subito gli stream di un'attività ancora senza dati dettagliati
+        (apertura del dettaglio). Restituisce True se gli stream sono disponibili.
+        """
+        if activity.stream_status == STREAM_FETCHED:
+            return True
+        if not self.refresh_access_token(user, db):
+            return False
+        with rate_limiter.for_user(user.id):
+            result = self._get_activity_streams(
+                activity.strava_activity_id, self._get_thread_client(user.access_token)
+            )
+        try:
+            self._apply_stream_result(db, activity, result)
+            db.commit()
+        except IntegrityError:
+            # Il backfill ha salvato gli stream della stessa attività nel frattempo
+            db.rollback()
+            db.refresh(activity)
+        return activity.stream_status == STREAM_FETCHED
     
     def refresh_access_token(self, user: User, db: Session = None) -> bool:
         """Aggiorna il token di accesso se scaduto e salva sempre i nuovi valori nel DB"""
+        if user.strava_deauthorized_at is not None:
+            return False
         if user.expires_at > datetime.utcnow():
             return True
         try:
@@ -0,0 +1,168 @@
+"""
+Archivio degli stream su file, letto con mmap per le richieste di un intervallo di tempo.
+
+Per ogni attività con stream in activity_streams viene scritto un file a layout fisso,
+non compresso, in STREAM_ARCHIVE_DIR. Le colonne sono array little-endian allineati a
+8 byte che np.frombuffer legge direttamente dalla mappa del file, senza decompressione
+né parsing: una finestra del grafico costa due ricerche binarie su "time" e la copia
+delle sole righe richieste.
+
+    intestazione   "<4sBBHIq4x"  magic b"FXSM", versione, numero di stream, riservato,
+                                  punti, versione della riga sorgente (updated_at in µs)
+    per stream     "<16sBB6xQ"   nome, codice dtype, componenti, offset dei dati
+
+Il database resta la fonte: il file è una copia derivata, riscritta alla prima lettura
+quando manca o quando la riga di activity_streams è stata aggiornata dopo la sua creazione.
+"""
+import os
+import struct
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.activity import Activity
+from app.models.activity_stream import ActivityStream
+from app.services.stream_store import DTYPES, DTYPE_CODES, decode_streams, load_streams, time_slice
+
+ARCHIVE_FORMAT_VERSION = 1
+MAGIC = b"FXSM"
+HEADER = struct.Struct("<4sBBHIq4x")
+ENTRY = struct.Struct("<16sBB6xQ")
+ALIGNMENT = 8
+EPOCH = datetime(1970, 1, 1)
+
+
+def archive_path(activity_id: int) -> Path:
+    """File dell'attività, in sottocartelle da 1000 attività"""
+    return Path(settings.stream_archive_dir) / f"{activity_id // 1000:06d}" / f"{activity_id}.fxs"
+
+
+def _source_version(updated_at: Optional[datetime]) -> int:
+    return int((updated_at - EPOCH).total_seconds() * 1_000_000) if updated_at else 0
+
+
+def write_archive(path: Path, streams: Dict[str, np.ndarray], source_version: int) -> None:
+    """Scrive il file in modo atomico: chi ha già mappato la versione precedente continua a leggerla"""
+    names = list(streams)
+    point_count = max((array.shape[0] for array in streams.values()), default=0)
+    offset = HEADER.size + ENTRY.size * len(names)
+    entries = []
+    payloads = []
+    for name in names:
+        array = streams[name]
+        dtype_code = DTYPE_CODES[array.dtype.newbyteorder("<").str]
+        offset += -offset % ALIGNMENT
+        components = array.shape[1] if array.ndim == 2 else 1
+        entries.append(ENTRY.pack(name.encode()[:16], dtype_code, components, offset))
+        payload = np.ascontiguousarray(array, dtype=DTYPES[dtype_code]).tobytes()
+        payloads.append((offset, payload))
+        offset += len(payload)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as archive:
+            archive.write(HEADER.pack(MAGIC, ARCHIVE_FORMAT_VERSION, len(names), 0, point_count, source_version))
+            archive.write(b"".join(entries))
+            for payload_offset, payload in payloads:
+                archive.write(b"\0" * (payload_offset - archive.tell()))
+                archive.write(payload)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class StreamArchive:
+    """Stream di un'attività mappati in memoria: gli array sono viste sul file, non copie"""
+
+    def __init__(self, path: Path):
+        self._map = np.memmap(path, dtype=np.uint8, mode="r")
+        magic, version, stream_count, _, self.point_count, self.source_version = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != ARCHIVE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported stream archive: {magic!r} v{version}")
+        self._columns = {}
+        for index in range(stream_count):
+            name, dtype_code, components, offset = ENTRY.unpack_from(self._map, HEADER.size + ENTRY.size * index)
+            self._columns[name.rstrip(b"\0").decode()] = (DTYPES[dtype_code], components, offset)
+
+    @property
+    def stream_types(self) -> List[str]:
+        return list(self._columns)
+
+    def column(self, name: str) -> np.ndarray:
+        dtype, components, offset = self._columns[name]
+        array = np.frombuffer(self._map, dtype=dtype, count=self.point_count * components, offset=offset)
+        return array.reshape(-1, components) if components > 1 else array
+
+    def index_range(self, from_t: Optional[float], to_t: Optional[float]) -> slice:
+        """Righe con from_t <= time <= to_t"""
+        return time_slice(self.column("time"), from_t, to_t)
+
+    def read(self, types: Optional[Iterable[str]] = None, rows: slice = slice(None)) -> Dict[str, np.ndarray]:
+        names = [name for name in self._columns if types is None or name in types]
+        return {name: self.column(name)[rows] for name in names}
+
+
+def open_archive(db: Session, activity: Activity) -> Optional[StreamArchive]:
+    """
+    Apre il file dell'attività, creandolo o riscrivendolo dal blob di activity_streams se
+    manca o è più vecchio della riga. None se l'attività non ha stream nell'archivio binario.
+    """
+    row = db.query(ActivityStream.updated_at, ActivityStream.created_at).filter(
+        ActivityStream.activity_id == activity.id
+    ).first()
+    if row is None:
+        return None
+    source_version = _source_version(row.updated_at or row.created_at)
+    path = archive_path(activity.id)
+    try:
+        archive = StreamArchive(path)
+        if archive.source_version == source_version:
+            return archive
+    except (FileNotFoundError, ValueError):
+        pass
+
+    data = db.query(ActivityStream.data).filter(ActivityStream.activity_id == activity.id).scalar()
+    write_archive(path, decode_streams(data), source_version)
+    return StreamArchive(path)
+
+
+def read_stream_range(
+    db: Session, activity: Activity, types: Optional[List[str]] = None,
+    from_t: Optional[float] = None, to_t: Optional[float] = None
+) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Stream dell'attività limitati all'intervallo [from_t, to_t] dello stream "time" (secondi).
+    Le righe non ancora migrate nell'archivio binario vengono lette e tagliate in memoria.
+    Solleva KeyError se è richiesto un intervallo e l'attività non ha lo stream "time".
+    """
+    archive = open_archive(db, activity)
+    if archive is not None:
+        if from_t is None and to_t is None:
+            return archive.read(types)
+        if "time" not in archive.stream_types:
+            raise KeyError("time")
+        return archive.read(types, archive.index_range(from_t, to_t))
+
+    streams = load_streams(db, activity, None if types is None else list(set(types) | {"time"}))
+    if streams is None or (from_t is None and to_t is None):
+        return streams
+    if "time" not in streams:
+        raise KeyError("time")
+    rows = time_slice(streams["time"], from_t, to_t)
+    return {name: array[rows] for name, array in streams.items() if types is None or name in types}
+
+
+def remove_archives(activity_ids: Iterable[int]) -> None:
+    """Elimina i file delle attività cancellate"""
+    for activity_id in activity_ids:
+        try:
+            archive_path(activity_id).unlink()
+        except FileNotFoundError:
+            pass
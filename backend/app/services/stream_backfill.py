@@ -0,0 +1,161 @@
+import threading
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from sqlalchemy import or_, update
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.models.activity import Activity, STREAM_PENDING, STREAM_FAILED
+from app.models.user import User
+from app.services.rate_limiter import StravaRateLimitError, rate_limiter
+from app.services.strava_service import StravaService
+from app.services.training_load import update_training_loads
+
+
+class StreamBackfillWorker:
+    """
+    Thread che scarica in background gli stream delle attività importate senza dati dettagliati.
+
+    Le attività più recenti vengono servite per prime; le chiamate sono a bassa priorità
+    (rate_limiter.background()) quindi usano solo il budget lasciato libero dalle sync e
+    dalle aperture del dettaglio. Le attività vengono prese con un lease su
+    stream_requested_at, così più istanze dell'applicazione non le scaricano due volte.
+    """
+
+    def __init__(self, strava_service: Optional[StravaService] = None):
+        self.strava_service = strava_service or StravaService()
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="stream-backfill", daemon=True)
+        self._thread.start()
+        print("[STREAMS] Worker di backfill avviato")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def wake(self) -> None:
+        """Segnala che ci sono nuove attività senza stream"""
+        self._wake_event.set()
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                wait = self.run_once()
+            except Exception as e:
+                print(f"[STREAMS][ERRORE] Backfill interrotto: {str(e)}")
+                wait = settings.stream_backfill_idle_interval
+
+            if wait:
+                self._wake_event.wait(wait)
+                self._wake_event.clear()
+
+    def _claimable(self, now: datetime):
+        """Attività senza stream ancora da tentare e non prese in carico da un altro worker"""
+        lease_before = now - timedelta(seconds=settings.stream_backfill_lease)
+        return (
+            Activity.stream_status.in_((STREAM_PENDING, STREAM_FAILED))
+            & (Activity.stream_attempts < settings.stream_backfill_max_attempts)
+            & or_(Activity.stream_requested_at.is_(None), Activity.stream_requested_at < lease_before)
+        )
+
+    def _claim_batch(self, db) -> Tuple[Optional[int], List[int]]:
+        """Prende in carico un blocco di attività di un solo utente, dalla più recente"""
+        now = datetime.utcnow()
+        first = db.query(Activity.user_id).filter(
+            self._claimable(now)
+        ).order_by(Activity.start_date.desc()).first()
+        if first is None:
+            return None, []
+
+        user_id = first[0]
+        candidates = [activity_id for (activity_id,) in db.query(Activity.id).filter(
+            Activity.user_id == user_id, self._claimable(now)
+        ).order_by(Activity.start_date.desc()).limit(settings.stream_backfill_batch_size).all()]
+
+        claimed = []
+        for activity_id in candidates:
+            result = db.execute(
+                update(Activity)
+                .where(Activity.id == activity_id, self._claimable(now))
+                .values(stream_requested_at=now)
+            )
+            if result.rowcount == 1:
+                claimed.append(activity_id)
+        db.commit()
+        return user_id, claimed
+
+    def _release(self, db, activity_ids: List[int]) -> None:
+        """Libera il lease delle attività non scaricate, che restano nella coda"""
+        db.execute(
+            update(Activity)
+            .where(Activity.id.in_(activity_ids), Activity.stream_status.in_((STREAM_PENDING, STREAM_FAILED)))
+            .values(stream_requested_at=None)
+        )
+        db.commit()
+
+    def run_once(self) -> float:
+        """
+        Scarica gli stream di un blocco di attività.
+        Restituisce i secondi da attendere prima del blocco successivo (0 se c'è altro lavoro).
+        """
+        db = SessionLocal()
+        try:
+            user_id, activity_ids = self._claim_batch(db)
+            if not activity_ids:
+                return settings.stream_backfill_idle_interval
+
+            user = db.query(User).filter(User.id == user_id).first()
+            if not self.strava_service.refresh_access_token(user, db):
+                # Senza token valido le attività verrebbero solo riprese all'infinito
+                db.execute(
+                    update(Activity)
+                    .where(Activity.id.in_(activity_ids))
+                    .values(stream_attempts=Activity.stream_attempts + 1, stream_requested_at=None)
+                )
+                db.commit()
+                return 0
+
+            activities = {
+                activity.strava_activity_id: activity
+                for activity in db.query(Activity).filter(Activity.id.in_(activity_ids)).all()
+            }
+            results = {}
+            rate_limit_error = None
+            try:
+                # Nessuna attesa lunga: se il budget a bassa priorità è finito si riprova più tardi
+                with rate_limiter.for_user(user.id), rate_limiter.background(), rate_limiter.max_wait(settings.stream_backfill_idle_interval):
+                    self.strava_service._fetch_streams_concurrently(user.access_token, list(activities), results)
+            except StravaRateLimitError as e:
+                rate_limit_error = e
+
+            # Gli stream scaricati prima di un rate limit vengono salvati comunque.
+            # Il carico di allenamento si ricalcola una volta per il blocco, dal primo giorno cambiato
+            load_since = {}
+            for strava_activity_id, result in results.items():
+                self.strava_service._apply_stream_result(db, activities[strava_activity_id], result, load_since)
+            update_training_loads(db, load_since)
+            db.commit()
+            print(f"[STREAMS] Backfill: {len(results)} attività elaborate per user_id={user_id}")
+
+            if rate_limit_error:
+                self._release(db, [
+                    activity.id for strava_activity_id, activity in activities.items() if strava_activity_id not in results
+                ])
+                retry_after = rate_limit_error.retry_after or settings.stream_backfill_idle_interval
+                print(f"[STREAMS] Budget per il backfill esaurito, nuovo tentativo tra {retry_after}s")
+                return retry_after
+            return 0
+        finally:
+            db.close()
+
+
+stream_backfill_worker = StreamBackfillWorker()
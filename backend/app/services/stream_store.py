@@ -0,0 +1,232 @@
+"""
+Archivio degli stream delle attività in formato binario colonnare.
+
+Ogni stream è salvato come array tipizzato e compresso con zlib invece che come
+JSON: gli interi (tempo, frequenza cardiaca, cadenza, potenza) come uint16 (uint32
+se non ci stanno, int16/int32 se ci sono valori negativi come nella temperatura),
+le misure continue (distanza, altitudine, velocità, latlng) come float32. Uno stream
+intero con punti mancanti è salvato come float32 con NaN, per non confonderli con
+lo zero. Il blob ha un'intestazione fissa seguita dalle colonne:
+
+    intestazione   "<4sBBI"  magic b"FXST", versione, numero di stream, punti
+    per stream     "<B" + nome, "<BBI"  codice dtype, componenti, byte compressi
+                   dati compressi
+
+La decodifica restituisce direttamente array NumPy, senza passare dal JSON.
+"""
+import json
+import struct
+import zlib
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.activity import Activity
+from app.models.activity_stream import ActivityStream, ActivityStreamLevel
+from app.services.best_efforts import save_best_efforts
+from app.services.downsample import build_pyramid, choose_level
+from app.services.mean_max import save_mean_max
+from app.services.training_load import save_training_load
+from app.services.zones import save_zones
+
+STREAM_FORMAT_VERSION = 1
+MAGIC = b"FXST"
+HEADER = struct.Struct("<4sBBI")
+COLUMN = struct.Struct("<BBI")
+
+# Stream interi: il dtype più piccolo in cui entrano i valori
+INTEGER_STREAMS = {"time", "heartrate", "cadence", "watts", "temp", "moving"}
+DTYPES = {1: np.dtype("<u2"), 2: np.dtype("<u4"), 3: np.dtype("<f4"), 4: np.dtype("<i2"), 5: np.dtype("<i4")}
+DTYPE_CODES = {dtype.str: code for code, dtype in DTYPES.items()}
+
+
+def _integer_dtype(array: np.ndarray) -> np.dtype:
+    """Il dtype intero più piccolo per i valori: senza segno se non ce ne sono di negativi"""
+    if array.size == 0 or array.min() >= 0:
+        return np.dtype(np.uint16) if array.size == 0 or array.max() <= np.iinfo(np.uint16).max else np.dtype(np.uint32)
+    info = np.iinfo(np.int16)
+    return np.dtype(np.int16) if info.min <= array.min() and array.max() <= info.max else np.dtype(np.int32)
+
+
+def _to_array(stream_type: str, values: List[Any]) -> np.ndarray:
+    """Converte i valori di uno stream nel dtype compatto; i valori mancanti diventano NaN (float32)"""
+    if stream_type in INTEGER_STREAMS:
+        try:
+            array = np.asarray(values, dtype=np.int64)
+        except TypeError:
+            # Punti mancanti: lo zero sarebbe un valore valido (temperatura, potenza)
+            return np.array([np.nan if value is None else value for value in values], dtype=np.float32)
+        return array.astype(_integer_dtype(array))
+    try:
+        return np.asarray(values, dtype=np.float32)
+    except TypeError:
+        return np.array([np.nan if value is None else value for value in values], dtype=np.float32)
+
+
+def encode_streams(streams: Dict[str, List[Any]], level: int = 1) -> bytes:
+    """Codifica gli stream di Strava ({tipo: valori}) nel formato binario (livelli zlib più alti non riducono la dimensione su questi dati)"""
+    return _encode_arrays({stream_type: _to_array(stream_type, values) for stream_type, values in streams.items()}, level)
+
+
+def _encode_arrays(arrays: Dict[str, np.ndarray], level: int = 1) -> bytes:
+    columns = []
+    point_count = 0
+    for stream_type, array in arrays.items():
+        point_count = max(point_count, array.shape[0])
+        components = array.shape[1] if array.ndim == 2 else 1
+        dtype_code = DTYPE_CODES[array.dtype.newbyteorder("<").str]
+        payload = zlib.compress(np.ascontiguousarray(array, dtype=DTYPES[dtype_code]).tobytes(), level)
+        name = stream_type.encode()
+        columns.append(struct.pack("<B", len(name)) + name + COLUMN.pack(dtype_code, components, len(payload)) + payload)
+    return HEADER.pack(MAGIC, STREAM_FORMAT_VERSION, len(columns), point_count) + b"".join(columns)
+
+
+def decode_streams(data: bytes, types: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+    """Decodifica il blob in array NumPy; con types decomprime solo gli stream richiesti"""
+    magic, version, stream_count, _ = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != STREAM_FORMAT_VERSION:
+        raise ValueError(f"Unsupported stream format: {magic!r} v{version}")
+
+    streams = {}
+    offset = HEADER.size
+    for _ in range(stream_count):
+        name_length = data[offset]
+        name = data[offset + 1:offset + 1 + name_length].decode()
+        offset += 1 + name_length
+        dtype_code, components, payload_length = COLUMN.unpack_from(data, offset)
+        offset += COLUMN.size
+        if types is None or name in types:
+            array = np.frombuffer(zlib.decompress(data[offset:offset + payload_length]), dtype=DTYPES[dtype_code])
+            streams[name] = array.reshape(-1, components) if components > 1 else array
+        offset += payload_length
+    return streams
+
+
+def streams_to_lists(streams: Dict[str, np.ndarray]) -> Dict[str, list]:
+    """Converte gli array in liste serializzabili ({tipo: valori}); NaN diventa None"""
+    return {
+        stream_type: np.where(np.isnan(array), None, array).tolist() if array.dtype.kind == "f" else array.tolist()
+        for stream_type, array in streams.items()
+    }
+
+
+def streams_to_json(streams: Dict[str, np.ndarray]) -> str:
+    """Serializza gli stream nel JSON di detailed_data atteso dal frontend ({tipo: {"data": valori}})"""
+    return json.dumps({stream_type: {"data": values} for stream_type, values in streams_to_lists(streams).items()})
+
+
+def streams_from_json(detailed_data: str) -> Dict[str, list]:
+    """Legge il JSON di detailed_data, sia nel formato {tipo: {"data": valori}} sia in quello piatto {tipo: valori}"""
+    return {
+        stream_type: stream["data"] if isinstance(stream, dict) else stream
+        for stream_type, stream in json.loads(detailed_data).items()
+    }
+
+
+def time_slice(time: np.ndarray, from_t: Optional[float], to_t: Optional[float]) -> slice:
+    """Righe con from_t <= time <= to_t, con due ricerche binarie sullo stream "time" (crescente)"""
+    start = int(np.searchsorted(time, from_t, side="left")) if from_t is not None else 0
+    stop = int(np.searchsorted(time, to_t, side="right")) if to_t is not None else time.shape[0]
+    return slice(start, max(start, stop))
+
+
+def save_streams(
+    db: Session, activity: Activity, streams: Dict[str, List[Any]], load_since: Optional[Dict[int, date]] = None
+) -> ActivityStream:
+    """
+    Salva (o sostituisce) gli stream di un'attività e ricalcola ciò che ne deriva: livelli
+    sottocampionati, migliori tempi, tempo nelle zone, curve media-massime e carico di
+    allenamento (per un blocco di attività, load_since come in save_training_load).
+    Non esegue il commit.
+    """
+    arrays = {stream_type: _to_array(stream_type, values) for stream_type, values in streams.items()}
+    stream_row = db.get(ActivityStream, activity.id) or ActivityStream(activity_id=activity.id)
+    stream_row.format_version = STREAM_FORMAT_VERSION
+    stream_row.point_count = max((array.shape[0] for array in arrays.values()), default=0)
+    stream_row.stream_types = ",".join(streams)
+    stream_row.data = _encode_arrays(arrays)
+    db.add(stream_row)
+    save_stream_levels(db, activity, arrays)
+    save_best_efforts(db, activity, arrays)
+    save_zones(db, activity, arrays)
+    save_mean_max(db, activity, arrays)
+    save_training_load(db, activity, arrays, load_since)
+    return stream_row
+
+
+def save_stream_levels(db: Session, activity: Activity, arrays: Dict[str, np.ndarray]) -> List[int]:
+    """Ricalcola la piramide di livelli (STREAM_LEVELS) e sostituisce quella salvata. Non esegue il commit."""
+    db.query(ActivityStreamLevel).filter(ActivityStreamLevel.activity_id == activity.id).delete(synchronize_session=False)
+    pyramid = build_pyramid(arrays, settings.stream_levels)
+    db.add_all(
+        ActivityStreamLevel(activity_id=activity.id, points=points, data=_encode_arrays(level))
+        for points, level in pyramid.items()
+    )
+    return list(pyramid)
+
+
+def load_stream_level(
+    db: Session, activity: Activity, points: int, types: Optional[List[str]] = None,
+    from_t: Optional[float] = None, to_t: Optional[float] = None
+) -> Optional[Tuple[int, Dict[str, np.ndarray]]]:
+    """
+    Il livello più piccolo con almeno `points` punti nella finestra [from_t, to_t], come
+    (punti del livello, stream con inviluppi "tipo:min"/"tipo:max" tagliati sulla finestra).
+    None se serve la risoluzione piena o se gli stream non sono ancora scaricati.
+    Le attività scaricate prima dei livelli li ottengono qui (il chiamante esegue il commit).
+    """
+    stream_row = db.query(ActivityStream.point_count).filter(ActivityStream.activity_id == activity.id).first()
+    if stream_row is None:
+        return None
+    available = [row.points for row in db.query(ActivityStreamLevel.points).filter(ActivityStreamLevel.activity_id == activity.id)]
+    if not available and stream_row.point_count > min(settings.stream_levels, default=0):
+        available = save_stream_levels(db, activity, load_streams(db, activity))
+        db.flush()
+
+    fraction = 1.0
+    if (from_t is not None or to_t is not None) and activity.elapsed_time:
+        window = (to_t if to_t is not None else activity.elapsed_time) - (from_t or 0)
+        fraction = min(1.0, max(window, 1) / activity.elapsed_time)
+    level_points = choose_level(available, stream_row.point_count, points, fraction)
+    if not level_points:
+        return None
+
+    data = db.query(ActivityStreamLevel.data).filter(
+        ActivityStreamLevel.activity_id == activity.id, ActivityStreamLevel.points == level_points
+    ).scalar()
+    ranged = from_t is not None or to_t is not None
+    names = None
+    if types is not None:
+        names = {name for stream_type in types for name in (stream_type, f"{stream_type}:min", f"{stream_type}:max")}
+        if ranged:
+            names.add("time")
+    level = decode_streams(data, names)
+    if ranged:
+        if "time" not in level:
+            raise KeyError("time")
+        rows = time_slice(level["time"], from_t, to_t)
+        level = {name: array[rows] for name, array in level.items()}
+        if types is not None and "time" not in types:
+            del level["time"]
+    return level_points, level
+
+
+def load_streams(db: Session, activity: Activity, types: Optional[List[str]] = None) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Stream di un'attività come array NumPy, o None se non ancora scaricati.
+    Le righe non ancora migrate vengono lette dal vecchio JSON in detailed_data.
+    """
+    data = db.query(ActivityStream.data).filter(ActivityStream.activity_id == activity.id).scalar()
+    if data is not None:
+        return decode_streams(data, types)
+    if activity.detailed_data:
+        legacy = streams_from_json(activity.detailed_data)
+        return {
+            stream_type: _to_array(stream_type, values)
+            for stream_type, values in legacy.items()
+            if types is None or stream_type in types
+        }
+    return None
@@ -0,0 +1,290 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import func, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.database import SessionLocal, engine
+from app.models.activity import Activity, STREAM_PENDING
+from app.models.sync_job import SyncJob, ACTIVE_JOB_STATUSES
+from app.models.user import User
+from app.services.rate_limiter import StravaRateLimitError, rate_limiter
+from app.services.strava_service import StravaService
+from app.services.stream_backfill import stream_backfill_worker
+
+SYNC_JOB_KINDS = ("sync", "smart", "extend", "auto")
+
+
+def enqueue_sync_job(
+    db: Session, user: User, kind: str, params: Optional[Dict[str, Any]] = None, run_after: Optional[datetime] = None
+) -> SyncJob:
+    """
+    Accoda un job di sincronizzazione per l'utente, eventualmente non prima di run_after.
+    Se l'utente ha già un job in coda o in esecuzione viene restituito quello.
+    """
+    if kind not in SYNC_JOB_KINDS:
+        raise ValueError(f"Invalid sync job kind: {kind}")
+
+    active_job = get_active_job(db, user.id)
+    if active_job:
+        if active_job.kind == "auto" and kind != "auto":
+            # Una richiesta dell'utente non aspetta la partenza distribuita della sync automatica
+            promoted = db.execute(
+                update(SyncJob)
+                .where(SyncJob.id == active_job.id, SyncJob.status == "queued")
+                .values(kind=kind, params=params or {}, run_after=None, updated_at=datetime.utcnow())
+            )
+            db.commit()
+            db.refresh(active_job)
+            if promoted.rowcount:
+                sync_worker.wake()
+        return active_job
+
+    job = SyncJob(user_id=user.id, kind=kind, status="queued", params=params or {}, run_after=run_after)
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Un'altra richiesta (anche di un altro processo) ha appena accodato un job per lo stesso utente
+        db.rollback()
+        return get_active_job(db, user.id)
+    db.refresh(job)
+
+    sync_worker.wake()
+    return job
+
+
+def get_active_job(db: Session, user_id: int) -> Optional[SyncJob]:
+    """Restituisce il job in coda o in esecuzione dell'utente, se presente"""
+    return db.query(SyncJob).filter(
+        SyncJob.user_id == user_id,
+        SyncJob.status.in_(ACTIVE_JOB_STATUSES)
+    ).first()
+
+
+def job_eta_seconds(job: SyncJob) -> Optional[int]:
+    """
+    Stima il tempo residuo dell'elenco attività dal ritmo finora osservato. Le pagine arrivano
+    dalla più vecchia, quindi il checkpoint dice quanta parte dello storico (dalla prima attività
+    a before o a oggi) è già stata salvata. Nessuna stima per i laps, scaricati dopo l'elenco.
+    """
+    checkpoint = job.checkpoint or {}
+    if job.status != "running" or not job.started_at or checkpoint.get('listed'):
+        return None
+    if not checkpoint.get('first_start_date') or not checkpoint.get('last_start_date'):
+        return None
+    now = datetime.utcnow()
+    first_start_date = datetime.fromisoformat(checkpoint['first_start_date'])
+    last_start_date = datetime.fromisoformat(checkpoint['last_start_date'])
+    end = datetime.fromisoformat(checkpoint['before']) if checkpoint.get('before') else now
+    covered = (last_start_date - first_start_date).total_seconds()
+    if covered <= 0:
+        return None
+    elapsed = (now - job.started_at).total_seconds()
+    return int(elapsed * max(0.0, (end - last_start_date).total_seconds()) / covered)
+
+
+class JobProgress:
+    """Scrive i contatori di avanzamento sul job, su una connessione separata dalla sessione di sync"""
+
+    min_interval = 1.0
+
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+        self._counters: Dict[str, Any] = {}
+        self._last_write = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, **counters: Any) -> None:
+        with self._lock:
+            self._counters.update(counters)
+            # Il download degli stream aggiorna molto spesso: limita le scritture,
+            # tranne per i checkpoint che devono essere durevoli subito dopo il commit della pagina
+            if 'checkpoint' in counters or time.monotonic() - self._last_write >= self.min_interval:
+                self.flush()
+
+    def flush(self) -> None:
+        if not self._counters:
+            return
+        with engine.begin() as conn:
+            conn.execute(
+                update(SyncJob)
+                .where(SyncJob.id == self.job_id)
+                .values(**self._counters, updated_at=datetime.utcnow())
+            )
+        self._counters = {}
+        self._last_write = time.monotonic()
+
+
+class SyncJobWorker:
+    """
+    Pool di thread che esegue i job di sincronizzazione fuori dall'event loop.
+
+    I job vengono presi dalla tabella sync_jobs con un UPDATE condizionale, quindi più
+    istanze dell'applicazione possono condividere la stessa coda; un job "running" che
+    non aggiorna i progressi da sync_job_stale_after secondi viene ripreso.
+    """
+
+    def __init__(self, strava_service: Optional[StravaService] = None):
+        self.strava_service = strava_service or StravaService()
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stop_event.clear()
+        for index in range(settings.sync_job_workers):
+            thread = threading.Thread(target=self._run, name=f"sync-job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"[SYNC JOB] Avviati {len(self._threads)} worker")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._wake_event.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def wake(self) -> None:
+        """Segnala ai worker che c'è un nuovo job in coda"""
+        self._wake_event.set()
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                job_id = self._claim_next_job()
+            except Exception as e:
+                print(f"[SYNC JOB][ERRORE] Impossibile leggere la coda: {str(e)}")
+                job_id = None
+
+            if job_id is None:
+                self._wake_event.wait(settings.sync_job_poll_interval)
+                self._wake_event.clear()
+                continue
+            self._execute(job_id)
+
+    def _claimable(self, now: datetime):
+        """Job pronti per l'esecuzione: in coda (e non rimandati) oppure abbandonati da un altro worker"""
+        stale_before = now - timedelta(seconds=settings.sync_job_stale_after)
+        return or_(
+            (SyncJob.status == "queued") & or_(SyncJob.run_after.is_(None), SyncJob.run_after <= now),
+            (SyncJob.status == "running") & (SyncJob.updated_at < stale_before)
+        )
+
+    def _claim_next_job(self) -> Optional[int]:
+        """Prende in carico il prossimo job in coda (o abbandonato) e restituisce il suo id"""
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            candidates = db.query(SyncJob.id).filter(
+                self._claimable(now)
+            ).order_by(SyncJob.created_at).limit(5).all()
+
+            for (job_id,) in candidates:
+                claimed = db.execute(
+                    update(SyncJob)
+                    .where(SyncJob.id == job_id, self._claimable(now))
+                    .values(status="running", started_at=datetime.utcnow(), updated_at=datetime.utcnow())
+                )
+                db.commit()
+                if claimed.rowcount == 1:
+                    return job_id
+            return None
+        finally:
+            db.close()
+
+    def _resolve_window(self, db: Session, job: SyncJob, user: User) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """
+        Calcola l'intervallo (after, before) da sincronizzare in base al tipo di job:
+        - sync: data esplicita, sync completa se richiesta, altrimenti incrementale
+        - smart, auto: incrementale dal cursore dell'utente
+        - extend: solo lo storico precedente all'attività più vecchia già importata
+        """
+        params = job.params or {}
+        if job.kind == "sync":
+            if params.get("after_date"):
+                return datetime.fromisoformat(params["after_date"]), None
+            if params.get("full"):
+                return None, None
+            return self.strava_service.incremental_after_date(db, user), None
+
+        if job.kind in ("smart", "auto"):
+            return self.strava_service.incremental_after_date(db, user), None
+
+        oldest_start_date = db.query(func.min(Activity.start_date)).filter(
+            Activity.user_id == job.user_id
+        ).scalar()
+        if oldest_start_date is None:
+            return None, None
+        return oldest_start_date - timedelta(days=params.get("months_back", 12) * 30), oldest_start_date
+
+    def _execute(self, job_id: int) -> None:
+        db = SessionLocal()
+        progress = JobProgress(job_id)
+        try:
+            job = db.query(SyncJob).filter(SyncJob.id == job_id).first()
+            user = db.query(User).filter(User.id == job.user_id).first()
+            print(f"[SYNC JOB] Avvio job {job.id} ({job.kind}) per user_id={job.user_id}")
+
+            if not self.strava_service.refresh_access_token(user, db):
+                raise Exception("Token Strava scaduto o non valido. Ricollega il tuo account Strava dalle impostazioni.")
+
+            # Un job interrotto riparte dal checkpoint, che contiene anche l'intervallo originale
+            after_date, before_date = (None, None) if job.checkpoint else self._resolve_window(db, job, user)
+            # I job in background possono attendere il reset delle finestre Strava, ma senza
+            # smettere di aggiornare i progressi così a lungo da essere ripresi da un altro worker:
+            # le attese più lunghe rimettono il job in coda con run_after
+            max_wait = min(settings.sync_job_max_wait, settings.sync_job_stale_after / 2)
+            with rate_limiter.max_wait(max_wait):
+                sync_result = self.strava_service.sync_user_activities(
+                    db, user, after_date, progress, before_date=before_date, checkpoint=job.checkpoint
+                )
+
+            progress.flush()
+            db.refresh(job)
+            job.status = "completed"
+            job.error = None
+            job.result = sync_result
+            # Attività rimaste senza stream: le scarica il backfill
+            job.streams_pending = db.query(func.count(Activity.id)).filter(
+                Activity.user_id == job.user_id, Activity.stream_status == STREAM_PENDING
+            ).scalar()
+            job.finished_at = datetime.utcnow()
+            db.commit()
+            print(f"[SYNC JOB] Job {job.id} completato: {sync_result}")
+            # Le nuove attività sono state salvate senza stream
+            stream_backfill_worker.wake()
+        except StravaRateLimitError as e:
+            # Budget esaurito oltre l'attesa massima: il job torna in coda e riprenderà dal checkpoint
+            db.rollback()
+            progress.flush()
+            retry_after = e.retry_after or settings.sync_job_poll_interval
+            print(f"[SYNC JOB] Job {job_id} rimesso in coda tra {retry_after}s: {str(e)}")
+            db.execute(
+                update(SyncJob)
+                .where(SyncJob.id == job_id)
+                .values(
+                    status="queued", error=str(e), updated_at=datetime.utcnow(),
+                    run_after=datetime.utcnow() + timedelta(seconds=retry_after)
+                )
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"[SYNC JOB][ERRORE] Job {job_id} fallito: {str(e)}")
+            db.execute(
+                update(SyncJob)
+                .where(SyncJob.id == job_id)
+                .values(status="failed", error=str(e), finished_at=datetime.utcnow(), updated_at=datetime.utcnow())
+            )
+            db.commit()
+        finally:
+            db.close()
+
+
+sync_worker = SyncJobWorker()
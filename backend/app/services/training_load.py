@@ -0,0 +1,247 @@
+"""
+Carico di allenamento: TRIMP delle attività e medie esponenziali giornaliere di fatica
+(ATL, TRAINING_ATL_DAYS), forma fisica (CTL, TRAINING_CTL_DAYS) e forma del giorno
+(TSB = CTL - ATL del giorno prima), nella tabella training_loads.
+
+Il TRIMP di Banister si calcola quando l'attività viene salvata: dalla frequenza cardiaca
+di ogni punto degli stream, pesata sul suo intervallo di tempo, oppure da
+average_heartrate e moving_time finché gli stream non ci sono (o se non hanno la
+frequenza). La riserva cardiaca usa le frequenze a riposo e massima delle impostazioni
+dell'utente (settings["training"]).
+
+training_loads ha una riga per giorno, dalla prima all'ultima attività dell'utente.
+Quando un'attività cambia si riscrivono solo i giorni dal suo in avanti: le medie
+ripartono dai valori salvati del giorno precedente e si calcolano con
+scipy.signal.lfilter, senza rileggere le attività più vecchie. L'endpoint legge le righe
+dell'intervallo richiesto e prolunga il decadimento oltre l'ultima.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.signal import lfilter
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.activity import Activity
+from app.models.activity_stream import ActivityStream
+from app.models.training_load import TrainingLoad
+from app.models.user import User
+from app.schemas.user import TrainingSettings
+from app.services.zones import point_seconds
+
+# Coefficienti del TRIMP di Banister
+TRIMP_WEIGHT = 0.64
+TRIMP_EXPONENT = 1.92
+TRIMP_STREAMS = ["time", "heartrate", "moving"]
+
+HeartRates = Tuple[float, float]  # (a riposo, massima)
+
+
+def training_heartrates(user_settings: Optional[dict]) -> HeartRates:
+    """Frequenze a riposo e massima dalle impostazioni dell'utente (quelle predefinite se non le ha scelte)"""
+    training = TrainingSettings(**((user_settings or {}).get("training") or {}))
+    return float(training.restingHeartrate), float(training.maxHeartrate)
+
+
+def _trimp(heartrate: np.ndarray, minutes: np.ndarray, heartrates: HeartRates) -> float:
+    resting, maximum = heartrates
+    reserve = np.clip((heartrate - resting) / (maximum - resting), 0.0, 1.0)
+    return float(np.sum(minutes * reserve * TRIMP_WEIGHT * np.exp(TRIMP_EXPONENT * reserve)))
+
+
+def stream_trimp(streams: Dict[str, np.ndarray], heartrates: HeartRates) -> Optional[float]:
+    """TRIMP dagli stream; None se mancano "time" o "heartrate" (i punti con frequenza 0 non contano)"""
+    seconds = point_seconds(streams)
+    heartrate = streams.get("heartrate")
+    if seconds is None or heartrate is None or heartrate.shape[0] != seconds.shape[0]:
+        return None
+    heartrate = heartrate.astype(np.float64)
+    valid = heartrate > 0
+    if not valid.any():
+        return None
+    return _trimp(heartrate[valid], seconds[valid] / 60, heartrates)
+
+
+def summary_trimp(average_heartrate: Optional[float], moving_time: Optional[int], heartrates: HeartRates) -> float:
+    """TRIMP dalla frequenza media e dal tempo in movimento; 0 senza frequenza"""
+    if not average_heartrate or not moving_time:
+        return 0.0
+    return _trimp(np.array([average_heartrate], dtype=np.float64), np.array([moving_time / 60]), heartrates)
+
+
+def save_training_load(
+    db: Session, activity: Activity, arrays: Dict[str, np.ndarray], load_since: Optional[Dict[int, date]] = None
+) -> float:
+    """
+    Ricalcola il TRIMP dell'attività dagli stream appena salvati e, se è cambiato, il carico
+    dal suo giorno in avanti. Con load_since (blocchi di attività) il giorno viene solo
+    annotato per l'utente e il chiamante aggiorna il carico una volta con update_training_loads.
+    Non esegue il commit.
+    """
+    heartrates = training_heartrates(db.get(User, activity.user_id).settings)
+    trimp = stream_trimp(arrays, heartrates)
+    if trimp is None:
+        trimp = summary_trimp(activity.average_heartrate, activity.moving_time, heartrates)
+    if activity.trimp is None or abs(activity.trimp - trimp) > 1e-9:
+        activity.trimp = trimp
+        day = activity.start_date.date()
+        if load_since is None:
+            update_training_load(db, activity.user_id, day)
+        else:
+            load_since[activity.user_id] = min(load_since.get(activity.user_id, day), day)
+    return trimp
+
+
+def _daily_trimp(db: Session, user_id: int, start: date, end: date) -> np.ndarray:
+    """Somma del TRIMP per giorno da start a end inclusi, con l'indice (user_id, start_date)"""
+    totals = np.zeros((end - start).days + 1)
+    rows = db.execute(select(Activity.start_date, Activity.trimp).where(
+        Activity.user_id == user_id,
+        Activity.start_date >= datetime.combine(start, time.min),
+        Activity.start_date < datetime.combine(end + timedelta(days=1), time.min),
+    )).all()
+    if rows:
+        days = np.array([(start_date.date() - start).days for start_date, _ in rows])
+        np.add.at(totals, days, [trimp or 0.0 for _, trimp in rows])
+    return totals
+
+
+def _ewma(values: np.ndarray, previous: float, time_constant: float) -> np.ndarray:
+    """Media esponenziale y[n] = y[n-1] + (x[n] - y[n-1]) / time_constant, partendo da y[-1] = previous"""
+    alpha = 1.0 / time_constant
+    result, _ = lfilter([alpha], [1.0, alpha - 1.0], values, zi=[(1.0 - alpha) * previous])
+    return result
+
+
+def _write_loads(db: Session, user_id: int, since: Optional[date]) -> int:
+    """
+    Riscrive le righe di training_loads da since (None = dalla prima attività) all'ultima
+    attività, partendo dalle medie salvate del giorno precedente. Restituisce le righe scritte.
+    """
+    first_day, last_day = db.execute(
+        select(func.min(Activity.start_date), func.max(Activity.start_date)).where(Activity.user_id == user_id)
+    ).one()
+    if first_day is None:
+        db.execute(delete(TrainingLoad).where(TrainingLoad.user_id == user_id))
+        return 0
+    last_row = db.execute(select(func.max(TrainingLoad.day)).where(TrainingLoad.user_id == user_id)).scalar()
+    start = first_day.date() if since is None or last_row is None else min(since, last_row + timedelta(days=1))
+    end = max(last_day.date(), last_row or last_day.date())
+    if start > end:
+        return 0
+
+    previous = db.execute(select(TrainingLoad.atl, TrainingLoad.ctl).where(
+        TrainingLoad.user_id == user_id, TrainingLoad.day == start - timedelta(days=1)
+    )).first()
+    atl_before, ctl_before = previous if previous is not None else (0.0, 0.0)
+    trimp = _daily_trimp(db, user_id, start, end)
+    atl = _ewma(trimp, atl_before, settings.training_atl_days)
+    ctl = _ewma(trimp, ctl_before, settings.training_ctl_days)
+    tsb = np.concatenate([[ctl_before - atl_before], (ctl - atl)[:-1]])
+
+    db.execute(delete(TrainingLoad).where(TrainingLoad.user_id == user_id, TrainingLoad.day >= start))
+    db.execute(insert(TrainingLoad), [
+        {
+            "user_id": user_id, "day": start + timedelta(days=index),
+            "trimp": float(trimp[index]), "atl": float(atl[index]), "ctl": float(ctl[index]), "tsb": float(tsb[index]),
+        }
+        for index in range(trimp.shape[0])
+    ])
+    return trimp.shape[0]
+
+
+def update_training_load(db: Session, user_id: int, since: date) -> None:
+    """
+    Aggiorna il carico dal giorno since in avanti dopo un'attività aggiunta, modificata o
+    eliminata. Un utente senza righe viene ricalcolato per intero. Non esegue il commit.
+    """
+    db.flush()  # il TRIMP appena assegnato alle attività deve entrare nelle somme
+    if db.execute(select(TrainingLoad.day).where(TrainingLoad.user_id == user_id).limit(1)).first() is None:
+        rebuild_training_load(db, user_id)
+        return
+    _write_loads(db, user_id, since)
+
+
+def update_training_loads(db: Session, load_since: Dict[int, date]) -> None:
+    """update_training_load per ogni utente di un blocco di attività, dal primo giorno cambiato. Non esegue il commit."""
+    for user_id, since in load_since.items():
+        update_training_load(db, user_id, since)
+
+
+def rebuild_training_load(db: Session, user_id: int, heartrates: Optional[HeartRates] = None) -> int:
+    """
+    Ricalcola il TRIMP di tutte le attività dell'utente (dagli stream, se scaricati) e tutte
+    le righe di training_loads. Restituisce le attività elaborate. Non esegue il commit.
+    """
+    from app.services.stream_store import decode_streams  # stream_store importa questo modulo
+
+    if heartrates is None:
+        heartrates = training_heartrates(db.get(User, user_id).settings)
+    trimps = {
+        activity_id: summary_trimp(average_heartrate, moving_time, heartrates)
+        for activity_id, average_heartrate, moving_time in db.execute(
+            select(Activity.id, Activity.average_heartrate, Activity.moving_time).where(Activity.user_id == user_id)
+        )
+    }
+    query = select(ActivityStream.activity_id, ActivityStream.data).where(
+        ActivityStream.activity_id.in_(select(Activity.id).where(Activity.user_id == user_id))
+    )
+    for activity_id, data in db.execute(query.execution_options(yield_per=200)):
+        trimp = stream_trimp(decode_streams(data, TRIMP_STREAMS), heartrates)
+        if trimp is not None:
+            trimps[activity_id] = trimp
+    if trimps:
+        db.execute(update(Activity), [{"id": activity_id, "trimp": trimp} for activity_id, trimp in trimps.items()])
+    db.execute(delete(TrainingLoad).where(TrainingLoad.user_id == user_id))
+    _write_loads(db, user_id, None)
+    return len(trimps)
+
+
+def ensure_user_training_load(db: Session, user_id: int) -> bool:
+    """
+    Calcola il carico di un utente con attività salvate prima di training_loads (o con
+    python -m app.utils.build_training_load). True se lo ha calcolato: il chiamante esegue il commit.
+    """
+    if db.execute(select(TrainingLoad.day).where(TrainingLoad.user_id == user_id).limit(1)).first():
+        return False
+    if not db.execute(select(Activity.id).where(Activity.user_id == user_id).limit(1)).first():
+        return False
+    print(f"[TRAINING] Calcolo del carico per l'utente {user_id}")
+    rebuild_training_load(db, user_id)
+    return True
+
+
+def read_training_load(db: Session, user_id: int, start: date, end: date) -> List[dict]:
+    """
+    Carico e medie di ogni giorno da start a end inclusi. Prima della prima riga i valori
+    sono zero; dopo l'ultima le medie decadono senza nuovi allenamenti.
+    """
+    rows = {
+        row.day: row for row in db.execute(
+            select(TrainingLoad.day, TrainingLoad.trimp, TrainingLoad.atl, TrainingLoad.ctl, TrainingLoad.tsb)
+            .where(TrainingLoad.user_id == user_id, TrainingLoad.day >= start, TrainingLoad.day <= end)
+        )
+    }
+    last = db.execute(
+        select(TrainingLoad.day, TrainingLoad.atl, TrainingLoad.ctl)
+        .where(TrainingLoad.user_id == user_id).order_by(TrainingLoad.day.desc()).limit(1)
+    ).first()
+    atl_decay = 1.0 - 1.0 / settings.training_atl_days
+    ctl_decay = 1.0 - 1.0 / settings.training_ctl_days
+
+    days = []
+    for index in range((end - start).days + 1):
+        day = start + timedelta(days=index)
+        row = rows.get(day)
+        if row is not None:
+            days.append({"date": day, "trimp": row.trimp, "atl": row.atl, "ctl": row.ctl, "tsb": row.tsb})
+        elif last is not None and day > last.day:
+            elapsed = (day - last.day).days
+            atl, ctl = last.atl * atl_decay ** elapsed, last.ctl * ctl_decay ** elapsed
+            tsb = last.ctl * ctl_decay ** (elapsed - 1) - last.atl * atl_decay ** (elapsed - 1)
+            days.append({"date": day, "trimp": 0.0, "atl": atl, "ctl": ctl, "tsb": tsb})
+        else:
+            days.append({"date": day, "trimp": 0.0, "atl": 0.0, "ctl": 0.0, "tsb": 0.0})
+    return days
@@ -0,0 +1,241 @@
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import func, or_, update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.models.activity import Activity
+from app.models.sync_job import SyncJob, ACTIVE_JOB_STATUSES
+from app.models.user import User
+from app.models.webhook_event import WebhookEvent
+from app.services.rate_limiter import StravaRateLimitError, rate_limiter
+from app.services.strava_service import StravaService
+from app.services.stream_backfill import stream_backfill_worker
+
+WEBHOOK_OBJECT_TYPES = ("activity", "athlete")
+WEBHOOK_ASPECT_TYPES = ("create", "update", "delete")
+# Campi di un evento "update" che si applicano senza chiamare Strava
+LOCAL_UPDATE_FIELDS = {"title": "name", "type": "type"}
+# Un evento in lavorazione da più di così è stato abbandonato da un worker
+PROCESSING_LEASE = timedelta(minutes=10)
+
+
+def enqueue_webhook_event(db: Session, event: Dict[str, Any]) -> WebhookEvent:
+    """
+    Salva un evento ricevuto da Strava. Gli eventi ancora in attesa sullo stesso oggetto
+    spostano in avanti la loro finestra di debounce, così una raffica di modifiche
+    viene elaborata una sola volta quando si è esaurita.
+    """
+    now = datetime.utcnow()
+    process_after = now + timedelta(seconds=settings.webhook_debounce_seconds)
+    db.execute(
+        update(WebhookEvent)
+        .where(
+            WebhookEvent.object_type == event["object_type"],
+            WebhookEvent.object_id == event["object_id"],
+            WebhookEvent.status == "pending"
+        )
+        .values(process_after=process_after, updated_at=now)
+    )
+    webhook_event = WebhookEvent(
+        object_type=event["object_type"],
+        object_id=event["object_id"],
+        aspect_type=event["aspect_type"],
+        owner_id=event["owner_id"],
+        updates=event.get("updates") or {},
+        event_time=datetime.utcfromtimestamp(event["event_time"]),
+        status="pending",
+        process_after=process_after
+    )
+    db.add(webhook_event)
+    db.commit()
+    db.refresh(webhook_event)
+
+    webhook_worker.wake()
+    return webhook_event
+
+
+class WebhookEventWorker:
+    """
+    Thread che elabora gli eventi webhook di Strava, raggruppati per oggetto.
+
+    Tutti gli eventi in attesa di un'attività vengono uniti: una cancellazione elimina
+    l'attività, le modifiche di titolo e tipo si applicano senza chiamare Strava, e
+    solo le attività nuove (o mai importate) vengono scaricate con una chiamata al
+    dettaglio che include anche i laps.
+    """
+
+    def __init__(self, strava_service: Optional[StravaService] = None):
+        self.strava_service = strava_service or StravaService()
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="strava-webhook-worker", daemon=True)
+        self._thread.start()
+        print("[WEBHOOK] Worker avviato")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def wake(self) -> None:
+        """Segnala che è arrivato un nuovo evento"""
+        self._wake_event.set()
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                processed = self.run_once()
+            except Exception as e:
+                print(f"[WEBHOOK][ERRORE] Impossibile leggere la coda: {str(e)}")
+                processed = 0
+
+            if not processed:
+                self._wake_event.wait(settings.webhook_poll_interval)
+                self._wake_event.clear()
+
+    def _claimable(self, now: datetime):
+        """Eventi con la finestra di debounce chiusa, o abbandonati da un altro worker"""
+        return or_(
+            (WebhookEvent.status == "pending") & (WebhookEvent.process_after <= now),
+            (WebhookEvent.status == "processing") & (WebhookEvent.updated_at < now - PROCESSING_LEASE)
+        )
+
+    def _claim_next_object(self, db: Session) -> Tuple[Optional[Tuple[str, int]], List[WebhookEvent]]:
+        """Prende in carico tutti gli eventi pronti di un solo oggetto, dal più vecchio"""
+        now = datetime.utcnow()
+        candidates = db.query(WebhookEvent.object_type, WebhookEvent.object_id).filter(
+            self._claimable(now)
+        ).group_by(
+            WebhookEvent.object_type, WebhookEvent.object_id
+        ).order_by(func.min(WebhookEvent.event_time)).limit(5).all()
+
+        for object_type, object_id in candidates:
+            claimed = db.execute(
+                update(WebhookEvent)
+                .where(
+                    WebhookEvent.object_type == object_type,
+                    WebhookEvent.object_id == object_id,
+                    self._claimable(now)
+                )
+                .values(status="processing", updated_at=now)
+            )
+            db.commit()
+            if claimed.rowcount:
+                events = db.query(WebhookEvent).filter(
+                    WebhookEvent.object_type == object_type,
+                    WebhookEvent.object_id == object_id,
+                    WebhookEvent.status == "processing",
+                    WebhookEvent.updated_at == now
+                ).order_by(WebhookEvent.event_time, WebhookEvent.id).all()
+                return (object_type, object_id), events
+        return None, []
+
+    def run_once(self) -> int:
+        """Elabora gli eventi di un oggetto; restituisce quanti eventi sono stati presi in carico"""
+        db = SessionLocal()
+        try:
+            key, events = self._claim_next_object(db)
+            if not events:
+                return 0
+            event_ids = [event.id for event in events]
+            object_type, object_id = key
+            try:
+                owner = db.query(User).filter(User.strava_id == events[-1].owner_id).first()
+                if owner is None:
+                    print(f"[WEBHOOK] Atleta {events[-1].owner_id} sconosciuto, {len(events)} eventi ignorati")
+                elif object_type == "athlete":
+                    self._process_athlete_events(db, owner, events)
+                else:
+                    self._process_activity_events(db, owner, object_id, events)
+                self._finish(db, event_ids, status="done", processed_at=datetime.utcnow(), error=None)
+            except StravaRateLimitError as e:
+                # Il budget è finito: gli eventi tornano in attesa fino al reset della finestra
+                db.rollback()
+                retry_after = e.retry_after or settings.webhook_poll_interval
+                self._finish(
+                    db, event_ids, status="pending", error=str(e),
+                    process_after=datetime.utcnow() + timedelta(seconds=retry_after)
+                )
+            except Exception as e:
+                db.rollback()
+                print(f"[WEBHOOK][ERRORE] Eventi {object_type} {object_id} non elaborati: {str(e)}")
+                attempts = max(event.attempts for event in events) + 1
+                retry_after = settings.webhook_poll_interval * 2 ** attempts
+                self._finish(
+                    db, event_ids, attempts=attempts, error=str(e),
+                    status="failed" if attempts >= settings.webhook_max_attempts else "pending",
+                    process_after=datetime.utcnow() + timedelta(seconds=retry_after)
+                )
+            return len(events)
+        finally:
+            db.close()
+
+    def _finish(self, db: Session, event_ids: List[int], **values: Any) -> None:
+        db.execute(
+            update(WebhookEvent)
+            .where(WebhookEvent.id.in_(event_ids))
+            .values(updated_at=datetime.utcnow(), **values)
+        )
+        db.commit()
+
+    def _process_activity_events(self, db: Session, user: User, strava_activity_id: int, events: List[WebhookEvent]) -> None:
+        """Unisce gli eventi di un'attività e applica solo l'effetto finale"""
+        activity = db.query(Activity).filter(Activity.strava_activity_id == strava_activity_id).first()
+
+        if any(event.aspect_type == "delete" for event in events):
+            if activity:
+                self.strava_service.delete_activities(db, [activity.id])
+                db.commit()
+            print(f"[WEBHOOK] Attività {strava_activity_id} eliminata ({len(events)} eventi)")
+            return
+
+        if activity is None or any(event.aspect_type == "create" for event in events):
+            # Attività nuova: un'unica chiamata al dettaglio, gli stream arriveranno dal backfill
+            if not self.strava_service.refresh_access_token(user, db):
+                raise Exception("Token Strava scaduto o non valido")
+            with rate_limiter.for_user(user.id), rate_limiter.max_wait(settings.webhook_poll_interval):
+                activity = self.strava_service.ingest_activity(db, user, strava_activity_id)
+            if activity is not None:
+                stream_backfill_worker.wake()
+            print(f"[WEBHOOK] Attività {strava_activity_id} scaricata ({len(events)} eventi)")
+            return
+
+        # Solo modifiche: Strava invia i nuovi valori nell'evento, l'ultimo vince
+        values = {}
+        for event in events:
+            for field, value in (event.updates or {}).items():
+                if field in LOCAL_UPDATE_FIELDS:
+                    values[LOCAL_UPDATE_FIELDS[field]] = value
+        if values:
+            self.strava_service.update_activity_fields(db, activity, values)
+            db.commit()
+        print(f"[WEBHOOK] Attività {strava_activity_id} aggiornata senza chiamate a Strava ({len(events)} eventi)")
+
+    def _process_athlete_events(self, db: Session, user: User, events: List[WebhookEvent]) -> None:
+        """Revoca dell'accesso da parte dell'atleta: i token non sono più validi"""
+        if not any((event.updates or {}).get("authorized") == "false" for event in events):
+            return
+        user.access_token = ""
+        user.refresh_token = ""
+        user.expires_at = datetime.utcnow()
+        user.strava_deauthorized_at = datetime.utcnow()
+        db.execute(
+            update(SyncJob)
+            .where(SyncJob.user_id == user.id, SyncJob.status.in_(ACTIVE_JOB_STATUSES))
+            .values(status="failed", error="Strava access revoked by the athlete", finished_at=datetime.utcnow())
+        )
+        db.commit()
+        print(f"[WEBHOOK] Accesso revocato da user_id={user.id}")
+
+
+webhook_worker = WebhookEventWorker()
@@ -0,0 +1,176 @@
+"""
+Tempo nelle zone di frequenza cardiaca e di ritmo (tabella activity_zones).
+
+Il tempo di ogni punto è l'intervallo dello stream "time" che lo precede (zero nelle
+pause, se c'è lo stream "moving"): np.histogram con questi pesi somma i secondi per zona
+in un solo passaggio sugli array. Le zone di ritmo si calcolano su "velocity_smooth",
+con i limiti in secondi al km convertiti in metri al secondo.
+
+I limiti sono quelli delle impostazioni dell'utente (settings["zones"]). Il tempo per
+zona si salva insieme agli stream, quindi le distribuzioni per settimana o mese sono
+somme di righe già pronte; quando l'utente cambia le zone si ricalcolano tutte le sue
+attività in blocco.
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.activity import Activity
+from app.models.activity_stream import ActivityStream
+from app.models.activity_zone import ActivityZone, ZONE_HEARTRATE, ZONE_PACE
+from app.models.user import User
+from app.schemas.user import ZoneSettings
+from app.services.rollups import bucket_start
+
+ZONE_KINDS = (ZONE_HEARTRATE, ZONE_PACE)
+ZONE_STREAMS = ["time", "heartrate", "velocity_smooth", "moving"]
+
+
+def zone_bounds(user_settings: Optional[dict]) -> Dict[str, List[float]]:
+    """Limiti delle zone dalle impostazioni dell'utente (quelli predefiniti se non li ha scelti)"""
+    zones = ZoneSettings(**((user_settings or {}).get("zones") or {}))
+    return {ZONE_HEARTRATE: zones.heartrate, ZONE_PACE: zones.pace}
+
+
+def _edges(kind: str, bounds: List[float]) -> np.ndarray:
+    """Bordi dei bin di np.histogram, crescenti; il ritmo diventa velocità (m/s)"""
+    if kind == ZONE_PACE:
+        bounds = [1000.0 / pace for pace in bounds]
+    return np.concatenate([[0.0], bounds, [np.inf]])
+
+
+def point_seconds(streams: Dict[str, np.ndarray]) -> Optional[np.ndarray]:
+    """Secondi di ogni punto: l'intervallo di "time" che lo precede, zero se "moving" dice fermo. None senza "time"."""
+    time = streams.get("time")
+    if time is None or time.shape[0] < 2:
+        return None
+    seconds = np.diff(time.astype(np.float64), prepend=float(time[0]))
+    moving = streams.get("moving")
+    if moving is not None and moving.shape[0] == time.shape[0]:
+        seconds = np.where(moving > 0, seconds, 0.0)
+    return seconds
+
+
+def compute_time_in_zones(streams: Dict[str, np.ndarray], bounds: Dict[str, List[float]]) -> Dict[str, np.ndarray]:
+    """
+    Secondi in ogni zona ({tipo di zona: array con len(limiti) + 1 valori}), per i tipi di
+    cui l'attività ha lo stream. I punti senza valore (frequenza 0, velocità nulla o NaN) non contano.
+    """
+    seconds = point_seconds(streams)
+    if seconds is None:
+        return {}
+    count = seconds.shape[0]
+
+    zones = {}
+    for kind, stream_type in ((ZONE_HEARTRATE, "heartrate"), (ZONE_PACE, "velocity_smooth")):
+        values = streams.get(stream_type)
+        if values is None or values.shape[0] != count:
+            continue
+        values = values.astype(np.float64)
+        valid = values > 0  # False anche per i NaN
+        if not valid.any():
+            continue
+        zones[kind], _ = np.histogram(values[valid], bins=_edges(kind, bounds[kind]), weights=seconds[valid])
+    return zones
+
+
+def _zone_rows(activity_id: int, zones: Dict[str, np.ndarray]) -> List[dict]:
+    return [
+        {"activity_id": activity_id, "kind": kind, "zone": zone, "seconds": float(seconds)}
+        for kind, values in zones.items()
+        for zone, seconds in enumerate(values) if seconds > 0
+    ]
+
+
+def save_zones(
+    db: Session, activity: Activity, arrays: Dict[str, np.ndarray], bounds: Optional[Dict[str, List[float]]] = None
+) -> Dict[str, np.ndarray]:
+    """Ricalcola il tempo nelle zone dell'attività e sostituisce quello salvato. Non esegue il commit."""
+    if bounds is None:
+        bounds = zone_bounds(db.get(User, activity.user_id).settings)
+    zones = compute_time_in_zones(arrays, bounds)
+    db.execute(delete(ActivityZone).where(ActivityZone.activity_id == activity.id))
+    rows = _zone_rows(activity.id, zones)
+    if rows:
+        db.execute(insert(ActivityZone), rows)
+    return zones
+
+
+def rebuild_user_zones(
+    db: Session, user_id: int, bounds: Optional[Dict[str, List[float]]] = None, batch_size: int = 200
+) -> int:
+    """
+    Ricalcola il tempo nelle zone di tutte le attività dell'utente con stream scaricati,
+    leggendo solo le colonne necessarie. Restituisce le attività elaborate. Non esegue il commit.
+    """
+    from app.services.stream_store import decode_streams  # stream_store importa questo modulo
+
+    if bounds is None:
+        bounds = zone_bounds(db.get(User, user_id).settings)
+    user_activity_ids = select(Activity.id).where(Activity.user_id == user_id)
+    db.execute(delete(ActivityZone).where(ActivityZone.activity_id.in_(user_activity_ids)))
+    query = select(ActivityStream.activity_id, ActivityStream.data).where(ActivityStream.activity_id.in_(user_activity_ids))
+    count = 0
+    rows = []
+    for activity_id, data in db.execute(query.execution_options(yield_per=batch_size)):
+        rows.extend(_zone_rows(activity_id, compute_time_in_zones(decode_streams(data, ZONE_STREAMS), bounds)))
+        count += 1
+        if len(rows) >= batch_size * 10:
+            db.execute(insert(ActivityZone), rows)
+            rows = []
+    if rows:
+        db.execute(insert(ActivityZone), rows)
+    return count
+
+
+def ensure_user_zones(db: Session, user_id: int) -> bool:
+    """
+    Calcola le zone di un utente con stream scaricati prima dell'introduzione di activity_zones
+    (o con python -m app.utils.build_zones). True se le ha calcolate: il chiamante esegue il commit.
+    """
+    user_activity_ids = select(Activity.id).where(Activity.user_id == user_id)
+    if db.execute(select(ActivityZone.activity_id).where(ActivityZone.activity_id.in_(user_activity_ids)).limit(1)).first():
+        return False
+    has_streams = db.execute(select(ActivityStream.activity_id).where(
+        ActivityStream.activity_id.in_(user_activity_ids),
+        ActivityStream.stream_types.like("%heartrate%") | ActivityStream.stream_types.like("%velocity_smooth%")
+    ).limit(1)).first()
+    if not has_streams:
+        return False
+    print(f"[ZONES] Calcolo delle zone per l'utente {user_id}")
+    rebuild_user_zones(db, user_id)
+    return True
+
+
+def read_zone_distribution(
+    db: Session, user_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None,
+    type_key: Optional[str] = None, period: Optional[str] = None
+) -> Dict[Optional[object], Dict[str, Dict[int, float]]]:
+    """
+    Secondi per tipo di zona e zona nell'intervallo [start, end], raggruppati per bucket del
+    periodo (ROLLUP_WEEK, ROLLUP_MONTH) o, con period None, in un unico bucket None.
+    """
+    query = select(Activity.start_date, ActivityZone.kind, ActivityZone.zone, ActivityZone.seconds).join(
+        Activity, Activity.id == ActivityZone.activity_id
+    ).where(Activity.user_id == user_id)
+    if start is not None:
+        query = query.where(Activity.start_date >= start)
+    if end is not None:
+        query = query.where(Activity.start_date <= end)
+    if type_key is not None:
+        query = query.where(Activity.type_key == type_key)
+
+    distribution: Dict[Optional[object], Dict[str, Dict[int, float]]] = defaultdict(lambda: defaultdict(lambda: defaultdict(float)))
+    for start_date, kind, zone, seconds in db.execute(query):
+        bucket = bucket_start(period, start_date.date()) if period is not None else None
+        distribution[bucket][kind][zone] += seconds
+    return distribution
+
+
+def zone_seconds(zones: Dict[int, float], bounds: List[float]) -> List[float]:
+    """Secondi di tutte le zone, anche quelle senza righe"""
+    return [zones.get(zone, 0.0) for zone in range(len(bounds) + 1)]
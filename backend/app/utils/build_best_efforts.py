@@ -0,0 +1,59 @@
+"""
+Calcola i migliori tempi (best_efforts) delle attività con stream già scaricati.
+
+Le attività i cui stream arrivano dopo l'introduzione di best_efforts li ottengono al
+salvataggio degli stream; questo comando serve per lo storico. Senza --all elabora solo
+le attività che non hanno ancora tempi salvati (anche quelle troppo corte per il primo
+obiettivo, che vengono ricontrollate a ogni esecuzione). Un commit per blocco.
+
+    cd backend
+    python -m app.utils.build_best_efforts --batch-size 200
+"""
+import argparse
+import time
+
+from app.db.database import SessionLocal, require_current_schema
+from app.models import Activity, ActivityStream, BestEffort
+from app.services.best_efforts import save_best_efforts
+from app.services.stream_store import load_streams
+
+
+def build(batch_size: int, rebuild_all: bool) -> None:
+    require_current_schema()
+    db = SessionLocal()
+    try:
+        query = db.query(Activity).filter(Activity.id.in_(db.query(ActivityStream.activity_id)))
+        if not rebuild_all:
+            query = query.filter(~Activity.id.in_(db.query(BestEffort.activity_id)))
+        total = query.count()
+        print(f"Attività da elaborare: {total}")
+        done = 0
+        efforts = 0
+        last_id = 0
+        started = time.perf_counter()
+        while True:
+            activities = query.filter(Activity.id > last_id).order_by(Activity.id).limit(batch_size).all()
+            if not activities:
+                break
+            for activity in activities:
+                streams = load_streams(db, activity, ["distance", "time"])
+                efforts += len(save_best_efforts(db, activity, streams or {}))
+            db.commit()
+            last_id = activities[-1].id
+            done += len(activities)
+            print(f"  {done}/{total}")
+        print(f"{efforts} migliori tempi per {done} attività in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--all", action="store_true", help="ricalcola anche le attività che hanno già i tempi")
+    args = parser.parse_args()
+    build(args.batch_size, args.all)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Calcola le curve media-massime (activity_mean_max) e l'inviluppo delle attività con stream già scaricati.
+
+Le attività i cui stream arrivano dopo l'introduzione delle curve le ottengono al
+salvataggio degli stream, e l'inviluppo si aggiorna da solo; questo comando serve per
+lo storico o per ricalcolare tutto se cambiano le durate di MEAN_MAX_DURATIONS. Senza
+--user-id elabora tutti gli utenti. Un commit per utente.
+
+    cd backend
+    python -m app.utils.build_mean_max --user-id 1
+"""
+import argparse
+import time
+
+from app.db.database import SessionLocal, require_current_schema
+from app.models import User
+from app.services.mean_max import rebuild_mean_max
+
+
+def build(user_ids) -> None:
+    require_current_schema()
+    db = SessionLocal()
+    try:
+        if not user_ids:
+            user_ids = [user_id for (user_id,) in db.query(User.id).order_by(User.id)]
+        started = time.perf_counter()
+        total = 0
+        for user_id in user_ids:
+            count = rebuild_mean_max(db, user_id)
+            db.commit()
+            total += count
+            print(f"  utente {user_id}: {count} attività")
+        print(f"Curve media-massime calcolate per {total} attività in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--user-id", type=int, action="append", help="solo questo utente (ripetibile)")
+    args = parser.parse_args()
+    build(args.user_id)
+
+
+if __name__ == "__main__":
+    main()
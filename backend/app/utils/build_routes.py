@@ -0,0 +1,58 @@
+"""
+Calcola i percorsi semplificati per zoom (activity_routes) delle attività già salvate.
+
+Le attività sincronizzate dopo l'introduzione dei percorsi li ottengono alla sync; questo
+comando serve per lo storico, o dopo aver cambiato ROUTE_ZOOM_LEVELS o
+ROUTE_TOLERANCE_PIXELS (con --all). Lavora a blocchi con un commit per blocco.
+
+    cd backend
+    python -m app.utils.build_routes --batch-size 500
+"""
+import argparse
+import time
+
+from sqlalchemy import or_
+
+from app.db.database import SessionLocal, require_current_schema
+from app.models import Activity, ActivityRoute
+from app.services.geometry import save_routes
+
+
+def build(batch_size: int, rebuild_all: bool) -> None:
+    require_current_schema()
+    db = SessionLocal()
+    try:
+        query = db.query(Activity.id, Activity.map_polyline, Activity.summary_polyline).filter(
+            or_(Activity.map_polyline.isnot(None), Activity.summary_polyline.isnot(None))
+        )
+        if not rebuild_all:
+            query = query.filter(~Activity.id.in_(db.query(ActivityRoute.activity_id)))
+        total = query.count()
+        print(f"Attività da elaborare: {total}")
+        done = 0
+        last_id = 0
+        started = time.perf_counter()
+        while True:
+            rows = query.filter(Activity.id > last_id).order_by(Activity.id).limit(batch_size).all()
+            if not rows:
+                break
+            save_routes(db, {row.id: row.map_polyline or row.summary_polyline for row in rows})
+            db.commit()
+            last_id = rows[-1].id
+            done += len(rows)
+            print(f"  {done}/{total}")
+        print(f"Percorsi calcolati per {done} attività in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--all", action="store_true", help="ricalcola anche le attività che hanno già i percorsi")
+    args = parser.parse_args()
+    build(args.batch_size, args.all)
+
+
+if __name__ == "__main__":
+    main()
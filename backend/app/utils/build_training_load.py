@@ -0,0 +1,46 @@
+"""
+Calcola il TRIMP delle attività e il carico giornaliero (training_loads) da zero.
+
+Le attività salvate dopo l'introduzione del carico lo aggiornano da sole, dal loro giorno
+in avanti; questo comando serve per lo storico o dopo aver cambiato TRAINING_ATL_DAYS o
+TRAINING_CTL_DAYS. Usa gli stream già scaricati e, per le attività senza, la frequenza
+media. Senza --user-id elabora tutti gli utenti. Un commit per utente.
+
+    cd backend
+    python -m app.utils.build_training_load --user-id 1
+"""
+import argparse
+import time
+
+from app.db.database import SessionLocal, require_current_schema
+from app.models import User
+from app.services.training_load import rebuild_training_load
+
+
+def build(user_ids) -> None:
+    require_current_schema()
+    db = SessionLocal()
+    try:
+        if not user_ids:
+            user_ids = [user_id for (user_id,) in db.query(User.id).order_by(User.id)]
+        started = time.perf_counter()
+        total = 0
+        for user_id in user_ids:
+            count = rebuild_training_load(db, user_id)
+            db.commit()
+            total += count
+            print(f"  utente {user_id}: {count} attività")
+        print(f"Carico calcolato per {total} attività in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--user-id", type=int, action="append", help="solo questo utente (ripetibile)")
+    args = parser.parse_args()
+    build(args.user_id)
+
+
+if __name__ == "__main__":
+    main()
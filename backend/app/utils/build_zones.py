@@ -0,0 +1,46 @@
+"""
+Calcola il tempo nelle zone (activity_zones) delle attività con stream già scaricati.
+
+Le attività i cui stream arrivano dopo l'introduzione delle zone le ottengono al
+salvataggio degli stream, e cambiare le zone nelle impostazioni le ricalcola tutte;
+questo comando serve per lo storico. Senza --user-id elabora tutti gli utenti, con i
+limiti delle impostazioni di ciascuno. Un commit per utente.
+
+    cd backend
+    python -m app.utils.build_zones --user-id 1
+"""
+import argparse
+import time
+
+from app.db.database import SessionLocal, require_current_schema
+from app.models import User
+from app.services.zones import rebuild_user_zones
+
+
+def build(user_ids) -> None:
+    require_current_schema()
+    db = SessionLocal()
+    try:
+        if not user_ids:
+            user_ids = [user_id for (user_id,) in db.query(User.id).order_by(User.id)]
+        started = time.perf_counter()
+        total = 0
+        for user_id in user_ids:
+            count = rebuild_user_zones(db, user_id)
+            db.commit()
+            total += count
+            print(f"  utente {user_id}: {count} attività")
+        print(f"Zone calcolate per {total} attività in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--user-id", type=int, action="append", help="solo questo utente (ripetibile)")
+    args = parser.parse_args()
+    build(args.user_id)
+
+
+if __name__ == "__main__":
+    main()
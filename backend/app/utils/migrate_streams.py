@@ -0,0 +1,73 @@
+"""
+Converte gli stream salvati in JSON (activities.detailed_data) nell'archivio binario activity_streams.
+
+Lavora a blocchi con un commit per blocco, quindi può essere interrotto e rilanciato;
+le righe convertite hanno detailed_data azzerato e stream_status "fetched".
+
+    cd backend
+    python -m app.utils.migrate_streams --batch-size 200
+"""
+import argparse
+import time
+
+from sqlalchemy import func
+
+from app.db.database import SessionLocal, require_current_schema
+from app.models import Activity
+from app.models.activity import STREAM_FETCHED
+from app.services.stream_store import save_streams, streams_from_json
+from app.services.training_load import update_training_loads
+
+
+def migrate(batch_size: int) -> None:
+    require_current_schema()
+    db = SessionLocal()
+    try:
+        total = db.query(func.count(Activity.id)).filter(Activity.detailed_data.isnot(None)).scalar()
+        print(f"Attività da convertire: {total}")
+        converted = 0
+        json_bytes = 0
+        binary_bytes = 0
+        started = time.perf_counter()
+        while True:
+            activities = db.query(Activity).filter(
+                Activity.detailed_data.isnot(None)
+            ).order_by(Activity.id).limit(batch_size).all()
+            if not activities:
+                break
+            load_since = {}
+            for activity in activities:
+                try:
+                    streams = streams_from_json(activity.detailed_data)
+                except ValueError:
+                    print(f"Attività {activity.id}: JSON non valido, gli stream verranno riscaricati")
+                    activity.stream_status = "pending"
+                    activity.detailed_data = None
+                    continue
+                json_bytes += len(activity.detailed_data.encode())
+                binary_bytes += len(save_streams(db, activity, streams, load_since).data)
+                activity.detailed_data = None
+                activity.stream_status = STREAM_FETCHED
+            update_training_loads(db, load_since)
+            db.commit()
+            converted += len(activities)
+            print(f"  {converted}/{total}")
+
+        elapsed = time.perf_counter() - started
+        if json_bytes:
+            print(f"Convertite {converted} attività in {elapsed:.1f}s: "
+                  f"{json_bytes / 1024 / 1024:.1f} MB di JSON -> {binary_bytes / 1024 / 1024:.1f} MB "
+                  f"({json_bytes / binary_bytes:.1f}x)")
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+    migrate(args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
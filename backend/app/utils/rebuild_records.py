@@ -0,0 +1,46 @@
+"""
+Ricostruisce da zero l'indice dei record personali (personal_records) da best_efforts.
+
+L'indice si aggiorna da solo quando le attività ottengono i loro migliori tempi; questo
+comando serve dopo la migrazione 0016, dopo python -m app.utils.build_best_efforts --all
+o dopo aver cambiato RECORDS_TOP_N. Ogni utente viene ricostruito in una propria transazione.
+
+    cd backend
+    python -m app.utils.rebuild_records
+    python -m app.utils.rebuild_records --user-id 3
+"""
+import argparse
+import time
+
+from app.db.database import SessionLocal, require_current_schema
+from app.models import User
+from app.services.records import rebuild_records
+
+
+def rebuild(user_ids) -> None:
+    require_current_schema()
+    db = SessionLocal()
+    try:
+        if not user_ids:
+            user_ids = [user_id for (user_id,) in db.query(User.id).order_by(User.id)]
+        started = time.perf_counter()
+        total = 0
+        for user_id in user_ids:
+            count = rebuild_records(db, [user_id])
+            db.commit()
+            total += count
+            print(f"  utente {user_id}: {count} record")
+        print(f"Record ricostruiti per {len(user_ids)} utenti ({total} righe) in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--user-id", type=int, action="append", help="solo questo utente (ripetibile)")
+    args = parser.parse_args()
+    rebuild(args.user_id)
+
+
+if __name__ == "__main__":
+    main()
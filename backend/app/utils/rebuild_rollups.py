@@ -0,0 +1,46 @@
+"""
+Ricalcola da zero i totali per giorno, settimana e mese (activity_rollups).
+
+La sync li aggiorna in modo incrementale; questo comando serve per popolarli dopo la
+migrazione 0014 o per riallinearli se il database è stato modificato a mano. Ogni
+utente viene ricalcolato in una propria transazione.
+
+    cd backend
+    python -m app.utils.rebuild_rollups
+    python -m app.utils.rebuild_rollups --user-id 3
+"""
+import argparse
+import time
+
+from app.db.database import SessionLocal, require_current_schema
+from app.models import User
+from app.services.rollups import rebuild_rollups
+
+
+def rebuild(user_ids) -> None:
+    require_current_schema()
+    db = SessionLocal()
+    try:
+        if not user_ids:
+            user_ids = [user_id for (user_id,) in db.query(User.id).order_by(User.id)]
+        started = time.perf_counter()
+        total = 0
+        for user_id in user_ids:
+            count = rebuild_rollups(db, [user_id])
+            db.commit()
+            total += count
+            print(f"  utente {user_id}: {count} attività")
+        print(f"Totali ricalcolati per {len(user_ids)} utenti ({total} attività) in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--user-id", type=int, action="append", help="solo questo utente (ripetibile)")
+    args = parser.parse_args()
+    rebuild(args.user_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Simulatore locale della push subscription di Strava.
+
+Esegue la verifica della subscription (GET con hub.challenge) e invia eventi con lo
+stesso formato di Strava al backend in esecuzione, senza bisogno di un tunnel pubblico.
+
+    cd backend
+    python -m app.utils.webhook_sender verify
+    python -m app.utils.webhook_sender event --owner-id 12345 --object-id 987654321 --aspect create
+    python -m app.utils.webhook_sender event --owner-id 12345 --object-id 987654321 --aspect update --title "Giro lungo" --burst 5
+    python -m app.utils.webhook_sender deauthorize --owner-id 12345
+"""
+import argparse
+import secrets
+import time
+from typing import Any, Dict, Optional
+
+import requests
+
+from app.core.config import settings
+
+DEFAULT_URL = "http://localhost:8000/webhooks/strava"
+
+
+def verify(url: str, verify_token: Optional[str]) -> None:
+    """Ripete la richiesta di verifica che Strava invia alla creazione della subscription"""
+    challenge = secrets.token_hex(8)
+    response = requests.get(url, params={
+        "hub.mode": "subscribe",
+        "hub.challenge": challenge,
+        "hub.verify_token": verify_token or "",
+    })
+    ok = response.status_code == 200 and response.json().get("hub.challenge") == challenge
+    print(f"Verifica {'riuscita' if ok else 'fallita'}: {response.status_code} {response.text}")
+
+
+def send_event(url: str, event: Dict[str, Any]) -> None:
+    started = time.perf_counter()
+    response = requests.post(url, json=event)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    # Strava considera fallita la consegna se la risposta supera i 2 secondi
+    print(f"{event['object_type']} {event['object_id']} {event['aspect_type']}: {response.status_code} in {elapsed_ms:.0f}ms {response.text}")
+
+
+def build_event(object_type: str, object_id: int, aspect: str, owner_id: int, updates: Dict[str, str]) -> Dict[str, Any]:
+    return {
+        "object_type": object_type,
+        "object_id": object_id,
+        "aspect_type": aspect,
+        "owner_id": owner_id,
+        "subscription_id": settings.strava_webhook_subscription_id or 1,
+        "event_time": int(time.time()),
+        "updates": updates,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default=DEFAULT_URL)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    verify_parser = commands.add_parser("verify", help="verifica della subscription")
+    verify_parser.add_argument("--verify-token", default=settings.strava_webhook_verify_token)
+
+    event_parser = commands.add_parser("event", help="evento su un'attività")
+    event_parser.add_argument("--owner-id", type=int, required=True, help="strava_id dell'atleta")
+    event_parser.add_argument("--object-id", type=int, required=True, help="id Strava dell'attività")
+    event_parser.add_argument("--aspect", choices=["create", "update", "delete"], required=True)
+    event_parser.add_argument("--title")
+    event_parser.add_argument("--type")
+    event_parser.add_argument("--burst", type=int, default=1, help="eventi consecutivi da inviare (per il debounce)")
+
+    deauthorize_parser = commands.add_parser("deauthorize", help="revoca dell'accesso da parte dell'atleta")
+    deauthorize_parser.add_argument("--owner-id", type=int, required=True)
+
+    args = parser.parse_args()
+
+    if args.command == "verify":
+        verify(args.url, args.verify_token)
+    elif args.command == "event":
+        updates = {field: value for field, value in (("title", args.title), ("type", args.type)) if value}
+        for index in range(args.burst):
+            burst_updates = dict(updates)
+            if args.burst > 1 and "title" in burst_updates:
+                burst_updates["title"] = f"{burst_updates['title']} ({index + 1})"
+            send_event(args.url, build_event("activity", args.object_id, args.aspect, args.owner_id, burst_updates))
+    else:
+        send_event(args.url, build_event("athlete", args.owner_id, "update", args.owner_id, {"authorized": "false"}))
+
+
+if __name__ == "__main__":
+    main()
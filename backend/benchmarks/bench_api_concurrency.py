@@ -0,0 +1,134 @@
+"""
+Benchmark di concorrenza delle API: latenza con molti client in parallelo.
+
+Avvia uvicorn in un sottoprocesso su un database SQLite temporaneo (worker in
+background senza lavoro, nessuna chiamata a Strava) e lancia N client concorrenti che
+alternano elenco attività, statistiche e tendenze. Riporta richieste al secondo e
+percentili di latenza: con le sessioni sincrone dentro endpoint async ogni query
+bloccava l'event loop e le richieste si mettevano in fila.
+
+    cd backend
+    python -m benchmarks.bench_api_concurrency --clients 100 --requests 20 --workers 1
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.security import create_access_token
+from app.models import Base, User, Activity
+
+PATHS = [
+    "/activities/?limit=50",
+    "/activities/stats/summary",
+    "/activities/trends/summary?period=year",
+    "/activities/?limit=50&activity_type=run",
+]
+
+
+def populate(database_url: str, activities: int) -> int:
+    """Un utente con lo storico già sincronizzato (stream già scaricati: il backfill resta fermo)"""
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    user = User(strava_id=1, access_token="", refresh_token="", expires_at=datetime.utcnow() + timedelta(days=365))
+    db.add(user)
+    db.flush()
+    start = datetime.utcnow() - timedelta(days=5 * 365)
+    db.add_all(
+        Activity(
+            strava_activity_id=i, user_id=user.id, name=f"Attività {i}", distance=8000.0 + i % 4000,
+            moving_time=2400, elapsed_time=2500, total_elevation_gain=40.0,
+            type=("Run", "Ride", "Workout")[i % 3], stream_status="fetched",
+            start_date=start + timedelta(hours=(5 * 365 * 24 / activities) * i)
+        )
+        for i in range(activities)
+    )
+    db.commit()
+    user_id = user.id
+    db.close()
+    engine.dispose()
+    return user_id
+
+
+async def client(http: httpx.AsyncClient, index: int, requests: int, headers: dict, latencies: list, errors: list) -> None:
+    for request_index in range(requests):
+        path = PATHS[(index + request_index) % len(PATHS)]
+        started = time.perf_counter()
+        response = await http.get(path, headers=headers)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            errors.append(response.status_code)
+
+
+async def run_clients(base_url: str, clients: int, requests: int, headers: dict) -> None:
+    latencies: list = []
+    errors: list = []
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as http:
+        # Riscaldamento: connessioni del pool e cache di SQLite
+        await asyncio.gather(*(http.get(path, headers=headers) for path in PATHS))
+        started = time.perf_counter()
+        await asyncio.gather(*(client(http, index, requests, headers, latencies, errors) for index in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    percentile = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+    print(
+        f"{clients} client x {requests} richieste: {len(latencies) / elapsed:.0f} req/s  "
+        f"p50 {percentile(0.50):.0f}ms  p95 {percentile(0.95):.0f}ms  p99 {percentile(0.99):.0f}ms  "
+        f"errori {len(errors)}"
+    )
+
+
+def wait_for_server(base_url: str, process: subprocess.Popen) -> None:
+    for _ in range(100):
+        if process.poll() is not None:
+            raise RuntimeError("uvicorn terminated during startup")
+        try:
+            httpx.get(f"{base_url}/docs", timeout=1)
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError("uvicorn did not start")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Latenza delle API con client concorrenti")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=20, help="richieste per client")
+    parser.add_argument("--activities", type=int, default=3000)
+    parser.add_argument("--workers", type=int, default=1, help="processi uvicorn")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        user_id = populate(database_url, args.activities)
+        headers = {"Authorization": f"Bearer {create_access_token(user_id)}"}
+        base_url = f"http://127.0.0.1:{args.port}"
+
+        env = {**os.environ, "DATABASE_URL": database_url, "AUTO_SYNC_ENABLED": "false", "DEBUG": "false"}
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port),
+             "--workers", str(args.workers), "--log-level", "warning"],
+            env=env, stdout=subprocess.DEVNULL
+        )
+        try:
+            wait_for_server(base_url, server)
+            asyncio.run(run_clients(base_url, args.clients, args.requests, headers))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
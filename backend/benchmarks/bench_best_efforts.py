@@ -0,0 +1,70 @@
+"""
+Benchmark dei migliori tempi (services/best_efforts.py): finestre scorrevoli con
+np.searchsorted su tutti i punti di partenza contro due puntatori in Python puro.
+
+Usa uno stream sintetico a 1 Hz con andatura variabile (default: 3 ore, circa 34 km,
+quindi tutte le distanze fino alla mezza maratona) e verifica che i due metodi diano
+gli stessi tempi.
+
+    cd backend
+    python -m benchmarks.bench_best_efforts --seconds 10800
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.services.best_efforts import BEST_EFFORT_DISTANCES, BEST_EFFORT_NAMES, compute_best_efforts
+
+
+def synthetic_run(seconds: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    speed = np.clip(3.2 + np.cumsum(rng.normal(0, 0.02, seconds)) * 0.05 + rng.normal(0, 0.3, seconds), 0, None)
+    return np.cumsum(speed).astype(np.float32), np.arange(seconds, dtype=np.uint16 if seconds < 65536 else np.uint32)
+
+
+def two_pointer_reference(distance, seconds, target: float) -> float:
+    """Versione di riferimento: per ogni partenza il puntatore di arrivo avanza, mai indietro"""
+    covered = np.fmax.accumulate(np.nan_to_num(distance.astype(np.float64))).tolist()
+    seconds = seconds.astype(np.float64).tolist()
+    best = float("inf")
+    end = 0
+    for start in range(len(covered)):
+        while end < len(covered) and covered[end] - covered[start] < target:
+            end += 1
+        if end == len(covered):
+            break
+        before = end - 1
+        step = covered[end] - covered[before]
+        fraction = (covered[start] + target - covered[before]) / step if step > 0 else 1.0
+        best = min(best, seconds[before] + fraction * (seconds[end] - seconds[before]) - seconds[start])
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=int, default=10800, help="durata dell'attività (un punto al secondo)")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    distance, seconds = synthetic_run(args.seconds)
+    targets = list(BEST_EFFORT_DISTANCES.values())
+
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        efforts = compute_best_efforts(distance, seconds, targets)
+    vector_ms = (time.perf_counter() - started) / args.repeat * 1000
+
+    started = time.perf_counter()
+    reference = {target: two_pointer_reference(distance, seconds, target) for target in efforts}
+    reference_ms = (time.perf_counter() - started) * 1000
+
+    print(f"{args.seconds} punti, {distance[-1] / 1000:.1f} km, {len(efforts)} distanze")
+    print(f"searchsorted vettoriale {vector_ms:.1f} ms, due puntatori in Python {reference_ms:.0f} ms")
+    for target, (elapsed, start, end) in efforts.items():
+        assert abs(elapsed - reference[target]) < 1e-6
+        print(f"  {BEST_EFFORT_NAMES[target]:<20} {elapsed:>8.1f} s  (punti {start}-{end})")
+
+
+if __name__ == "__main__":
+    main()
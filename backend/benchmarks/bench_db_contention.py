@@ -0,0 +1,137 @@
+"""
+Load test del database: latenza delle letture della dashboard mentre una sync scrive.
+
+Alcuni thread (uno per job di sync, ognuno con il proprio utente) ripetono l'upsert a
+blocchi di StravaService (stesso percorso della sync, un commit per blocco) mentre altri
+thread leggono l'elenco delle attività come
+GET /activities. Confronta l'engine SQLite di default (journal rollback) con il
+profilo di app/db/database.py (WAL, synchronous=NORMAL, busy_timeout, mmap, cache).
+
+    cd backend
+    python -m benchmarks.bench_db_contention --seconds 10 --writers 2 --readers 8
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.api.activities import SUMMARY_COLUMNS
+from app.db.database import create_db_engine
+from app.models import Base, User, Activity
+from app.services.strava_service import StravaService
+from benchmarks.bench_sync_ingest import fake_summaries
+
+
+def writer(Session, user_id: int, summaries, chunk_size: int, stop: threading.Event, stats: dict) -> None:
+    """Ri-sincronizza di continuo le attività, variando la distanza perché ogni riga venga riscritta"""
+    service = StravaService()
+    user = User(id=user_id)  # l'upsert usa solo user.id
+    round_index = 0
+    while not stop.is_set():
+        round_index += 1
+        for summary in summaries:
+            summary.distance = 10000.0 + round_index
+        for chunk_start in range(0, len(summaries), chunk_size):
+            if stop.is_set():
+                break
+            db = Session()
+            try:
+                service._upsert_activities_chunk(db, user, summaries[chunk_start:chunk_start + chunk_size])
+                db.commit()
+                stats["chunks"] += 1
+            except OperationalError:
+                db.rollback()
+                stats["errors"] += 1
+            finally:
+                db.close()
+
+
+def reader(Session, user_id: int, stop: threading.Event, latencies: list, stats: dict) -> None:
+    """Stessa query dell'elenco attività: conteggio e prima pagina ordinata per data"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        db = Session()
+        try:
+            query = db.query(*SUMMARY_COLUMNS).filter(Activity.user_id == user_id).order_by(Activity.start_date.desc())
+            query.count()
+            query.limit(50).all()
+            latencies.append((time.perf_counter() - started) * 1000)
+        except OperationalError:
+            stats["errors"] += 1
+        finally:
+            db.close()
+
+
+def run(name: str, engine, args) -> None:
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    db = Session()
+    datasets = []
+    for writer_index in range(args.writers):
+        user = User(strava_id=1 + writer_index, access_token="", refresh_token="", expires_at=datetime.utcnow())
+        db.add(user)
+        db.commit()
+        summaries = fake_summaries(args.activities)
+        for summary in summaries:
+            summary.id += writer_index * args.activities
+        StravaService()._upsert_activities_chunk(db, user, summaries)
+        db.commit()
+        datasets.append((user.id, summaries))
+    db.close()
+
+    stop = threading.Event()
+    write_stats = {"chunks": 0, "errors": 0}
+    read_stats = {"errors": 0}
+    latencies: list = []
+    threads = [
+        threading.Thread(target=writer, args=(Session, user_id, summaries, args.chunk_size, stop, write_stats))
+        for user_id, summaries in datasets
+    ]
+    threads += [
+        threading.Thread(target=reader, args=(Session, datasets[index % len(datasets)][0], stop, latencies, read_stats))
+        for index in range(args.readers)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    latencies.sort()
+    percentile = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] if latencies else float("nan")
+    print(
+        f"{name:<8} letture {len(latencies) / args.seconds:7.0f}/s  "
+        f"p50 {statistics.median(latencies) if latencies else float('nan'):6.1f}ms  "
+        f"p95 {percentile(0.95):6.1f}ms  p99 {percentile(0.99):6.1f}ms  "
+        f"blocchi scritti {write_stats['chunks'] / args.seconds:5.1f}/s  "
+        f"errori lettura {read_stats['errors']}  errori scrittura {write_stats['errors']}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Letture concorrenti a una sync su SQLite")
+    parser.add_argument("--activities", type=int, default=2000)
+    parser.add_argument("--chunk-size", type=int, default=200)
+    parser.add_argument("--writers", type=int, default=2, help="sync concorrenti (SYNC_JOB_WORKERS)")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    print(f"{args.activities} attività per utente, {args.writers} sync, {args.readers} lettori, sync a blocchi di {args.chunk_size}, {args.seconds:.0f}s per profilo")
+    with tempfile.TemporaryDirectory() as tmp:
+        default_url = f"sqlite:///{os.path.join(tmp, 'default.db')}"
+        run("default", create_engine(default_url, connect_args={"check_same_thread": False}), args)
+        run("profilo", create_db_engine(f"sqlite:///{os.path.join(tmp, 'tuned.db')}"), args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Benchmark delle curve media-massime (services/mean_max.py): somme cumulative e np.interp
+contro finestre scorrevoli in Python puro su un'attività, e curva di sempre letta da
+mean_max_envelopes contro calcolata da activity_mean_max o dagli stream di ogni attività.
+
+Popola un database SQLite temporaneo con un utente e un'attività al giorno con stream
+sintetici a 1 Hz (velocità, potenza, pause) per diversi anni, poi misura anche il costo
+dell'aggiornamento dell'inviluppo quando arrivano gli stream di un'attività.
+
+    cd backend
+    python -m benchmarks.bench_mean_max --years 3 --seconds 3600
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, User, Activity, ActivityStream, ActivityMeanMax, MeanMaxEnvelope
+from app.models.mean_max import MEAN_MAX_POWER, MEAN_MAX_SPEED
+from app.models.personal_record import ALL_TIME
+from app.services.mean_max import (
+    MEAN_MAX_DURATIONS, MEAN_MAX_STREAMS, compute_mean_max, rebuild_mean_max, save_mean_max
+)
+from app.services.stream_store import decode_streams, encode_streams
+
+
+def synthetic_streams(seconds: int, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    velocity = np.clip(3.3 + np.cumsum(rng.normal(0, 0.02, seconds)) * 0.05 + rng.normal(0, 0.2, seconds), 0, None)
+    watts = np.clip(220 + np.cumsum(rng.normal(0, 2, seconds)) * 0.1 + rng.normal(0, 30, seconds), 0, None)
+    return {
+        "time": np.arange(seconds).tolist(),
+        "velocity_smooth": velocity.round(2).tolist(),
+        "watts": watts.round().astype(int).tolist(),
+        "moving": (rng.random(seconds) > 0.02).tolist(),
+    }
+
+
+def python_reference(streams: dict, stream_type: str) -> dict:
+    """Versione di riferimento: ogni punto diventa i suoi secondi, poi una finestra scorrevole per durata"""
+    time, moving, values = streams["time"], streams["moving"], streams[stream_type]
+    series = []
+    for index in range(1, len(time)):
+        if moving[index]:
+            series.extend([float(values[index])] * (time[index] - time[index - 1]))
+    curve = {}
+    for duration in MEAN_MAX_DURATIONS:
+        if duration > len(series):
+            break
+        window = best = sum(series[:duration])
+        for end in range(duration, len(series)):
+            window += series[end] - series[end - duration]
+            best = max(best, window)
+        curve[duration] = best / duration
+    return curve
+
+
+def populate(db, days: int, seconds: int) -> User:
+    user = User(strava_id=1, access_token="", refresh_token="", expires_at=datetime.utcnow(), first_name="Atleta")
+    db.add(user)
+    db.flush()
+    start = datetime.utcnow() - timedelta(days=days)
+    for i in range(days):
+        activity = Activity(
+            strava_activity_id=i, user_id=user.id, name=f"Uscita {i}", distance=30000.0, moving_time=seconds,
+            elapsed_time=seconds, type="Ride", start_date=start + timedelta(days=i, hours=7)
+        )
+        db.add(activity)
+        db.flush()
+        streams = synthetic_streams(seconds, i)
+        db.add(ActivityStream(
+            activity_id=activity.id, format_version=1, point_count=seconds,
+            stream_types=",".join(streams), data=encode_streams(streams)
+        ))
+    db.commit()
+    db.execute(text("ANALYZE"))
+    return user
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--seconds", type=int, default=3600, help="durata di ogni attività (un punto al secondo)")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    streams = synthetic_streams(args.seconds, 0)
+    arrays = decode_streams(encode_streams(streams))
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        curves = compute_mean_max(arrays)
+    vector_ms = (time.perf_counter() - started) / args.repeat * 1000
+    started = time.perf_counter()
+    reference = {MEAN_MAX_SPEED: python_reference(streams, "velocity_smooth"), MEAN_MAX_POWER: python_reference(streams, "watts")}
+    reference_ms = (time.perf_counter() - started) * 1000
+    for kind, curve in reference.items():
+        # velocity_smooth è salvato in float32
+        assert np.allclose(list(curves[kind].values()), list(curve.values()), rtol=1e-5), kind
+    print(f"un'attività di {args.seconds} punti, {len(curves[MEAN_MAX_SPEED])} durate, velocità e potenza: "
+          f"somme cumulative {vector_ms:.2f} ms, Python {reference_ms:.0f} ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'mean_max.db')}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        days = 365 * args.years
+        user = populate(db, days, args.seconds)
+
+        started = time.perf_counter()
+        rebuild_mean_max(db, user.id)
+        db.commit()
+        print(f"{days} attività, ricalcolo completo (curve dagli stream e inviluppo): {time.perf_counter() - started:.2f}s")
+
+        def from_envelope():
+            return dict(db.execute(select(MeanMaxEnvelope.duration, MeanMaxEnvelope.value).where(
+                MeanMaxEnvelope.user_id == user.id, MeanMaxEnvelope.type_key == "ride",
+                MeanMaxEnvelope.year == ALL_TIME, MeanMaxEnvelope.kind == MEAN_MAX_POWER
+            )).all())
+
+        def from_curves():
+            return dict(db.execute(
+                select(ActivityMeanMax.duration, func.max(ActivityMeanMax.value))
+                .join(Activity, Activity.id == ActivityMeanMax.activity_id)
+                .where(Activity.user_id == user.id, Activity.type_key == "ride", ActivityMeanMax.kind == MEAN_MAX_POWER)
+                .group_by(ActivityMeanMax.duration)
+            ).all())
+
+        def from_streams():
+            best = {}
+            query = select(ActivityStream.data).join(Activity, Activity.id == ActivityStream.activity_id).where(Activity.user_id == user.id)
+            for (data,) in db.execute(query):
+                for duration, value in compute_mean_max(decode_streams(data, MEAN_MAX_STREAMS)).get(MEAN_MAX_POWER, {}).items():
+                    best[duration] = max(best.get(duration, 0.0), value)
+            return best
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            stored = from_envelope()
+        envelope_ms = (time.perf_counter() - started) / args.repeat * 1000
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            grouped = from_curves()
+        curves_ms = (time.perf_counter() - started) / args.repeat * 1000
+        started = time.perf_counter()
+        recomputed = from_streams()
+        streams_ms = (time.perf_counter() - started) * 1000
+        assert stored == grouped and np.allclose([stored[duration] for duration in recomputed], list(recomputed.values()))
+        print(f"curva di potenza di sempre ({len(stored)} durate): mean_max_envelopes {envelope_ms:.2f} ms, "
+              f"activity_mean_max {curves_ms:.1f} ms, dagli stream {streams_ms:.0f} ms")
+
+        # Stream salvati di nuovo per l'ultima attività: curva e fusione con l'inviluppo
+        activity = db.execute(select(Activity).where(Activity.user_id == user.id).order_by(Activity.start_date.desc()).limit(1)).scalar()
+        arrays = decode_streams(db.get(ActivityStream, activity.id).data, MEAN_MAX_STREAMS)
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            save_mean_max(db, activity, arrays)
+            db.rollback()
+        print(f"curve e inviluppo di un'attività appena salvata: {(time.perf_counter() - started) / args.repeat * 1000:.2f} ms")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
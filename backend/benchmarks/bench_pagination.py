@@ -0,0 +1,78 @@
+"""
+Benchmark della paginazione dell'elenco attività: skip/limit con conteggio contro cursore.
+
+Su uno storico sintetico (default 5000 attività) misura il tempo di GET /activities a
+diverse profondità, chiamando direttamente l'endpoint con una AsyncSession su un
+database SQLite temporaneo.
+
+    cd backend
+    python -m benchmarks.bench_pagination --activities 5000 --limit 50
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.activities import get_user_activities
+from app.db.database import create_async_db_engine
+from app.models import User
+from benchmarks.bench_api_concurrency import populate
+
+
+async def page(db, user, limit: int, skip: int = 0, cursor=None, include_total=None) -> dict:
+    return await get_user_activities(
+        skip=skip, limit=limit, activity_type=None, start_date=None, end_date=None,
+        sort_by="start_date", sort_order="desc", cursor=cursor, include_total=include_total,
+        db=db, current_user=user
+    )
+
+
+async def timed(call, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        await call()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+async def run(database_url: str, user_id: int, limit: int, repeat: int) -> None:
+    engine = create_async_db_engine(database_url)
+    async with AsyncSession(engine) as db:
+        user = await db.get(User, user_id)
+
+        # Cursore di ogni pagina, percorrendo l'elenco una volta
+        cursors = [None]
+        response = await page(db, user, limit)
+        while response["next_cursor"]:
+            cursors.append(response["next_cursor"])
+            response = await page(db, user, limit, cursor=response["next_cursor"])
+        pages = len(cursors)
+
+        print(f"{pages} pagine da {limit}")
+        print(f"{'pagina':>8} {'skip + totale':>14} {'skip':>8} {'cursore':>8}")
+        for index in sorted({0, pages // 4, pages // 2, pages - 1}):
+            skip = index * limit
+            with_total = await timed(lambda: page(db, user, limit, skip=skip), repeat)
+            skip_only = await timed(lambda: page(db, user, limit, skip=skip, include_total=False), repeat)
+            keyset = await timed(lambda: page(db, user, limit, cursor=cursors[index], include_total=False), repeat)
+            print(f"{index + 1:>8} {with_total:>12.2f}ms {skip_only:>6.2f}ms {keyset:>6.2f}ms")
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Paginazione con skip e con cursore")
+    parser.add_argument("--activities", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'pagination.db')}"
+        user_id = populate(database_url, args.activities)
+        asyncio.run(run(database_url, user_id, args.limit, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark di statistiche e tendenze: aggregazione sulle attività contro lettura dei
+totali per giorno, settimana e mese di services/rollups.py.
+
+Popola un database SQLite temporaneo con un utente e molti anni di attività, poi
+misura le stesse richieste (totale di sempre, ultimo anno, un intervallo con date e
+orari qualsiasi) con un GROUP BY sulle attività e con read_rollups, e il costo
+dell'aggiornamento incrementale alla sync.
+
+    cd backend
+    python -m benchmarks.bench_rollups --activities 20000
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, User, Activity
+from app.services.rollups import RollupDelta, read_rollups, rebuild_rollups, sum_totals
+
+TYPES = ["Run", "Ride", "Workout", "TrailRun", "Swim"]
+
+
+def populate(db, activities: int, years: int) -> User:
+    user = User(strava_id=1, access_token="", refresh_token="", expires_at=datetime.utcnow(), first_name="Atleta")
+    db.add(user)
+    db.flush()
+    start = datetime.utcnow() - timedelta(days=365 * years)
+    step = timedelta(days=365 * years) / activities
+    db.add_all(
+        Activity(
+            strava_activity_id=i, user_id=user.id, name=f"Attività {i}", distance=8000.0 + i % 5000,
+            moving_time=2400 + i % 600, elapsed_time=2500 + i % 600, total_elevation_gain=float(i % 90),
+            average_heartrate=140.0 + i % 20, type=TYPES[i % len(TYPES)], start_date=start + step * i
+        )
+        for i in range(activities)
+    )
+    db.commit()
+    db.execute(text("ANALYZE"))
+    return user
+
+
+def raw_totals(db, user_id: int, start, end):
+    query = select(
+        Activity.type_key, func.count(Activity.id), func.sum(Activity.distance), func.sum(Activity.moving_time),
+        func.sum(Activity.total_elevation_gain)
+    ).where(Activity.user_id == user_id).group_by(Activity.type_key)
+    if start is not None:
+        query = query.where(Activity.start_date >= start)
+    if end is not None:
+        query = query.where(Activity.start_date <= end)
+    return db.execute(query).all()
+
+
+def timed(function, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--activities", type=int, default=20000)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'rollups.db')}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        user = populate(db, args.activities, args.years)
+
+        started = time.perf_counter()
+        rebuild_rollups(db, [user.id])
+        db.commit()
+        print(f"{args.activities} attività in {args.years} anni, ricostruzione dei totali "
+              f"{time.perf_counter() - started:.2f}s")
+
+        now = datetime.utcnow()
+        ranges = {
+            "sempre": (None, None),
+            "ultimo anno": (now - timedelta(days=365), None),
+            "intervallo con orari": (now - timedelta(days=3 * 365, hours=7), now - timedelta(days=40, hours=3)),
+        }
+        print(f"{'intervallo':<22} {'attività':>10} {'rollup':>10} {'righe':>7}")
+        for label, (start, end) in ranges.items():
+            raw_ms = timed(lambda: raw_totals(db, user.id, start, end), args.repeat)
+            rollup_ms = timed(lambda: read_rollups(db, user.id, start, end, by_bucket=False), args.repeat)
+            rows = read_rollups(db, user.id, start, end, by_bucket=False)
+            expected = sum(count for _, count, *_ in raw_totals(db, user.id, start, end))
+            assert sum_totals(values for *_, values in rows)["activity_count"] == expected
+            print(f"{label:<22} {raw_ms:>7.2f} ms {rollup_ms:>7.2f} ms {len(rows):>7}")
+
+        # Aggiornamento alla sync: un blocco di 200 attività modificate
+        chunk = db.execute(select(*Activity.__table__.c).where(Activity.user_id == user.id).limit(200)).all()
+
+        def apply_chunk():
+            delta = RollupDelta()
+            for activity in chunk:
+                delta.replace(activity, {**activity._asdict(), "distance": activity.distance + 100})
+            delta.apply(db)
+            db.rollback()
+
+        print(f"aggiornamento incrementale di un blocco di {len(chunk)} attività: {timed(apply_chunk, args.repeat):.2f} ms")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark dei percorsi semplificati: decodifica delle polyline e Douglas-Peucker
+vettoriale di services/geometry.py, con la dimensione dei percorsi per ogni zoom.
+
+Usa tracce sintetiche (default: 3000 punti, come la polyline dettagliata di una corsa
+di 15 km) e confronta il calcolo di tutti i livelli con un Douglas-Peucker ricorsivo
+in Python puro eseguito una volta per tolleranza.
+
+    cd backend
+    python -m benchmarks.bench_routes --points 3000 --routes 500
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.geometry import (
+    decode_polyline, encode_polyline, simplify_for_zooms, zoom_tolerance, _to_meters
+)
+
+
+def synthetic_track(points: int, seed: int) -> np.ndarray:
+    """Traccia GPS con curve e passo variabile, arrotondata come le polyline (5 decimali)"""
+    rng = np.random.default_rng(seed)
+    heading = np.cumsum(rng.normal(0, 0.3, points))
+    step = rng.uniform(2, 6, points)
+    lat = 45.46 + np.cumsum(np.cos(heading) * step) / 111_320
+    lng = 9.19 + np.cumsum(np.sin(heading) * step) / 78_000
+    return np.round(np.column_stack([lat, lng]), 5)
+
+
+def recursive_douglas_peucker(points: np.ndarray, tolerance: float) -> int:
+    """Versione di riferimento: un segmento alla volta, distanze in Python"""
+    keep = 2
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        (ax, ay), (bx, by) = points[start], points[end]
+        dx, dy = bx - ax, by - ay
+        length_sq = dx * dx + dy * dy or 1.0
+        best, best_index = -1.0, -1
+        for index in range(start + 1, end):
+            px, py = points[index]
+            t = min(1.0, max(0.0, ((px - ax) * dx + (py - ay) * dy) / length_sq))
+            distance = ((px - ax - t * dx) ** 2 + (py - ay - t * dy) ** 2) ** 0.5
+            if distance > best:
+                best, best_index = distance, index
+        if best > tolerance:
+            keep += 1
+            stack += [(start, best_index), (best_index, end)]
+    return keep
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--points", type=int, default=3000)
+    parser.add_argument("--routes", type=int, default=500, help="attività sulla mappa per l'endpoint /routes/all")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    track = synthetic_track(args.points, 0)
+    encoded = encode_polyline(track)
+    zooms = settings.route_zoom_levels
+    latitude = float(track[:, 0].mean())
+
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        decode_polyline(encoded)
+    decode_ms = (time.perf_counter() - started) / args.repeat * 1000
+
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        levels = simplify_for_zooms(decode_polyline(encoded), zooms)
+    vector_ms = (time.perf_counter() - started) / args.repeat * 1000
+
+    points = _to_meters(track)
+    started = time.perf_counter()
+    reference = {zoom: recursive_douglas_peucker(points, zoom_tolerance(zoom, latitude)) for zoom in zooms}
+    reference_ms = (time.perf_counter() - started) * 1000
+
+    print(f"traccia di {args.points} punti, polyline {len(encoded) / 1024:.1f} KB, decodifica {decode_ms:.2f} ms")
+    print(f"tutti i livelli {zooms}: vettoriale {vector_ms:.1f} ms, ricorsivo in Python {reference_ms:.0f} ms")
+    print(f"{'zoom':<6} {'tolleranza':>11} {'punti':>7} {'polyline':>10} {'/routes/all':>12}")
+    for zoom, simplified in levels.items():
+        assert len(simplified) == reference[zoom]
+        size = len(encode_polyline(simplified))
+        print(f"{zoom:<6} {zoom_tolerance(zoom, latitude):>9.1f} m {len(simplified):>7} "
+              f"{size / 1024:>7.1f} KB {size * args.routes / 1024 / 1024:>9.1f} MB")
+    print(f"{'orig.':<6} {'':>11} {args.points:>7} {len(encoded) / 1024:>7.1f} KB "
+          f"{len(encoded) * args.routes / 1024 / 1024:>9.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark dell'archivio degli stream: JSON in activities.detailed_data contro il
+formato binario colonnare di services/stream_store.py.
+
+Usa gli stream sintetici di un'attività (default: corsa di 3 ore a 1 punto al secondo)
+e misura dimensione, tempo di scrittura e tempo di lettura fino agli array NumPy.
+Confronta anche la lettura di una finestra di tempo (--window secondi): decodifica del
+blob e taglio contro ricerca binaria sull'archivio mmap di services/stream_archive.py,
+e il costo della piramide di livelli sottocampionati (services/downsample.py) con la
+dimensione della risposta JSON di ogni livello.
+
+    cd backend
+    python -m benchmarks.bench_stream_store --seconds 10800
+"""
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.downsample import build_pyramid, split_envelopes
+from app.services.stream_archive import StreamArchive, write_archive
+from app.services.stream_store import encode_streams, decode_streams, streams_to_json, streams_to_lists, _to_array
+
+
+def synthetic_streams(seconds: int):
+    """Stream con la stessa forma di quelli di Strava, con valori realistici"""
+    rng = np.random.default_rng(42)
+    speed = np.clip(3.2 + np.cumsum(rng.normal(0, 0.02, seconds)), 2.0, 5.0)
+    distance = np.cumsum(speed)
+    heading = np.cumsum(rng.normal(0, 0.05, seconds))
+    lat = 45.46 + np.cumsum(np.cos(heading) * speed) / 111_320
+    lng = 9.19 + np.cumsum(np.sin(heading) * speed) / 78_000
+    return {
+        "time": list(range(seconds)),
+        "distance": np.round(distance, 1).tolist(),
+        "latlng": np.round(np.column_stack([lat, lng]), 6).tolist(),
+        "altitude": np.round(120 + np.cumsum(rng.normal(0, 0.1, seconds)), 1).tolist(),
+        "velocity_smooth": np.round(speed, 2).tolist(),
+        "heartrate": np.clip(150 + np.cumsum(rng.normal(0, 0.5, seconds)), 90, 200).astype(int).tolist(),
+        "cadence": np.clip(85 + rng.normal(0, 2, seconds), 60, 100).astype(int).tolist(),
+        "watts": np.clip(250 + rng.normal(0, 30, seconds), 0, None).astype(int).tolist(),
+    }
+
+
+def timed(function, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=int, default=10800)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--window", type=int, default=600, help="secondi letti dal centro dell'attività")
+    args = parser.parse_args()
+
+    streams = synthetic_streams(args.seconds)
+    text = json.dumps(streams)
+    blob = encode_streams(streams)
+
+    json_write = timed(lambda: json.dumps(streams), args.repeat)
+    json_read = timed(lambda: {k: _to_array(k, v) for k, v in json.loads(text).items()}, args.repeat)
+    binary_write = timed(lambda: encode_streams(streams), args.repeat)
+    binary_read = timed(lambda: decode_streams(blob), args.repeat)
+    binary_read_one = timed(lambda: decode_streams(blob, ["heartrate"]), args.repeat)
+
+    print(f"{args.seconds} punti, {len(streams)} stream")
+    print(f"{'formato':<10} {'dimensione':>12} {'scrittura':>11} {'lettura':>11}")
+    print(f"{'json':<10} {len(text) / 1024:>9.0f} KB {json_write:>8.1f} ms {json_read:>8.1f} ms")
+    print(f"{'binario':<10} {len(blob) / 1024:>9.0f} KB {binary_write:>8.1f} ms {binary_read:>8.1f} ms")
+    print(f"binario, solo heartrate: {binary_read_one:.2f} ms  ({len(text) / len(blob):.1f}x più piccolo)")
+
+    from_t = args.seconds // 2
+    to_t = from_t + args.window
+    types = ["time", "heartrate", "velocity_smooth"]
+
+    def blob_window():
+        decoded = decode_streams(blob, types)
+        time_stream = decoded["time"]
+        rows = slice(np.searchsorted(time_stream, from_t), np.searchsorted(time_stream, to_t, side="right"))
+        return {name: array[rows] for name, array in decoded.items()}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "activity.fxs"
+        write_archive(path, decode_streams(blob), 0)
+
+        def archive_window():
+            archive = StreamArchive(path)
+            return {name: array.copy() for name, array in archive.read(types, archive.index_range(from_t, to_t)).items()}
+
+        assert all(np.array_equal(blob_window()[name], archive_window()[name]) for name in types)
+        blob_range = timed(blob_window, args.repeat)
+        archive_range = timed(archive_window, args.repeat)
+        print(f"finestra di {args.window}s ({', '.join(types)}), file {path.stat().st_size / 1024:.0f} KB")
+        print(f"{'blob':<10} {blob_range:>8.3f} ms")
+        print(f"{'mmap':<10} {archive_range:>8.3f} ms  ({blob_range / archive_range:.0f}x)")
+
+    arrays = decode_streams(blob)
+    pyramid_build = timed(lambda: build_pyramid(arrays, settings.stream_levels), args.repeat)
+    print(f"piramide {settings.stream_levels}: {pyramid_build:.1f} ms alla scrittura")
+    print(f"{'punti':<10} {'risposta JSON':>14} {'con inviluppi':>14}")
+    print(f"{args.seconds:<10} {len(streams_to_json(arrays)) / 1024:>11.0f} KB")
+    for points, level in build_pyramid(arrays, settings.stream_levels).items():
+        level_streams, envelopes = split_envelopes(level)
+        envelope_size = len(json.dumps({name: streams_to_lists(bounds) for name, bounds in envelopes.items()}))
+        print(f"{points:<10} {len(streams_to_json(level_streams)) / 1024:>11.0f} KB "
+              f"{(len(streams_to_json(level_streams)) + envelope_size) / 1024:>11.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
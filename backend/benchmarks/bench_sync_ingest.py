@@ -0,0 +1,92 @@
+"""
+Benchmark del salvataggio delle attività durante la sync.
+
+Confronta il vecchio percorso (una SELECT per attività e un unico commit finale)
+con l'upsert a blocchi di StravaService, su un database SQLite temporaneo e senza
+chiamate a Strava. Misura sia il primo import sia una ri-sincronizzazione.
+
+    cd backend
+    python -m benchmarks.bench_sync_ingest --activities 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+import types
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, User, Activity
+from app.services.strava_service import StravaService
+
+
+def fake_summaries(count: int):
+    """Riepiloghi con la stessa forma di quelli restituiti da stravalib"""
+    start = datetime(2020, 1, 1, 7, 0)
+    return [
+        types.SimpleNamespace(
+            id=10_000_000 + i, name=f"Run {i}", distance=10000.0, moving_time=3000, elapsed_time=3100,
+            total_elevation_gain=50.0, type="Run", start_date=start + timedelta(hours=12 * i),
+            average_speed=3.3, max_speed=5.0, average_heartrate=150.0, max_heartrate=175.0,
+            average_cadence=85.0, average_watts=None, map=None
+        )
+        for i in range(count)
+    ]
+
+
+def legacy_ingest(service: StravaService, db, user: User, summaries) -> None:
+    """Percorso precedente: N+1 SELECT e commit unico"""
+    for strava_activity in summaries:
+        existing_activity = db.query(Activity).filter(
+            Activity.strava_activity_id == strava_activity.id
+        ).first()
+        if existing_activity:
+            service._update_activity_from_strava(existing_activity, strava_activity)
+        else:
+            db.add(service._create_activity_from_strava(strava_activity, user.id))
+    db.commit()
+
+
+def chunked_ingest(service: StravaService, db, user: User, summaries, chunk_size: int) -> None:
+    """Percorso attuale: una query IN per blocco, scritture in batch e commit per blocco"""
+    for chunk_start in range(0, len(summaries), chunk_size):
+        service._upsert_activities_chunk(db, user, summaries[chunk_start:chunk_start + chunk_size])
+        db.commit()
+
+
+def run(name: str, ingest, summaries) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine, autoflush=False)()
+        user = User(strava_id=1, access_token="x", refresh_token="y", expires_at=datetime(2100, 1, 1))
+        db.add(user)
+        db.commit()
+
+        for phase in ("first import", "re-sync"):
+            started = time.perf_counter()
+            ingest(db, user, summaries)
+            elapsed = time.perf_counter() - started
+            print(f"{name:<10} {phase:<13} {len(summaries) / elapsed:>10.0f} rows/s  ({elapsed:.2f}s)")
+        db.close()
+        engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--activities", type=int, default=5000)
+    parser.add_argument("--chunk-size", type=int, default=200)
+    args = parser.parse_args()
+
+    # Nessuna chiamata di rete: gli stream vengono scaricati dopo la sync, il benchmark misura solo il database
+    service = StravaService()
+    summaries = fake_summaries(args.activities)
+
+    run("legacy", lambda db, user, rows: legacy_ingest(service, db, user, rows), summaries)
+    run("chunked", lambda db, user, rows: chunked_ingest(service, db, user, rows, args.chunk_size), summaries)
+
+
+if __name__ == "__main__":
+    main()
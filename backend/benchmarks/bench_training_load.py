@@ -0,0 +1,135 @@
+"""
+Benchmark del carico di allenamento (services/training_load.py): serie di fatica e forma
+calcolata a ogni richiesta rileggendo gli stream di tutte le attività, contro lettura di
+training_loads, e costo dell'aggiornamento incrementale quando arriva un'attività.
+
+Popola un database SQLite temporaneo con un utente e un'attività al giorno con stream
+sintetici a 1 Hz (frequenza cardiaca e pause) per diversi anni.
+
+    cd backend
+    python -m benchmarks.bench_training_load --years 5 --seconds 3600
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, User, Activity, ActivityStream
+from app.services.stream_store import decode_streams, encode_streams
+from app.services.training_load import (
+    TRIMP_STREAMS, read_training_load, rebuild_training_load, stream_trimp, training_heartrates, update_training_load
+)
+
+
+def synthetic_streams(seconds: int, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    heartrate = np.clip(140 + np.cumsum(rng.normal(0, 0.3, seconds)) * 0.2 + rng.normal(0, 2, seconds), 60, 200)
+    return {
+        "time": np.arange(seconds).tolist(),
+        "heartrate": heartrate.round().astype(int).tolist(),
+        "moving": (rng.random(seconds) > 0.02).tolist(),
+    }
+
+
+def populate(db, days: int, seconds: int) -> User:
+    user = User(strava_id=1, access_token="", refresh_token="", expires_at=datetime.utcnow(), first_name="Atleta")
+    db.add(user)
+    db.flush()
+    start = datetime.utcnow() - timedelta(days=days)
+    for i in range(days):
+        activity = Activity(
+            strava_activity_id=i, user_id=user.id, name=f"Corsa {i}", distance=10000.0, moving_time=seconds,
+            elapsed_time=seconds, average_heartrate=145.0, type="Run", start_date=start + timedelta(days=i, hours=7)
+        )
+        db.add(activity)
+        db.flush()
+        streams = synthetic_streams(seconds, i % 50)
+        db.add(ActivityStream(
+            activity_id=activity.id, format_version=1, point_count=seconds,
+            stream_types=",".join(streams), data=encode_streams(streams)
+        ))
+    db.commit()
+    db.execute(text("ANALYZE"))
+    return user
+
+
+def replay(db, user_id: int, start, end):
+    """Senza training_loads: TRIMP di ogni attività dagli stream e medie giorno per giorno"""
+    heartrates = training_heartrates(None)
+    daily = {}
+    query = select(Activity.start_date, ActivityStream.data).join(
+        ActivityStream, ActivityStream.activity_id == Activity.id
+    ).where(Activity.user_id == user_id)
+    for start_date, data in db.execute(query):
+        day = start_date.date()
+        daily[day] = daily.get(day, 0.0) + (stream_trimp(decode_streams(data, TRIMP_STREAMS), heartrates) or 0.0)
+    atl = ctl = 0.0
+    series = []
+    day = min(daily)
+    while day <= end:
+        tsb = ctl - atl
+        load = daily.get(day, 0.0)
+        atl += (load - atl) / 7
+        ctl += (load - ctl) / 42
+        if day >= start:
+            series.append((day, load, atl, ctl, tsb))
+        day += timedelta(days=1)
+    return series
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--seconds", type=int, default=3600, help="durata di ogni attività (un punto al secondo)")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'training.db')}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        days = 365 * args.years
+        user = populate(db, days, args.seconds)
+
+        started = time.perf_counter()
+        rebuild_training_load(db, user.id)
+        db.commit()
+        print(f"{days} attività, ricalcolo completo (TRIMP dagli stream e medie): {time.perf_counter() - started:.2f}s")
+
+        end = datetime.utcnow().date()
+        start = end - timedelta(days=90)
+        started = time.perf_counter()
+        replayed = replay(db, user.id, start, end)
+        replay_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            stored = read_training_load(db, user.id, start, end)
+        stored_ms = (time.perf_counter() - started) / args.repeat * 1000
+        for (_, load, atl, ctl, tsb), day in zip(replayed, stored):
+            assert np.allclose([load, atl, ctl, tsb], [day["trimp"], day["atl"], day["ctl"], day["tsb"]])
+        print(f"ultimi 90 giorni: dagli stream {replay_ms:.0f} ms, da training_loads {stored_ms:.2f} ms")
+
+        # Nuova attività oggi e attività modificata un anno fa: si riscrivono solo i giorni successivi
+        for label, offset in (("oggi", 0), ("un anno fa", 365)):
+            activity = db.execute(select(Activity).where(Activity.user_id == user.id).order_by(Activity.start_date.desc()).offset(offset).limit(1)).scalar()
+
+            def edit():
+                activity.trimp = (activity.trimp or 0.0) + 10.0
+                update_training_load(db, user.id, activity.start_date.date())
+                db.rollback()
+
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                edit()
+            print(f"aggiornamento incrementale, attività di {label}: {(time.perf_counter() - started) / args.repeat * 1000:.2f} ms")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
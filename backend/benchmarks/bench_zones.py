@@ -0,0 +1,146 @@
+"""
+Benchmark del tempo nelle zone (services/zones.py): np.histogram pesato contro un ciclo
+in Python puro su un'attività, e distribuzione settimanale di un anno letta da
+activity_zones contro ricalcolata dagli stream di ogni attività.
+
+Popola un database SQLite temporaneo con un utente e un'attività al giorno con stream
+sintetici a 1 Hz (frequenza cardiaca, velocità, pause), poi misura anche il ricalcolo in
+blocco che avviene quando l'utente cambia le zone.
+
+    cd backend
+    python -m benchmarks.bench_zones --activities 365 --seconds 3600
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, User, Activity, ActivityStream
+from app.models.activity_rollup import ROLLUP_WEEK
+from app.models.activity_zone import ZONE_HEARTRATE, ZONE_PACE
+from app.services.stream_store import decode_streams, encode_streams
+from app.services.zones import (
+    ZONE_STREAMS, compute_time_in_zones, read_zone_distribution, rebuild_user_zones, zone_bounds
+)
+
+
+def synthetic_streams(seconds: int, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    velocity = np.clip(3.3 + np.cumsum(rng.normal(0, 0.02, seconds)) * 0.05 + rng.normal(0, 0.2, seconds), 0, None)
+    heartrate = np.clip(150 + np.cumsum(rng.normal(0, 0.3, seconds)) * 0.2 + rng.normal(0, 2, seconds), 60, 200)
+    moving = rng.random(seconds) > 0.02
+    return {
+        "time": np.arange(seconds).tolist(),
+        "heartrate": heartrate.round().astype(int).tolist(),
+        "velocity_smooth": velocity.round(2).tolist(),
+        "moving": moving.tolist(),
+    }
+
+
+def python_reference(streams: dict, bounds: dict) -> dict:
+    """Versione di riferimento: un punto alla volta, con la zona trovata scorrendo i limiti"""
+    time, moving = streams["time"], streams["moving"]
+    zones = {ZONE_HEARTRATE: [0.0] * (len(bounds[ZONE_HEARTRATE]) + 1), ZONE_PACE: [0.0] * (len(bounds[ZONE_PACE]) + 1)}
+    for index in range(1, len(time)):
+        if not moving[index]:
+            continue
+        seconds = time[index] - time[index - 1]
+        heartrate = streams["heartrate"][index]
+        if heartrate > 0:
+            zones[ZONE_HEARTRATE][sum(heartrate >= bound for bound in bounds[ZONE_HEARTRATE])] += seconds
+        velocity = streams["velocity_smooth"][index]
+        if velocity > 0:
+            zones[ZONE_PACE][sum(velocity >= 1000 / pace for pace in bounds[ZONE_PACE])] += seconds
+    return zones
+
+
+def populate(db, activities: int, seconds: int) -> User:
+    user = User(strava_id=1, access_token="", refresh_token="", expires_at=datetime.utcnow(), first_name="Atleta")
+    db.add(user)
+    db.flush()
+    start = datetime.utcnow() - timedelta(days=activities)
+    for i in range(activities):
+        activity = Activity(
+            strava_activity_id=i, user_id=user.id, name=f"Corsa {i}", distance=10000.0, moving_time=seconds,
+            elapsed_time=seconds, type="Run", start_date=start + timedelta(days=i)
+        )
+        db.add(activity)
+        db.flush()
+        streams = synthetic_streams(seconds, i)
+        db.add(ActivityStream(
+            activity_id=activity.id, format_version=1, point_count=seconds,
+            stream_types=",".join(streams), data=encode_streams(streams)
+        ))
+    db.commit()
+    db.execute(text("ANALYZE"))
+    return user
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--activities", type=int, default=365)
+    parser.add_argument("--seconds", type=int, default=3600, help="durata di ogni attività (un punto al secondo)")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    bounds = zone_bounds(None)
+
+    streams = synthetic_streams(args.seconds, 0)
+    arrays = decode_streams(encode_streams(streams))
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        zones = compute_time_in_zones(arrays, bounds)
+    vector_ms = (time.perf_counter() - started) / args.repeat * 1000
+    started = time.perf_counter()
+    reference = python_reference(streams, bounds)
+    reference_ms = (time.perf_counter() - started) * 1000
+    for kind in (ZONE_HEARTRATE, ZONE_PACE):
+        assert np.allclose(zones[kind], reference[kind]), (kind, zones[kind], reference[kind])
+    print(f"un'attività di {args.seconds} punti: np.histogram {vector_ms:.2f} ms, Python {reference_ms:.1f} ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'zones.db')}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        user = populate(db, args.activities, args.seconds)
+
+        started = time.perf_counter()
+        rebuild_user_zones(db, user.id, bounds)
+        db.commit()
+        print(f"ricalcolo in blocco di {args.activities} attività: {time.perf_counter() - started:.2f}s")
+
+        year_ago = datetime.utcnow() - timedelta(days=365)
+
+        def from_streams():
+            weeks = {}
+            query = select(Activity.start_date, ActivityStream.data).join(
+                ActivityStream, ActivityStream.activity_id == Activity.id
+            ).where(Activity.user_id == user.id, Activity.start_date >= year_ago)
+            for start_date, data in db.execute(query):
+                zones = compute_time_in_zones(decode_streams(data, ZONE_STREAMS), bounds)
+                week = start_date.date() - timedelta(days=start_date.weekday())
+                for kind, values in zones.items():
+                    weeks[(week, kind)] = weeks.get((week, kind), 0) + values
+            return weeks
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            stored = read_zone_distribution(db, user.id, year_ago, period=ROLLUP_WEEK)
+        stored_ms = (time.perf_counter() - started) / args.repeat * 1000
+        started = time.perf_counter()
+        recomputed = from_streams()
+        streams_ms = (time.perf_counter() - started) * 1000
+        for (week, kind), values in recomputed.items():
+            assert np.allclose([stored[week][kind].get(zone, 0.0) for zone in range(len(values))], values)
+        print(f"distribuzione settimanale dell'ultimo anno: activity_zones {stored_ms:.2f} ms, "
+              f"dagli stream {streams_ms:.1f} ms ({len(stored)} settimane)")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
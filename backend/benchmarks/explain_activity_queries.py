@@ -0,0 +1,121 @@
+"""
+Verifica dei piani di esecuzione delle query sulle attività.
+
+Esegue gli endpoint di app/api/activities.py (elenco, statistiche, tendenze) su un
+database SQLite temporaneo, intercetta le query SQL sulle tabelle activities e
+activity_rollups e ne stampa l'EXPLAIN QUERY PLAN. Termina con errore se una query
+legge l'intera tabella invece di usare un indice.
+
+    cd backend
+    python -m benchmarks.explain_activity_queries --activities 5000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.api.activities import get_user_activities, get_user_stats, get_user_trends
+from app.db.database import create_async_db_engine
+from app.models import Base, User, Activity
+
+TYPES = ["Run", "Ride", "Workout", "TrailRun", "Swim"]
+
+
+def populate(db, users: int, activities: int) -> User:
+    """Più utenti con attività di tipi diversi, così il planner ha statistiche realistiche"""
+    start = datetime.utcnow() - timedelta(days=3 * 365)
+    for user_index in range(users):
+        user = User(
+            strava_id=1000 + user_index, access_token="", refresh_token="",
+            expires_at=datetime.utcnow(), first_name=f"Atleta {user_index}"
+        )
+        db.add(user)
+        db.flush()
+        db.add_all(
+            Activity(
+                strava_activity_id=user_index * activities + i, user_id=user.id, name=f"Attività {i}",
+                distance=8000.0 + i % 5000, moving_time=2400, elapsed_time=2500, total_elevation_gain=40.0,
+                type=TYPES[i % len(TYPES)], start_date=start + timedelta(hours=(3 * 365 * 24 / activities) * i)
+            )
+            for i in range(activities)
+        )
+    db.commit()
+    db.execute(text("ANALYZE"))
+    return db.query(User).first()
+
+
+async def capture_queries(database_url: str, user_id: int):
+    """Esegue gli endpoint e restituisce le query su activities e activity_rollups con i relativi parametri"""
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if "FROM activities" in statement or "FROM activity_rollups" in statement:
+            captured.append((statement, parameters))
+
+    engine = create_async_db_engine(database_url)
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    month_ago = datetime.utcnow() - timedelta(days=30)
+    async with AsyncSession(engine, autoflush=False, expire_on_commit=False) as db:
+        user = await db.get(User, user_id)
+        list_defaults = dict(skip=0, limit=50, activity_type=None, start_date=None, end_date=None,
+                             sort_by="start_date", sort_order="desc", cursor=None, include_total=None,
+                             db=db, current_user=user)
+        stats_defaults = dict(start_date=None, end_date=None, activity_type=None, db=db, current_user=user)
+        first_page = await get_user_activities(**list_defaults)
+        await get_user_activities(**{**list_defaults, "cursor": first_page["next_cursor"]})
+        await get_user_activities(**{**list_defaults, "activity_type": "run"})
+        await get_user_activities(**{**list_defaults, "start_date": month_ago, "sort_order": "asc"})
+        await get_user_stats(**stats_defaults)
+        await get_user_stats(**{**stats_defaults, "activity_type": "Ride", "start_date": month_ago})
+        await get_user_trends(period="year", db=db, current_user=user)
+    await engine.dispose()
+    return captured
+
+
+def query_plan(conn, statement: str, parameters) -> Tuple[List[str], List[str]]:
+    """Passi dell'EXPLAIN QUERY PLAN e, fra questi, le letture di activities o activity_rollups senza indice"""
+    plan = [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+    # "SCAN activities" senza indice = lettura dell'intera tabella
+    scans = [step for step in plan if step.startswith(("SCAN activities", "SCAN activity_rollups")) and "INDEX" not in step]
+    return plan, scans
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="EXPLAIN QUERY PLAN delle query sulle attività")
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--activities", type=int, default=2000, help="attività per utente")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'explain.db')}"
+        engine = create_engine(database_url)
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        user = populate(db, args.users, args.activities)
+        queries = asyncio.run(capture_queries(database_url, user.id))
+
+        full_scans = 0
+        with engine.connect() as conn:
+            for statement, parameters in queries:
+                plan, scans = query_plan(conn, statement, parameters)
+                full_scans += len(scans)
+                print(" ".join(statement.split())[:160])
+                for step in plan:
+                    print(f"    {'!! ' if step in scans else ''}{step}")
+                print()
+        db.close()
+        engine.dispose()
+
+    print(f"{len(queries)} query controllate, {full_scans} letture complete della tabella")
+    sys.exit(1 if full_scans else 0)
+
+
+if __name__ == "__main__":
+    main()
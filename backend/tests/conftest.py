@@ -0,0 +1,153 @@
+"""
+Fixture comuni: un database SQLite temporaneo creato con le migrazioni (alembic upgrade head),
+come in produzione. DATABASE_URL va impostato prima di importare l'applicazione.
+"""
+import os
+import tempfile
+
+_database_dir = tempfile.mkdtemp(prefix="foxrun-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_database_dir, 'test.db')}"
+os.environ["STREAM_ARCHIVE_DIR"] = os.path.join(_database_dir, "streams")
+os.environ.setdefault("SILENCE_TOKEN_WARNINGS", "true")
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Optional
+
+import numpy as np
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db.database import ALEMBIC_INI, SessionLocal, engine
+from app.models import Activity, Base, User
+from app.models.activity import STREAM_FETCHED
+from app.services.stream_store import save_streams
+
+
+def alembic_config() -> Config:
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "alembic"))
+    return config
+
+
+@pytest.fixture(scope="session", autouse=True)
+def migrated_database():
+    command.upgrade(alembic_config(), "head")
+    yield
+    engine.dispose()
+
+
+@pytest.fixture
+def db_session():
+    """Sessione su una transazione annullata alla fine del test: i servizi non eseguono il commit"""
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection)
+    try:
+        yield session
+    finally:
+        session.close()
+        transaction.rollback()
+        connection.close()
+
+
+@pytest.fixture
+def user(db_session):
+    user = User(strava_id=1, access_token="", refresh_token="", expires_at=datetime(2030, 1, 1), first_name="Atleta")
+    db_session.add(user)
+    db_session.flush()
+    return user
+
+
+@pytest.fixture
+def committed_user():
+    """
+    Utente salvato con il commit, per i worker e i servizi che aprono una propria sessione:
+    alla fine vengono cancellate tutte le righe che lo riguardano
+    """
+    db = SessionLocal()
+    try:
+        user = User(strava_id=2, access_token="", refresh_token="", expires_at=datetime(2030, 1, 1), first_name="Atleta")
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+    finally:
+        db.close()
+    yield user
+
+    activity_ids = select(Activity.id).where(Activity.user_id == user.id)
+    with engine.begin() as conn:
+        # Dalle tabelle che dipendono dalle altre: prima le righe delle attività, poi quelle dell'utente
+        for table in reversed(Base.metadata.sorted_tables):
+            if "activity_id" in table.c:
+                conn.execute(table.delete().where(table.c.activity_id.in_(activity_ids)))
+            if "user_id" in table.c:
+                conn.execute(table.delete().where(table.c.user_id == user.id))
+            if "owner_id" in table.c:
+                conn.execute(table.delete().where(table.c.owner_id == user.strava_id))
+            if table.name == "strava_rate_limits":
+                conn.execute(table.delete().where(table.c.key == f"user:{user.id}"))
+        conn.execute(User.__table__.delete().where(User.id == user.id))
+
+
+def _strava_summary(index: int, **values) -> SimpleNamespace:
+    """Riepilogo di un'attività come lo restituisce l'elenco di Strava"""
+    summary = dict(
+        id=5 * 10 ** 8 + index, name=f"Corsa {index}", type="Run", start_date=datetime(2024, 1, 1, 7) + timedelta(days=index),
+        distance=5000.0 + index, moving_time=1500, elapsed_time=1600, total_elevation_gain=10.0, average_speed=3.3,
+        max_speed=4.1, average_heartrate=None, max_heartrate=None, average_cadence=None, average_watts=None, map=None
+    )
+    summary.update(values)
+    return SimpleNamespace(**summary)
+
+
+@pytest.fixture
+def strava_summary():
+    return _strava_summary
+
+
+def _synthetic_streams(seconds: int, seed: int) -> dict:
+    """Stream a 1 Hz con velocità, potenza e frequenza che variano e qualche pausa"""
+    rng = np.random.default_rng(seed)
+    velocity = np.clip(3.0 + np.cumsum(rng.normal(0, 0.05, seconds)) * 0.05 + rng.normal(0, 0.3, seconds), 0.5, None)
+    moving = rng.random(seconds) > 0.03
+    return {
+        "time": np.arange(seconds).tolist(),
+        "distance": np.cumsum(np.where(moving, velocity, 0.0)).round(1).tolist(),
+        "velocity_smooth": velocity.round(2).tolist(),
+        "heartrate": np.clip(120 + np.cumsum(rng.normal(0, 0.5, seconds)) + rng.normal(0, 3, seconds), 80, 195).round().tolist(),
+        "watts": np.clip(200 + rng.normal(0, 40, seconds), 0, None).round().tolist(),
+        "moving": moving.tolist(),
+    }
+
+
+@pytest.fixture
+def synthetic_streams():
+    return _synthetic_streams
+
+
+@pytest.fixture
+def add_activity(db_session, user):
+    """Crea un'attività dell'utente e, se indicati, ne salva gli stream con tutti i dati derivati"""
+    counter = iter(range(1, 10 ** 6))
+
+    def add(start_date: datetime, activity_type: str = "Run", streams: Optional[dict] = None, **values) -> Activity:
+        index = next(counter)
+        activity = Activity(
+            # Id Strava lontani da quelli delle attività salvate con il commit dagli altri test
+            strava_activity_id=10 ** 9 + index, user_id=user.id, name=f"Attività {index}", type=activity_type,
+            start_date=start_date, distance=values.pop("distance", 10000.0), moving_time=values.pop("moving_time", 3000),
+            elapsed_time=values.pop("elapsed_time", 3100), **values
+        )
+        db_session.add(activity)
+        db_session.flush()
+        if streams is not None:
+            save_streams(db_session, activity, streams)
+            activity.stream_status = STREAM_FETCHED
+        db_session.flush()
+        return activity
+
+    return add
@@ -0,0 +1,52 @@
+"""
+Scheduler delle sync automatiche: un solo lease "auto_sync" fra le istanze e
+utenti in scadenza secondo le loro impostazioni.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app.models import SchedulerLease, SyncJob
+from app.services.auto_sync import AUTO_SYNC_LEASE, AutoSyncScheduler
+
+
+def test_only_one_instance_holds_the_lease(db_session):
+    first, second = AutoSyncScheduler(), AutoSyncScheduler()
+    assert first._acquire_lease(db_session)
+    assert not second._acquire_lease(db_session)
+    # Il titolare lo rinnova a ogni controllo
+    assert first._acquire_lease(db_session)
+
+    # Lease scaduto (istanza ferma senza rilasciarlo): lo prende un'altra istanza
+    db_session.execute(
+        update(SchedulerLease)
+        .where(SchedulerLease.name == AUTO_SYNC_LEASE)
+        .values(expires_at=datetime.utcnow() - timedelta(seconds=1))
+    )
+    assert second._acquire_lease(db_session)
+    assert not first._acquire_lease(db_session)
+    assert db_session.get(SchedulerLease, AUTO_SYNC_LEASE).owner == second.owner
+
+
+def test_due_users_follow_interval_and_last_job(db_session, user):
+    now = datetime(2024, 5, 1, 12)
+    scheduler = AutoSyncScheduler()
+
+    def due() -> bool:
+        db_session.flush()
+        return user in scheduler.due_users(db_session, now, limit=100)
+
+    user.settings = {"sync": {"autoSync": True, "syncInterval": "daily"}}
+    user.last_sync_timestamp = now - timedelta(hours=25)
+    assert due()
+    user.last_sync_timestamp = now - timedelta(hours=5)
+    assert not due()
+
+    # Un job accodato di recente (anche se poi fallito) rimanda il prossimo tentativo
+    user.last_sync_timestamp = now - timedelta(days=3)
+    db_session.add(SyncJob(user_id=user.id, kind="auto", status="failed", params={}, created_at=now - timedelta(hours=2)))
+    assert not due()
+
+    user.settings = {"sync": {"autoSync": False}}
+    user.last_sync_timestamp = None
+    assert not due()
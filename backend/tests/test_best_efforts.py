@@ -0,0 +1,47 @@
+"""
+Migliori tempi sulle distanze standard contro una ricerca esaustiva.
+"""
+import numpy as np
+import pytest
+
+from app.services.best_efforts import compute_best_efforts
+
+
+def reference_best_effort(distance: np.ndarray, time: np.ndarray, target: float) -> float:
+    """Doppio ciclo: da ogni partenza il primo punto che copre l'obiettivo, arrivo interpolato"""
+    best = np.inf
+    for start in range(distance.shape[0]):
+        for end in range(start + 1, distance.shape[0]):
+            if distance[end] - distance[start] >= target:
+                step = distance[end] - distance[end - 1]
+                fraction = (distance[start] + target - distance[end - 1]) / step if step > 0 else 1.0
+                best = min(best, time[end - 1] + fraction * (time[end] - time[end - 1]) - time[start])
+                break
+    return best
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_best_efforts_match_reference(seed):
+    rng = np.random.default_rng(seed)
+    time = np.cumsum(rng.integers(1, 4, 700)).astype(np.float64)
+    distance = np.cumsum(rng.uniform(0, 8, 700))
+    efforts = compute_best_efforts(distance, time, [400.0, 1000.0, 1609.344, 50000.0])
+    assert 50000.0 not in efforts
+    for target in (400.0, 1000.0, 1609.344):
+        elapsed, start, end = efforts[target]
+        assert elapsed == pytest.approx(reference_best_effort(distance, time, target), abs=1e-9)
+        assert distance[end] - distance[start] >= target
+
+
+def test_gps_drift_and_gaps_keep_distance_monotonic():
+    time = np.arange(6, dtype=np.float64)
+    # Il GPS torna indietro a 400 m e manca un punto: la distanza coperta resta 500 e poi 900
+    distance = np.array([0.0, 500.0, 400.0, 900.0, np.nan, 1500.0])
+    assert compute_best_efforts(distance, time, [1000.0])[1000.0] == (3.0, 2, 5)
+
+
+def test_finish_time_is_interpolated_between_samples():
+    # 1000 m vengono raggiunti a tre quarti del tratto da 400 a 1200 m, percorso in 200 s
+    distance = np.array([0.0, 400.0, 1200.0])
+    time = np.array([0.0, 100.0, 300.0])
+    assert compute_best_efforts(distance, time, [1000.0, 1500.0]) == {1000.0: (250.0, 0, 2)}
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from app.services.downsample import build_pyramid, lttb_indices, split_envelopes
+
+
+def reference_lttb(x: np.ndarray, y: np.ndarray, points: int) -> list:
+    """LTTB classico su una serie, punto per punto, con gli stessi bucket di lttb_indices"""
+    edges = np.linspace(1, x.shape[0] - 1, points - 1).astype(np.int64)
+    selected = [0]
+    for bucket in range(points - 2):
+        if bucket + 1 < points - 2:
+            following = slice(edges[bucket + 1], edges[bucket + 2])
+            cx, cy = x[following].mean(), y[following].mean()
+        else:
+            cx, cy = x[-1], y[-1]
+        ax, ay = x[selected[-1]], y[selected[-1]]
+        selected.append(max(
+            range(edges[bucket], edges[bucket + 1]),
+            key=lambda index: abs((ax - cx) * (y[index] - ay) - (ax - x[index]) * (cy - ay))
+        ))
+    return selected + [x.shape[0] - 1]
+
+
+@pytest.mark.parametrize("length,points", [(1000, 50), (3601, 300), (257, 256)])
+def test_lttb_matches_reference(length, points):
+    rng = np.random.default_rng(length)
+    x = np.cumsum(rng.integers(1, 4, length)).astype(np.float64)
+    y = np.cumsum(rng.normal(0, 1, length))
+    indices, _ = lttb_indices(x, y[:, None], points)
+    assert indices.tolist() == reference_lttb(x, y, points)
+
+
+def test_lttb_keeps_everything_when_not_reducing():
+    x = np.arange(10, dtype=np.float64)
+    indices, _ = lttb_indices(x, x[:, None], 10)
+    assert indices.tolist() == list(range(10))
+
+
+def test_pyramid_levels_and_envelopes(synthetic_streams):
+    raw = synthetic_streams(5000, seed=3)
+    streams = {name: np.asarray(values, dtype=np.float64) for name, values in raw.items()}
+    pyramid = build_pyramid(streams, [4000, 1000, 250, 6000])
+    assert sorted(pyramid) == [250, 1000, 4000]
+    for points, level in pyramid.items():
+        level_streams, envelopes = split_envelopes(level)
+        assert level_streams["time"].shape[0] == points
+        assert np.all(np.diff(level_streams["time"]) > 0)
+        assert level_streams["time"][[0, -1]].tolist() == [0, 4999]
+        assert "time" not in envelopes and "distance" not in envelopes
+        heartrate = envelopes["heartrate"]
+        # Gli inviluppi contengono il punto scelto e conservano gli estremi dello stream originale
+        assert np.all(heartrate["min"] <= level_streams["heartrate"])
+        assert np.all(heartrate["max"] >= level_streams["heartrate"])
+        assert heartrate["min"].min() == streams["heartrate"].min()
+        assert heartrate["max"].max() == streams["heartrate"].max()
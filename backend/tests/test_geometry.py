@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from app.services.geometry import _to_meters, decode_polyline, encode_polyline, point_importance, simplify_for_zooms
+
+
+def reference_douglas_peucker(coordinates: np.ndarray, tolerance: float) -> list:
+    """Douglas-Peucker ricorsivo (con una pila), distanza dal segmento in metri"""
+    points = _to_meters(coordinates)
+    keep = {0, coordinates.shape[0] - 1}
+    pending = [(0, coordinates.shape[0] - 1)]
+    while pending:
+        start, end = pending.pop()
+        if end - start < 2:
+            continue
+        a, b = points[start], points[end]
+        ab = b - a
+        inner = points[start + 1:end]
+        length_sq = ab @ ab
+        t = np.clip((inner - a) @ ab / (length_sq if length_sq > 0 else 1), 0, 1)
+        distance = np.hypot(*(inner - a - t[:, None] * ab).T)
+        farthest = int(np.argmax(distance))
+        if distance[farthest] > tolerance:
+            split = start + 1 + farthest
+            keep.add(split)
+            pending += [(start, split), (split, end)]
+    return sorted(keep)
+
+
+@pytest.fixture
+def route():
+    rng = np.random.default_rng(7)
+    steps = rng.normal(0, 1e-4, (2000, 2)) + [2e-5, 3e-5]
+    return np.array([45.46, 9.19]) + np.cumsum(steps, axis=0)
+
+
+@pytest.mark.parametrize("tolerance", [2.0, 5.0, 20.0, 100.0])
+def test_importance_matches_recursive_douglas_peucker(route, tolerance):
+    importance = point_importance(route, min_tolerance=2.0)
+    assert np.flatnonzero(importance > tolerance).tolist() == reference_douglas_peucker(route, tolerance)
+
+
+def test_zoom_levels_are_nested(route):
+    simplified = simplify_for_zooms(route, [8, 12, 16])
+    sizes = [simplified[zoom].shape[0] for zoom in (8, 12, 16)]
+    assert sizes == sorted(sizes) and sizes[0] >= 2
+    coarse = {tuple(point) for point in simplified[8]}
+    assert coarse <= {tuple(point) for point in simplified[16]}
+
+
+def test_polyline_round_trip(route):
+    decoded = decode_polyline(encode_polyline(route))
+    assert np.allclose(decoded, route, atol=1e-5)
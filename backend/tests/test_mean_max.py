@@ -0,0 +1,58 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+from sqlalchemy import select
+
+from app.models import ActivityMeanMax, MeanMaxEnvelope
+from app.models.mean_max import MEAN_MAX_POWER, MEAN_MAX_SPEED
+from app.models.personal_record import ALL_TIME
+from app.services.mean_max import compute_mean_max, rebuild_mean_max
+from app.services.strava_service import StravaService
+from app.services.stream_store import decode_streams, encode_streams
+from benchmarks.bench_mean_max import python_reference
+
+
+@pytest.mark.parametrize("seconds", [90, 1800])
+def test_curves_match_sliding_windows(synthetic_streams, seconds):
+    raw = synthetic_streams(seconds, seed=seconds)
+    curves = compute_mean_max(decode_streams(encode_streams(raw)))
+    for kind, stream_type in ((MEAN_MAX_SPEED, "velocity_smooth"), (MEAN_MAX_POWER, "watts")):
+        reference = python_reference(raw, stream_type)
+        assert list(curves[kind]) == list(reference)
+        # velocity_smooth è salvato in float32
+        assert np.allclose(list(curves[kind].values()), list(reference.values()), rtol=1e-5)
+
+
+def test_window_between_samples():
+    """Punti ogni 10 s: la finestra migliore di 5 s cade dentro un intervallo"""
+    streams = {"time": np.array([0.0, 10.0, 20.0, 30.0]), "watts": np.array([0.0, 100.0, 300.0, 200.0])}
+    curve = compute_mean_max(streams, durations=[5, 10, 15, 40])[MEAN_MAX_POWER]
+    assert curve == {5: 300.0, 10: 300.0, 15: pytest.approx(800 / 3)}
+
+
+def _envelopes(db):
+    return sorted(db.execute(select(
+        MeanMaxEnvelope.type_key, MeanMaxEnvelope.year, MeanMaxEnvelope.kind, MeanMaxEnvelope.duration,
+        MeanMaxEnvelope.value, MeanMaxEnvelope.activity_id
+    )).all())
+
+
+def test_incremental_envelope_matches_rebuild(db_session, user, add_activity, synthetic_streams):
+    activities = [
+        add_activity(datetime(2023 + index % 2, 2 + index, 3), "Ride" if index % 3 else "VirtualRide",
+                     streams=synthetic_streams(600 + 400 * index, seed=40 + index))
+        for index in range(7)
+    ]
+    StravaService().delete_activities(db_session, [activities[1].id, activities[6].id])
+    incremental = _envelopes(db_session)
+    assert {(row.year, row.kind) for row in incremental} >= {(ALL_TIME, MEAN_MAX_POWER), (2024, MEAN_MAX_SPEED)}
+
+    best = db_session.execute(select(ActivityMeanMax.activity_id, ActivityMeanMax.value).where(
+        ActivityMeanMax.kind == MEAN_MAX_POWER, ActivityMeanMax.duration == 60,
+        ActivityMeanMax.activity_id.in_([activity.id for activity in activities if activity.type == "Ride"])
+    ).order_by(ActivityMeanMax.value.desc())).first()
+    assert ("ride", ALL_TIME, MEAN_MAX_POWER, 60, best.value, best.activity_id) in incremental
+
+    assert rebuild_mean_max(db_session, user.id) == 5
+    assert _envelopes(db_session) == incremental
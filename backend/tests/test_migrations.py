@@ -0,0 +1,19 @@
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+
+from app.db.database import engine, require_current_schema
+from app.models import Base
+from conftest import alembic_config
+
+
+def test_migrations_match_models():
+    """alembic upgrade head produce lo schema dei modelli: nessuna differenza per autogenerate"""
+    with engine.connect() as connection:
+        differences = compare_metadata(MigrationContext.configure(connection), Base.metadata)
+    assert differences == []
+
+
+def test_single_head_and_current_schema():
+    assert len(ScriptDirectory.from_config(alembic_config()).get_heads()) == 1
+    require_current_schema()
@@ -0,0 +1,99 @@
+"""
+Paginazione per chiave dell'elenco attività: cursori e confini delle pagine, anche
+con valori ripetuti nella colonna di ordinamento.
+"""
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.activities import _decode_cursor, _encode_cursor, get_user_activities
+from app.core.config import settings
+from app.db.database import SessionLocal, create_async_db_engine
+from app.models import Activity, User
+
+ACTIVITY_COUNT = 23
+
+
+@pytest.fixture
+def activity_ids(committed_user):
+    """Attività salvate con il commit (gli endpoint le leggono da un'altra connessione), con date e distanze ripetute"""
+    db = SessionLocal()
+    try:
+        activities = [
+            Activity(
+                strava_activity_id=7 * 10 ** 8 + index, user_id=committed_user.id, name=f"Attività {index % 5}", type="Run",
+                start_date=datetime(2024, 1, 1 + index // 3, 7), distance=5000.0 * (1 + index % 4),
+                moving_time=1500 + index, elapsed_time=1600 + index
+            )
+            for index in range(ACTIVITY_COUNT)
+        ]
+        db.add_all(activities)
+        db.commit()
+        return [activity.id for activity in activities]
+    finally:
+        db.close()
+
+
+async def _pages(user_id: int, **filters) -> list:
+    """Tutte le pagine dell'elenco seguendo next_cursor"""
+    async_engine = create_async_db_engine(settings.database_url)
+    pages = []
+    try:
+        async with AsyncSession(async_engine, expire_on_commit=False) as db:
+            user = await db.get(User, user_id)
+            params = dict(skip=0, limit=5, activity_type=None, start_date=None, end_date=None,
+                          sort_by="start_date", sort_order="desc", cursor=None, include_total=None,
+                          db=db, current_user=user)
+            params.update(filters)
+            while True:
+                page = await get_user_activities(**params)
+                pages.append(page)
+                if page["next_cursor"] is None:
+                    return pages
+                params["cursor"] = page["next_cursor"]
+    finally:
+        await async_engine.dispose()
+
+
+@pytest.mark.parametrize("sort_by,sort_order", [
+    ("start_date", "desc"), ("start_date", "asc"), ("distance", "desc"), ("name", "asc")
+])
+def test_cursor_pages_cover_every_activity_once(committed_user, activity_ids, sort_by, sort_order):
+    db = SessionLocal()
+    try:
+        column = getattr(Activity, sort_by)
+        order = (column.desc(), Activity.id.desc()) if sort_order == "desc" else (column.asc(), Activity.id.asc())
+        expected = [row.id for row in db.query(Activity.id).filter(Activity.user_id == committed_user.id).order_by(*order)]
+    finally:
+        db.close()
+
+    pages = asyncio.run(_pages(committed_user.id, sort_by=sort_by, sort_order=sort_order))
+    assert [len(page["activities"]) for page in pages] == [5, 5, 5, 5, 3]
+    assert [activity.id for page in pages for activity in page["activities"]] == expected
+    # Il totale si conta solo sulla prima pagina
+    assert [page["total"] for page in pages] == [ACTIVITY_COUNT, None, None, None, None]
+
+
+@pytest.mark.parametrize("limit,sizes", [(ACTIVITY_COUNT, [ACTIVITY_COUNT]), (ACTIVITY_COUNT - 1, [ACTIVITY_COUNT - 1, 1])])
+def test_last_page_has_no_cursor(committed_user, activity_ids, limit, sizes):
+    pages = asyncio.run(_pages(committed_user.id, limit=limit))
+    assert [len(page["activities"]) for page in pages] == sizes
+
+
+def test_cursor_round_trip_and_validation():
+    row = SimpleNamespace(id=42, start_date=datetime(2024, 5, 1, 6, 30), distance=10000.5)
+    cursor = _encode_cursor("start_date", True, row)
+    assert "=" not in cursor
+    assert _decode_cursor(cursor, "start_date", True) == (row.start_date, 42)
+    assert _decode_cursor(_encode_cursor("distance", False, row), "distance", False) == (10000.5, 42)
+
+    with pytest.raises(HTTPException) as mismatch:
+        _decode_cursor(cursor, "start_date", False)
+    assert mismatch.value.status_code == 400
+    with pytest.raises(HTTPException) as invalid:
+        _decode_cursor("non-un-cursore", "start_date", True)
+    assert invalid.value.status_code == 400
@@ -0,0 +1,30 @@
+"""
+Piani di esecuzione delle query sulle attività (EXPLAIN QUERY PLAN, come
+benchmarks/explain_activity_queries.py): nessuna deve leggere tutta la tabella.
+"""
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.db.database import SessionLocal, engine
+from benchmarks.explain_activity_queries import capture_queries, populate, query_plan
+
+
+@pytest.fixture(scope="module")
+def populated_user_id():
+    """Utenti con attività salvate con il commit: gli endpoint le leggono da un'altra connessione"""
+    db = SessionLocal()
+    try:
+        return populate(db, users=3, activities=400).id
+    finally:
+        db.close()
+
+
+def test_activity_queries_use_indexes(populated_user_id):
+    queries = asyncio.run(capture_queries(settings.database_url, populated_user_id))
+    assert queries
+    with engine.connect() as conn:
+        for statement, parameters in queries:
+            plan, scans = query_plan(conn, statement, parameters)
+            assert not scans, f"{' '.join(statement.split())[:160]}: {plan}"
@@ -0,0 +1,82 @@
+"""
+Scheduler delle chiamate Strava: prenotazioni sulle finestre condivise (tabella
+strava_rate_limits) e riallineamento dei contatori con gli header di Strava.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, select
+
+from app.core.config import settings
+from app.db.database import engine
+from app.models.rate_limit import RateLimitWindow
+from app.services.rate_limiter import DAILY_WINDOW, SHORT_WINDOW, StravaRateLimiter
+
+# 7 minuti e mezzo prima della fine della finestra corta delle 10:00
+NOW = datetime(2024, 5, 1, 10, 7, 30)
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    """Scheduler con 10 chiamate ogni 15 minuti, metà per utente; i contatori sono salvati con il commit"""
+    monkeypatch.setattr(settings, "strava_rate_limit_safety", 0.0)
+    monkeypatch.setattr(settings, "strava_rate_limit_user_share", 0.5)
+    with engine.begin() as conn:
+        conn.execute(delete(RateLimitWindow))
+    limiter = StravaRateLimiter()
+    limiter._limits = {SHORT_WINDOW: 10, DAILY_WINDOW: 1000}
+    yield limiter
+    with engine.begin() as conn:
+        conn.execute(delete(RateLimitWindow))
+
+
+def _usage() -> dict:
+    with engine.connect() as conn:
+        return dict(conn.execute(select(RateLimitWindow.key, RateLimitWindow.usage)).all())
+
+
+def test_reserve_counts_every_window_and_rolls_back_refusals(limiter):
+    with limiter.for_user(7):
+        assert [limiter._reserve(NOW) for _ in range(5)] == [0.0] * 5
+        # Quota dell'utente esaurita: attesa fino alla fine della finestra corta
+        assert limiter._reserve(NOW) == 450.0
+    # La chiamata rifiutata non resta conteggiata sulle finestre già prenotate
+    assert _usage() == {SHORT_WINDOW: 5, DAILY_WINDOW: 5, "user:7": 5}
+
+    # Le chiamate senza utente usano il resto della finestra corta
+    assert [limiter._reserve(NOW) for _ in range(5)] == [0.0] * 5
+    assert limiter._reserve(NOW) == 450.0
+    assert _usage() == {SHORT_WINDOW: 10, DAILY_WINDOW: 10, "user:7": 5}
+
+
+def test_new_window_resets_short_usage(limiter):
+    for _ in range(10):
+        limiter._reserve(NOW)
+    assert limiter._reserve(NOW) > 0
+
+    assert limiter._reserve(NOW + timedelta(minutes=8)) == 0.0
+    assert _usage() == {SHORT_WINDOW: 1, DAILY_WINDOW: 11}
+
+
+def test_daily_budget_waits_until_midnight(limiter):
+    limiter._limits = {SHORT_WINDOW: 10, DAILY_WINDOW: 3}
+    for _ in range(3):
+        assert limiter._reserve(NOW) == 0.0
+    assert limiter._reserve(NOW) == (datetime(2024, 5, 2) - NOW).total_seconds()
+
+
+def test_record_only_raises_usage(limiter):
+    limiter.record({"X-RateLimit-Limit": "200,2000", "X-RateLimit-Usage": "50,300"}, 200)
+    assert limiter._limits == {SHORT_WINDOW: 200, DAILY_WINDOW: 2000}
+    assert _usage() == {SHORT_WINDOW: 50, DAILY_WINDOW: 300}
+
+    # Header di una risposta partita prima delle prenotazioni più recenti: i contatori non scendono
+    limiter.record({"X-RateLimit-Limit": "200,2000", "X-RateLimit-Usage": "10,20"}, 200)
+    assert _usage() == {SHORT_WINDOW: 50, DAILY_WINDOW: 300}
+
+    # 429 senza header: la finestra corta è considerata esaurita
+    limiter.record({}, 429)
+    assert _usage() == {SHORT_WINDOW: 200, DAILY_WINDOW: 300}
+    with engine.connect() as conn:
+        limits = dict(conn.execute(select(RateLimitWindow.key, RateLimitWindow.limit)).all())
+    assert limits == {SHORT_WINDOW: 200, DAILY_WINDOW: 2000}
@@ -0,0 +1,48 @@
+"""
+Indice dei record personali: aggiornato attività per attività e ricostruito da best_efforts.
+"""
+from datetime import datetime
+
+from sqlalchemy import select
+
+from app.models import BestEffort, PersonalRecord
+from app.models.personal_record import ALL_TIME
+from app.services.best_efforts import BEST_EFFORT_DISTANCES
+from app.services.records import rebuild_records
+from app.services.strava_service import StravaService
+
+
+def _records(db):
+    return sorted(db.execute(select(
+        PersonalRecord.type_key, PersonalRecord.year, PersonalRecord.distance, PersonalRecord.rank,
+        PersonalRecord.activity_id, PersonalRecord.elapsed_time
+    )).all())
+
+
+def test_incremental_records_match_rebuild(db_session, user, add_activity, synthetic_streams):
+    """Record aggiornati attività per attività (anche con eliminazioni) = ricostruiti da best_efforts"""
+    activities = [
+        add_activity(datetime(2022 + index % 3, 1 + index, 5, 7), "Run" if index % 4 else "TrailRun",
+                     streams=synthetic_streams(1800 + 300 * index, seed=index))
+        for index in range(8)
+    ]
+    StravaService().delete_activities(db_session, [activities[2].id, activities[5].id])
+    incremental = _records(db_session)
+    assert incremental
+    assert {record.year for record in incremental} >= {ALL_TIME, 2022}
+
+    rebuild_records(db_session, [user.id])
+    assert _records(db_session) == incremental
+
+
+def test_all_time_record_is_best_effort(db_session, user, add_activity, synthetic_streams):
+    for index in range(3):
+        add_activity(datetime(2023, 3, 1 + index), streams=synthetic_streams(2400, seed=10 + index))
+    fastest = db_session.execute(
+        select(BestEffort).where(BestEffort.distance == BEST_EFFORT_DISTANCES["Best 5K"]).order_by(BestEffort.elapsed_time)
+    ).scalars().first()
+    record = db_session.execute(select(PersonalRecord).where(
+        PersonalRecord.user_id == user.id, PersonalRecord.year == ALL_TIME,
+        PersonalRecord.distance == fastest.distance, PersonalRecord.rank == 1
+    )).scalar_one()
+    assert (record.activity_id, record.elapsed_time) == (fastest.activity_id, fastest.elapsed_time)
@@ -0,0 +1,65 @@
+"""
+Totali per giorno, settimana e mese: gli aggiornamenti incrementali della sync
+devono coincidere con la ricostruzione da zero.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from app.models import Activity, ActivityRollup
+from app.services.rollups import SUM_COLUMNS, rebuild_rollups
+from app.services.strava_service import StravaService
+
+
+def _rollups(db, user_id: int) -> list:
+    rows = db.execute(select(ActivityRollup).where(ActivityRollup.user_id == user_id)).scalars()
+    return sorted(
+        (row.period, row.bucket, row.type_key, *(round(getattr(row, column), 6) for column in SUM_COLUMNS))
+        for row in rows
+    )
+
+
+def test_incremental_rollups_match_rebuild(db_session, user, strava_summary):
+    service = StravaService()
+    summaries = [
+        strava_summary(index, start_date=datetime(2024, 1, 1, 7) + timedelta(days=3 * index),
+                       average_heartrate=140.0 + index if index % 2 else None, average_watts=200.0 if index % 3 == 0 else None)
+        for index in range(30)
+    ]
+    service._upsert_activities_chunk(db_session, user, summaries[:20])
+    service._upsert_activities_chunk(db_session, user, summaries[20:])
+
+    # Re-sync con attività corrette su Strava: distanza, tempi e tipo
+    summaries[4].distance += 1500.0
+    summaries[7].moving_time = 2400
+    summaries[11].type = "Ride"
+    summaries[12].distance = 0.0
+    service._upsert_activities_chunk(db_session, user, summaries[:15])
+    ids = dict(db_session.query(Activity.strava_activity_id, Activity.id).filter(Activity.user_id == user.id))
+    service.delete_activities(db_session, [ids[summaries[2].id], ids[summaries[25].id]])
+    db_session.flush()
+    incremental = _rollups(db_session, user.id)
+    assert incremental
+
+    rebuild_rollups(db_session, [user.id])
+    assert _rollups(db_session, user.id) == incremental
+
+
+def test_emptied_buckets_are_deleted(db_session, user, strava_summary):
+    service = StravaService()
+    service._upsert_activities_chunk(db_session, user, [
+        strava_summary(1, start_date=datetime(2024, 3, 5, 7)),
+        strava_summary(2, start_date=datetime(2024, 5, 20, 7)),
+    ])
+    assert {row[:3] for row in _rollups(db_session, user.id)} >= {("month", datetime(2024, 3, 1).date(), "run")}
+
+    # L'unica attività di marzo cambia tipo e poi viene eliminata: i suoi bucket spariscono
+    march = strava_summary(1, start_date=datetime(2024, 3, 5, 7), type="Ride")
+    service._upsert_activities_chunk(db_session, user, [march])
+    assert not any(row[1] == datetime(2024, 3, 5).date() and row[2] == "run" for row in _rollups(db_session, user.id))
+    activity_id = db_session.query(Activity.id).filter(Activity.strava_activity_id == march.id).scalar()
+    service.delete_activities(db_session, [activity_id])
+    db_session.flush()
+    assert {(row[0], row[1]) for row in _rollups(db_session, user.id)} == {
+        ("day", datetime(2024, 5, 20).date()), ("week", datetime(2024, 5, 20).date()), ("month", datetime(2024, 5, 1).date())
+    }
@@ -0,0 +1,53 @@
+"""
+Sync delle attività con l'elenco di Strava simulato: pagine salvate una alla volta
+e ripresa dal checkpoint dopo un'interruzione.
+"""
+import pytest
+
+from app.db.database import SessionLocal
+from app.models import Activity, User
+from app.services import strava_service
+from app.services.rate_limiter import StravaRateLimitError
+from app.services.strava_service import StravaService
+
+
+def test_interrupted_sync_resumes_from_checkpoint(committed_user, strava_summary, monkeypatch):
+    monkeypatch.setattr(strava_service, "STRAVA_PAGE_SIZE", 3)
+    summaries = [strava_summary(index) for index in range(8)]
+    requested = []
+    rate_limited = {3}
+
+    def get_page(client, after, before, page):
+        requested.append(page)
+        if page in rate_limited:
+            rate_limited.discard(page)
+            raise StravaRateLimitError("Rate limit exceeded for Strava API.", 60)
+        return summaries[(page - 1) * 3:page * 3]
+
+    service = StravaService()
+    monkeypatch.setattr(service, "_get_activities_page", get_page)
+    monkeypatch.setattr(service, "_ingest_laps", lambda db, user, progress: 0)
+    saved = {}
+
+    db = SessionLocal()
+    try:
+        user = db.get(User, committed_user.id)
+        with pytest.raises(StravaRateLimitError):
+            service.sync_user_activities(db, user, None, lambda **counters: saved.update(counters))
+        # Le prime due pagine sono già salvate e il checkpoint indica da dove ripartire
+        assert requested == [1, 2, 3]
+        assert saved["checkpoint"]["page"] == 2
+        assert db.query(Activity).filter(Activity.user_id == user.id).count() == 6
+
+        requested.clear()
+        result = service.sync_user_activities(
+            db, user, None, lambda **counters: saved.update(counters), checkpoint=saved["checkpoint"]
+        )
+        assert requested == [3]
+        assert result["synced_count"] == 8
+        stored = [row.strava_activity_id for row in db.query(Activity.strava_activity_id).filter(Activity.user_id == user.id)]
+        assert sorted(stored) == [summary.id for summary in summaries]
+        db.refresh(user)
+        assert user.sync_cursor == summaries[-1].start_date
+    finally:
+        db.close()
@@ -0,0 +1,47 @@
+"""
+Finestre temporali degli stream lette dall'archivio mmap e dalle righe ancora in JSON.
+"""
+import json
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from app.services.stream_archive import archive_path, read_stream_range
+from app.services.stream_store import save_streams
+
+
+def test_time_window_is_read_from_archive(db_session, add_activity, synthetic_streams):
+    streams = synthetic_streams(600, seed=3)
+    activity = add_activity(datetime(2024, 5, 1, 7), streams=streams)
+
+    window = read_stream_range(db_session, activity, ["heartrate"], 100.5, 200)
+    assert archive_path(activity.id).exists()
+    assert list(window) == ["heartrate"]
+    np.testing.assert_array_equal(window["heartrate"], streams["heartrate"][101:201])
+
+    # Estremi inclusi; senza intervallo tutte le righe
+    assert read_stream_range(db_session, activity, ["time"], 0, 10)["time"].tolist() == list(range(11))
+    assert read_stream_range(db_session, activity, ["time"], 590, None)["time"].tolist() == list(range(590, 600))
+    assert read_stream_range(db_session, activity)["time"].shape == (600,)
+    assert read_stream_range(db_session, activity, ["time"], 700, 800)["time"].tolist() == []
+
+
+def test_archive_follows_new_streams(db_session, add_activity, synthetic_streams):
+    activity = add_activity(datetime(2024, 5, 1, 7), streams=synthetic_streams(300, seed=4))
+    assert read_stream_range(db_session, activity, ["time"], 0, 1000)["time"].shape == (300,)
+
+    save_streams(db_session, activity, {"time": list(range(0, 400, 2)), "heartrate": [130] * 200})
+    db_session.flush()
+    window = read_stream_range(db_session, activity, ["time", "heartrate"], 10, 20)
+    assert window["time"].tolist() == [10, 12, 14, 16, 18, 20]
+    assert window["heartrate"].tolist() == [130] * 6
+
+
+def test_legacy_rows_are_sliced_in_memory(db_session, add_activity):
+    activity = add_activity(datetime(2024, 5, 1, 7), detailed_data=json.dumps({"time": [0, 5, 10, 15], "distance": [0.0, 10.0, 20.0, 30.0]}))
+    assert read_stream_range(db_session, activity, ["distance"], 5, 10)["distance"].tolist() == [10.0, 20.0]
+
+    no_time = add_activity(datetime(2024, 5, 2, 7), detailed_data=json.dumps({"distance": [0.0, 10.0]}))
+    with pytest.raises(KeyError):
+        read_stream_range(db_session, no_time, ["distance"], 0, 10)
@@ -0,0 +1,113 @@
+"""
+Formato binario degli stream: dtype compatti, valori mancanti, decodifica parziale e
+lettura delle righe ancora in JSON.
+"""
+import asyncio
+import json
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.activities import get_activity_detail
+from app.core.config import settings
+from app.db.database import SessionLocal, create_async_db_engine
+from app.models import Activity, User
+from app.models.activity import STREAM_FETCHED
+from app.services.stream_store import decode_streams, encode_streams, load_streams, save_streams, streams_to_json
+
+
+def test_round_trip_keeps_values_and_compact_dtypes():
+    streams = {
+        "time": [0, 1, 2, 4],
+        "heartrate": [120, 121, 125, 130],
+        "watts": [200, 70000, 0, 250],  # oltre uint16
+        "distance": [0.0, 3.1, 6.25, 12.5],
+        "altitude": [101.5, None, 102.0, 102.5],
+        "latlng": [[45.1, 7.6], [45.1001, 7.6001], [45.1002, 7.6002], [45.1003, 7.6003]],
+    }
+    decoded = decode_streams(encode_streams(streams))
+
+    assert {name: array.dtype.str for name, array in decoded.items()} == {
+        "time": "<u2", "heartrate": "<u2", "watts": "<u4", "distance": "<f4", "altitude": "<f4", "latlng": "<f4"
+    }
+    for name in ("time", "heartrate", "watts"):
+        assert decoded[name].tolist() == streams[name]
+    np.testing.assert_allclose(decoded["distance"], streams["distance"])
+    assert decoded["latlng"].shape == (4, 2)
+    np.testing.assert_allclose(decoded["latlng"], streams["latlng"], rtol=1e-6)
+    # I valori mancanti delle misure continue restano NaN e tornano null nel JSON
+    assert np.isnan(decoded["altitude"][1])
+    assert json.loads(streams_to_json(decoded))["altitude"] == {"data": [101.5, None, 102.0, 102.5]}
+
+
+def test_integer_streams_keep_missing_and_negative_values():
+    decoded = decode_streams(encode_streams({
+        "heartrate": [120, None, 0, 125],
+        "temp": [-3, -1, 0, 2],
+        "watts": [-70000, 0, 250, 300],
+    }))
+
+    # Il punto mancante resta NaN (e null nel JSON), distinto dallo zero registrato
+    assert decoded["heartrate"].dtype.str == "<f4"
+    assert json.loads(streams_to_json(decoded))["heartrate"] == {"data": [120.0, None, 0.0, 125.0]}
+    assert decoded["temp"].dtype.str == "<i2"
+    assert decoded["temp"].tolist() == [-3, -1, 0, 2]
+    assert decoded["watts"].dtype.str == "<i4"
+    assert decoded["watts"].tolist() == [-70000, 0, 250, 300]
+
+
+def test_decode_only_requested_types():
+    data = encode_streams({"time": [0, 1], "heartrate": [100, 101], "distance": [0.0, 2.0]})
+    assert list(decode_streams(data, ["heartrate"])) == ["heartrate"]
+
+
+def test_legacy_json_rows_are_read_until_migrated(db_session, add_activity):
+    legacy = {"time": [0, 1, 2], "distance": [0.0, 2.5, 5.0]}
+    activity = add_activity(datetime(2024, 5, 1, 7), detailed_data=json.dumps(legacy))
+    streams = load_streams(db_session, activity)
+    assert streams["time"].tolist() == legacy["time"]
+    assert streams["distance"].dtype == np.float32
+
+    # Anche le righe nel formato del frontend ({tipo: {"data": valori}})
+    wrapped = add_activity(datetime(2024, 5, 2, 7), detailed_data=streams_to_json(streams))
+    assert load_streams(db_session, wrapped)["distance"].tolist() == legacy["distance"]
+
+    # Dopo il salvataggio nel formato binario vale la riga di activity_streams
+    save_streams(db_session, activity, {"time": [0, 1, 2, 3], "distance": [0.0, 2.5, 5.0, 7.5]})
+    db_session.flush()
+    assert load_streams(db_session, activity, ["time"])["time"].tolist() == [0, 1, 2, 3]
+
+
+def test_detail_endpoint_keeps_the_frontend_stream_format(committed_user):
+    """ActivityDetail.tsx legge detailed_data come {tipo: {"data": valori}}"""
+    db = SessionLocal()
+    try:
+        activity = Activity(
+            strava_activity_id=8 * 10 ** 8, user_id=committed_user.id, name="Dettaglio", type="Run",
+            start_date=datetime(2024, 5, 1, 7), distance=20.0, moving_time=3, elapsed_time=3,
+            stream_status=STREAM_FETCHED
+        )
+        db.add(activity)
+        db.flush()
+        save_streams(db, activity, {"time": [0, 1, 2, 3], "heartrate": [120, 121, 122, 123], "distance": [0.0, 5.0, 10.0, 20.0]})
+        db.commit()
+        activity_id = activity.id
+    finally:
+        db.close()
+
+    async def detail():
+        async_engine = create_async_db_engine(settings.database_url)
+        try:
+            async with AsyncSession(async_engine, expire_on_commit=False) as session:
+                user = await session.get(User, committed_user.id)
+                return await get_activity_detail(activity_id, db=session, current_user=user)
+        finally:
+            await async_engine.dispose()
+
+    detailed_data = json.loads(asyncio.run(detail())["detailed_data"])
+    assert detailed_data == {
+        "time": {"data": [0, 1, 2, 3]},
+        "heartrate": {"data": [120, 121, 122, 123]},
+        "distance": {"data": [0.0, 5.0, 10.0, 20.0]},
+    }
@@ -0,0 +1,123 @@
+"""
+Coda dei job di sincronizzazione: un solo job attivo per utente (indice
+uq_sync_jobs_active_user) e ripresa dei job abbandonati da un worker.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.models import SyncJob
+from app.services import rate_limiter as rate_limiter_module, sync_jobs
+from app.services.rate_limiter import rate_limiter
+from app.services.sync_jobs import SyncJobWorker, enqueue_sync_job
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _set_job(db, job_id: int, **values) -> None:
+    db.execute(update(SyncJob).where(SyncJob.id == job_id).values(**values))
+    db.commit()
+
+
+def test_duplicate_requests_collapse_into_active_job(db, committed_user):
+    job = enqueue_sync_job(db, committed_user, "sync", {"full": True})
+    assert enqueue_sync_job(db, committed_user, "smart").id == job.id
+    assert db.query(SyncJob).filter(SyncJob.user_id == committed_user.id).count() == 1
+
+    # Un job concluso non blocca le richieste successive
+    _set_job(db, job.id, status="completed", finished_at=datetime.utcnow())
+    assert enqueue_sync_job(db, committed_user, "smart").id != job.id
+
+
+def test_unique_index_allows_one_active_job_per_user(db, committed_user):
+    db.add(SyncJob(user_id=committed_user.id, kind="sync", status="running", params={}))
+    db.commit()
+    db.add(SyncJob(user_id=committed_user.id, kind="smart", status="queued", params={}))
+    with pytest.raises(IntegrityError):
+        db.commit()
+    db.rollback()
+
+    db.add(SyncJob(user_id=committed_user.id, kind="smart", status="failed", params={}))
+    db.commit()
+
+
+def test_concurrent_enqueue_returns_the_winner(db, committed_user, monkeypatch):
+    """Due richieste che non vedono ancora un job attivo: la seconda riceve quello della prima"""
+    winner = enqueue_sync_job(db, committed_user, "sync")
+    get_active_job = sync_jobs.get_active_job
+    calls = []
+
+    def not_yet_visible(session, user_id):
+        calls.append(user_id)
+        return None if len(calls) == 1 else get_active_job(session, user_id)
+
+    monkeypatch.setattr(sync_jobs, "get_active_job", not_yet_visible)
+    assert enqueue_sync_job(db, committed_user, "smart").id == winner.id
+    assert len(calls) == 2
+
+
+def test_stale_running_job_is_reclaimed(db, committed_user):
+    job = enqueue_sync_job(db, committed_user, "sync")
+    worker = SyncJobWorker()
+    assert worker._claim_next_job() == job.id
+    # In esecuzione e con progressi recenti: nessun altro worker lo prende
+    assert worker._claim_next_job() is None
+
+    stalled_at = datetime.utcnow() - timedelta(seconds=settings.sync_job_stale_after + 60)
+    _set_job(db, job.id, updated_at=stalled_at)
+    assert worker._claim_next_job() == job.id
+    db.refresh(job)
+    assert job.status == "running"
+    assert job.updated_at > stalled_at
+
+
+def test_requeued_job_waits_for_run_after(db, committed_user):
+    job = enqueue_sync_job(db, committed_user, "sync")
+    _set_job(db, job.id, run_after=datetime.utcnow() + timedelta(minutes=5))
+    worker = SyncJobWorker()
+    assert worker._claim_next_job() is None
+
+    _set_job(db, job.id, run_after=datetime.utcnow() - timedelta(seconds=1))
+    assert worker._claim_next_job() == job.id
+
+
+def test_long_rate_limit_wait_requeues_instead_of_stalling(db, committed_user, monkeypatch):
+    """Un'attesa oltre sync_job_stale_after non tiene il job "running": torna in coda con run_after"""
+    job = enqueue_sync_job(db, committed_user, "sync")
+    worker = SyncJobWorker()
+    assert worker._claim_next_job() == job.id
+
+    daily_reset = 6 * 3600
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        raise RuntimeError("il worker non deve restare in attesa")
+
+    monkeypatch.setattr(settings, "sync_job_max_wait", 86400)
+    monkeypatch.setattr(rate_limiter, "_reserve", lambda now: float(daily_reset))
+    monkeypatch.setattr(rate_limiter_module.time, "sleep", sleep)
+    monkeypatch.setattr(worker.strava_service, "refresh_access_token", lambda user, session: True)
+    monkeypatch.setattr(
+        worker.strava_service, "sync_user_activities",
+        lambda *args, **kwargs: rate_limiter.acquire()
+    )
+    worker._execute(job.id)
+
+    db.refresh(job)
+    assert sleeps == []
+    assert job.status == "queued"
+    assert job.run_after > datetime.utcnow() + timedelta(seconds=settings.sync_job_stale_after)
+    # Nessun worker lo riprende prima del reset del budget
+    assert worker._claim_next_job() is None
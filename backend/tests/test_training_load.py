@@ -0,0 +1,94 @@
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models import Activity, TrainingLoad
+from app.services.strava_service import StravaService
+from app.services.training_load import (
+    TRIMP_EXPONENT, TRIMP_WEIGHT, rebuild_training_load, read_training_load, stream_trimp, summary_trimp,
+    update_training_load,
+)
+
+HEARTRATES = (60.0, 190.0)
+
+
+def reference_trimp(minutes: float, heartrate: float) -> float:
+    reserve = (heartrate - HEARTRATES[0]) / (HEARTRATES[1] - HEARTRATES[0])
+    return minutes * reserve * TRIMP_WEIGHT * np.exp(TRIMP_EXPONENT * reserve)
+
+
+def test_trimp_from_streams_and_summary():
+    assert summary_trimp(150, 3600, HEARTRATES) == pytest.approx(reference_trimp(60, 150))
+    assert summary_trimp(None, 3600, HEARTRATES) == 0.0
+    streams = {
+        "time": np.arange(3601.0),
+        "heartrate": np.full(3601, 150.0),
+        "moving": np.r_[np.ones(1801), np.zeros(600), np.ones(1200)],
+    }
+    # Pause e frequenza a 0 non contano: 50 minuti a 150 bpm
+    streams["heartrate"][100:160] = 0
+    assert stream_trimp(streams, HEARTRATES) == pytest.approx(reference_trimp((3000 - 60) / 60, 150))
+    assert stream_trimp({"time": np.arange(10.0)}, HEARTRATES) is None
+
+
+def reference_loads(daily: list) -> list:
+    """ATL, CTL e TSB (CTL - ATL del giorno prima) giorno per giorno"""
+    atl = ctl = 0.0
+    rows = []
+    for trimp in daily:
+        tsb = ctl - atl
+        atl += (trimp - atl) / settings.training_atl_days
+        ctl += (trimp - ctl) / settings.training_ctl_days
+        rows.append((trimp, atl, ctl, tsb))
+    return rows
+
+
+def _loads(db, user_id):
+    return db.execute(select(TrainingLoad.day, TrainingLoad.trimp, TrainingLoad.atl, TrainingLoad.ctl, TrainingLoad.tsb).where(
+        TrainingLoad.user_id == user_id
+    ).order_by(TrainingLoad.day)).all()
+
+
+def test_incremental_load_matches_daily_reference(db_session, user, add_activity, synthetic_streams):
+    start = datetime(2024, 1, 1, 7)
+    rng = np.random.default_rng(1)
+    offsets = sorted(rng.choice(120, 45, replace=False).tolist())
+    activities = []
+    for position, offset in enumerate(offsets):
+        activity = add_activity(start + timedelta(days=offset), average_heartrate=130 + offset % 30,
+                                streams=synthetic_streams(900, seed=offset) if position % 5 == 0 else None)
+        if activity.trimp is None:
+            activity.trimp = summary_trimp(activity.average_heartrate, activity.moving_time, HEARTRATES)
+            update_training_load(db_session, user.id, activity.start_date.date())
+        activities.append(activity)
+    # Modifiche ed eliminazioni nel mezzo: si riscrivono solo i giorni successivi
+    activities[11].average_heartrate = 175
+    activities[11].trimp = summary_trimp(175, activities[11].moving_time, HEARTRATES)
+    update_training_load(db_session, user.id, activities[11].start_date.date())
+    StravaService().delete_activities(db_session, [activities[20].id, activities[30].id])
+
+    incremental = _loads(db_session, user.id)
+    daily = np.zeros((incremental[-1].day - incremental[0].day).days + 1)
+    for trimp, start_date in db_session.execute(select(Activity.trimp, Activity.start_date).where(Activity.user_id == user.id)):
+        daily[(start_date.date() - incremental[0].day).days] += trimp
+    expected = reference_loads(daily.tolist())
+    assert incremental[0].day == start.date() + timedelta(days=offsets[0])
+    assert np.allclose([row[1:] for row in incremental], expected)
+
+    rebuild_training_load(db_session, user.id, HEARTRATES)
+    assert np.allclose([row[1:] for row in _loads(db_session, user.id)], [row[1:] for row in incremental])
+
+
+def test_read_decays_after_last_day(db_session, user, add_activity):
+    # Senza righe salvate il carico dell'utente si calcola per intero, con il TRIMP dalla frequenza media
+    add_activity(datetime(2024, 6, 1, 7), average_heartrate=150, moving_time=3000)
+    update_training_load(db_session, user.id, date(2024, 6, 1))
+    trimp = summary_trimp(150, 3000, HEARTRATES)
+    days = read_training_load(db_session, user.id, date(2024, 5, 31), date(2024, 6, 4))
+    assert [day["trimp"] for day in days] == pytest.approx([0.0, trimp, 0.0, 0.0, 0.0])
+    expected = reference_loads([trimp, 0.0, 0.0, 0.0])
+    for day, (_, atl, ctl, tsb) in zip(days[1:], expected):
+        assert (day["atl"], day["ctl"], day["tsb"]) == pytest.approx((atl, ctl, tsb))
@@ -0,0 +1,58 @@
+"""
+Eventi webhook di Strava: una raffica di modifiche sulla stessa attività viene
+elaborata una sola volta, alla chiusura della finestra di debounce.
+"""
+import calendar
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.models import Activity, WebhookEvent
+from app.services.webhook_events import WebhookEventWorker, enqueue_webhook_event
+
+
+def _event(strava_activity_id: int, owner_id: int, updates: dict, seconds: int) -> dict:
+    return {
+        "object_type": "activity", "object_id": strava_activity_id, "aspect_type": "update", "owner_id": owner_id,
+        "updates": updates, "event_time": calendar.timegm(datetime(2024, 5, 1, 9, 0, seconds).timetuple())
+    }
+
+
+def test_burst_of_updates_is_processed_once_after_debounce(committed_user, monkeypatch):
+    monkeypatch.setattr(settings, "webhook_debounce_seconds", 60)
+    db = SessionLocal()
+    try:
+        activity = Activity(
+            strava_activity_id=6 * 10 ** 8, user_id=committed_user.id, name="Corsa", type="Run",
+            start_date=datetime(2024, 5, 1, 7), distance=10000.0, moving_time=3000, elapsed_time=3100
+        )
+        db.add(activity)
+        db.commit()
+
+        for index in range(3):
+            event = enqueue_webhook_event(
+                db, _event(activity.strava_activity_id, committed_user.strava_id, {"title": f"Titolo {index}"}, index)
+            )
+        # Ogni evento sposta in avanti la finestra di quelli ancora in attesa
+        pending = db.query(WebhookEvent).filter(WebhookEvent.object_id == activity.strava_activity_id).all()
+        assert {pending_event.process_after for pending_event in pending} == {event.process_after}
+
+        worker = WebhookEventWorker()
+        assert worker.run_once() == 0
+
+        db.execute(
+            update(WebhookEvent)
+            .where(WebhookEvent.object_id == activity.strava_activity_id)
+            .values(process_after=datetime.utcnow() - timedelta(seconds=1))
+        )
+        db.commit()
+        assert worker.run_once() == 3
+        assert worker.run_once() == 0
+
+        db.expire_all()
+        assert activity.name == "Titolo 2"
+        assert {pending_event.status for pending_event in pending} == {"done"}
+    finally:
+        db.close()
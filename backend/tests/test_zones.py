@@ -0,0 +1,54 @@
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import select
+
+from app.models import ActivityZone
+from app.models.activity_zone import ZONE_HEARTRATE, ZONE_PACE
+from app.services.stream_store import decode_streams, encode_streams
+from app.services.zones import compute_time_in_zones, rebuild_user_zones, zone_bounds
+
+BOUNDS = zone_bounds(None)
+
+
+def reference_zone(value: float, bounds: list) -> int:
+    return sum(value >= bound for bound in bounds)
+
+
+def test_time_in_zones_matches_point_by_point_sum(synthetic_streams):
+    raw = synthetic_streams(3000, seed=5)
+    streams = decode_streams(encode_streams(raw))
+    zones = compute_time_in_zones(streams, BOUNDS)
+
+    expected = {ZONE_HEARTRATE: np.zeros(len(BOUNDS[ZONE_HEARTRATE]) + 1), ZONE_PACE: np.zeros(len(BOUNDS[ZONE_PACE]) + 1)}
+    pace_speeds = sorted(1000.0 / pace for pace in BOUNDS[ZONE_PACE])
+    for index in range(1, len(raw["time"])):
+        if not raw["moving"][index]:
+            continue
+        seconds = raw["time"][index] - raw["time"][index - 1]
+        expected[ZONE_HEARTRATE][reference_zone(raw["heartrate"][index], BOUNDS[ZONE_HEARTRATE])] += seconds
+        expected[ZONE_PACE][reference_zone(float(streams["velocity_smooth"][index]), pace_speeds)] += seconds
+    for kind in expected:
+        assert np.allclose(zones[kind], expected[kind])
+    assert zones[ZONE_HEARTRATE].sum() == sum(raw["moving"][1:])
+
+
+def test_missing_values_and_streams():
+    streams = {"time": np.arange(5.0), "heartrate": np.array([0, 150, np.nan, 150, 150], dtype=np.float32)}
+    zones = compute_time_in_zones(streams, BOUNDS)
+    assert list(zones) == [ZONE_HEARTRATE]
+    # Frequenza 0 o mancante: il punto non conta; gli altri tre secondi sono in zona 2 (142-162)
+    assert zones[ZONE_HEARTRATE].tolist() == [0, 3, 0, 0, 0]
+    assert compute_time_in_zones({"heartrate": np.array([150.0])}, BOUNDS) == {}
+
+
+def test_rebuild_matches_zones_saved_with_streams(db_session, user, add_activity, synthetic_streams):
+    for index in range(3):
+        add_activity(datetime(2024, 4, 1 + index), streams=synthetic_streams(1200, seed=20 + index))
+    query = select(ActivityZone.activity_id, ActivityZone.kind, ActivityZone.zone, ActivityZone.seconds).order_by(
+        ActivityZone.activity_id, ActivityZone.kind, ActivityZone.zone
+    )
+    saved = db_session.execute(query).all()
+    assert saved
+    assert rebuild_user_zones(db_session, user.id) == 3
+    assert db_session.execute(query).all() == saved
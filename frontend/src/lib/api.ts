@@ -27,14 +27,53 @@ export interface Activity {
   max_heartrate?: number;
   average_cadence?: number;
   average_watts?: number;
+  trimp?: number | null; // carico di allenamento (TRIMP)
+  // Solo nel dettaglio: l'elenco restituisce i campi di riepilogo
   map_polyline?: string;
   summary_polyline?: string;
   detailed_data?: string;
+  stream_status?: 'pending' | 'fetched' | 'failed' | 'unavailable';
+  best_efforts?: BestEffort[];
+  mean_max?: Partial<Record<'speed' | 'power', Array<{ duration: number; value: number }>>>;
   created_at: string;
   updated_at: string;
   laps?: Lap[];
 }
 
+export interface BestEffort {
+  name: string;  // es. "Best 5K"
+  distance: number;
+  elapsed_time: number;
+  start_index: number;
+  end_index: number;
+}
+
+export interface ActivityStreams {
+  activity_id: number;
+  stream_status: 'pending' | 'fetched' | 'failed' | 'unavailable';
+  points: number | null;
+  streams: Record<string, Array<number | number[] | null>> | null;
+  envelopes: Record<string, { min: Array<number | null>; max: Array<number | null> }> | null;
+}
+
+export interface ActivityRoute {
+  activity_id: number;
+  zoom: number | null;
+  point_count: number | null;
+  polyline: string | null;
+}
+
+export interface ActivityRoutes {
+  zoom: number | null;
+  routes: Array<{
+    activity_id: number;
+    name: string;
+    type: string;
+    start_date: string;
+    polyline: string;
+  }>;
+}
+
 export interface Lap {
   id: number;
   lap_index: number;
@@ -50,6 +89,7 @@ export interface UserStats {
   total_time: number;
   total_elevation: number;
   average_pace: number;
+  average_heartrate?: number | null;
   total_activities_all?: number;
   num_bike?: number;
   num_tennis?: number;
@@ -65,15 +105,80 @@ export interface Trends {
   }>;
 }
 
-export interface SyncResult {
-  message: string;
-  sync_result: {
+export interface PersonalRecords {
+  activity_type: string;
+  year: number | null;
+  records: Array<{
+    key: string;
+    name: string;
+    distance: number;
+    efforts: Array<{
+      rank: number;
+      activity_id: number;
+      activity_name: string;
+      elapsed_time: number;
+      start_date: string;
+    }>;
+  }>;
+}
+
+export interface MeanMaxCurve {
+  activity_type: string;
+  year: number | null;
+  kind: 'speed' | 'power';
+  // value: miglior media in m/s (speed) o watt (power) su duration secondi in movimento
+  points: Array<{ duration: number; value: number; activity_id: number; activity_name: string; start_date: string }>;
+}
+
+export interface ZoneDistribution {
+  period: 'week' | 'month' | 'total';
+  activity_type: string | null;
+  heartrate_bounds: number[]; // bpm, limiti fra le zone
+  pace_bounds: number[]; // secondi al km, limiti fra le zone
+  heartrate: number[]; // secondi per zona, dalla più facile
+  pace: number[];
+  buckets: Array<{ start: string; heartrate: number[]; pace: number[] }>;
+}
+
+export interface TrainingLoadSeries {
+  start_date: string;
+  end_date: string;
+  atl_days: number;
+  ctl_days: number;
+  // atl = fatica, ctl = forma fisica, tsb = forma del giorno (CTL - ATL del giorno prima)
+  days: Array<{ date: string; trimp: number; atl: number; ctl: number; tsb: number }>;
+}
+
+export interface SyncJob {
+  id: number;
+  user_id: number;
+  kind: 'sync' | 'smart' | 'extend' | 'auto';
+  status: 'queued' | 'running' | 'completed' | 'failed';
+  pages_fetched: number;
+  activities_upserted: number;
+  streams_pending: number;
+  streams_fetched: number;
+  laps_synced: number;
+  eta_seconds?: number | null;
+  result?: {
     synced_count: number;
     updated_count: number;
     total_activities: number;
-  };
+    laps_synced?: number;
+  } | null;
+  error?: string | null;
+  started_at?: string | null;
+  finished_at?: string | null;
 }
 
+export interface SyncJobResponse {
+  message: string;
+  job_id: number;
+  job: SyncJob;
+}
+
+const SYNC_POLL_INTERVAL_MS = 2000;
+
 class ApiService {
   // JWT token management
   private getToken(): string | null {
@@ -162,23 +267,44 @@ class ApiService {
   }
 
   // Activities endpoints
-  async syncActivities(afterDate?: string): Promise<SyncResult> {
+  // La sync gira in background sul server: le POST restituiscono un job che viene interrogato fino al termine
+  async syncActivities(afterDate?: string): Promise<SyncJob> {
     const params = afterDate ? `?after_date=${afterDate}` : '';
-    return this.request(`/activities/sync${params}`, {
+    const { job_id } = await this.request<SyncJobResponse>(`/activities/sync${params}`, {
       method: 'POST',
     });
+    return this.waitForSyncJob(job_id);
   }
 
-  async syncActivitiesSmart(): Promise<SyncResult> {
-    return this.request(`/activities/sync/smart`, {
+  async syncActivitiesSmart(): Promise<SyncJob> {
+    const { job_id } = await this.request<SyncJobResponse>(`/activities/sync/smart`, {
       method: 'POST',
     });
+    return this.waitForSyncJob(job_id);
   }
 
-  async syncActivitiesExtend(monthsBack: number = 12): Promise<SyncResult> {
-    return this.request(`/activities/sync/extend?months_back=${monthsBack}`, {
+  async syncActivitiesExtend(monthsBack: number = 12): Promise<SyncJob> {
+    const { job_id } = await this.request<SyncJobResponse>(`/activities/sync/extend?months_back=${monthsBack}`, {
       method: 'POST',
     });
+    return this.waitForSyncJob(job_id);
+  }
+
+  async getSyncJob(jobId: number): Promise<SyncJobResponse> {
+    return this.request(`/activities/sync/${jobId}`);
+  }
+
+  async waitForSyncJob(jobId: number): Promise<SyncJob> {
+    for (;;) {
+      const { job } = await this.getSyncJob(jobId);
+      if (job.status === 'completed') {
+        return job;
+      }
+      if (job.status === 'failed') {
+        throw new Error(`Sync failed: ${job.error}`);
+      }
+      await new Promise((resolve) => setTimeout(resolve, SYNC_POLL_INTERVAL_MS));
+    }
   }
 
   async getUserActivities(
@@ -190,12 +316,15 @@ class ApiService {
       end_date?: string;
       sort_by?: string;
       sort_order?: string;
+      cursor?: string;
+      include_total?: boolean;
     }
   ): Promise<{
     activities: Activity[];
-    total: number;
+    total: number | null;
     skip: number;
     limit: number;
+    next_cursor: string | null;
   }> {
     const params = new URLSearchParams();
     if (options) {
@@ -213,6 +342,40 @@ class ApiService {
     return this.request(`/activities/${activityId}`);
   }
 
+  async getActivityStreams(
+    activityId: number,
+    types?: string[],
+    range?: { from_t?: number; to_t?: number; points?: number }
+  ): Promise<ActivityStreams> {
+    const params = new URLSearchParams();
+    if (types) params.append('types', types.join(','));
+    if (range?.from_t !== undefined) params.append('from_t', range.from_t.toString());
+    if (range?.to_t !== undefined) params.append('to_t', range.to_t.toString());
+    if (range?.points !== undefined) params.append('points', range.points.toString());
+    const query = params.toString();
+    return this.request(`/activities/${activityId}/streams${query ? `?${query}` : ''}`);
+  }
+
+  async getActivityRoute(activityId: number, zoom?: number): Promise<ActivityRoute> {
+    const params = zoom !== undefined ? `?zoom=${zoom}` : '';
+    return this.request(`/activities/${activityId}/route${params}`);
+  }
+
+  async getRoutes(
+    zoom: number,
+    options?: {
+      activity_type?: string;
+      startDate?: string;
+      endDate?: string;
+    }
+  ): Promise<ActivityRoutes> {
+    const params = new URLSearchParams({ zoom: zoom.toString() });
+    if (options?.activity_type) params.append('activity_type', options.activity_type);
+    if (options?.startDate) params.append('start_date', options.startDate);
+    if (options?.endDate) params.append('end_date', options.endDate);
+    return this.request(`/activities/routes/all?${params.toString()}`);
+  }
+
   async getUserStats(
     options?: {
       startDate?: string;
@@ -234,6 +397,37 @@ class ApiService {
     return this.request(`/activities/trends/summary?${params.toString()}`);
   }
 
+  async getRecords(options?: { activity_type?: string; year?: number }): Promise<PersonalRecords> {
+    const params = new URLSearchParams();
+    if (options?.activity_type) params.append('activity_type', options.activity_type);
+    if (options?.year) params.append('year', options.year.toString());
+    return this.request(`/records?${params.toString()}`);
+  }
+
+  async getMeanMaxCurve(options?: { activity_type?: string; kind?: 'speed' | 'power'; year?: number }): Promise<MeanMaxCurve> {
+    const params = new URLSearchParams();
+    if (options?.activity_type) params.append('activity_type', options.activity_type);
+    if (options?.kind) params.append('kind', options.kind);
+    if (options?.year) params.append('year', options.year.toString());
+    return this.request(`/records/mean-max?${params.toString()}`);
+  }
+
+  async getZoneDistribution(options?: { period?: 'week' | 'month' | 'total'; startDate?: string; endDate?: string; activity_type?: string }): Promise<ZoneDistribution> {
+    const params = new URLSearchParams();
+    if (options?.period) params.append('period', options.period);
+    if (options?.startDate) params.append('start_date', options.startDate);
+    if (options?.endDate) params.append('end_date', options.endDate);
+    if (options?.activity_type) params.append('activity_type', options.activity_type);
+    return this.request(`/activities/zones/summary?${params.toString()}`);
+  }
+
+  async getTrainingLoad(options?: { startDate?: string; endDate?: string }): Promise<TrainingLoadSeries> {
+    const params = new URLSearchParams();
+    if (options?.startDate) params.append('start_date', options.startDate);
+    if (options?.endDate) params.append('end_date', options.endDate);
+    return this.request(`/activities/training-load/summary?${params.toString()}`);
+  }
+
   // Health check
   async healthCheck(): Promise<{ status: string }> {
     return this.request('/health');
@@ -91,17 +91,14 @@ export default function Activities() {
   const handleLoadAll = async () => {
     if (!user?.id) return;
     setLoadingAll(true);
-    let skip = 0;
+    // Pagine successive con il cursore: nessun conteggio e nessun offset sullo storico
+    let cursor: string | undefined = undefined;
     let all: any[] = [];
-    let totalFetched = 0;
-    let totalCount = 0;
     do {
-      const res = await apiService.getUserActivities({ skip, limit: PAGE_SIZE });
+      const res = await apiService.getUserActivities({ limit: PAGE_SIZE, cursor });
       all = all.concat(res.activities);
-      totalFetched += res.activities.length;
-      totalCount = res.total;
-      skip += PAGE_SIZE;
-    } while (totalFetched < totalCount);
+      cursor = res.next_cursor ?? undefined;
+    } while (cursor);
     setAllActivities(all);
     setAllLoaded(true);
     setLoadingAll(false);
@@ -124,7 +121,7 @@ export default function Activities() {
       if (!user?.id) return;
       const res = await apiService.getUserActivities({ skip: page * PAGE_SIZE, limit: PAGE_SIZE });
       setPagedActivities(res.activities);
-      setTotal(res.total);
+      setTotal(res.total ?? 0);
     };
     fetchPage();
   }, [user?.id, page]);
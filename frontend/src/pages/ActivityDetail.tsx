@@ -26,6 +26,10 @@ function formatPaceMinutes(pace: number) {
   return `${min}:${sec.toString().padStart(2, '0')}/km`;
 }
 
+// Punti richiesti per i grafici: il backend serve il livello sottocampionato più vicino
+const CHART_POINTS = 1000;
+const CHART_STREAM_TYPES = ["time", "distance", "altitude", "velocity_smooth", "heartrate", "cadence", "watts"];
+
 // Config per ChartContainer (stile dashboard)
 const chartConfig = {
   quota: { label: "Altitudine", color: "hsl(var(--primary))" },
@@ -44,6 +48,8 @@ export default function ActivityDetail() {
 
   const [track, setTrack] = useState<[number, number][]>([]);
   const [streams, setStreams] = useState<any>(null);
+  // Stream sottocampionati per i grafici (pochi KB anche per attività lunghe)
+  const [chartStreams, setChartStreams] = useState<any>(null);
   const fileInputRef = useRef<HTMLInputElement>(null);
   const [gpxError, setGpxError] = useState<string | null>(null);
 
@@ -143,6 +149,7 @@ export default function ActivityDetail() {
 
         console.log("Heart rates estratti:", heartRates);
 
+        setChartStreams(null);
         setStreams((prev: any) => ({
           ...prev,
           altitude: { data: altitudes },
@@ -176,11 +183,26 @@ export default function ActivityDetail() {
         }
         if (data.detailed_data) {
           try {
-            setStreams(JSON.parse(data.detailed_data));
+            // Migliori tempi calcolati dal backend, nel formato { "Best 5K": secondi }
+            const bests = data.best_efforts?.length
+              ? Object.fromEntries(data.best_efforts.map((effort) => [effort.name, effort.elapsed_time]))
+              : undefined;
+            setStreams({ ...JSON.parse(data.detailed_data), bests });
           } catch (e) {
             setStreams(null);
           }
         }
+        try {
+          const res = await apiService.getActivityStreams(Number(id), CHART_STREAM_TYPES, { points: CHART_POINTS });
+          // Stesso formato di detailed_data usato dai grafici: { tipo: { data: [...] } }
+          setChartStreams(
+            res.streams
+              ? Object.fromEntries(Object.entries(res.streams).map(([type, values]) => [type, { data: values }]))
+              : null
+          );
+        } catch (e) {
+          setChartStreams(null);
+        }
       } catch (err: any) {
         setError(err.message || "Errore nel caricamento dell'attività");
       } finally {
@@ -192,11 +214,12 @@ export default function ActivityDetail() {
 
   const chartData = useMemo(() => {
     const arr: any[] = [];
-    if (streams && streams.distance && streams.distance.data) {
-      const n = streams.distance.data.length;
+    const source = chartStreams ?? streams;
+    if (source && source.distance && source.distance.data) {
+      const n = source.distance.data.length;
       for (let i = 0; i < n; i++) {
         // Normalizza la velocità: se è in m/s (GPX), converti in km/h
-        let velocita = streams.velocity_smooth?.data?.[i];
+        let velocita = source.velocity_smooth?.data?.[i];
         if (velocita != null && !isNaN(velocita)) {
           // Se la velocità è troppo bassa (< 20), probabilmente è in m/s (GPX)
           if (velocita < 20) {
@@ -211,23 +234,23 @@ export default function ActivityDetail() {
           ritmo = 60 / velocita;
         }
         // Quota
-        let quota = streams.altitude?.data?.[i];
+        let quota = source.altitude?.data?.[i];
         if (quota == null || isNaN(quota)) quota = null;
         arr.push({
-          distanza: streams.distance?.data?.[i] ?? null,
+          distanza: source.distance?.data?.[i] ?? null,
           quota,
           velocita,
           ritmo,
-          fc: streams.heartrate?.data?.[i] ?? null,
-          cadenza: streams.cadence?.data?.[i] ?? null,
-          potenza: streams.watts?.data?.[i] ?? null,
-          tempo: streams.time?.data?.[i] ?? null,
+          fc: source.heartrate?.data?.[i] ?? null,
+          cadenza: source.cadence?.data?.[i] ?? null,
+          potenza: source.watts?.data?.[i] ?? null,
+          tempo: source.time?.data?.[i] ?? null,
         });
       }
     }
     // Filtra punti completamente nulli o senza distanza
     return arr.filter(d => d.distanza != null && !isNaN(d.distanza));
-  }, [streams]);
+  }, [streams, chartStreams]);
 
   if (loading) {
     return (
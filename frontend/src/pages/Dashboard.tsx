@@ -27,6 +27,8 @@ import {
 } from "lucide-react";
 import { useAuth } from "@/hooks/useAuth";
 import { useActivities } from "@/hooks/useActivities";
+import { useQuery } from "@tanstack/react-query";
+import { apiService } from "@/lib/api";
 import { Button } from "@/components/ui/button";
 import { Alert, AlertDescription, AlertTitle } from "@/components/ui/alert";
 import { formatDistance, formatDuration, formatPace, haversine, formatRecordTime, getBestTimeForDistance } from "@/lib/utils"
@@ -60,6 +62,11 @@ export default function Dashboard() {
     isSyncing,
     syncError
   } = useActivities(user?.id || null, 'year');
+  const { data: records, isLoading: isLoadingRecords, isError: isRecordsError } = useQuery({
+    queryKey: ['records', user?.id, 'run'],
+    queryFn: () => apiService.getRecords({ activity_type: 'Run' }),
+    enabled: !!user?.id,
+  });
   
 
   const handleSyncAll = async () => {
@@ -143,37 +150,50 @@ export default function Dashboard() {
   const maxElevation = activities.filter(a => a.type === "Run").reduce((max, a) => ((a.total_elevation_gain || 0) > ((max?.total_elevation_gain) || 0) ? a : max), null);
 
   // --- RECORD PERSONALI ALL TIME ---
-  // Distanze standard (metri)
+  // Distanze standard: key è quella di /records (BEST_EFFORT_KEYS del backend), value in metri per la stima
   const allTimeDistances = [
-    { label: "400 m", value: 400 },
-    { label: "Mezzo miglio", value: 804.67 },
-    { label: "1 KM", value: 1000 },
-    { label: "1 miglio", value: 1609.34 },
-    { label: "2 miglia", value: 3218.68 },
-    { label: "5 km", value: 5000 },
-    { label: "10 km", value: 10000 },
-    { label: "15 KM", value: 15000 },
-    { label: "10 miglia", value: 16093.4 },
-    { label: "20 KM", value: 20000 },
-    { label: "Mezza maratona", value: 21097 },
+    { key: "400m", label: "400 m", value: 400 },
+    { key: "half_mile", label: "Mezzo miglio", value: 804.67 },
+    { key: "1k", label: "1 KM", value: 1000 },
+    { key: "mile", label: "1 miglio", value: 1609.34 },
+    { key: "2_mile", label: "2 miglia", value: 3218.68 },
+    { key: "5k", label: "5 km", value: 5000 },
+    { key: "10k", label: "10 km", value: 10000 },
+    { key: "15k", label: "15 KM", value: 15000 },
+    { key: "10_mile", label: "10 miglia", value: 16093.4 },
+    { key: "20k", label: "20 KM", value: 20000 },
+    { key: "half_marathon", label: "Mezza maratona", value: 21097.5 },
   ];
 
-  // Nuova lista record all time con logica "smart"
+  // Record dagli stream (indice /records del backend). La stima da lap e attività intere, che vede
+  // solo le attività già caricate, serve solo finché /records non risponde o se la richiesta fallisce
+  const recordsUnavailable = isLoadingRecords || isRecordsError;
   const allTimeRecords = allTimeDistances.map(d => {
-    const best = getBestTimeForDistance(activities, d.value);
+    const record = records?.records.find(r => r.key === d.key);
+    const effort = record?.efforts[0];
+    if (effort) {
+      return {
+        label: d.label,
+        time: formatRecordTime(effort.elapsed_time),
+        date: format(new Date(effort.start_date), 'dd/MM/yyyy'),
+        activity: { id: effort.activity_id, name: effort.activity_name },
+        source: 'streams'
+      };
+    }
+    const best = recordsUnavailable ? getBestTimeForDistance(activities, d.value) : null;
     return best
       ? {
           label: d.label,
           time: formatRecordTime(best.moving_time),
           date: best.start_date ? format(new Date(best.start_date), 'dd/MM/yyyy') : '',
           activity: best.activity,
-          fromLap: best.fromLap
+          source: best.fromLap ? 'lap' : 'activity'
         }
-      : { label: d.label, time: "–", date: "", activity: null, fromLap: false };
+      : { label: d.label, time: "–", date: "", activity: null, source: null };
   });
 
-  // Mostra avviso se almeno un record non è stato calcolato da lap
-  const hasApproxRecords = allTimeRecords.some(r => r.time !== "–" && !r.fromLap);
+  // Mostra avviso se almeno un record è stimato dall'attività intera (né stream né lap)
+  const hasApproxRecords = allTimeRecords.some(r => r.source === 'activity');
 
   const fileInputRef = useRef(null);
   const [importLoading, setImportLoading] = React.useState(false);
@@ -1,4 +1,5 @@
 import { useState } from "react";
+import { useQuery } from "@tanstack/react-query";
 import { MetricCard } from "@/components/MetricCard";
 import { ChartCard } from "@/components/ChartCard";
 import { Button } from "@/components/ui/button";
@@ -53,6 +54,7 @@ import {
 } from "lucide-react";
 import { useAuth } from "@/hooks/useAuth";
 import { useActivities } from "@/hooks/useActivities";
+import { apiService } from "@/lib/api";
 import { format } from "date-fns";
 import { it } from "date-fns/locale";
 import { formatPace } from "@/lib/utils";
@@ -96,6 +98,7 @@ const chartConfig = {
   fatigue: { label: "Fatigue", color: "hsl(var(--destructive))" },
   fitness: { label: "Fitness", color: "hsl(var(--success))" },
   form: { label: "Form", color: "hsl(var(--secondary))" },
+  speed: { label: "Speed (km/h)", color: "hsl(var(--primary))" },
 };
 
 export default function Performance() {
@@ -104,88 +107,107 @@ export default function Performance() {
   const [timeRange, setTimeRange] = useState("4weeks");
 
   // --- AGGREGAZIONE DATI REALI ---
-  // Zone di frequenza cardiaca (esempio: 5 zone)
-  const hrZones = [
-    { label: "Recovery", min: 0, max: 142, color: "#22c55e" },
-    { label: "Aerobic", min: 142, max: 162, color: "#3b82f6" },
-    { label: "Tempo", min: 162, max: 174, color: "#f59e0b" },
-    { label: "Threshold", min: 174, max: 184, color: "#f97316" },
-    { label: "VO2 Max", min: 184, max: 300, color: "#ef4444" },
-  ];
-  const hrZoneCounts = Array(hrZones.length).fill(0);
-  let totalHrSamples = 0;
+  // Tempo nelle zone dal backend (activity_zones), con i limiti delle impostazioni dell'utente
+  const { data: zoneDistribution } = useQuery({
+    queryKey: ['zones', user?.id, 'year'],
+    queryFn: () => apiService.getZoneDistribution({
+      period: 'total',
+      startDate: new Date(Date.now() - 365 * 24 * 60 * 60 * 1000).toISOString(),
+    }),
+    enabled: !!user?.id,
+  });
+  const percentages = (seconds: number[] = []) => {
+    const total = seconds.reduce((sum, value) => sum + value, 0);
+    return seconds.map(value => total ? Math.round((value / total) * 100) : 0);
+  };
+
+  // Zone di frequenza cardiaca: n limiti = n + 1 zone, dalla più facile
+  const hrZoneLabels = ["Recovery", "Aerobic", "Tempo", "Threshold", "VO2 Max"];
+  const hrZoneColors = ["#22c55e", "#3b82f6", "#f59e0b", "#f97316", "#ef4444"];
+  const hrBounds = zoneDistribution?.heartrate_bounds ?? [142, 162, 174, 184];
+  const hrPercentages = percentages(zoneDistribution?.heartrate);
+  const performanceZones = [...hrBounds, null].map((max, i) => ({
+    zone: `Zone ${i+1}`,
+    label: hrZoneLabels[i] ?? `Zone ${i+1}`,
+    percentage: hrPercentages[i] ?? 0,
+    color: hrZoneColors[Math.min(i, hrZoneColors.length - 1)],
+    bpm: i === 0 ? `< ${max}` : max === null ? `> ${hrBounds[i-1]}` : `${hrBounds[i-1]}-${max}`
+  }));
   let allHr = [];
   activities.forEach(a => {
     if (a.detailed_data) {
       try {
         const streams = JSON.parse(a.detailed_data);
-        if (streams.heartrate && Array.isArray(streams.heartrate)) {
-          allHr = allHr.concat(streams.heartrate);
-          streams.heartrate.forEach(hr => {
-            for (let i = 0; i < hrZones.length; i++) {
-              if (hr >= hrZones[i].min && hr < hrZones[i].max) {
-                hrZoneCounts[i]++;
-                break;
-              }
-            }
-            totalHrSamples++;
-          });
+        // Formato del backend { tipo: { data: [...] } } o piatto { tipo: [...] } (dati mock)
+        const heartrate = Array.isArray(streams.heartrate) ? streams.heartrate : streams.heartrate?.data;
+        if (Array.isArray(heartrate)) {
+          allHr = allHr.concat(heartrate);
         }
       } catch {}
     }
   });
-  const performanceZones = hrZones.map((z, i) => ({
-    zone: `Zone ${i+1}`,
-    label: z.label,
-    percentage: totalHrSamples ? Math.round((hrZoneCounts[i] / totalHrSamples) * 100) : 0,
-    color: z.color,
-    bpm: i === 0 ? `< ${hrZones[1].min}` : i === hrZones.length-1 ? `> ${hrZones[i].min}` : `${z.min}-${z.max}`
-  }));
 
-  // Zone di ritmo (pace)
-  const paceZonesDef = [
-    { zone: "Easy", min: 5.0, max: 5.5, color: "#22c55e", pace: "5:00-5:30" },
-    { zone: "Moderate", min: 4.5, max: 5.0, color: "#f59e0b", pace: "4:30-5:00" },
-    { zone: "Tempo", min: 4.0, max: 4.5, color: "#f97316", pace: "4:00-4:30" },
-    { zone: "Hard", min: 0, max: 4.0, color: "#ef4444", pace: "< 4:00" },
-  ];
-  const paceZoneCounts = Array(paceZonesDef.length).fill(0);
-  let totalPaceSamples = 0;
-  let allPaces = [];
-  activities.filter(a => a.type === "Run" && a.moving_time && a.distance).forEach(a => {
-    const pace = (a.moving_time / 60) / (a.distance / 1000); // min/km
-    allPaces.push(pace);
-    for (let i = 0; i < paceZonesDef.length; i++) {
-      if (pace >= paceZonesDef[i].min && pace < paceZonesDef[i].max) {
-        paceZoneCounts[i]++;
-        break;
-      }
-    }
-    totalPaceSamples++;
-  });
-  const paceZones = paceZonesDef.map((z, i) => ({
-    ...z,
-    percentage: totalPaceSamples ? Math.round((paceZoneCounts[i] / totalPaceSamples) * 100) : 0
+  // Zone di ritmo: limiti in secondi al km, dal più lento
+  const paceZoneLabels = ["Recovery", "Easy", "Moderate", "Tempo", "Hard"];
+  const paceZoneColors = ["#3b82f6", "#22c55e", "#f59e0b", "#f97316", "#ef4444"];
+  const paceBounds = zoneDistribution?.pace_bounds ?? [330, 300, 270, 240];
+  const pacePercentages = percentages(zoneDistribution?.pace);
+  const formatSeconds = (seconds: number) => `${Math.floor(seconds / 60)}:${String(Math.round(seconds % 60)).padStart(2, "0")}`;
+  const paceZones = [...paceBounds, null].map((fast, i) => ({
+    zone: paceZoneLabels[i] ?? `Zone ${i+1}`,
+    percentage: pacePercentages[i] ?? 0,
+    color: paceZoneColors[Math.min(i, paceZoneColors.length - 1)],
+    pace: i === 0 ? `> ${formatSeconds(fast)}` : fast === null ? `< ${formatSeconds(paceBounds[i-1])}` : `${formatSeconds(fast)}-${formatSeconds(paceBounds[i-1])}`
   }));
+  const allPaces = activities
+    .filter(a => a.type === "Run" && a.moving_time && a.distance)
+    .map(a => (a.moving_time / 60) / (a.distance / 1000)); // min/km
 
-  // Carico settimanale (esempio: somma distanza, tempo, fitness fittizio)
-  const weekly: Record<string, { load: number; fatigue: number; fitness: number; form: number; time: number; distance: number }> = {};
+  // Tempo e distanza settimanali dalle corse
+  const weekly: Record<string, { time: number; distance: number }> = {};
   activities.filter(a => a.type === "Run").forEach(a => {
     const d = new Date(a.start_date);
     const week = `${d.getFullYear()}-W${String(Math.ceil((d.getDate() + 6 - d.getDay()) / 7)).padStart(2, "0")}`;
-    if (!weekly[week]) weekly[week] = { load: 0, fatigue: 0, fitness: 0, form: 0, time: 0, distance: 0 };
-    weekly[week].load += a.distance / 1000;
-    weekly[week].fatigue += a.moving_time / 60;
-    weekly[week].fitness += (a.distance / 1000) * 0.2 + (a.moving_time / 60) * 0.1; // esempio
-    weekly[week].form += (a.distance / 1000) * 0.05;
+    if (!weekly[week]) weekly[week] = { time: 0, distance: 0 };
     weekly[week].time += a.moving_time / 3600;
     weekly[week].distance += a.distance / 1000;
   });
   const weeksOrder = Object.keys(weekly).sort();
-  const weeklyLoad = weeksOrder.map(week => ({
-    week,
-    ...weekly[week]
-  })).slice(-6); // ultime 6 settimane
+
+  // Carico (TRIMP), fatica (ATL), forma fisica (CTL) e forma (TSB) dal backend (training_loads):
+  // per ogni settimana il carico è la somma dei giorni, le medie sono quelle dell'ultimo giorno
+  const { data: trainingLoadSeries } = useQuery({
+    queryKey: ['training-load', user?.id, '6weeks'],
+    queryFn: () => apiService.getTrainingLoad({
+      startDate: new Date(Date.now() - 41 * 24 * 60 * 60 * 1000).toISOString().slice(0, 10),
+    }),
+    enabled: !!user?.id,
+  });
+  // Curva media-massima di sempre della corsa (mean_max_envelopes): velocità in km/h per durata
+  const { data: speedCurve } = useQuery({
+    queryKey: ['mean-max', user?.id, 'Run', 'speed'],
+    queryFn: () => apiService.getMeanMaxCurve({ activity_type: 'Run', kind: 'speed' }),
+    enabled: !!user?.id,
+  });
+  const formatDuration = (seconds: number) =>
+    seconds < 60 ? `${seconds}s` : seconds < 3600 ? `${Math.round(seconds / 60)}m` : `${+(seconds / 3600).toFixed(1)}h`;
+  const meanMaxData = (speedCurve?.points ?? []).map(point => ({
+    duration: formatDuration(point.duration),
+    speed: +(point.value * 3.6).toFixed(1),
+  }));
+
+  const weeklyLoad: Array<{ week: string; load: number; fatigue: number; fitness: number; form: number }> = [];
+  (trainingLoadSeries?.days ?? []).forEach((day, i) => {
+    if (i % 7 === 0) {
+      const [, month, date] = day.date.split('-');
+      weeklyLoad.push({ week: `${date}/${month}`, load: 0, fatigue: 0, fitness: 0, form: 0 });
+    }
+    const week = weeklyLoad[weeklyLoad.length - 1];
+    week.load += day.trimp;
+    week.fatigue = Math.round(day.atl);
+    week.fitness = Math.round(day.ctl);
+    week.form = Math.round(day.tsb);
+  });
 
   // Trova la prima settimana di giugno tra i dati disponibili
   const firstJuneWeekKey = weeksOrder.find(week => {
@@ -220,7 +242,7 @@ export default function Performance() {
   const trainingLoad = weeklyLoad.reduce((sum, w) => sum + w.load, 0);
   const performanceIndex = Math.round((vo2max + radarData[0].value + radarData[1].value + radarData[4].value + radarData[5].value) / 5);
   const recoveryScore = radarData[3].value;
-  const weeklySummary = weeklyLoad.length ? weeklyLoad[weeklyLoad.length-1] : { time: 0, distance: 0 };
+  const weeklySummary = weeksOrder.length ? weekly[weeksOrder[weeksOrder.length-1]] : { time: 0, distance: 0 };
 
   if (isLoadingActivities) {
     return <div className="flex items-center justify-center h-64"><span>Caricamento dati...</span></div>;
@@ -264,7 +286,7 @@ export default function Performance() {
         <MetricCard
           title="Training Load"
           value={trainingLoad ? trainingLoad.toFixed(0) : "-"}
-          unit="km"
+          unit="TRIMP"
           change={0}
           icon={Zap}
           variant="secondary"
@@ -437,6 +459,37 @@ export default function Performance() {
         </Card>
       </div>
 
+      {/* Mean-Max Curve */}
+      <ChartCard title="Critical Speed Curve" description="Best average speed (km/h) for each duration, all time">
+        <ChartContainer config={chartConfig} className="h-[280px] w-full">
+          <ResponsiveContainer width="100%" height="100%">
+            <LineChart data={meanMaxData} margin={{ top: 20, right: 20, left: 20, bottom: 20 }}>
+              <CartesianGrid strokeDasharray="3 3" opacity={0.3} />
+              <XAxis 
+                dataKey="duration" 
+                tick={{ fontSize: 12 }}
+                tickLine={false}
+                axisLine={false}
+              />
+              <YAxis 
+                tick={{ fontSize: 12 }}
+                tickLine={false}
+                axisLine={false}
+                width={40}
+              />
+              <ChartTooltip content={<ChartTooltipContent />} />
+              <Line
+                type="monotone"
+                dataKey="speed"
+                stroke="hsl(var(--primary))"
+                strokeWidth={3}
+                dot={{ fill: "hsl(var(--primary))", strokeWidth: 2, r: 3 }}
+              />
+            </LineChart>
+          </ResponsiveContainer>
+        </ChartContainer>
+      </ChartCard>
+
       {/* Performance Insights */}
       <div className="grid gap-6 md:grid-cols-3">
         <Card className="bg-gradient-card">